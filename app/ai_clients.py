@@ -0,0 +1,238 @@
+"""
+Process-wide registry of OpenAI / Anthropic clients.
+
+One SDK client per (provider, API key) is shared by all requests and threads,
+so its HTTP connection pool and keep-alive connections are reused instead of
+opening a new TLS connection per request. Each call type gets its own deadline
+(AI_TIMEOUTS) and every provider has a circuit breaker that fails fast while
+the provider is degraded instead of tying up workers until the timeout.
+
+    client = get_client("openai", "chat")
+    with ai_call("openai", "interactive", tokens=estimate_tokens(messages, max_tokens=400)):
+        completion = client.chat.completions.create(...)
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("openai", "anthropic")
+
+# Deadline per call type in seconds (override with settings.AI_TIMEOUTS)
+DEFAULT_TIMEOUTS = {
+    "chat": 30.0,
+    "classification": 10.0,
+    "vision": 90.0,
+    "embeddings": 20.0,
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Provider is degraded, the call was rejected without contacting it."""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"AI provider '{provider}' is unavailable, retry in {retry_after:.0f}s")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+def call_timeout(kind: str) -> float:
+    timeouts = {**DEFAULT_TIMEOUTS, **getattr(settings, "AI_TIMEOUTS", {})}
+    if kind not in timeouts:
+        raise ValueError(f"Unknown AI call type: {kind}. Use one of {sorted(timeouts)}")
+    return float(timeouts[kind])
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    """Timeouts, connection errors, 5xx and 429 count against the breaker, 4xx do not."""
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status >= 500 or status == 429
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in ("APIConnectionError", "APITimeoutError") for cls in type(exc).__mro__)
+
+
+class CircuitBreaker:
+    """
+    Closed → open after failure_threshold consecutive provider failures.
+
+    While open every call fails immediately; after reset_timeout one trial
+    call is let through (half-open) and closes the circuit on success.
+    """
+
+    def __init__(self, provider: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> None:
+        """Raises CircuitOpenError while the circuit is open."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return
+            retry_after = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        raise CircuitOpenError(self.provider, retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"AI provider '{self.provider}' recovered, circuit closed")
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self._trial_running:
+                    logger.warning(
+                        f"AI provider '{self.provider}' failing ({self.failures} in a row), "
+                        f"circuit open for {self.reset_timeout:.0f}s"
+                    )
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def release_trial(self) -> None:
+        """Trial call ended without a verdict (e.g. a 400), let the next one through."""
+        with self._lock:
+            self._trial_running = False
+
+
+class AIClientRegistry:
+    """Shared SDK clients and circuit breakers (thread-safe, created lazily)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, Optional[str]], object] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def _api_key(self, provider: str) -> Optional[str]:
+        if provider == "openai":
+            return getattr(settings, "OPENAI_API_KEY", None)
+        return getattr(settings, "ANTHROPIC_API_KEY", None)
+
+    def _create(self, provider: str, api_key: Optional[str]):
+        max_retries = int(getattr(settings, "AI_MAX_RETRIES", 2))
+        timeout = max(DEFAULT_TIMEOUTS.values())
+        if provider == "openai":
+            from openai import OpenAI
+
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY is not configured in settings")
+            return OpenAI(api_key=api_key, timeout=timeout, max_retries=max_retries)
+
+        import anthropic
+
+        # Without a key the SDK reads ANTHROPIC_API_KEY from the environment
+        return anthropic.Anthropic(api_key=api_key, timeout=timeout, max_retries=max_retries)
+
+    def get_client(self, provider: str, kind: str = "chat", api_key: Optional[str] = None):
+        """
+        Shared client of a provider bound to the deadline of a call type.
+
+        The returned object is a lightweight copy (with_options) that uses the
+        pooled HTTP connections of the shared client.
+
+        Raises:
+            ValueError: unknown provider / call type or missing OpenAI API key
+        """
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown AI provider: {provider}. Use one of {PROVIDERS}")
+        timeout = call_timeout(kind)
+        key = (provider, api_key or self._api_key(provider) or None)
+
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._create(*key)
+                    self._clients[key] = client
+                    logger.info(f"Created shared {provider} client")
+        return client.with_options(timeout=timeout)
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(
+                    provider,
+                    failure_threshold=int(getattr(settings, "AI_CIRCUIT_FAILURE_THRESHOLD", 5)),
+                    reset_timeout=float(getattr(settings, "AI_CIRCUIT_RESET_TIMEOUT", 30)),
+                )
+            return self._breakers[provider]
+
+    @contextmanager
+    def circuit(self, provider: str):
+        """Guard one provider call; raises CircuitOpenError while the provider is degraded."""
+        breaker = self.breaker(provider)
+        breaker.before_call()
+        try:
+            yield
+        except Exception as exc:
+            if is_provider_failure(exc):
+                breaker.record_failure()
+            else:
+                breaker.release_trial()
+            raise
+        breaker.record_success()
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                name: {"state": b.state, "failures": b.failures}
+                for name, b in self._breakers.items()
+            }
+
+    def reset(self) -> None:
+        """Drop clients and breakers (tests, key rotation)."""
+        with self._lock:
+            for client in self._clients.values():
+                try:
+                    client.close()
+                except Exception:
+                    pass
+            self._clients.clear()
+            self._breakers.clear()
+
+
+registry = AIClientRegistry()
+get_client = registry.get_client
+circuit = registry.circuit
+
+
+@contextmanager
+def ai_call(provider: str, priority: str = "interactive", tokens: int = 0):
+    """
+    Guard one provider call: circuit breaker + cluster-wide rate limit.
+
+    Waits for the provider budget of the priority class (see app/rate_limit.py),
+    raises CircuitOpenError while the provider is degraded.
+    """
+    from .rate_limit import rate_limiter
+
+    with circuit(provider):
+        rate_limiter.acquire(provider, priority, tokens)
+        yield
@@ -0,0 +1,77 @@
+"""
+Conditional GET for per-user JSON endpoints.
+
+Dashboard and coach SPA endpoints are polled on every tab switch while the
+data behind them changes only when a statement, document or survey is saved.
+Each endpoint declares which data it is built from; its ETag is a fingerprint
+of that data (row count + latest created/updated timestamps, one aggregate
+query), so a matching If-None-Match is answered with 304 before the view
+computes any metrics:
+
+    @login_required
+    @conditional_json(statements_version)
+    def api_profitability(request): ...
+
+    @conditional_json(documents_version, user_id=client_user_id)
+    def documents_data(request, client_id): ...
+
+Counts are part of the fingerprint because deleting a row does not move the
+latest timestamp. Bump ETAG_VERSION when a payload format changes.
+"""
+import hashlib
+from typing import Callable, Optional
+
+from django.db.models import Count, Max
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from ingest.models import Document, FinancialStatement
+from survey.models import SurveySubmission
+
+ETAG_VERSION = 1
+
+
+def statements_version(user_id: int) -> tuple:
+    """Statements and their materialized metrics (refreshed on every statement save)."""
+    data = FinancialStatement.objects.filter(user_id=user_id).aggregate(
+        count=Count("id"), created=Max("created_at"), computed=Max("metrics__computed_at")
+    )
+    return data["count"], data["created"], data["computed"]
+
+
+def documents_version(user_id: int) -> tuple:
+    data = Document.objects.filter(owner_id=user_id).aggregate(count=Count("id"), updated=Max("updated_at"))
+    return data["count"], data["updated"]
+
+
+def surveys_version(user_id: int) -> tuple:
+    data = SurveySubmission.objects.filter(user_id=user_id).aggregate(count=Count("id"), created=Max("created_at"))
+    return data["count"], data["created"]
+
+
+def own_user_id(request, *args, **kwargs) -> Optional[int]:
+    return request.user.pk if request.user.is_authenticated else None
+
+
+def conditional_json(
+    version: Callable[[int], tuple],
+    user_id: Callable[..., Optional[int]] = own_user_id,
+):
+    """
+    ETag a view by the data version of one user.
+
+    `user_id(request, *args, **kwargs)` resolves whose data the view returns;
+    None (anonymous, forbidden) skips the ETag and lets the view answer.
+    Responses are private and always revalidated by the browser.
+    """
+    def etag(request, *args, **kwargs):
+        owner = user_id(request, *args, **kwargs)
+        if owner is None:
+            return None
+        fingerprint = f"{ETAG_VERSION}:{request.get_full_path()}:{owner}:{version(owner)}"
+        return hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+
+    def decorator(view):
+        return cache_control(private=True, no_cache=True)(condition(etag_func=etag)(view))
+
+    return decorator
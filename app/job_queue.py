@@ -0,0 +1,242 @@
+"""
+Database-backed work queue shared by the ingest and export workers.
+
+Work items are model rows with `status` (queued → running → done/failed),
+`attempts`, `started_at`, `finished_at` and `error`. A worker claims the
+oldest queued row with a conditional UPDATE, so threads and processes never
+process the same row twice. Rows stuck in "running" after a worker crashed
+are requeued, or marked failed once they were claimed `max_attempts` times.
+No Celery/Redis is needed: the queue is drained either by an in-process
+daemon thread or by a management command.
+
+    class ExportJobService(JobQueue):
+        model = ExportJob
+        label = "export job"
+        max_attempts_setting = "EXPORT_JOB_MAX_ATTEMPTS"
+
+        def process(self, job): ...
+
+    _inline = InlineWorker("export", "EXPORT_JOBS_INLINE", ExportJobService)
+    _inline.start()                                   # after commit of a new job
+
+    class Command(WorkerCommand):                     # manage.py run_export_worker
+        service_class = ExportJobService
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Iterable, Optional, Type
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Claim, process and recover rows of one queue model."""
+
+    model = None
+    label = "job"
+    max_attempts_setting = ""
+    # A row "running" for longer than this belongs to a crashed worker
+    stale_minutes = 30
+    exhausted_error = "Zpracování opakovaně selhalo."
+
+    def max_attempts(self) -> int:
+        """How many times a row may be claimed before a stale run marks it failed."""
+        return max(1, int(getattr(settings, self.max_attempts_setting, 3)))
+
+    def claim(self, item) -> bool:
+        """Atomically move one queued row to "running" (conditional UPDATE)."""
+        now = timezone.now()
+        claimed = self.model.objects.filter(pk=item.pk, status="queued").update(
+            status="running",
+            started_at=now,
+            attempts=item.attempts + 1,
+        )
+        if claimed:
+            item.status, item.started_at, item.attempts = "running", now, item.attempts + 1
+            self.on_claimed(item)
+        return bool(claimed)
+
+    def claim_next(self):
+        """Claim the oldest queued row; None when the queue is empty."""
+        while True:
+            item = self.model.objects.filter(status="queued").order_by("id").first()
+            if item is None:
+                return None
+            if self.claim(item):
+                return item
+
+    def release(self, pks: Iterable[int]) -> int:
+        """Return claimed rows that were never processed to the queue, without counting the attempt."""
+        return self.model.objects.filter(pk__in=list(pks), status="running").update(
+            status="queued", attempts=F("attempts") - 1
+        )
+
+    def process(self, item):
+        raise NotImplementedError
+
+    def drain(self, concurrency: int = 1) -> int:
+        """
+        Process queued rows until the queue is empty.
+
+        Args:
+            concurrency: Number of worker threads
+
+        Returns:
+            Number of processed rows
+        """
+        if concurrency <= 1:
+            return self._work()
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=self.label.split()[0]) as pool:
+            futures = [pool.submit(self._threaded_work) for _ in range(concurrency)]
+            return sum(f.result() for f in futures)
+
+    def requeue_stale(self, minutes: Optional[int] = None) -> int:
+        """
+        Return rows stuck in "running" (crashed worker) back to the queue.
+
+        A row already claimed `max_attempts` times is marked failed instead,
+        so an input that kills the worker is not retried forever.
+        """
+        now = timezone.now()
+        stale = self.model.objects.filter(status="running", started_at__lt=self.stale_cutoff(minutes))
+        for item in stale.filter(attempts__gte=self.max_attempts()):
+            failed = self.model.objects.filter(pk=item.pk, status="running").update(
+                status="failed", error=self.exhausted_error, finished_at=now
+            )
+            if failed:
+                logger.error(f"{self.label.capitalize()} {item.pk} failed after {item.attempts} attempts")
+                self.on_exhausted(item)
+
+        count = stale.update(status="queued")
+        if count:
+            logger.warning(f"Requeued {count} stale {self.label}s")
+        return count
+
+    def stale_cutoff(self, minutes: Optional[int] = None):
+        """Rows "running" since before this time belong to a crashed worker."""
+        return timezone.now() - timedelta(minutes=minutes or self.stale_minutes)
+
+    def is_stale(self, item) -> bool:
+        """Whether a loaded row is "running" for longer than `stale_minutes`."""
+        return item.status == "running" and item.started_at is not None and item.started_at < self.stale_cutoff()
+
+    def on_claimed(self, item) -> None:
+        """Hook after a row was claimed."""
+
+    def on_exhausted(self, item) -> None:
+        """Hook after a stale row was marked failed."""
+
+    def _work(self) -> int:
+        processed = 0
+        while True:
+            item = self.claim_next()
+            if item is None:
+                return processed
+            self.process(item)
+            processed += 1
+
+    def _threaded_work(self) -> int:
+        try:
+            return self._work()
+        finally:
+            connection.close()
+
+
+class InlineWorker:
+    """
+    Daemon thread that drains a queue inside the web process.
+
+    Disabled by setting `setting` to False when a dedicated worker command
+    runs instead. Like the command, every pass first requeues rows left in
+    "running" by a crashed or restarted process.
+    """
+
+    def __init__(self, name: str, setting: str, service_class: Type[JobQueue]):
+        self.name = name
+        self.setting = setting
+        self.service_class = service_class
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pending = False
+
+    def start(self) -> None:
+        """Make sure the thread runs; a running thread drains once more."""
+        if not getattr(settings, self.setting, True):
+            return
+
+        with self._lock:
+            self._pending = True
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name=f"{self.name}-inline-worker", daemon=True)
+            self._thread.start()
+
+    def drain(self) -> int:
+        """One pass of the thread: recover stale rows, then empty the queue."""
+        service = self.service_class()
+        service.requeue_stale()
+        return service.drain()
+
+    def _loop(self) -> None:
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._thread = None
+                        return
+                    self._pending = False
+                close_old_connections()
+                self.drain()
+        except Exception as e:
+            logger.error(f"Inline {self.name} worker crashed: {e}", exc_info=True)
+            with self._lock:
+                self._thread = None
+        finally:
+            connection.close()
+
+
+class WorkerCommand(BaseCommand):
+    """Polling loop of a `run_*_worker` management command."""
+
+    service_class = JobQueue
+    name = "job"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Drain the queue and exit.")
+        parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between queue checks.")
+        parser.add_argument(
+            "--stale-minutes", type=int, default=self.service_class.stale_minutes,
+            help="Requeue items running longer than this.",
+        )
+
+    def drain(self, service, options) -> int:
+        return service.drain()
+
+    def handle(self, *args, **options):
+        service = self.service_class()
+        self.stdout.write(self.style.SUCCESS(f"{self.name.capitalize()} worker started."))
+
+        try:
+            while True:
+                service.requeue_stale(options["stale_minutes"])
+                processed = self.drain(service, options)
+                if processed:
+                    self.stdout.write(f"Processed {processed} {service.label}s.")
+                if options["once"]:
+                    break
+                time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"{self.name.capitalize()} worker stopped."))
@@ -0,0 +1,227 @@
+"""
+Cluster-wide rate limiter for AI provider calls.
+
+Every web process, ingest worker and management command draws from the same
+per-provider token bucket stored in the database (AIRateBucket, row locked
+with SELECT … FOR UPDATE), with separate budgets for tokens and requests per
+minute (AI_RATE_LIMITS). Calls belong to a priority class:
+
+    interactive  chat, coach questions, RAG search      (never waits behind others)
+    ingest       vision extraction, summaries           (keeps AI_RATE_LIMIT_RESERVE free)
+    batch        bulk embedding runs                    (keeps a larger reserve free)
+
+A call that does not fit waits in the queue (AIRateWaiter) instead of failing;
+lower classes also wait while a higher class is queued. Queue depth and wait
+times are visible with `manage.py ai_rate_limits` and in the admin (AIRateStat).
+The limiter fails open: database errors never block an AI call.
+"""
+import json
+import logging
+import random
+import time
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = ("interactive", "ingest", "batch")
+
+DEFAULT_LIMITS = {
+    "openai": {"tokens_per_minute": 200_000, "requests_per_minute": 500},
+    "anthropic": {"tokens_per_minute": 80_000, "requests_per_minute": 50},
+}
+# Share of the budget a class must leave untouched for the classes above it
+DEFAULT_RESERVE = {"interactive": 0.0, "ingest": 0.1, "batch": 0.3}
+# After this many seconds in the queue a call proceeds anyway (logged, counted as timed_out)
+DEFAULT_MAX_WAIT = {"interactive": 30, "ingest": 300, "batch": 1800}
+
+# Vision payloads are capped at ~1.15 MP ≈ 1 600 image tokens (see ImagePreparer)
+IMAGE_TOKENS = 1600
+
+WAITER_STALE_SECONDS = 30
+MIN_POLL = 0.05
+MAX_POLL = 1.0
+
+
+def estimate_tokens(content: Any = "", max_tokens: int = 0, images: int = 0) -> int:
+    """Rough request size: ~4 characters per token + completion budget + images."""
+    text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False, default=str)
+    return len(text) // 4 + int(max_tokens) + images * IMAGE_TOKENS
+
+
+def rate_limit_enabled() -> bool:
+    return getattr(settings, "AI_RATE_LIMIT_ENABLED", True)
+
+
+def provider_limits(provider: str) -> Dict[str, float]:
+    limits = {**DEFAULT_LIMITS.get(provider, DEFAULT_LIMITS["openai"]),
+              **getattr(settings, "AI_RATE_LIMITS", {}).get(provider, {})}
+    return {key: float(value) for key, value in limits.items()}
+
+
+def _setting(name: str, defaults: Dict[str, float], priority: str) -> float:
+    return float({**defaults, **getattr(settings, name, {})}[priority])
+
+
+class RateLimiter:
+    """DB-backed token bucket with priority classes (module singleton: rate_limiter)."""
+
+    def _rank(self, priority: str) -> int:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown AI priority: {priority}. Use one of {PRIORITIES}")
+        return PRIORITIES.index(priority)
+
+    def _try_take(self, provider: str, priority: str, tokens: int, waiter_id: Optional[int]) -> Optional[float]:
+        """
+        Take the budget if the call may run now.
+
+        Returns:
+            None when taken, otherwise seconds to sleep before the next try
+        """
+        from ingest.models import AIRateBucket, AIRateWaiter
+
+        limits = provider_limits(provider)
+        tpm, rpm = limits["tokens_per_minute"], limits["requests_per_minute"]
+        reserve = _setting("AI_RATE_LIMIT_RESERVE", DEFAULT_RESERVE, priority)
+        rank = self._rank(priority)
+        # A single call larger than the usable budget would never fit
+        need = min(float(tokens), tpm * (1 - reserve))
+
+        now = timezone.now()
+        cutoff = now - timedelta(seconds=WAITER_STALE_SECONDS)
+        with transaction.atomic():
+            bucket, _ = AIRateBucket.objects.select_for_update().get_or_create(
+                provider=provider, defaults={"tokens": tpm, "requests": rpm, "updated_at": now}
+            )
+            elapsed = max(0.0, (now - bucket.updated_at).total_seconds())
+            bucket.tokens = min(tpm, bucket.tokens + elapsed * tpm / 60)
+            bucket.requests = min(rpm, bucket.requests + elapsed * rpm / 60)
+            bucket.updated_at = now
+
+            # Waiting calls of a higher class (or older calls of the same class) go first
+            AIRateWaiter.objects.filter(provider=provider, heartbeat_at__lt=cutoff).delete()
+            ahead = AIRateWaiter.objects.filter(provider=provider)
+            if waiter_id is None:
+                ahead = ahead.filter(rank__lte=rank)
+            else:
+                ahead = ahead.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=waiter_id))
+            blocked = ahead.exists()
+
+            token_gap = need - (bucket.tokens - reserve * tpm)
+            request_gap = 1 - (bucket.requests - reserve * rpm)
+            if not blocked and token_gap <= 0 and request_gap <= 0:
+                bucket.tokens -= need
+                bucket.requests -= 1
+                bucket.save()
+                return None
+            bucket.save()
+
+        if blocked:
+            return MIN_POLL * 4
+        wait = max(token_gap / (tpm / 60), request_gap / (rpm / 60))
+        # Jitter keeps waiting processes from polling in lockstep
+        return min(MAX_POLL, max(MIN_POLL, wait)) * random.uniform(1.0, 1.2)
+
+    def acquire(self, provider: str, priority: str = "interactive", tokens: int = 0) -> float:
+        """
+        Block until the provider budget allows the call.
+
+        Args:
+            provider: "openai" / "anthropic"
+            priority: "interactive" / "ingest" / "batch"
+            tokens: Estimated tokens of the call (estimate_tokens)
+
+        Returns:
+            Seconds spent in the queue (0.0 when the budget was available)
+        """
+        self._rank(priority)
+        if not rate_limit_enabled():
+            return 0.0
+
+        from ingest.models import AIRateWaiter
+
+        start = time.monotonic()
+        deadline = start + _setting("AI_RATE_LIMIT_MAX_WAIT", DEFAULT_MAX_WAIT, priority)
+        waiter = None
+        timed_out = False
+        try:
+            while True:
+                try:
+                    delay = self._try_take(provider, priority, tokens, waiter.pk if waiter else None)
+                except IntegrityError:
+                    delay = MIN_POLL  # bucket row created concurrently
+                if delay is None:
+                    break
+                if waiter is None:
+                    waiter = AIRateWaiter.objects.create(
+                        provider=provider, priority=priority, rank=self._rank(priority), tokens=tokens
+                    )
+                    logger.info(f"AI call queued: {provider}/{priority}, {tokens} tokens")
+                else:
+                    AIRateWaiter.objects.filter(pk=waiter.pk).update(heartbeat_at=timezone.now())
+                if time.monotonic() + delay > deadline:
+                    timed_out = True
+                    logger.warning(f"AI call {provider}/{priority} waited too long, proceeding without budget")
+                    break
+                time.sleep(delay)
+        except DatabaseError as e:
+            logger.warning(f"AI rate limiter unavailable ({e}), not limiting")
+        finally:
+            if waiter is not None:
+                try:
+                    AIRateWaiter.objects.filter(pk=waiter.pk).delete()
+                except DatabaseError:
+                    pass
+
+        waited = time.monotonic() - start if waiter else 0.0
+        self._record(provider, priority, tokens, waited, timed_out)
+        return waited
+
+    def _record(self, provider: str, priority: str, tokens: int, waited: float, timed_out: bool) -> None:
+        """Update wait counters (fail-open)."""
+        from ingest.models import AIRateStat
+
+        try:
+            AIRateStat.objects.get_or_create(provider=provider, priority=priority)
+            AIRateStat.objects.filter(provider=provider, priority=priority).update(
+                calls=F("calls") + 1,
+                waited=F("waited") + (1 if waited > 0 else 0),
+                timed_out=F("timed_out") + (1 if timed_out else 0),
+                tokens=F("tokens") + tokens,
+                wait_seconds=F("wait_seconds") + waited,
+                max_wait_seconds=Greatest(F("max_wait_seconds"), waited),
+            )
+        except Exception as e:
+            logger.warning(f"Failed to record AI rate stats: {e}")
+
+    def queue_depth(self) -> Dict[str, Dict[str, int]]:
+        """Calls currently waiting: {provider: {priority: count}}."""
+        from ingest.models import AIRateWaiter
+
+        cutoff = timezone.now() - timedelta(seconds=WAITER_STALE_SECONDS)
+        depth: Dict[str, Dict[str, int]] = {}
+        rows = (
+            AIRateWaiter.objects.filter(heartbeat_at__gte=cutoff)
+            .values("provider", "priority")
+            .annotate(count=Count("id"))
+        )
+        for row in rows:
+            depth.setdefault(row["provider"], {})[row["priority"]] = row["count"]
+        return depth
+
+    def reset(self) -> None:
+        """Refill all buckets and drop the queue and counters."""
+        from ingest.models import AIRateBucket, AIRateStat, AIRateWaiter
+
+        AIRateBucket.objects.all().delete()
+        AIRateWaiter.objects.all().delete()
+        AIRateStat.objects.all().delete()
+
+
+rate_limiter = RateLimiter()
@@ -173,3 +173,105 @@ SQLALCHEMY_DATABASE_URL = os.getenv(
     "DATABASE_URL",
     f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
 )
+
+# Ingest – zpracování nahraných výkazů
+# Cache výsledků AI extrakce (klíč = SHA-256 PDF + stránka + DPI + model + verze promptu)
+INGEST_EXTRACTION_CACHE_MAX_ENTRIES = int(os.getenv("INGEST_EXTRACTION_CACHE_MAX_ENTRIES", "5000"))
+INGEST_EXTRACTION_CACHE_TTL_DAYS = int(os.getenv("INGEST_EXTRACTION_CACHE_TTL_DAYS", "90"))
+# Max. souběžných vision volání v jednom procesu
+INGEST_VISION_CONCURRENCY = int(os.getenv("INGEST_VISION_CONCURRENCY", "3"))
+# True = joby zpracovává vlákno ve web procesu, False = samostatný `manage.py run_ingest_worker`
+INGEST_JOBS_INLINE = os.getenv("INGEST_JOBS_INLINE", "true").lower() == "true"
+# Soubor, jehož zpracování opakovaně shodilo worker, se po N pokusech označí jako chybný
+INGEST_JOB_MAX_ATTEMPTS = int(os.getenv("INGEST_JOB_MAX_ATTEMPTS", "3"))
+# Text-layer pre-pass (typ/rok/stránka z textové vrstvy PDF bez volání AI)
+INGEST_TEXT_PREPASS_ENABLED = os.getenv("INGEST_TEXT_PREPASS_ENABLED", "true").lower() == "true"
+INGEST_TEXT_PREPASS_MIN_CONFIDENCE = float(os.getenv("INGEST_TEXT_PREPASS_MIN_CONFIDENCE", "0.8"))
+INGEST_TEXT_PREPASS_MAX_PAGES = int(os.getenv("INGEST_TEXT_PREPASS_MAX_PAGES", "10"))
+# Deterministický parser textové vrstvy – pod touto confidence se volá Claude vision
+INGEST_TEXT_PARSER_MIN_CONFIDENCE = float(os.getenv("INGEST_TEXT_PARSER_MIN_CONFIDENCE", "0.85"))
+
+# Vision payload – ořez na tabulku, odstíny šedi, zmenšení na efektivní rozlišení modelu
+INGEST_VISION_MAX_LONG_EDGE = int(os.getenv("INGEST_VISION_MAX_LONG_EDGE", "1568"))
+INGEST_VISION_MAX_PIXELS = int(os.getenv("INGEST_VISION_MAX_PIXELS", "1150000"))
+INGEST_VISION_IMAGE_FORMAT = os.getenv("INGEST_VISION_IMAGE_FORMAT", "png")  # png | webp
+INGEST_VISION_MEASURE_BASELINE = os.getenv("INGEST_VISION_MEASURE_BASELINE", "false").lower() == "true"
+# Adaptivní DPI – render od nejnižšího DPI, vyšší jen při nízké confidence / nesedících součtech
+INGEST_VISION_DPI_TIERS = [int(dpi) for dpi in os.getenv("INGEST_VISION_DPI_TIERS", "120,200,300").split(",")]
+INGEST_VISION_TIER_MIN_CONFIDENCE = float(os.getenv("INGEST_VISION_TIER_MIN_CONFIDENCE", "0.85"))
+# Fan-out přes všechny stránky s výkazy (výroční zprávy: více výkazů / let v jednom PDF)
+INGEST_FANOUT_ENABLED = os.getenv("INGEST_FANOUT_ENABLED", "true").lower() == "true"
+INGEST_FANOUT_MAX_PAGES = int(os.getenv("INGEST_FANOUT_MAX_PAGES", "40"))  # stránky prohledané v textové vrstvě
+INGEST_FANOUT_SCAN_PAGES = int(os.getenv("INGEST_FANOUT_SCAN_PAGES", "3"))  # stránky skenu bez textové vrstvy
+# Počet procesů pro paralelní renderování stránek (1 = renderovat ve vlákně requestu)
+INGEST_RENDER_PROCESSES = int(os.getenv("INGEST_RENDER_PROCESSES", str(min(4, os.cpu_count() or 1))))
+# Max. velikost PDF – kontroluje se před jakýmkoli zápisem na disk
+INGEST_MAX_PDF_SIZE = int(os.getenv("INGEST_MAX_PDF_SIZE", str(10 * 1024 * 1024)))
+# Uploady do tohoto limitu drží Django v paměti (žádný dočasný soubor)
+FILE_UPLOAD_MAX_MEMORY_SIZE = INGEST_MAX_PDF_SIZE
+# Obrázky extrahovaných tabulek – úložiště podle SHA-256 obsahu (relativně k BASE_DIR)
+INGEST_IMAGE_STORE_DIR = os.getenv("INGEST_IMAGE_STORE_DIR", "ingest/media/extracted_tables")
+# Nenavázané obrázky mladší než N dní `gc_extracted_images` nemaže (čekající potvrzení uploadu)
+INGEST_IMAGE_RETENTION_DAYS = int(os.getenv("INGEST_IMAGE_RETENTION_DAYS", "7"))
+
+# AI klienti – sdílený pool spojení, deadline podle typu volání, circuit breaker (app/ai_clients.py)
+AI_TIMEOUTS = {
+    "chat": float(os.getenv("AI_TIMEOUT_CHAT", "30")),
+    "classification": float(os.getenv("AI_TIMEOUT_CLASSIFICATION", "10")),
+    "vision": float(os.getenv("AI_TIMEOUT_VISION", "90")),
+    "embeddings": float(os.getenv("AI_TIMEOUT_EMBEDDINGS", "20")),
+}
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+# Po N chybách poskytovatele za sebou (timeout, 5xx, 429) se volání na X s odmítají bez čekání
+AI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("AI_CIRCUIT_FAILURE_THRESHOLD", "5"))
+AI_CIRCUIT_RESET_TIMEOUT = float(os.getenv("AI_CIRCUIT_RESET_TIMEOUT", "30"))
+# Rate limit AI volání sdílený všemi procesy (DB token bucket), priority interactive > ingest > batch
+AI_RATE_LIMIT_ENABLED = os.getenv("AI_RATE_LIMIT_ENABLED", "true").lower() == "true"
+AI_RATE_LIMITS = {
+    "openai": {
+        "tokens_per_minute": int(os.getenv("AI_OPENAI_TPM", "200000")),
+        "requests_per_minute": int(os.getenv("AI_OPENAI_RPM", "500")),
+    },
+    "anthropic": {
+        "tokens_per_minute": int(os.getenv("AI_ANTHROPIC_TPM", "80000")),
+        "requests_per_minute": int(os.getenv("AI_ANTHROPIC_RPM", "50")),
+    },
+}
+# Podíl rozpočtu, který musí nižší třída nechat volný pro vyšší
+AI_RATE_LIMIT_RESERVE = {"interactive": 0.0, "ingest": 0.1, "batch": 0.3}
+# Max. čekání ve frontě (s), pak volání proběhne i bez rozpočtu
+AI_RATE_LIMIT_MAX_WAIT = {"interactive": 30, "ingest": 300, "batch": 1800}
+
+# Peer benchmarking – percentily marží podle roku a velikosti firmy (dashboard/benchmarks.py)
+# Rok se po nahrání výkazu přepočítá nejvýš jednou za N s, zbytek dožene `refresh_peer_benchmarks` (cron)
+BENCHMARK_REFRESH_INTERVAL = int(os.getenv("BENCHMARK_REFRESH_INTERVAL", "300"))
+# Menší skupina se nezobrazuje (použije se srovnání se všemi firmami)
+BENCHMARK_MIN_PEERS = int(os.getenv("BENCHMARK_MIN_PEERS", "5"))
+
+# Cache – "dashboard" je sdílená mezi procesy (kontext dashboardu, dashboard/context_cache.py);
+# databázová tabulka se vytvoří příkazem `manage.py createcachetable`
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "dashboard": {
+        "BACKEND": os.getenv("DASHBOARD_CACHE_BACKEND", "django.core.cache.backends.db.DatabaseCache"),
+        "LOCATION": os.getenv("DASHBOARD_CACHE_LOCATION", "dashboard_cache"),
+    },
+}
+# Platnost uloženého kontextu dashboardu v s (0 = bez cache); zápisy dat ho zneplatní dřív
+DASHBOARD_CONTEXT_CACHE_TTL = int(os.getenv("DASHBOARD_CONTEXT_CACHE_TTL", "600"))
+
+# Grafy PDF exportu – renderované na serveru, cache podle uživatele a otisku dat (relativně k BASE_DIR)
+EXPORT_CHART_CACHE_DIR = os.getenv("EXPORT_CHART_CACHE_DIR", "exports/media/charts")
+# True = PDF exporty vytváří vlákno ve web procesu, False = samostatný `manage.py run_export_worker`
+EXPORT_JOBS_INLINE = os.getenv("EXPORT_JOBS_INLINE", "true").lower() == "true"
+# Export, který opakovaně shodil worker, se po N pokusech označí jako chybný
+EXPORT_JOB_MAX_ATTEMPTS = int(os.getenv("EXPORT_JOB_MAX_ATTEMPTS", "3"))
+# Počet procesů pro hromadný export PDF všech klientů kouče (výchozí = počet jader)
+EXPORT_BULK_PROCESSES = int(os.getenv("EXPORT_BULK_PROCESSES", str(os.cpu_count() or 1)))
+# Snapshot exportu pro chatbota se přegeneruje po zápisu výkazů: s po posledním zápisu, max. s od prvního
+EXPORT_SNAPSHOT_DEBOUNCE = float(os.getenv("EXPORT_SNAPSHOT_DEBOUNCE", "10"))
+EXPORT_SNAPSHOT_MAX_DELAY = float(os.getenv("EXPORT_SNAPSHOT_MAX_DELAY", "60"))
+# Počet uchovaných snapshotů na uživatele (starší se mažou)
+EXPORT_SNAPSHOT_KEEP = int(os.getenv("EXPORT_SNAPSHOT_KEEP", "5"))
+# Hromadný export dat výkazů (CSV/XLSX) – počet výkazů načtených jedním dotazem
+EXPORT_DATA_CHUNK_SIZE = int(os.getenv("EXPORT_DATA_CHUNK_SIZE", "500"))
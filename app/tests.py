@@ -0,0 +1,183 @@
+"""
+Tests for the shared AI client registry and the AI rate limiter
+"""
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from app.ai_clients import AIClientRegistry, CircuitBreaker, CircuitOpenError, ai_call, is_provider_failure
+from app.rate_limit import estimate_tokens, rate_limiter
+from ingest.models import AIRateBucket, AIRateStat, AIRateWaiter
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class APITimeoutError(Exception):
+    """Same name as the SDK timeout errors"""
+
+
+@override_settings(OPENAI_API_KEY="sk-test", ANTHROPIC_API_KEY="ak-test", AI_TIMEOUTS={"chat": 12})
+class AIClientRegistryTestCase(SimpleTestCase):
+    """Tests for AIClientRegistry"""
+
+    def setUp(self):
+        self.registry = AIClientRegistry()
+        self.addCleanup(self.registry.reset)
+
+    def test_clients_share_connection_pool(self):
+        chat = self.registry.get_client("openai", "chat")
+        embeddings = self.registry.get_client("openai", "embeddings")
+
+        self.assertIs(chat._client, embeddings._client)
+        self.assertIs(self.registry.get_client("openai")._client, chat._client)
+        self.assertEqual((chat.timeout, embeddings.timeout), (12, 20))
+        self.assertEqual(self.registry.get_client("anthropic", "vision").timeout, 90)
+
+    def test_separate_client_per_key(self):
+        default = self.registry.get_client("openai")
+        other = self.registry.get_client("openai", api_key="sk-other")
+        self.assertIsNot(default._client, other._client)
+
+    @override_settings(OPENAI_API_KEY="")
+    def test_missing_openai_key(self):
+        with self.assertRaises(ValueError):
+            self.registry.get_client("openai")
+
+    def test_unknown_kind(self):
+        with self.assertRaises(ValueError):
+            self.registry.get_client("openai", "poetry")
+
+    @override_settings(AI_CIRCUIT_FAILURE_THRESHOLD=2, AI_CIRCUIT_RESET_TIMEOUT=30)
+    def test_circuit_opens_and_fails_fast(self):
+        for _ in range(2):
+            with self.assertRaises(ProviderError):
+                with self.registry.circuit("openai"):
+                    raise ProviderError(503)
+
+        with self.assertRaises(CircuitOpenError):
+            with self.registry.circuit("openai"):
+                self.fail("provider must not be called while the circuit is open")
+        self.assertEqual(self.registry.stats()["openai"]["state"], "open")
+
+        # Other providers are not affected
+        with self.registry.circuit("anthropic"):
+            pass
+
+    @override_settings(AI_CIRCUIT_FAILURE_THRESHOLD=1)
+    def test_client_errors_do_not_open_circuit(self):
+        with self.assertRaises(ProviderError):
+            with self.registry.circuit("openai"):
+                raise ProviderError(400)
+        with self.assertRaises(ValueError):
+            with self.registry.circuit("openai"):
+                raise ValueError("bad JSON in our own code")
+
+        self.assertEqual(self.registry.stats()["openai"]["state"], "closed")
+
+
+class CircuitBreakerTestCase(SimpleTestCase):
+    """Tests for CircuitBreaker"""
+
+    def test_half_open_trial(self):
+        breaker = CircuitBreaker("openai", failure_threshold=1, reset_timeout=30)
+        with patch("app.ai_clients.time.monotonic", return_value=100.0):
+            breaker.record_failure()
+            with self.assertRaises(CircuitOpenError) as ctx:
+                breaker.before_call()
+            self.assertEqual(ctx.exception.retry_after, 30)
+
+        with patch("app.ai_clients.time.monotonic", return_value=131.0):
+            breaker.before_call()  # trial call
+            with self.assertRaises(CircuitOpenError):
+                breaker.before_call()  # only one trial at a time
+            breaker.record_failure()
+            self.assertEqual(breaker.state, "open")
+
+        with patch("app.ai_clients.time.monotonic", return_value=162.0):
+            breaker.before_call()
+            breaker.record_success()
+            self.assertEqual(breaker.state, "closed")
+            breaker.before_call()
+
+    def test_provider_failures(self):
+        self.assertTrue(is_provider_failure(ProviderError(500)))
+        self.assertTrue(is_provider_failure(ProviderError(429)))
+        self.assertFalse(is_provider_failure(ProviderError(401)))
+        self.assertTrue(is_provider_failure(APITimeoutError()))
+        self.assertTrue(is_provider_failure(TimeoutError()))
+        self.assertFalse(is_provider_failure(KeyError("x")))
+
+
+@override_settings(
+    AI_RATE_LIMIT_ENABLED=True,
+    AI_RATE_LIMITS={"openai": {"tokens_per_minute": 6000, "requests_per_minute": 6000}},
+    AI_RATE_LIMIT_RESERVE={"interactive": 0.0, "ingest": 0.1, "batch": 0.3},
+    AI_RATE_LIMIT_MAX_WAIT={"interactive": 5, "ingest": 5, "batch": 0.2},
+)
+class RateLimiterTestCase(TestCase):
+    """Tests for the DB-backed rate limiter (6000 tokens/min = 100 tokens/s)"""
+
+    def _stat(self, priority):
+        return AIRateStat.objects.get(provider="openai", priority=priority)
+
+    def test_budget_is_taken(self):
+        waited = rate_limiter.acquire("openai", "interactive", tokens=1000)
+
+        self.assertEqual(waited, 0.0)
+        bucket = AIRateBucket.objects.get(provider="openai")
+        self.assertAlmostEqual(bucket.tokens, 5000, delta=5)
+        self.assertEqual((self._stat("interactive").calls, self._stat("interactive").waited), (1, 0))
+
+    def test_exhausted_budget_waits_for_refill(self):
+        rate_limiter.acquire("openai", "interactive", tokens=6000)
+        waited = rate_limiter.acquire("openai", "interactive", tokens=20)
+
+        self.assertGreater(waited, 0.1)
+        stat = self._stat("interactive")
+        self.assertEqual((stat.calls, stat.waited, stat.timed_out), (2, 1, 0))
+        self.assertGreater(stat.max_wait_seconds, 0.1)
+        self.assertFalse(AIRateWaiter.objects.exists())
+
+    def test_batch_keeps_reserve_for_interactive(self):
+        rate_limiter.acquire("openai", "interactive", tokens=4500)  # 1500 left = 25 %
+
+        self.assertEqual(rate_limiter.acquire("openai", "interactive", tokens=100), 0.0)
+        rate_limiter.acquire("openai", "batch", tokens=100)
+
+        self.assertEqual(self._stat("batch").timed_out, 1)
+
+    def test_lower_class_waits_behind_queued_higher_class(self):
+        AIRateWaiter.objects.create(provider="openai", priority="interactive", rank=0, tokens=10)
+        self.assertEqual(rate_limiter.queue_depth(), {"openai": {"interactive": 1}})
+
+        rate_limiter.acquire("openai", "batch", tokens=10)
+        self.assertEqual(self._stat("batch").timed_out, 1)
+
+        AIRateWaiter.objects.all().delete()
+        AIRateWaiter.objects.create(provider="openai", priority="batch", rank=2, tokens=10)
+        self.assertEqual(rate_limiter.acquire("openai", "interactive", tokens=10), 0.0)
+
+    @override_settings(AI_RATE_LIMIT_ENABLED=False)
+    def test_disabled(self):
+        self.assertEqual(rate_limiter.acquire("openai", "batch", tokens=10 ** 9), 0.0)
+        self.assertFalse(AIRateBucket.objects.exists())
+
+    def test_unknown_priority(self):
+        with self.assertRaises(ValueError):
+            rate_limiter.acquire("openai", "urgent")
+
+    def test_ai_call_and_command(self):
+        with ai_call("openai", "ingest", tokens=estimate_tokens("x" * 400, max_tokens=100)):
+            pass
+        self.assertEqual(self._stat("ingest").tokens, 200)
+
+        out = StringIO()
+        call_command("ai_rate_limits", stdout=out)
+        self.assertIn("openai", out.getvalue())
+        self.assertIn("ingest", out.getvalue())
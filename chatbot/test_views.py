@@ -25,17 +25,18 @@ def test_openai(request):
     
     # Test OpenAI importu
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
+        from app.ai_clients import ai_call, get_client
+        client = get_client("openai", "classification", api_key=api_key)
         
         # Jednoduchý test API call
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": "Řekni pouze 'API funguje'"}
-            ],
-            max_tokens=10
-        )
+        with ai_call("openai", "interactive", tokens=20):
+            response = client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "user", "content": "Řekni pouze 'API funguje'"}
+                ],
+                max_tokens=10
+            )
         
         result = response.choices[0].message.content.strip()
         
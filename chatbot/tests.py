@@ -1,3 +1,19 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
 
-# Create your tests here.
+from finance.schema import SCHEMA_KEY
+from ingest.tests.factories import TemporaryMediaMixin, make_statement
+
+from .views import _collect_user_context
+
+
+class UserContextTests(TemporaryMediaMixin, TestCase):
+    def test_statements_without_schema_marker(self):
+        user = User.objects.create_user(username="chat", password="x")
+        make_statement(user, 2023, {"Revenue": "1 000", "cogs": 400}, {"Cash": 50})
+
+        statement = _collect_user_context(user)["financial_statements"][0]
+
+        self.assertEqual(statement["income"], {"revenue": 1000.0, "cogs": 400.0})
+        self.assertEqual(statement["balance"], {"cash": 50.0})
+        self.assertNotIn(SCHEMA_KEY, str(statement))
@@ -11,9 +11,12 @@ from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
+from app.ai_clients import CircuitOpenError, ai_call, get_client
+from app.rate_limit import estimate_tokens
 from exports.services import get_latest_export
-from finance.utils import compute_metrics
+from finance.schema import canonical_balance, canonical_income, without_schema_key
 from ingest.models import Document, FinancialStatement
+from ingest.services.metrics_service import refresh_statement_metrics
 from survey.models import Response, SurveySubmission
 from suropen.models import OpenAnswer
 
@@ -86,12 +89,13 @@ def _classify_query(
                 "content": f"Sekce: {section or 'neuvedeno'}\nDotaz: {message}",
             },
         ]
-        completion = client.chat.completions.create(
-            model=CLASSIFIER_MODEL,
-            messages=classifier_messages,
-            max_tokens=4,
-            temperature=0,
-        )
+        with ai_call("openai", "interactive", tokens=estimate_tokens(classifier_messages, max_tokens=4)):
+            completion = client.chat.completions.create(
+                model=CLASSIFIER_MODEL,
+                messages=classifier_messages,
+                max_tokens=4,
+                temperature=0,
+            )
         label = completion.choices[0].message.content.strip().lower()
         if "context" in label:
             return ChatMessage.QUERY_CONTEXT
@@ -160,7 +164,7 @@ def _collect_user_context(user) -> Dict[str, Any]:
     try:
         statements = list(
             FinancialStatement.objects.filter(user=user)
-            .select_related("document")
+            .select_related("document", "metrics")
             .order_by("-year")[:3]
         )
     except Exception as exc:
@@ -170,20 +174,20 @@ def _collect_user_context(user) -> Dict[str, Any]:
     if statements:
         snapshot: List[Dict[str, Any]] = []
         for stmt in statements:
-            metrics = compute_metrics(stmt)
+            metrics = stmt.metrics if hasattr(stmt, "metrics") else refresh_statement_metrics(stmt)
             entry: Dict[str, Any] = {
                 "year": stmt.year,
                 "created_at": stmt.created_at.isoformat(),
                 "metrics": {
-                    "Revenue": metrics["revenue"],
-                    "COGS": metrics["cogs"],
-                    "GrossMargin": metrics["gross_margin"],
-                    "Overheads": metrics["overheads"],
-                    "EBIT": metrics["ebit"],
-                    "NetProfit": metrics["net_profit"],
+                    "Revenue": metrics.revenue,
+                    "COGS": metrics.cogs,
+                    "GrossMargin": metrics.gross_margin,
+                    "Overheads": metrics.overheads,
+                    "EBIT": metrics.ebit,
+                    "NetProfit": metrics.net_profit,
                 },
-                "income": stmt.income,
-                "balance": stmt.balance,
+                "income": without_schema_key(canonical_income(stmt.income)),
+                "balance": without_schema_key(canonical_balance(stmt.balance)),
                 "scale": stmt.scale,
             }
             document = getattr(stmt, "document", None)
@@ -321,7 +325,8 @@ def chat_api(request):
         )
 
     try:
-        client = OpenAI(api_key=api_key)
+        client = get_client("openai", "chat", api_key=api_key)
+        classifier_client = get_client("openai", "classification", api_key=api_key)
     except Exception as exc:
         logger.exception("Failed to initialise OpenAI client: %s", exc)
         return JsonResponse(
@@ -329,7 +334,7 @@ def chat_api(request):
             status=500,
         )
 
-    query_type = _classify_query(client, user_message, section)
+    query_type = _classify_query(classifier_client, user_message, section)
 
     context_payload: Optional[Dict[str, Any]] = None
     if query_type == ChatMessage.QUERY_CONTEXT:
@@ -361,13 +366,20 @@ def chat_api(request):
     messages = _build_messages(system_prompt, user_message, section, context_payload)
 
     try:
-        completion = client.chat.completions.create(
-            model=ASSISTANT_MODEL,
-            messages=messages,
-            max_tokens=400,
-            temperature=0.3,
-        )
+        with ai_call("openai", "interactive", tokens=estimate_tokens(messages, max_tokens=400)):
+            completion = client.chat.completions.create(
+                model=ASSISTANT_MODEL,
+                messages=messages,
+                max_tokens=400,
+                temperature=0.3,
+            )
         ai_response = completion.choices[0].message.content.strip()
+    except CircuitOpenError as exc:
+        logger.warning("Assistant unavailable: %s", exc)
+        return JsonResponse(
+            {"error": "AI asistent je dočasně nedostupný, zkus to prosím za chvíli."},
+            status=503,
+        )
     except Exception as exc:
         logger.exception("Assistant completion failed: %s", exc)
         return JsonResponse(
@@ -7,6 +7,7 @@ New chat endpoint with RAG integration for context-aware responses.
 import json
 import logging
 import os
+from importlib.util import find_spec
 from typing import Dict, Any, Optional
 
 from django.contrib.auth.decorators import login_required
@@ -14,14 +15,14 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
+from app.ai_clients import CircuitOpenError, ai_call, get_client
+from app.rate_limit import estimate_tokens
+
 from .models import ChatMessage
 from .services import RAGChatService
 
-try:
-    from openai import OpenAI
-    HAS_OPENAI = True
-except ImportError:
-    HAS_OPENAI = False
+# Clients come from app.ai_clients; here we only need to know the package is installed
+HAS_OPENAI = find_spec("openai") is not None
 
 logger = logging.getLogger(__name__)
 
@@ -92,7 +93,7 @@ def chat_api_rag(request):
 
         # Initialize services
         rag_service = RAGChatService()
-        client = OpenAI(api_key=api_key)
+        client = get_client("openai", "chat", api_key=api_key)
 
         # Generate RAG-enhanced response
         if use_rag:
@@ -119,12 +120,13 @@ def chat_api_rag(request):
         ]
 
         # Call OpenAI
-        completion = client.chat.completions.create(
-            model=ASSISTANT_MODEL,
-            messages=messages,
-            temperature=0.7,
-            max_tokens=1500,
-        )
+        with ai_call("openai", "interactive", tokens=estimate_tokens(messages, max_tokens=1500)):
+            completion = client.chat.completions.create(
+                model=ASSISTANT_MODEL,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=1500,
+            )
 
         assistant_response = completion.choices[0].message.content.strip()
 
@@ -173,6 +175,13 @@ def chat_api_rag(request):
             "error": "Neplatný JSON"
         }, status=400)
 
+    except CircuitOpenError as e:
+        logger.warning(f"RAG Chat unavailable: {e}")
+        return JsonResponse({
+            "success": False,
+            "error": "AI asistent je dočasně nedostupný, zkus to prosím za chvíli."
+        }, status=503)
+
     except Exception as e:
         logger.error(f"RAG Chat error: {e}", exc_info=True)
         return JsonResponse({
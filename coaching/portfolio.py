@@ -0,0 +1,282 @@
+"""
+Vectorized portfolio analytics over the statements of all companies.
+
+All statements are loaded with one query (materialized StatementMetrics
+columns + canonical income/balance keys extracted by the database) into a
+company × year × metric NumPy cube. Margins, YoY growth, working capital and
+the cashflow components of dashboard.cashflow are derived with array
+operations, so ranking hundreds of clients against thousands of peers costs
+no per-statement Python work.
+
+    portfolio = Portfolio.load()
+    portfolio.percentile_ranks("ebit_margin", 2024)
+    portfolio.table(2024, user_ids=client_ids, sort="revenue_yoy")
+
+The year axis is contiguous, YoY growth and balance deltas compare with
+calendar year - 1 (like calculate_cashflow). Statements must be stored in the
+canonical schema (manage.py normalize_statements).
+"""
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from ingest.models import FinancialStatement
+from ingest.services.metrics_service import materialize_missing
+
+logger = logging.getLogger(__name__)
+
+# Loaded column → ORM lookup (metrics are materialized, the rest are JSON keys)
+SOURCE_COLUMNS = {
+    "revenue": "metrics__revenue",
+    "cogs": "metrics__cogs",
+    "gross_margin": "metrics__gross_margin",
+    "overheads": "metrics__overheads",
+    "ebit": "metrics__ebit",
+    "net_profit": "metrics__net_profit",
+    "in_revenue": "income__revenue",
+    "in_cogs": "income__cogs",
+    "in_net_profit": "income__net_profit",
+    "in_depreciation": "income__depreciation",
+    "in_interest_paid": "income__interest_paid",
+    "in_income_tax_paid": "income__income_tax_paid",
+    "in_dividends_paid": "income__dividends_paid",
+    "in_extraordinary_items": "income__extraordinary_items",
+    "in_cash_begin": "income__cash_begin",
+    "cash": "balance__cash",
+    "receivables": "balance__receivables",
+    "inventory": "balance__inventory",
+    "tangible_assets": "balance__tangible_assets",
+    "trade_payables": "balance__trade_payables",
+    "short_term_liabilities": "balance__short_term_liabilities",
+    "short_term_loans": "balance__short_term_loans",
+    "long_term_loans": "balance__long_term_loans",
+    "loans_received": "balance__loans_received",
+    "loans_repaid": "balance__loans_repaid",
+    "asset_sales": "balance__asset_sales",
+    "capex": "balance__capex",
+    "bal_cash_begin": "balance__cash_begin",
+}
+
+# Metrics exposed to coaches (tables, rankings, percentiles)
+METRICS = (
+    "revenue", "gross_margin", "overheads", "ebit", "net_profit",
+    "gross_margin_pct", "ebit_margin", "net_margin",
+    "revenue_yoy", "gross_margin_yoy", "ebit_yoy", "net_profit_yoy",
+    "working_capital", "working_capital_change",
+    "operating_cf", "investing_cf", "financing_cf", "net_cash_flow", "cash_end",
+)
+GROWTH_METRICS = ("revenue", "gross_margin", "overheads", "ebit", "net_profit")
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _previous_year(values):
+    """Shift along the year axis: value of year - 1 (NaN for the first year)."""
+    shifted = np.full_like(values, np.nan)
+    shifted[:, 1:] = values[:, :-1]
+    return shifted
+
+
+def _ratio(numerator, denominator):
+    """numerator / denominator * 100, 0 where the denominator is 0 (compute_profitability)."""
+    out = np.zeros_like(numerator)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out * 100.0
+
+
+def _growth(values):
+    """YoY growth in %, NaN when the previous year is missing or 0 (finance.utils.growth)."""
+    prev = _previous_year(values)
+    valid = ~np.isnan(prev) & (prev != 0) & ~np.isnan(values)
+    out = np.full_like(values, np.nan)
+    np.divide(values - prev, np.abs(prev), out=out, where=valid)
+    return out * 100.0
+
+
+class Portfolio:
+    """Company × year × metric cube (NaN where a company has no statement)."""
+
+    def __init__(self, user_ids, years, columns: Dict[str, "np.ndarray"]):
+        self.user_ids = user_ids
+        self.years = years
+        self.columns = columns
+        self._user_index = {int(uid): i for i, uid in enumerate(user_ids)}
+
+    @classmethod
+    def load(cls, user_ids: Optional[Iterable[int]] = None) -> "Portfolio":
+        """
+        Load statements (of all companies or the given users) with a single query.
+
+        Statements without materialized metrics are materialized first.
+        """
+        if user_ids is not None:
+            user_ids = list(user_ids)
+        # Chybějící metriky by se v LEFT JOINu načetly jako NaN
+        materialize_missing(user_ids)
+        statements = FinancialStatement.objects.all()
+        if user_ids is not None:
+            statements = statements.filter(user_id__in=user_ids)
+        names = list(SOURCE_COLUMNS)
+        rows = list(statements.values_list("user_id", "year", *SOURCE_COLUMNS.values()))
+        if not rows:
+            return cls(np.array([], dtype=np.int64), np.array([], dtype=np.int64), {})
+
+        keys = np.array([row[:2] for row in rows], dtype=np.int64)
+        # None (and anything non-numeric in not yet normalized rows) → NaN
+        values = np.array(
+            [[v if isinstance(v, (int, float)) else None for v in row[2:]] for row in rows], dtype=float
+        )
+
+        users, company_idx = np.unique(keys[:, 0], return_inverse=True)
+        first_year, last_year = keys[:, 1].min(), keys[:, 1].max()
+        years = np.arange(first_year, last_year + 1)
+        year_idx = keys[:, 1] - first_year
+
+        cube = np.full((len(users), len(years), len(names)), np.nan)
+        cube[company_idx, year_idx] = values
+        columns = {name: cube[:, :, i] for i, name in enumerate(names)}
+        present = np.zeros((len(users), len(years)), dtype=bool)
+        present[company_idx, year_idx] = True
+        columns["present"] = present
+
+        portfolio = cls(users, years, columns)
+        portfolio._derive()
+        return portfolio
+
+    def _derive(self) -> None:
+        c = self.columns
+        present = c["present"]
+
+        def zero(name):
+            # Missing keys count as 0 for statements that exist (as in calculate_cashflow)
+            return np.where(present, np.nan_to_num(c[name]), np.nan)
+
+        revenue = np.nan_to_num(c["revenue"])
+        for name, source in (("gross_margin_pct", "gross_margin"), ("ebit_margin", "ebit"), ("net_margin", "net_profit")):
+            c[name] = np.where(present, _ratio(np.nan_to_num(c[source]), revenue), np.nan)
+        for name in GROWTH_METRICS:
+            c[f"{name}_yoy"] = _growth(c[name])
+
+        # --- Cashflow (vectorized dashboard.cashflow._cashflow) ---
+        cf_revenue = zero("in_revenue")
+        cf_cogs = zero("in_cogs")
+        overheads = zero("overheads")
+        interest = zero("in_interest_paid")
+        taxation = zero("in_income_tax_paid")
+        extraordinary = zero("in_extraordinary_items")
+        dividends = zero("in_dividends_paid")
+
+        def delta(name):
+            # Previous year without a statement counts as an empty balance sheet
+            return zero(name) - np.nan_to_num(_previous_year(c[name]))
+
+        c["working_capital"] = zero("receivables") + zero("inventory") - zero("short_term_liabilities")
+        c["working_capital_change"] = delta("inventory") + delta("receivables") - delta("short_term_liabilities")
+
+        net_profit = np.where(
+            np.isnan(c["in_net_profit"]),
+            cf_revenue - cf_cogs - overheads - interest - taxation + extraordinary,
+            c["in_net_profit"],
+        )
+        c["operating_cf"] = np.where(
+            present, net_profit + zero("in_depreciation") - c["working_capital_change"], np.nan
+        )
+
+        capex = np.where(np.isnan(c["capex"]), zero("tangible_assets") * 0.1, c["capex"])
+        capex = np.where((capex == 0) & (cf_revenue > 0), cf_revenue * 0.02, capex)
+        c["investing_cf"] = zero("asset_sales") - capex
+
+        loans_received, loans_repaid = zero("loans_received"), zero("loans_repaid")
+        total_loans = zero("short_term_loans") + zero("long_term_loans")
+        estimate = (loans_received == 0) & (loans_repaid == 0) & (total_loans > 0)
+        loans_repaid = np.where(estimate, total_loans * 0.1, loans_repaid)
+        loans_received = np.where(estimate & (cf_revenue > 10000), cf_revenue * 0.05, loans_received)
+        c["financing_cf"] = loans_received - loans_repaid - dividends
+
+        c["net_cash_flow"] = c["operating_cf"] + c["investing_cf"] + c["financing_cf"]
+        # cash_begin: balance, then income value, then 80 % of cash (first non-zero, like `or`)
+        cash_begin = np.nan_to_num(c["bal_cash_begin"])
+        cash_begin = np.where(cash_begin == 0, np.nan_to_num(c["in_cash_begin"]), cash_begin)
+        cash_begin = np.where(cash_begin == 0, zero("cash") * 0.8, cash_begin)
+        c["cash_end"] = np.where(present, cash_begin + c["net_cash_flow"], np.nan)
+
+    # --- Queries ---
+
+    def __getitem__(self, name: str):
+        return self.columns[name]
+
+    def _year(self, year: int) -> int:
+        if not len(self.years) or not self.years[0] <= year <= self.years[-1]:
+            raise KeyError(year)
+        return int(year - self.years[0])
+
+    def latest_year(self, user_ids: Optional[Sequence[int]] = None) -> Optional[int]:
+        rows = self._rows(user_ids)
+        present = self.columns["present"][rows] if len(self.years) else np.zeros((0, 0), dtype=bool)
+        years_with_data = np.flatnonzero(present.any(axis=0))
+        return int(self.years[years_with_data[-1]]) if len(years_with_data) else None
+
+    def _rows(self, user_ids: Optional[Sequence[int]]):
+        if user_ids is None:
+            return np.arange(len(self.user_ids))
+        return np.array([self._user_index[uid] for uid in user_ids if uid in self._user_index], dtype=np.int64)
+
+    def percentile_ranks(self, metric: str, year: int):
+        """Share of peers (in %) with the same or lower value, NaN without data."""
+        values = self.columns[metric][:, self._year(year)]
+        valid = ~np.isnan(values)
+        peers = np.sort(values[valid])
+        ranks = np.full_like(values, np.nan)
+        if len(peers):
+            ranks[valid] = np.searchsorted(peers, values[valid], side="right") / len(peers) * 100.0
+        return ranks
+
+    def distribution(self, metric: str, year: int) -> Dict[str, Optional[float]]:
+        values = self.columns[metric][:, self._year(year)]
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return {f"p{q}": None for q in PERCENTILES}
+        return {f"p{q}": float(v) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+    def peer_count(self, year: int) -> int:
+        return int(self.columns["present"][:, self._year(year)].sum())
+
+    def table(
+        self,
+        year: int,
+        user_ids: Optional[Sequence[int]] = None,
+        sort: str = "revenue_yoy",
+        descending: bool = True,
+        metrics: Sequence[str] = METRICS,
+    ) -> List[Dict]:
+        """
+        Ranked rows for the selected companies in one year, with peer percentiles
+        against all loaded companies. Companies without data sort last.
+        """
+        if sort not in self.columns:
+            raise KeyError(sort)
+        y = self._year(year)
+        rows = self._rows(user_ids)
+        rows = rows[self.columns["present"][rows, y]]
+
+        key = self.columns[sort][rows, y]
+        key = np.where(np.isnan(key), -np.inf if descending else np.inf, key)
+        order = np.argsort(-key if descending else key, kind="stable")
+        rows = rows[order]
+
+        ranks = {m: self.percentile_ranks(m, year)[rows] for m in metrics}
+        values = {m: self.columns[m][rows, y] for m in metrics}
+        result = []
+        for pos, row in enumerate(rows):
+            result.append({
+                "rank": pos + 1,
+                "user_id": int(self.user_ids[row]),
+                "year": int(year),
+                "values": {m: _float(values[m][pos]) for m in metrics},
+                "percentiles": {m: _float(ranks[m][pos]) for m in metrics},
+            })
+        return result
+
+
+def _float(value) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 4)
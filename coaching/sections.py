@@ -0,0 +1,100 @@
+"""
+JSON sections of the coach's client view (see dashboard.sections).
+
+The single SPA endpoints (client_data, documents_data, ...) and the composite
+client_bundle endpoint share these builders; the bundle resolves the client
+profile and the access check once and loads each input once for all sections.
+"""
+
+from functools import cached_property
+from typing import Any, Dict, Mapping
+
+from dashboard.sections import Section, UserData
+from suropen.models import OpenAnswer
+
+
+class ClientData(UserData):
+    """Section inputs of one coached company."""
+
+    def __init__(self, profile):
+        super().__init__(profile.user)
+        self.profile = profile
+
+    @cached_property
+    def open_answer_count(self) -> int:
+        return OpenAnswer.objects.filter(user=self.user).count()
+
+
+def client_section(data: ClientData, params: Mapping[str, Any]) -> Dict[str, Any]:
+    latest_doc = data.documents[0] if data.documents else None
+    return {
+        'success': True,
+        'client': {
+            'id': data.profile.id,
+            'name': data.profile.company_name,
+            'user_id': data.user.id,
+        },
+        'stats': {
+            'statements_count': len(data.documents),
+            'last_activity': latest_doc.uploaded_at.isoformat() if latest_doc else None,
+        }
+    }
+
+
+def documents_section(data: ClientData, params: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        'success': True,
+        'documents': [
+            {
+                'id': d.id,
+                'name': getattr(d.file, 'name', ''),
+                'type': d.doc_type,
+                'year': d.year,
+                'uploaded_at': d.uploaded_at.isoformat() if getattr(d, 'uploaded_at', None) else None,
+            } for d in data.documents[:25]
+        ]
+    }
+
+
+def cashflow_section(data: ClientData, params: Mapping[str, Any]) -> Dict[str, Any]:
+    series = data.cashflow_series
+    if not series:
+        return {'success': True, 'available': False}
+    year = max(series)
+    cf = series[year] or {}
+    return {'success': True, 'available': True, 'year': year, 'cashflow': cf}
+
+
+def charts_section(data: ClientData, params: Mapping[str, Any]) -> Dict[str, Any]:
+    rows = []
+    for m in data.metrics:
+        rows.append({
+            'year': m.year,
+            'revenue': m.revenue,
+            'cogs': m.cogs,
+            'ebit': m.ebit,
+        })
+    return {'success': True, 'series': rows}
+
+
+def surveys_section(data: ClientData, params: Mapping[str, Any]) -> Dict[str, Any]:
+    submissions = data.submissions
+    return {
+        'success': True,
+        'count': len(submissions),
+        'latest': submissions[0].created_at.isoformat() if submissions else None,
+    }
+
+
+def suropen_section(data: ClientData, params: Mapping[str, Any]) -> Dict[str, Any]:
+    return {'success': True, 'count': data.open_answer_count}
+
+
+CLIENT_SECTIONS: Dict[str, Section] = {
+    'client': client_section,
+    'documents': documents_section,
+    'cashflow': cashflow_section,
+    'charts': charts_section,
+    'surveys': surveys_section,
+    'suropen': suropen_section,
+}
@@ -1,3 +1,174 @@
+import math
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CompanyProfile, UserRole
+from dashboard.cashflow import calculate_cashflow
+from ingest.models import FinancialStatement, StatementMetrics
+from ingest.tests.factories import TemporaryMediaMixin, make_statement
+
+from .models import Coach, UserCoachAssignment
+from .portfolio import Portfolio
+
+
+class PortfolioTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        self.alpha = User.objects.create_user(username="alpha", password="x")
+        self.beta = User.objects.create_user(username="beta", password="x")
+        self.gamma = User.objects.create_user(username="gamma", password="x")
+
+        make_statement(self.alpha, 2022, {"revenue": 1000, "cogs": 400, "personnel_costs": 300},
+                   {"receivables": 100, "inventory": 50, "short_term_liabilities": 80, "cash": 40})
+        make_statement(self.alpha, 2023, {"revenue": 1200, "cogs": 500, "personnel_costs": 300, "net_profit": 350},
+                   {"receivables": 150, "inventory": 40, "short_term_liabilities": 60, "cash": 70,
+                    "short_term_loans": 200, "capex": 0})
+        make_statement(self.beta, 2023, {"revenue": 20000, "cogs": 15000, "depreciation": 100},
+                   {"tangible_assets": 500, "long_term_loans": 1000, "cash_begin": 10})
+        make_statement(self.gamma, 2021, {"revenue": 500, "cogs": 100}, {"receivables": 10})
+        make_statement(self.gamma, 2023, {"revenue": 400, "cogs": 100}, {"receivables": 30})
+
+    def test_cashflow_matches_calculate_cashflow(self):
+        portfolio = Portfolio.load()
+
+        for fs in FinancialStatement.objects.all():
+            expected = calculate_cashflow(fs.user, fs.year)
+            company = portfolio._user_index[fs.user_id]
+            year = portfolio._year(fs.year)
+            for name in ("working_capital_change", "operating_cf", "investing_cf", "financing_cf",
+                         "net_cash_flow", "cash_end"):
+                self.assertAlmostEqual(portfolio[name][company, year], expected[name], msg=(fs, name))
+
+    def test_metrics_growth_and_percentiles(self):
+        portfolio = Portfolio.load()
+        alpha = portfolio._user_index[self.alpha.id]
+        gamma = portfolio._user_index[self.gamma.id]
+        y2023 = portfolio._year(2023)
+
+        self.assertAlmostEqual(portfolio["revenue_yoy"][alpha, y2023], 20.0)
+        self.assertTrue(math.isnan(portfolio["revenue_yoy"][gamma, y2023]))  # 2022 chybí
+        self.assertAlmostEqual(portfolio["gross_margin_pct"][alpha, y2023], 700 / 1200 * 100)
+
+        ranks = portfolio.percentile_ranks("revenue", 2023)
+        self.assertAlmostEqual(ranks[portfolio._user_index[self.beta.id]], 100.0)
+        self.assertAlmostEqual(ranks[gamma], 100 / 3)
+        self.assertEqual(portfolio.distribution("revenue", 2023)["p50"], 1200.0)
+
+        table = portfolio.table(2023, [self.gamma.id, self.alpha.id], sort="revenue")
+        self.assertEqual([row["user_id"] for row in table], [self.alpha.id, self.gamma.id])
+        self.assertAlmostEqual(table[0]["percentiles"]["revenue"], 200 / 3, places=3)
+
+    def test_statements_without_metrics_are_materialized(self):
+        # Výkazy uložené před zavedením StatementMetrics nemají řádek metrik
+        StatementMetrics.objects.filter(user=self.beta).delete()
+
+        portfolio = Portfolio.load()
+
+        beta = portfolio._user_index[self.beta.id]
+        self.assertEqual(portfolio["revenue"][beta, portfolio._year(2023)], 20000.0)
+        self.assertTrue(StatementMetrics.objects.filter(user=self.beta).exists())
+
+    def test_portfolio_api_lists_only_own_clients(self):
+        coach_user = User.objects.create_user(username="coach", password="x")
+        UserRole.objects.create(user=coach_user, role="coach")
+        coach = Coach.objects.create(user=coach_user)
+        for user in (self.alpha, self.gamma):
+            CompanyProfile.objects.create(user=user, company_name=user.username.title())
+            UserCoachAssignment.objects.create(coach=coach, client=user)
+        CompanyProfile.objects.create(user=self.beta, company_name="Beta")
+        self.client.force_login(coach_user)
+
+        data = self.client.get(reverse("coaching:portfolio_data"), {"sort": "ebit_margin"}).json()
+
+        self.assertTrue(data["success"])
+        self.assertEqual(data["year"], 2023)
+        self.assertEqual(data["peers"]["count"], 3)
+        self.assertEqual({row["company_name"] for row in data["rows"]}, {"Alpha", "Gamma"})
+        margins = [row["values"]["ebit_margin"] for row in data["rows"]]
+        self.assertEqual(margins, sorted(margins, reverse=True))
+
+        response = self.client.get(reverse("coaching:portfolio_data"), {"sort": "secret"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConditionalGetTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="x")
+        self.profile = CompanyProfile.objects.create(user=self.owner, company_name="Owner")
+        make_statement(self.owner, 2023, {"revenue": 1000, "cogs": 400})
+
+        self.coach_user = User.objects.create_user(username="coach", password="x")
+        UserRole.objects.create(user=self.coach_user, role="coach")
+        UserCoachAssignment.objects.create(coach=Coach.objects.create(user=self.coach_user), client=self.owner)
+
+    def test_charts_data_revalidates(self):
+        self.client.force_login(self.coach_user)
+        url = reverse("coaching:charts_data", args=[self.profile.id])
+        etag = self.client.get(url)["ETag"]
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        make_statement(self.owner, 2024, {"revenue": 1200, "cogs": 500})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_foreign_coach_is_refused_despite_etag(self):
+        self.client.force_login(self.coach_user)
+        url = reverse("coaching:documents_data", args=[self.profile.id])
+        etag = self.client.get(url)["ETag"]
+
+        stranger = User.objects.create_user(username="stranger", password="x")
+        UserRole.objects.create(user=stranger, role="coach")
+        Coach.objects.create(user=stranger)
+        self.client.force_login(stranger)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.has_header("ETag"))
+
+
+class ClientBundleTests(TemporaryMediaMixin, TestCase):
+    SINGLES = {
+        "client": "client_data",
+        "documents": "documents_data",
+        "cashflow": "cashflow_data",
+        "charts": "charts_data",
+        "surveys": "surveys_data",
+        "suropen": "suropen_data",
+    }
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="x")
+        self.profile = CompanyProfile.objects.create(user=self.owner, company_name="Owner")
+        make_statement(self.owner, 2022, {"revenue": 900, "cogs": 300})
+        make_statement(self.owner, 2023, {"revenue": 1000, "cogs": 400})
+
+        coach_user = User.objects.create_user(username="coach", password="x")
+        UserRole.objects.create(user=coach_user, role="coach")
+        UserCoachAssignment.objects.create(coach=Coach.objects.create(user=coach_user), client=self.owner)
+        self.client.force_login(coach_user)
+
+    def test_bundle_returns_all_sections_with_fewer_queries(self):
+        with CaptureQueriesContext(connection) as separate:
+            expected = {
+                section: self.client.get(reverse(f"coaching:{name}", args=[self.profile.id])).json()
+                for section, name in self.SINGLES.items()
+            }
+        with CaptureQueriesContext(connection) as bundled:
+            data = self.client.get(reverse("coaching:client_bundle", args=[self.profile.id])).json()
+
+        self.assertTrue(data["success"])
+        self.assertEqual(data["sections"], expected)
+        self.assertEqual(data["sections"]["charts"]["series"][-1]["revenue"], 1000.0)
+        self.assertLess(len(bundled) * 2, len(separate))
+
+    def test_bundle_subset_and_access(self):
+        url = reverse("coaching:client_bundle", args=[self.profile.id])
+        data = self.client.get(url, {"sections": "charts,surveys"}).json()
+        self.assertEqual(set(data["sections"]), {"charts", "surveys"})
 
-# Create your tests here.
+        stranger = User.objects.create_user(username="stranger", password="x")
+        UserRole.objects.create(user=stranger, role="coach")
+        Coach.objects.create(user=stranger)
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(url).status_code, 403)
@@ -9,6 +9,7 @@ urlpatterns = [
     path("", RedirectView.as_view(pattern_name="coaching:my_clients"), name="coaching_home"),
     path("my-clients/", views.my_clients, name="my_clients"),
     path("api/clients/", views.my_clients_api, name="my_clients_api"),
+    path("api/portfolio/", views.portfolio_data, name="portfolio_data"),
 
     # Unassigned users management
     path("unassigned-users/", views.unassigned_users, name="unassigned_users"),
@@ -26,4 +27,5 @@ urlpatterns = [
     path("client/<int:client_id>/charts-data/", views.charts_data, name="charts_data"),
     path("client/<int:client_id>/surveys-data/", views.surveys_data, name="surveys_data"),
     path("client/<int:client_id>/suropen-data/", views.suropen_data, name="suropen_data"),
+    path("client/<int:client_id>/bundle/", views.client_bundle, name="client_bundle"),
 ]
@@ -8,12 +8,22 @@ from django.utils import timezone
 from datetime import datetime, timedelta
 from accounts.models import CompanyProfile, CoachClientNotes
 from accounts.permissions import coach_required, can_coach_access_client
-from ingest.models import Document, FinancialStatement
-from survey.models import SurveySubmission
-from dashboard.cashflow import calculate_cashflow
+from app.conditional import conditional_json, documents_version, statements_version, surveys_version
+from ingest.models import Document
+from dashboard.sections import build_sections, requested_sections
 from dashboard.views import build_dashboard_context
-from finance.utils import compute_metrics
 from .models import Coach, UserCoachAssignment
+from .portfolio import METRICS, Portfolio
+from .sections import (
+    CLIENT_SECTIONS,
+    ClientData,
+    cashflow_section,
+    charts_section,
+    client_section,
+    documents_section,
+    suropen_section,
+    surveys_section,
+)
 
 
 @login_required
@@ -215,103 +225,80 @@ def save_client_notes(request, client_id):  # override with JSON support
         return redirect('coaching:client_dashboard', client_id=client_id)
 
 
-@login_required
-@coach_required
-def client_data(request, client_id):
+def _client_user_id(request, client_id):
+    """Owner of the client's data for conditional GET (None → view answers 404/403)."""
+    client = CompanyProfile.objects.filter(id=client_id).first()
+    if client is None or not can_coach_access_client(request.user, client):
+        return None
+    return client.user_id
+
+
+def _client_section(request, client_id, section):
     client = get_object_or_404(CompanyProfile, id=client_id)
     if not can_coach_access_client(request.user, client):
         return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
-    latest_doc = Document.objects.filter(owner=client.user).order_by('-uploaded_at').first()
-    statements_count = Document.objects.filter(owner=client.user).count()
-    return JsonResponse({
-        'success': True,
-        'client': {
-            'id': client.id,
-            'name': client.company_name,
-            'user_id': client.user.id,
-        },
-        'stats': {
-            'statements_count': statements_count,
-            'last_activity': latest_doc.uploaded_at.isoformat() if latest_doc else None,
-        }
-    })
+    return JsonResponse(section(ClientData(client), request.GET))
 
 
 @login_required
 @coach_required
+def client_data(request, client_id):
+    return _client_section(request, client_id, client_section)
+
+
+@login_required
+@coach_required
+@conditional_json(documents_version, user_id=_client_user_id)
 def documents_data(request, client_id):
-    client = get_object_or_404(CompanyProfile, id=client_id)
-    if not can_coach_access_client(request.user, client):
-        return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
-    docs = Document.objects.filter(owner=client.user).order_by('-uploaded_at')[:25]
-    return JsonResponse({
-        'success': True,
-        'documents': [
-            {
-                'id': d.id,
-                'name': getattr(d.file, 'name', ''),
-                'type': d.doc_type,
-                'year': d.year,
-                'uploaded_at': d.uploaded_at.isoformat() if getattr(d, 'uploaded_at', None) else None,
-            } for d in docs
-        ]
-    })
+    return _client_section(request, client_id, documents_section)
 
 
 @login_required
 @coach_required
+@conditional_json(statements_version, user_id=_client_user_id)
 def cashflow_data(request, client_id):
-    client = get_object_or_404(CompanyProfile, id=client_id)
-    if not can_coach_access_client(request.user, client):
-        return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
-    years = list(FinancialStatement.objects.filter(user=client.user).values_list('year', flat=True).order_by('-year'))
-    if not years:
-        return JsonResponse({'success': True, 'available': False})
-    year = years[0]
-    cf = calculate_cashflow(client.user, year) or {}
-    return JsonResponse({'success': True, 'available': True, 'year': year, 'cashflow': cf})
+    return _client_section(request, client_id, cashflow_section)
 
 
 @login_required
 @coach_required
+@conditional_json(statements_version, user_id=_client_user_id)
 def charts_data(request, client_id):
-    client = get_object_or_404(CompanyProfile, id=client_id)
-    if not can_coach_access_client(request.user, client):
-        return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
-    rows = []
-    for fs in FinancialStatement.objects.filter(user=client.user).order_by('year'):
-        metrics = compute_metrics(fs)
-        rows.append({
-            'year': fs.year,
-            'revenue': float(metrics["revenue"] or 0),
-            'cogs': float(metrics["cogs"] or 0),
-            'ebit': float(metrics["ebit"] or 0),
-        })
-    return JsonResponse({'success': True, 'series': rows})
+    return _client_section(request, client_id, charts_section)
 
 
 @login_required
 @coach_required
+@conditional_json(surveys_version, user_id=_client_user_id)
 def surveys_data(request, client_id):
-    client = get_object_or_404(CompanyProfile, id=client_id)
-    if not can_coach_access_client(request.user, client):
-        return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
-    submissions = SurveySubmission.objects.filter(user=client.user).order_by('-created_at')
-    return JsonResponse({'success': True, 'count': submissions.count(), 'latest': submissions.first().created_at.isoformat() if submissions.first() else None})
+    return _client_section(request, client_id, surveys_section)
 
 
 @login_required
 @coach_required
 def suropen_data(request, client_id):
-    client = get_object_or_404(CompanyProfile, id=client_id)
+    return _client_section(request, client_id, suropen_section)
+
+
+@login_required
+@coach_required
+def client_bundle(request, client_id):
+    """
+    Všechny (nebo vybrané) sekce klienta jedním požadavkem.
+
+    ?sections=client,documents,cashflow,charts,surveys,suropen (výchozí všechny)
+    Profil a oprávnění se ověří jednou, sdílená data se načtou jednou.
+    """
+    client = get_object_or_404(CompanyProfile.objects.select_related('user'), id=client_id)
     if not can_coach_access_client(request.user, client):
         return JsonResponse({'success': False, 'error': 'Forbidden'}, status=403)
     try:
-        from suropen.models import OpenAnswer
-        count = OpenAnswer.objects.filter(user=client.user).count()
-    except Exception:
-        count = 0
-    return JsonResponse({'success': True, 'count': count})
+        names = requested_sections(request.GET, CLIENT_SECTIONS)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e), 'available': list(CLIENT_SECTIONS)}, status=400)
+
+    sections = build_sections(ClientData(client), names, CLIENT_SECTIONS, request.GET)
+    return JsonResponse({'success': True, 'sections': sections})
 
 
 # ---- SPA endpoints for coach dashboard ----
@@ -507,3 +494,55 @@ def assign_client_to_self(request, client_id):
 
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=500)
+
+
+@login_required
+@coach_required
+def portfolio_data(request):
+    """
+    Žebříček klientů kouče za jeden rok s percentily vůči všem firmám.
+
+    Parametry: ?year= (výchozí poslední rok s daty klientů), ?sort= (metrika, výchozí revenue_yoy),
+    ?order=asc|desc
+    """
+    coach = get_object_or_404(Coach, user=request.user)
+    clients = {
+        profile.user_id: profile
+        for profile in CompanyProfile.objects.filter(
+            models.Q(assigned_coach=coach) | models.Q(user__usercoachassignment__coach=coach)
+        ).distinct()
+    }
+    sort = request.GET.get('sort', 'revenue_yoy')
+    if sort not in METRICS:
+        return JsonResponse({'success': False, 'error': f'Neznámá metrika: {sort}'}, status=400)
+
+    portfolio = Portfolio.load()
+    client_ids = list(clients)
+    try:
+        year = int(request.GET['year']) if request.GET.get('year') else portfolio.latest_year(client_ids)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Neplatný rok'}, status=400)
+    if year is None or year not in portfolio.years:
+        return JsonResponse({'success': True, 'year': year, 'metrics': METRICS, 'rows': [], 'peers': None,
+                             'missing': [p.company_name for p in clients.values()]})
+
+    rows = portfolio.table(year, client_ids, sort=sort, descending=request.GET.get('order') != 'asc')
+    for row in rows:
+        profile = clients[row['user_id']]
+        row['client_id'] = profile.id
+        row['company_name'] = profile.company_name
+    ranked = {row['user_id'] for row in rows}
+
+    return JsonResponse({
+        'success': True,
+        'year': year,
+        'years': [int(y) for y in portfolio.years],
+        'sort': sort,
+        'metrics': METRICS,
+        'peers': {
+            'count': portfolio.peer_count(year),
+            'distribution': {m: portfolio.distribution(m, year) for m in METRICS},
+        },
+        'rows': rows,
+        'missing': [p.company_name for uid, p in clients.items() if uid not in ranked],
+    })
@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import PeerBenchmark
+
+
+@admin.register(PeerBenchmark)
+class PeerBenchmarkAdmin(admin.ModelAdmin):
+    list_display = ("year", "size_band", "metric", "sample_size", "dirty", "computed_at")
+    list_filter = ("year", "size_band", "metric", "dirty")
+    readonly_fields = ("quantiles", "computed_at")
@@ -0,0 +1,213 @@
+"""
+Peer benchmarking - precomputed percentile distributions of margins.
+
+For every year, revenue size band and ratio (gross/operating/net margin) the
+p0…p100 cut points across all companies are stored in PeerBenchmark. The
+dashboard places a company in its peer group with a single indexed lookup and
+a bisect over 101 numbers instead of scanning all statements per request:
+
+    benchmarks_for(user_metrics(user))[2024]["gm_pct"]
+    # {"percentile": 72, "peers": 41, "band": "small", "band_label": "..."}
+
+Aggregates are refreshed incrementally: saving metrics of a statement marks
+its year dirty (dashboard.signals) and the year is recomputed after commit,
+at most once per BENCHMARK_REFRESH_INTERVAL seconds. Years left dirty by the
+throttle are picked up by ``manage.py refresh_peer_benchmarks`` (cron).
+Recomputing a year invalidates the cached dashboard context of every company
+with a statement in that year, since the context shows the percentiles.
+"""
+
+import logging
+import math
+from bisect import bisect_right
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard import context_cache
+from dashboard.models import BENCHMARK_METRICS, SIZE_BANDS, PeerBenchmark
+from ingest.models import StatementMetrics
+from ingest.services.metrics_service import materialize_missing
+
+logger = logging.getLogger(__name__)
+
+ALL_BAND = "all"
+BAND_LABELS = dict(SIZE_BANDS)
+# Horní hranice pásma v tis. Kč (poslední pásmo bez omezení)
+BAND_LIMITS = (("micro", 50_000), ("small", 250_000), ("medium", 1_250_000), ("large", math.inf))
+QUANTILE_STEPS = 100
+
+
+def size_band(revenue: Optional[float]) -> str:
+    """Revenue size band of a company (revenue in thousands CZK)."""
+    revenue = revenue or 0.0
+    for band, limit in BAND_LIMITS:
+        if revenue < limit:
+            return band
+    return BAND_LIMITS[-1][0]
+
+
+def quantiles(values: Sequence[float], steps: int = QUANTILE_STEPS) -> List[float]:
+    """Cut points p0…p100 with linear interpolation (numpy.percentile default)."""
+    ordered = sorted(values)
+    if not ordered:
+        return []
+    last = len(ordered) - 1
+    result = []
+    for step in range(steps + 1):
+        position = step / steps * last
+        low = int(position)
+        high = min(low + 1, last)
+        result.append(round(ordered[low] + (ordered[high] - ordered[low]) * (position - low), 4))
+    return result
+
+
+def percentile_of(value: float, cuts: Sequence[float]) -> Optional[int]:
+    """Percentile (0–100) of a value within stored cut points."""
+    if not cuts:
+        return None
+    if value < cuts[0]:
+        return 0
+    if value >= cuts[-1]:
+        return 100
+    # Poslední hranice <= value, uvnitř intervalu lineárně (stejné hodnoty → horní okraj)
+    index = bisect_right(cuts, value) - 1
+    low, high = cuts[index], cuts[index + 1]
+    fraction = (value - low) / (high - low) if high > low else 0.0
+    steps = len(cuts) - 1
+    return int(round((index + fraction) / steps * 100))
+
+
+def mark_dirty(years: Iterable[int]) -> None:
+    """Flag aggregates of the given years for recomputation (cheap, runs on every write)."""
+    for year in set(years):
+        if not PeerBenchmark.objects.filter(year=year).update(dirty=True):
+            PeerBenchmark.objects.get_or_create(
+                year=year, size_band=ALL_BAND, metric=BENCHMARK_METRICS[0], defaults={"dirty": True}
+            )
+
+
+def refresh_year(year: int) -> int:
+    """
+    Recompute all aggregates of one year from StatementMetrics (one query).
+
+    Statements of the year without metrics are materialized first, so they
+    are not missing from the distribution. Rows are marked clean before
+    reading, so statements written while the year is being recomputed leave
+    it dirty for the next run.
+
+    Returns:
+        Number of companies in the year
+    """
+    materialize_missing(year=year)
+    PeerBenchmark.objects.filter(year=year).update(dirty=False)
+    rows = list(
+        StatementMetrics.objects.filter(year=year, has_income=True, revenue__gt=0)
+        .values_list("revenue", *BENCHMARK_METRICS)
+    )
+
+    groups: Dict[str, List[tuple]] = {ALL_BAND: []}
+    for row in rows:
+        groups[ALL_BAND].append(row[1:])
+        groups.setdefault(size_band(row[0]), []).append(row[1:])
+
+    now = timezone.now()
+    with transaction.atomic():
+        PeerBenchmark.objects.filter(year=year).exclude(size_band__in=list(groups)).delete()
+        for band, values in groups.items():
+            for index, metric in enumerate(BENCHMARK_METRICS):
+                values_of_metric = {
+                    "sample_size": len(values),
+                    "quantiles": quantiles([value[index] for value in values]),
+                    "computed_at": now,
+                }
+                # Existující řádky si nechávají `dirty` (mohl ho mezitím nastavit nový zápis)
+                PeerBenchmark.objects.update_or_create(
+                    year=year,
+                    size_band=band,
+                    metric=metric,
+                    defaults=values_of_metric,
+                    create_defaults={**values_of_metric, "dirty": False},
+                )
+    # Uložené kontexty dashboardu obsahují percentily tohoto roku
+    context_cache.invalidate_many(set(StatementMetrics.objects.filter(year=year).values_list("user_id", flat=True)))
+    logger.info(f"Peer benchmarks {year}: {len(rows)} companies in {len(groups) - 1} bands")
+    return len(rows)
+
+
+def refresh_dirty(years: Optional[Iterable[int]] = None, min_age: Optional[int] = None) -> List[int]:
+    """
+    Recompute dirty years (optionally only the given ones).
+
+    With `min_age` (seconds) a year is skipped while its aggregates are
+    younger than that; it stays dirty for the next run.
+    """
+    dirty = PeerBenchmark.objects.filter(dirty=True)
+    if years is not None:
+        dirty = dirty.filter(year__in=list(years))
+    candidates = set(dirty.values_list("year", flat=True))
+    if min_age and candidates:
+        threshold = timezone.now() - timedelta(seconds=min_age)
+        fresh = set(
+            PeerBenchmark.objects.filter(year__in=candidates, computed_at__gt=threshold)
+            .values_list("year", flat=True)
+        )
+        candidates -= fresh
+
+    refreshed = sorted(candidates)
+    for year in refreshed:
+        refresh_year(year)
+    return refreshed
+
+
+def refresh_after_write(years: Iterable[int]) -> None:
+    """Incremental refresh triggered by new statements (throttled per year)."""
+    interval = getattr(settings, "BENCHMARK_REFRESH_INTERVAL", 300)
+    try:
+        refresh_dirty(years, min_age=interval)
+    except Exception as e:
+        logger.warning(f"Peer benchmark refresh failed, left for cron: {e}")
+
+
+def benchmarks_for(rows: Sequence[StatementMetrics]) -> Dict[int, Dict[str, dict]]:
+    """
+    Percentile of each margin of the given metrics rows among peers of the
+    same year and size band (all companies when the band is too small).
+
+    All years are looked up with one query on the (year, band, metric) index.
+    """
+    rows = [row for row in rows if row.has_income and row.revenue > 0]
+    if not rows:
+        return {}
+    min_peers = getattr(settings, "BENCHMARK_MIN_PEERS", 5)
+
+    aggregates = {
+        (agg.year, agg.size_band, agg.metric): agg
+        for agg in PeerBenchmark.objects.filter(year__in={row.year for row in rows}, sample_size__gt=0)
+    }
+
+    result: Dict[int, Dict[str, dict]] = {}
+    for row in rows:
+        own_band = size_band(row.revenue)
+        year_result = {}
+        for metric in BENCHMARK_METRICS:
+            aggregate = None
+            for band in (own_band, ALL_BAND):
+                candidate = aggregates.get((row.year, band, metric))
+                if candidate and candidate.sample_size >= min_peers:
+                    aggregate = candidate
+                    break
+            if aggregate is None:
+                continue
+            year_result[metric] = {
+                "percentile": percentile_of(getattr(row, metric), aggregate.quantiles),
+                "peers": aggregate.sample_size,
+                "band": aggregate.size_band,
+                "band_label": BAND_LABELS[aggregate.size_band],
+            }
+        if year_result:
+            result[row.year] = year_result
+    return result
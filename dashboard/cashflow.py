@@ -1,5 +1,11 @@
+from typing import Dict
+
 from ingest.models import FinancialStatement
-from finance.utils import compute_overheads, first_number, to_number
+from finance.schema import canonical_balance, canonical_income
+from finance.utils import compute_overheads
+
+# Sloupce potřebné pro výpočet (bez dokumentu, obrázku apod.)
+CASHFLOW_FIELDS = ("year", "income", "balance")
 
 
 def calculate_cashflow(user, year):
@@ -7,60 +13,72 @@ def calculate_cashflow(user, year):
     Vypočítá Cash Flow výkaz z FinancialStatement pro daný rok a uživatele.
     Používá přímou i nepřímou metodu podle dostupných dat.
     """
-    fs = FinancialStatement.objects.filter(user=user, year=year).first()
+    # Daný rok i předchozí rok (pro výpočet změn Δ) jedním dotazem
+    statements = {
+        fs.year: fs
+        for fs in FinancialStatement.objects.filter(user=user, year__in=(year, year - 1)).only(*CASHFLOW_FIELDS)
+    }
+    fs = statements.get(year)
     if not fs:
         return None
+    fs_prev = statements.get(year - 1)
+    return _cashflow(
+        canonical_income(fs.income),
+        canonical_balance(fs.balance),
+        canonical_balance(fs_prev.balance) if fs_prev else {},
+    )
 
-    # Získat data předchozího roku pro výpočet změn (Δ)
-    fs_prev = FinancialStatement.objects.filter(user=user, year=year - 1).first()
 
-    income = fs.income or {}
-    balance = fs.balance or {}
-    balance_prev = (fs_prev.balance or {}) if fs_prev else {}
+def calculate_cashflow_series(user) -> Dict[int, dict]:
+    """
+    Cash Flow všech roků uživatele jedním průchodem: {rok: výsledek calculate_cashflow}.
 
-    def _income_value(keys, default=0.0):
-        val = first_number(income, keys)
-        return val if val is not None else default
+    Výkazy se načtou jedním dotazem a každý se normalizuje jen jednou;
+    Δ rozvahy se počítají vůči roku year - 1 (stejně jako calculate_cashflow).
+    """
+    parsed = {
+        fs.year: (canonical_income(fs.income), canonical_balance(fs.balance))
+        for fs in FinancialStatement.objects.filter(user=user).only(*CASHFLOW_FIELDS).order_by("year")
+    }
+    return {
+        year: _cashflow(income, balance, parsed.get(year - 1, (None, {}))[1])
+        for year, (income, balance) in parsed.items()
+    }
 
-    def _balance_value(keys, default=0.0):
-        val = first_number(balance, keys)
-        return val if val is not None else default
 
-    def _balance_prev_value(keys, default=0.0):
-        val = first_number(balance_prev, keys)
-        return val if val is not None else default
+def _cashflow(income: dict, balance: dict, balance_prev: dict) -> dict:
+    """Výpočet z kanonických dat výkazu a rozvahy předchozího roku ({} pokud chybí)."""
 
     # Výsledovka
-    revenue = _income_value(("Revenue", "revenue"), 0.0)
-    cogs = _income_value(("COGS", "cogs"), 0.0)
+    revenue = income.get("revenue", 0.0)
+    cogs = income.get("cogs", 0.0)
     overheads = compute_overheads(income)
-    depreciation = _income_value(("depreciation", "Depreciation"), 0.0)
+    depreciation = income.get("depreciation", 0.0)
 
-    interest = _income_value(("InterestPaid", "Interest", "interest_paid"), 0.0)
-    taxation = _income_value(("IncomeTaxPaid", "Tax", "income_tax_paid"), 0.0)
-    dividends = _income_value(("DividendsPaid", "Dividends", "dividends_paid"), 0.0)
-    extraordinary = _income_value(("ExtraordinaryItems", "extraordinary_items"), 0.0)
+    interest = income.get("interest_paid", 0.0)
+    taxation = income.get("income_tax_paid", 0.0)
+    dividends = income.get("dividends_paid", 0.0)
+    extraordinary = income.get("extraordinary_items", 0.0)
 
     # Rozvaha (aktuální rok)
-    total_assets = _balance_value(("TotalAssets", "total_assets", "assets_total"), 0.0)
-    cash = _balance_value(("Cash", "cash"), 0.0)
-    receivables = _balance_value(("Receivables", "receivables"), 0.0)
-    inventory = _balance_value(("Inventory", "inventory"), 0.0)
-    tangible_assets = _balance_value(("TangibleAssets", "tangible_assets", "fixed_assets_tangible"), 0.0)
-    trade_payables = _balance_value(("TradePayables", "trade_payables"), 0.0)
-    short_term_liabilities = _balance_value(("ShortTermLiabilities", "short_term_liabilities", "liabilities_short"), 0.0)
-    short_term_loans = _balance_value(("ShortTermLoans", "short_term_loans"), 0.0)
-    long_term_loans = _balance_value(("LongTermLoans", "long_term_loans"), 0.0)
+    cash = balance.get("cash", 0.0)
+    receivables = balance.get("receivables", 0.0)
+    inventory = balance.get("inventory", 0.0)
+    tangible_assets = balance.get("tangible_assets", 0.0)
+    trade_payables = balance.get("trade_payables", 0.0)
+    short_term_liabilities = balance.get("short_term_liabilities", 0.0)
+    short_term_loans = balance.get("short_term_loans", 0.0)
+    long_term_loans = balance.get("long_term_loans", 0.0)
 
     # Rozvaha (předchozí rok) - pro výpočet Δ
-    receivables_prev = _balance_prev_value(("Receivables", "receivables"), 0.0)
-    inventory_prev = _balance_prev_value(("Inventory", "inventory"), 0.0)
-    trade_payables_prev = _balance_prev_value(("TradePayables", "trade_payables"), 0.0)
-    short_term_liabilities_prev = _balance_prev_value(("ShortTermLiabilities", "short_term_liabilities", "liabilities_short"), 0.0)
+    receivables_prev = balance_prev.get("receivables", 0.0)
+    inventory_prev = balance_prev.get("inventory", 0.0)
+    trade_payables_prev = balance_prev.get("trade_payables", 0.0)
+    short_term_liabilities_prev = balance_prev.get("short_term_liabilities", 0.0)
 
-    loans_received = _balance_value(("LoansReceived", "loans_received"), 0.0)
-    loans_repaid = _balance_value(("LoansRepaid", "loans_repaid"), 0.0)
-    asset_sales = _balance_value(("AssetSales", "asset_sales"), 0.0)
+    loans_received = balance.get("loans_received", 0.0)
+    loans_repaid = balance.get("loans_repaid", 0.0)
+    asset_sales = balance.get("asset_sales", 0.0)
 
     # --- Změny v rozvaze (Δ) ---
     delta_receivables = receivables - receivables_prev
@@ -74,14 +92,14 @@ def calculate_cashflow(user, year):
     working_capital_change = (delta_inventory + delta_receivables - delta_short_term_liabilities)
 
     cash_begin = (
-        to_number(balance.get("CashBegin"))
-        or to_number(income.get("CashBegin"))
+        balance.get("cash_begin")
+        or income.get("cash_begin")
         or cash * 0.8
     )
 
     # --- Základní výpočty ---
-    net_profit = _income_value(
-        ("NetProfit", "net_profit", "net_income"),
+    net_profit = income.get(
+        "net_profit",
         revenue - cogs - overheads - interest - taxation + extraordinary,
     )
 
@@ -95,7 +113,7 @@ def calculate_cashflow(user, year):
     # Vyšší zásoby = nákup navíc (cash out)
     # Vyšší závazky = zaplatili jsme méně (cash zůstalo)
     # Používáme cogs_services z overheads jako část služeb
-    cogs_services = _income_value(("cogs_services", "services", "Services"), 0.0)
+    cogs_services = income.get("cogs_services", income.get("services", 0.0))
     cash_to_suppliers = (cogs + cogs_services) + delta_inventory - delta_payables
 
     # --- Gross Cash Profit ---
@@ -105,7 +123,7 @@ def calculate_cashflow(user, year):
     operating_cf = net_profit + depreciation - working_capital_change
 
     # --- Cash Flow z investiční činnosti ---
-    capex = _balance_value(("CapEx", "FixedAssets", "capex"), tangible_assets * 0.1)
+    capex = balance.get("capex", tangible_assets * 0.1)
     if capex == 0 and revenue > 0:
         capex = revenue * 0.02
     investing_cf = asset_sales - capex
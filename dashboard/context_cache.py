@@ -0,0 +1,136 @@
+"""
+Per-user cache of the dashboard context (build_dashboard_context).
+
+The context of a user is stored under a versioned key; writes to any model
+the dashboard reads bump the user's version (dashboard.signals), so stale
+entries are never read again and simply expire. Coaches switching between
+clients reuse the cached context of each client.
+
+    context = cached_context(user, build)     # build(user) only on a miss
+    invalidate(user_id)                        # after a relevant write
+    invalidate_many(user_ids)                  # after a peer benchmark refresh
+    cache_stats()                              # hit ratio, rebuild times
+
+Uses the "dashboard" cache alias (database cache by default, shared by all
+workers, so invalidation and the hit/miss counters cover every process).
+Cache failures fall back to building the context.
+"""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger(__name__)
+
+CACHE_ALIAS = "dashboard"
+# Zvýšit při změně struktury kontextu (staré záznamy se přestanou číst)
+CONTEXT_VERSION = 1
+STATS_KEY = "dashboard:ctx:stats:{}"
+STATS_FIELDS = ("hits", "misses", "rebuild_us_total", "rebuild_us_max")
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(user_id: int) -> str:
+    return f"dashboard:ctx:version:{user_id}"
+
+
+def _context_key(user_id: int, version: int) -> str:
+    return f"dashboard:ctx:{CONTEXT_VERSION}:{user_id}:{version}"
+
+
+def _incr(key: str, delta: int = 1) -> None:
+    cache = _cache()
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Klíč ještě neexistuje (nebo byl vyřazen)
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def _user_version(user_id: int) -> int:
+    cache = _cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Začíná časem, aby vyřazený klíč verze neoživil starší uložený kontext
+        cache.add(_version_key(user_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def invalidate(user_id: int) -> None:
+    """Make the cached dashboard context of a user stale."""
+    cache = _cache()
+    try:
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), time.time_ns(), timeout=None)
+    except Exception as e:
+        # Zápis dat nesmí selhat kvůli cache; kontext pak vyprší po TTL
+        logger.warning(f"Failed to invalidate dashboard context of user {user_id}: {e}")
+
+
+def invalidate_many(user_ids: Iterable[int]) -> None:
+    """Make the cached context of many users stale (one cache write)."""
+    # Nová verze = aktuální čas, vždy vyšší než starší verze navýšené o počet zápisů
+    version = time.time_ns()
+    try:
+        _cache().set_many({_version_key(user_id): version for user_id in user_ids}, timeout=None)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate dashboard contexts: {e}")
+
+
+def cached_context(user, build: Callable[[Any], Dict[str, Any]]) -> Dict[str, Any]:
+    """Return the cached context of a user, rebuilding it with `build` on a miss."""
+    ttl = getattr(settings, "DASHBOARD_CONTEXT_CACHE_TTL", 600)
+    if not ttl:
+        return build(user)
+
+    cache = _cache()
+    try:
+        key = _context_key(user.pk, _user_version(user.pk))
+        context = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Dashboard context cache unavailable: {e}")
+        return build(user)
+    if context is not None:
+        _incr(STATS_KEY.format("hits"))
+        return context
+
+    started = time.perf_counter()
+    context = build(user)
+    elapsed_us = int((time.perf_counter() - started) * 1_000_000)
+    try:
+        cache.set(key, context, timeout=ttl)
+        _incr(STATS_KEY.format("misses"))
+        _incr(STATS_KEY.format("rebuild_us_total"), elapsed_us)
+        if elapsed_us > (cache.get(STATS_KEY.format("rebuild_us_max")) or 0):
+            cache.set(STATS_KEY.format("rebuild_us_max"), elapsed_us, timeout=None)
+    except Exception as e:
+        logger.warning(f"Failed to store dashboard context of user {user.pk}: {e}")
+    logger.debug(f"Dashboard context of user {user.pk} rebuilt in {elapsed_us / 1000:.1f} ms")
+    return context
+
+
+def cache_stats() -> Dict[str, Any]:
+    values = _cache().get_many([STATS_KEY.format(name) for name in STATS_FIELDS])
+    stats = {name: values.get(STATS_KEY.format(name), 0) for name in STATS_FIELDS}
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        "hits": stats["hits"],
+        "misses": stats["misses"],
+        "hit_ratio": round(stats["hits"] / lookups, 4) if lookups else None,
+        "avg_rebuild_ms": round(stats["rebuild_us_total"] / stats["misses"] / 1000, 2) if stats["misses"] else None,
+        "max_rebuild_ms": round(stats["rebuild_us_max"] / 1000, 2),
+    }
+
+
+def reset_stats() -> None:
+    _cache().delete_many([STATS_KEY.format(name) for name in STATS_FIELDS])
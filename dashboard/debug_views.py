@@ -2,7 +2,7 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from ingest.models import FinancialStatement
-from dashboard.cashflow import calculate_cashflow
+from dashboard.cashflow import calculate_cashflow_series
 
 @login_required
 def debug_cashflow(request):
@@ -16,8 +16,9 @@ def debug_cashflow(request):
         'statements': []
     }
     
+    series = calculate_cashflow_series(user)
     for statement in statements:
-        cf_data = calculate_cashflow(user, statement.year)
+        cf_data = series.get(statement.year)
         debug_info['statements'].append({
             'year': statement.year,
             'income': statement.income,
@@ -29,7 +30,7 @@ def debug_cashflow(request):
     # Pro poslední rok
     selected_year = statements.last().year if statements.exists() else None
     if selected_year:
-        cf = calculate_cashflow(user, selected_year)
+        cf = series.get(selected_year)
         debug_info['selected_year'] = selected_year
         debug_info['selected_cashflow'] = cf
     
@@ -0,0 +1,221 @@
+"""
+Cashflow forecasting - Monte Carlo projection built on dashboard.cashflow.
+
+The latest statement is reduced to a ForecastBase (revenue, cost ratios,
+working capital, debt, cash) calibrated with the same _cashflow() used by the
+cashflow dashboard. simulate() projects 1–5 years for thousands of scenarios
+at once as (scenarios × years) NumPy arrays:
+
+    revenue_t      = revenue_t-1 × (1 + g),  g ~ N(revenue_growth, growth_volatility)
+    working capital = receivables (DSO) + inventory (DIO) − payables (DPO)
+    operating CF   = net profit + depreciation − Δ working capital
+    investing CF   = −capex ratio × revenue
+    financing CF   = −loan repayment × remaining debt
+
+and returns percentile bands of cash, net cash flow and cash runway (years
+until cash drops below zero). The random draws use a fixed seed, so moving a
+slider changes the result only through the driver (common random numbers)
+and a 10 000-scenario, 5-year run takes tens of milliseconds.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Mapping, Optional
+
+import numpy as np
+
+from finance.schema import canonical_balance, canonical_income
+from finance.utils import growth
+from ingest.models import FinancialStatement
+
+from .cashflow import CASHFLOW_FIELDS, _cashflow
+
+logger = logging.getLogger(__name__)
+
+DAYS = 365.0
+BANDS = (5, 25, 50, 75, 95)
+RUNWAY_PERCENTILES = (10, 50, 90)
+DEFAULT_SCENARIOS = 2000
+MAX_SCENARIOS = 10000
+MAX_HORIZON = 5
+DEFAULT_TAX_RATE = 0.21
+
+# Nastavitelné drivery: (min, max); procenta a dny
+DRIVER_LIMITS = {
+    "revenue_growth": (-90.0, 200.0),
+    "growth_volatility": (0.0, 100.0),
+    "dso": (0.0, 365.0),
+    "dio": (0.0, 365.0),
+    "dpo": (0.0, 365.0),
+    "capex_ratio": (0.0, 100.0),
+    "loan_repayment": (0.0, 100.0),
+}
+
+
+@dataclass(frozen=True)
+class ForecastBase:
+    """Last actual year and the default drivers derived from it."""
+    year: int
+    revenue: float
+    cogs_ratio: float
+    overheads_ratio: float
+    depreciation: float
+    interest_rate: float
+    tax_rate: float
+    working_capital: float
+    debt: float
+    cash: float
+    # Drivery (výchozí hodnoty posuvníků)
+    revenue_growth: float
+    growth_volatility: float
+    dso: float
+    dio: float
+    dpo: float
+    capex_ratio: float
+    loan_repayment: float
+
+    def drivers(self) -> Dict[str, float]:
+        return {name: round(getattr(self, name), 2) for name in DRIVER_LIMITS}
+
+
+def _share(numerator: float, denominator: float, default: float = 0.0) -> float:
+    return numerator / denominator if denominator else default
+
+
+def load_base(user) -> Optional[ForecastBase]:
+    """Calibrate the forecast from the latest statement (one query)."""
+    statements = list(
+        FinancialStatement.objects.filter(user=user).only(*CASHFLOW_FIELDS).order_by("-year")[:2]
+    )
+    if not statements:
+        return None
+    latest = statements[0]
+    previous = statements[1] if len(statements) > 1 and statements[1].year == latest.year - 1 else None
+
+    income = canonical_income(latest.income)
+    balance = canonical_balance(latest.balance)
+    prev_income = canonical_income(previous.income) if previous else {}
+    cf = _cashflow(income, balance, canonical_balance(previous.balance) if previous else {})
+
+    revenue = cf["revenue"]
+    cogs = cf["cogs"]
+    receivables = balance.get("receivables", 0.0)
+    inventory = balance.get("inventory", 0.0)
+    # Závazky stejně jako Δ pracovního kapitálu v calculate_cashflow
+    payables = balance.get("short_term_liabilities", 0.0)
+    debt = balance.get("short_term_loans", 0.0) + balance.get("long_term_loans", 0.0)
+    earnings_before_tax = revenue - cogs - cf["overheads"] - cf["interest"]
+
+    revenue_growth = growth(revenue, prev_income.get("revenue")) if previous else None
+    return ForecastBase(
+        year=latest.year,
+        revenue=revenue,
+        cogs_ratio=_share(cogs, revenue),
+        overheads_ratio=_share(cf["overheads"], revenue),
+        depreciation=cf["depreciation"],
+        interest_rate=_share(cf["interest"], debt),
+        tax_rate=min(max(_share(cf["taxation"], earnings_before_tax, DEFAULT_TAX_RATE), 0.0), 0.5),
+        working_capital=receivables + inventory - payables,
+        debt=debt,
+        cash=balance.get("cash", cf["cash_end"]),
+        revenue_growth=min(max(revenue_growth or 0.0, -50.0), 50.0),
+        growth_volatility=10.0,
+        dso=_share(receivables, revenue) * DAYS,
+        dio=_share(inventory, cogs) * DAYS,
+        dpo=_share(payables, cogs) * DAYS,
+        capex_ratio=_share(cf["capex"], revenue) * 100,
+        loan_repayment=_share(cf["loans_repaid"], debt, 0.1) * 100,
+    )
+
+
+def with_drivers(base: ForecastBase, params: Mapping[str, Any]) -> ForecastBase:
+    """Apply user driver overrides; raises ValueError on invalid values."""
+    overrides = {}
+    for name, (low, high) in DRIVER_LIMITS.items():
+        raw = params.get(name)
+        if raw in (None, ""):
+            continue
+        value = float(raw)
+        if not low <= value <= high:
+            raise ValueError(f"{name} must be between {low:g} and {high:g}")
+        overrides[name] = value
+    return replace(base, **overrides)
+
+
+def _percentiles(values, percentiles) -> Dict[str, list]:
+    bands = np.percentile(values, percentiles, axis=0)
+    return {f"p{p}": np.round(band, 2).tolist() for p, band in zip(percentiles, bands)}
+
+
+def simulate(base: ForecastBase, horizon: int = 3, scenarios: int = DEFAULT_SCENARIOS, seed: int = 0) -> Dict[str, Any]:
+    """Run the Monte Carlo projection and summarize it into percentile bands."""
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"horizon must be between 1 and {MAX_HORIZON}")
+    if not 1 <= scenarios <= MAX_SCENARIOS:
+        raise ValueError(f"scenarios must be between 1 and {MAX_SCENARIOS}")
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    shocks = rng.standard_normal((scenarios, horizon))
+    rates = np.maximum(base.revenue_growth / 100 + base.growth_volatility / 100 * shocks, -0.95)
+
+    revenue = base.revenue * np.cumprod(1 + rates, axis=1)
+    cogs = revenue * base.cogs_ratio
+    overheads = revenue * base.overheads_ratio
+
+    # Pracovní kapitál z obrátkovosti, Δ vůči předchozímu roku (rok 0 = skutečnost)
+    working_capital = (revenue * base.dso + cogs * base.dio - cogs * base.dpo) / DAYS
+    previous_wc = np.concatenate(
+        [np.full((scenarios, 1), base.working_capital), working_capital[:, :-1]], axis=1
+    )
+    working_capital_change = working_capital - previous_wc
+
+    # Úvěr se splácí podílem ze zůstatku, úrok ze zůstatku na začátku roku
+    repayment_rate = base.loan_repayment / 100
+    debt_begin = base.debt * (1 - repayment_rate) ** np.arange(horizon)
+    repayment = debt_begin * repayment_rate
+    interest = debt_begin * base.interest_rate
+
+    earnings_before_tax = revenue - cogs - overheads - interest
+    net_profit = earnings_before_tax - np.maximum(earnings_before_tax, 0) * base.tax_rate
+    operating_cf = net_profit + base.depreciation - working_capital_change
+    investing_cf = -revenue * base.capex_ratio / 100
+    net_cash_flow = operating_cf + investing_cf - repayment
+    cash = base.cash + np.cumsum(net_cash_flow, axis=1)
+
+    # Runway: první rok se zápornou hotovostí, uvnitř roku lineárně
+    cash_path = np.concatenate([np.full((scenarios, 1), base.cash), cash], axis=1)
+    negative = cash_path < 0
+    ever_negative = negative.any(axis=1)
+    first = np.argmax(negative, axis=1)
+    runway = np.full(scenarios, np.inf)
+    crossing = ever_negative & (first > 0)
+    idx = np.flatnonzero(crossing)
+    before, after = cash_path[idx, first[idx] - 1], cash_path[idx, first[idx]]
+    runway[idx] = first[idx] - 1 + before / (before - after)
+    runway[ever_negative & (first == 0)] = 0.0
+
+    runway_bands = {}
+    for p, value in zip(RUNWAY_PERCENTILES, np.percentile(runway, RUNWAY_PERCENTILES)):
+        runway_bands[f"p{p}"] = None if not np.isfinite(value) else round(float(value), 2)
+
+    return {
+        "base_year": base.year,
+        "years": [base.year + step for step in range(1, horizon + 1)],
+        "scenarios": scenarios,
+        "drivers": base.drivers(),
+        "cash_begin": round(base.cash, 2),
+        "bands": {
+            "cash": _percentiles(cash, BANDS),
+            "net_cash_flow": _percentiles(net_cash_flow, BANDS),
+            "revenue": _percentiles(revenue, BANDS),
+        },
+        "probability_negative_cash": np.round((cash < 0).mean(axis=0), 4).tolist(),
+        "runway": {
+            **runway_bands,
+            # Podíl scénářů, kde hotovost v horizontu nedojde (percentil = None)
+            "beyond_horizon": round(float(np.isinf(runway).mean()), 4),
+        },
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
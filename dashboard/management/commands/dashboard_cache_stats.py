@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.context_cache import cache_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit ratio and rebuild times of the per-user dashboard context cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters after printing them.")
+
+    def handle(self, *args, **options):
+        stats = cache_stats()
+        for name, value in stats.items():
+            self.stdout.write(f"{name:>16}: {'-' if value is None else value}")
+        if options["reset"]:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
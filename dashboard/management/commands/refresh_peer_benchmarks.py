@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.benchmarks import mark_dirty, refresh_dirty
+from ingest.models import StatementMetrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute peer benchmark percentiles (PeerBenchmark). "
+        "By default only years marked dirty by new statements are processed; run from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Rebuild the aggregates of every year.")
+        parser.add_argument("--year", type=int, action="append", default=None, help="Only this year (repeatable).")
+
+    def handle(self, *args, **options):
+        years = options["year"]
+        if options["all"]:
+            mark_dirty(years or StatementMetrics.objects.values_list("year", flat=True).distinct())
+
+        refreshed = refresh_dirty(years)
+        for year in refreshed:
+            self.stdout.write(f"{year} refreshed")
+        self.stdout.write(self.style.SUCCESS(f"Peer benchmarks refreshed for {len(refreshed)} years."))
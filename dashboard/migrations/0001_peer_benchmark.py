@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeerBenchmark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('size_band', models.CharField(choices=[('all', 'Všechny firmy'), ('micro', 'Tržby do 50 mil. Kč'), ('small', 'Tržby 50–250 mil. Kč'), ('medium', 'Tržby 250 mil.–1,25 mld. Kč'), ('large', 'Tržby nad 1,25 mld. Kč')], max_length=10)),
+                ('metric', models.CharField(max_length=10)),
+                ('sample_size', models.IntegerField(default=0)),
+                ('quantiles', models.JSONField(default=list)),
+                ('dirty', models.BooleanField(db_index=True, default=True)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('year', 'size_band', 'metric'), name='unique_peer_benchmark')],
+            },
+        ),
+    ]
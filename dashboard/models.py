@@ -1,3 +1,35 @@
 from django.db import models
 
-# Create your models here.
+
+BENCHMARK_METRICS = ("gm_pct", "op_pct", "np_pct")
+
+# Pásma podle ročních tržeb v tis. Kč (≈ EU hranice mikro/malý/střední podnik)
+SIZE_BANDS = [
+    ("all", "Všechny firmy"),
+    ("micro", "Tržby do 50 mil. Kč"),
+    ("small", "Tržby 50–250 mil. Kč"),
+    ("medium", "Tržby 250 mil.–1,25 mld. Kč"),
+    ("large", "Tržby nad 1,25 mld. Kč"),
+]
+
+
+class PeerBenchmark(models.Model):
+    """
+    Percentile distribution of one ratio across all companies in a year and
+    revenue size band (dashboard.benchmarks). `quantiles` holds p0…p100.
+    """
+    year = models.IntegerField()
+    size_band = models.CharField(max_length=10, choices=SIZE_BANDS)
+    metric = models.CharField(max_length=10)
+    sample_size = models.IntegerField(default=0)
+    quantiles = models.JSONField(default=list)
+    dirty = models.BooleanField(default=True, db_index=True)
+    computed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=("year", "size_band", "metric"), name="unique_peer_benchmark")
+        ]
+
+    def __str__(self):
+        return f"{self.year} {self.size_band} {self.metric} (n={self.sample_size})"
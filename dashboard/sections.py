@@ -0,0 +1,172 @@
+"""
+Named JSON sections of the dashboard and the composite (batch) endpoints.
+
+Every dashboard / coach SPA endpoint is a section builder
+``section(data, params) -> dict`` over a UserData, which loads each shared
+input (metrics rows, cashflow series, documents, survey history) at most once.
+The single endpoints call one builder; the composite endpoints build several
+sections from the same UserData, so a page load needs one request and each
+input is queried once:
+
+    GET /dashboard/api/bundle/?sections=metrics,profitability,cashflow_summary
+    {"success": true, "sections": {"metrics": {...}, "profitability": {...}, ...}}
+
+A failing section is reported in its own payload ({"success": false}) and
+does not fail the other sections.
+"""
+
+import logging
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterable, List, Mapping
+
+from ingest.models import Document
+from ingest.services.metrics_service import user_metrics
+from survey.models import SurveySubmission
+
+from .cashflow import calculate_cashflow_series
+
+logger = logging.getLogger(__name__)
+
+Section = Callable[["UserData", Mapping[str, Any]], Dict[str, Any]]
+
+
+class UserData:
+    """Inputs of one user's sections, each loaded lazily and only once."""
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def metrics(self):
+        return user_metrics(self.user)
+
+    @cached_property
+    def cashflow_series(self):
+        return calculate_cashflow_series(self.user)
+
+    @cached_property
+    def documents(self) -> List[Document]:
+        return list(Document.objects.filter(owner=self.user).order_by("-uploaded_at"))
+
+    @cached_property
+    def submissions(self) -> List[SurveySubmission]:
+        return list(SurveySubmission.objects.filter(user=self.user).order_by("-created_at"))
+
+
+# --- Sekce dashboardu firmy ---
+
+def metrics_section(data: UserData, params: Mapping[str, Any]) -> Dict[str, Any]:
+    """Časové řady klíčových metrik, marže a YoY růsty."""
+    rows = []
+    margins = []
+    yoy = []
+    for m in data.metrics:
+        rows.append({
+            "year": m.year,
+            "revenue": m.revenue,
+            "cogs": m.cogs,
+            "overheads": m.overheads,
+            "ebit": m.ebit,
+            "net_profit": m.net_profit,
+        })
+        margins.append({
+            "year": m.year,
+            **m.profitability,
+        })
+        yoy.append({
+            "year": m.year,
+            "revenue_yoy": m.revenue_yoy,
+            "cogs_yoy": m.cogs_yoy,
+            "overheads_yoy": m.overheads_yoy,
+            "net_profit_yoy": m.net_profit_yoy,
+            "ebit_yoy": m.ebit_yoy,
+        })
+
+    return {
+        "success": True,
+        "years": [r["year"] for r in rows],
+        "series": rows,
+        "margins": margins,
+        "yoy": yoy,
+    }
+
+
+def profitability_section(data: UserData, params: Mapping[str, Any]) -> Dict[str, Any]:
+    """Přehled ziskovosti po letech."""
+    rows = []
+    for m in data.metrics:
+        rows.append({
+            "year": m.year,
+            "revenue": m.revenue,
+            "cogs": m.cogs,
+            "gross_margin": m.gross_margin,
+            "overheads": m.overheads,
+            "ebit": m.ebit,
+            "net_profit": m.net_profit,
+            "gm_pct": m.gm_pct,
+            "op_pct": m.op_pct,
+            "np_pct": m.np_pct,
+        })
+    return {"success": True, "rows": rows}
+
+
+def cashflow_summary_section(data: UserData, params: Mapping[str, Any]) -> Dict[str, Any]:
+    """Dostupné roky a cash flow vybraného roku (?year=, výchozí poslední)."""
+    series = data.cashflow_series
+    years = list(series)
+    if not years:
+        return {"success": True, "years": [], "current_year": None, "cashflow": None}
+
+    try:
+        selected_year = int(params.get("year", years[-1]))
+    except (TypeError, ValueError):
+        selected_year = years[-1]
+
+    if selected_year not in years:
+        selected_year = years[-1]
+
+    return {
+        "success": True,
+        "years": years,
+        "current_year": selected_year,
+        "cashflow": series[selected_year] or {},
+    }
+
+
+DASHBOARD_SECTIONS: Dict[str, Section] = {
+    "metrics": metrics_section,
+    "profitability": profitability_section,
+    "cashflow_summary": cashflow_summary_section,
+}
+
+
+def requested_sections(params: Mapping[str, Any], registry: Mapping[str, Section]) -> List[str]:
+    """
+    Section names from ?sections=a,b (or repeated ?sections=); all when missing.
+
+    Raises:
+        ValueError: unknown section name
+    """
+    names: List[str] = []
+    raw = params.getlist("sections") if hasattr(params, "getlist") else [params.get("sections") or ""]
+    for value in raw:
+        names.extend(name.strip() for name in value.split(",") if name.strip())
+    if not names:
+        return list(registry)
+    unknown = [name for name in names if name not in registry]
+    if unknown:
+        raise ValueError(f"unknown sections: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def build_sections(
+    data: UserData, names: Iterable[str], registry: Mapping[str, Section], params: Mapping[str, Any]
+) -> Dict[str, Dict[str, Any]]:
+    sections = {}
+    for name in names:
+        try:
+            sections[name] = registry[name](data, params)
+        except Exception as e:
+            logger.exception(f"Section {name} failed for user {data.user.pk}: {e}")
+            sections[name] = {"success": False, "error": "section_failed"}
+    return sections
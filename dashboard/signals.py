@@ -0,0 +1,83 @@
+"""
+Dashboard write hooks: incremental refresh of peer benchmarks and
+invalidation of the cached per-user dashboard context.
+"""
+
+import logging
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import CoachClientNotes, CompanyProfile
+from coaching.models import UserCoachAssignment
+from ingest.models import FinancialStatement, StatementMetrics
+from suropen.models import OpenAnswer
+from survey.models import Response, SurveySubmission
+
+from . import context_cache
+from .benchmarks import mark_dirty, refresh_after_write
+
+logger = logging.getLogger(__name__)
+
+
+def _schedule(year):
+    try:
+        mark_dirty([year])
+    except Exception as e:
+        logger.warning(f"Failed to mark peer benchmarks of {year} dirty: {e}")
+        return
+    transaction.on_commit(lambda: refresh_after_write([year]))
+
+
+@receiver(post_save, sender=StatementMetrics)
+def benchmarks_on_metrics_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _schedule(instance.year)
+
+
+@receiver(post_delete, sender=StatementMetrics)
+def benchmarks_on_metrics_delete(sender, instance, **kwargs):
+    _schedule(instance.year)
+
+
+def _notes_user_id(notes):
+    return CompanyProfile.objects.filter(pk=notes.client_id).values_list("user_id", flat=True).first()
+
+
+# Model → vlastník dashboardu, jehož kontext zápis mění
+CONTEXT_SOURCES = {
+    FinancialStatement: lambda instance: instance.user_id,
+    SurveySubmission: lambda instance: instance.user_id,
+    Response: lambda instance: instance.user_id,
+    OpenAnswer: lambda instance: instance.user_id,
+    CompanyProfile: lambda instance: instance.user_id,
+    UserCoachAssignment: lambda instance: instance.client_id,
+    CoachClientNotes: _notes_user_id,
+}
+
+
+def invalidate_dashboard_context(sender, instance, raw=False, **kwargs):
+    try:
+        user_id = CONTEXT_SOURCES[sender](instance)
+    except Exception as e:
+        logger.warning(f"Cannot resolve dashboard owner of {sender.__name__} {instance.pk}: {e}")
+        return
+    if raw or user_id is None:
+        return
+    # Hned (další čtení ve stejném požadavku) i po commitu (souběžný rebuild před commitem)
+    context_cache.invalidate(user_id)
+    transaction.on_commit(lambda: context_cache.invalidate(user_id))
+
+
+for _model in CONTEXT_SOURCES:
+    post_save.connect(invalidate_dashboard_context, sender=_model, dispatch_uid=f"dashboard_ctx_save_{_model.__name__}")
+    post_delete.connect(invalidate_dashboard_context, sender=_model, dispatch_uid=f"dashboard_ctx_delete_{_model.__name__}")
+
+
+@receiver(post_save, sender=User)
+def reset_context_of_new_user(sender, instance, created=False, raw=False, **kwargs):
+    # Znovupoužité id uživatele nesmí převzít kontext smazaného účtu
+    if created and not raw:
+        context_cache.invalidate(instance.pk)
@@ -1,10 +1,26 @@
 from django.contrib.auth.models import User
+from django.db import connection
 from django.core.files.uploadedfile import SimpleUploadedFile
+from unittest import mock
+
 from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CoachClientNotes, CompanyProfile
+from coaching.models import Coach
 
-from dashboard.cashflow import calculate_cashflow
+from dashboard.benchmarks import benchmarks_for, percentile_of, quantiles, refresh_dirty, refresh_year, size_band
+from dashboard.context_cache import cache_stats
+from dashboard.cashflow import calculate_cashflow, calculate_cashflow_series
+from dashboard.forecast import load_base, simulate, with_drivers
+from finance.schema import SCHEMA_KEY, canonical_balance, canonical_income, is_canonical
 from finance.utils import compute_overheads, compute_profitability, growth
-from ingest.models import Document, FinancialStatement
+from dashboard.models import PeerBenchmark
+from dashboard.views import build_dashboard_context
+from ingest.models import Document, FinancialStatement, StatementMetrics
+from ingest.services.metrics_service import user_metrics
+from ingest.tests.factories import TemporaryMediaMixin, make_statement
 
 
 class FinanceUtilsTests(SimpleTestCase):
@@ -32,7 +48,40 @@ class FinanceUtilsTests(SimpleTestCase):
         self.assertAlmostEqual(growth(120, 100), 20.0)
 
 
-class CashflowTests(TestCase):
+class StatementSchemaTests(SimpleTestCase):
+    def test_aliases_and_strings_normalized(self):
+        income = canonical_income({
+            "Revenue": "1 234,5 Kč",
+            "COGS": 400,
+            "personnel_costs_wages": "100",
+            "NetProfit": None,
+            "note": "odhad",
+        })
+        self.assertEqual(income["revenue"], 1234.5)
+        self.assertEqual(income["cogs"], 400.0)
+        self.assertEqual(income["personnel_wages"], 100.0)
+        self.assertNotIn("net_profit", income)
+        self.assertNotIn("Revenue", income)
+        self.assertEqual(income["note"], "odhad")
+        self.assertTrue(is_canonical(income))
+        self.assertIs(canonical_income(income), income)
+
+    def test_first_parseable_alias_wins(self):
+        balance = canonical_balance({"TotalAssets": "n/a", "total_assets": 10, "assets_total": 20})
+        self.assertEqual(balance["total_assets"], 10.0)
+
+    def test_current_period_flattened(self):
+        balance = canonical_balance({
+            "current": {"Cash": 50, "liabilities_short": 30},
+            "previous": {"Cash": 40},
+        })
+        self.assertEqual(balance["cash"], 50.0)
+        self.assertEqual(balance["short_term_liabilities"], 30.0)
+        self.assertEqual(balance["previous"], {"Cash": 40})
+        self.assertEqual(balance[SCHEMA_KEY], 1)
+
+
+class CashflowTests(TemporaryMediaMixin, TestCase):
     def setUp(self):
         self.user = User.objects.create(username="tester")
         upload = SimpleUploadedFile("test.pdf", b"x")
@@ -69,3 +118,268 @@ class CashflowTests(TestCase):
         self.assertAlmostEqual(cf["operating_cf"], 540.0)
         self.assertAlmostEqual(cf["investing_cf"], -20.0)
         self.assertAlmostEqual(cf["cash_end"], 600.0)
+
+    def test_cashflow_series_matches_single_years(self):
+        make_statement(self.user, 2021, {"revenue": 800, "cogs": 300}, {"receivables": 50, "cash": 40})
+        make_statement(self.user, 2022, {"revenue": 900, "cogs": 350}, {"receivables": 80, "cash": 60})
+        make_statement(self.user, 2024, {"revenue": 1000, "cogs": 400}, {"receivables": 70, "cash": 90})
+
+        with self.assertNumQueries(1):
+            series = calculate_cashflow_series(self.user)
+
+        self.assertEqual(list(series), [2021, 2022, 2024])
+        for year in series:
+            self.assertEqual(series[year], calculate_cashflow(self.user, year))
+        self.assertAlmostEqual(series[2022]["delta_receivables"], 30.0)
+        self.assertAlmostEqual(series[2024]["delta_receivables"], 70.0)  # 2023 chybí
+
+    def test_cashflow_series_endpoint(self):
+        make_statement(self.user, 2022, {"revenue": 900}, {"cash": 60})
+        make_statement(self.user, 2023, {"revenue": 1000}, {"cash": 90})
+        self.client.force_login(self.user)
+
+        data = self.client.get(
+            reverse("dashboard:api_cashflow_series"), HTTP_X_REQUESTED_WITH="XMLHttpRequest"
+        ).json()
+
+        self.assertEqual(data["years"], [2022, 2023])
+        self.assertEqual(set(data["cashflow"]), {"2022", "2023"})
+        operating = data["table"][0]["rows"][-1]
+        self.assertEqual(operating["key"], "operating_cf")
+        self.assertEqual(set(operating["values"]), {"2022", "2023"})
+
+
+class PeerBenchmarkTests(TemporaryMediaMixin, TestCase):
+    def _company(self, name, year, revenue, cogs):
+        user = User.objects.create_user(username=name, password="x")
+        make_statement(user, year, {"revenue": revenue, "cogs": cogs})
+        return user
+
+    def test_quantiles_and_percentile_lookup(self):
+        cuts = quantiles([10, 20, 30, 40, 50])
+        self.assertEqual(len(cuts), 101)
+        self.assertEqual((cuts[0], cuts[50], cuts[100]), (10, 30, 50))
+        self.assertEqual(percentile_of(30, cuts), 50)
+        self.assertEqual(percentile_of(5, cuts), 0)
+        self.assertEqual(percentile_of(99, cuts), 100)
+        self.assertIsNone(percentile_of(1, []))
+        self.assertEqual(size_band(49_999), "micro")
+        self.assertEqual(size_band(300_000), "medium")
+
+    def test_refresh_materializes_missing_metrics(self):
+        for i in range(1, 4):
+            self._company(f"old{i}", 2023, 1000, 1000 - 100 * i)
+        # Výkaz uložený před zavedením StatementMetrics
+        StatementMetrics.objects.filter(user__username="old3").delete()
+
+        self.assertEqual(refresh_year(2023), 3)
+        self.assertEqual(PeerBenchmark.objects.get(year=2023, size_band="all", metric="gm_pct").sample_size, 3)
+
+    def test_incremental_refresh_and_dashboard_lookup(self):
+        with self.settings(BENCHMARK_MIN_PEERS=3):
+            # První výkaz roku se přepočítá hned po commitu
+            with self.captureOnCommitCallbacks(execute=True):
+                users = [self._company("peer1", 2023, 1000, 900)]
+            self.assertFalse(PeerBenchmark.objects.filter(dirty=True).exists())
+            self.assertEqual(PeerBenchmark.objects.get(year=2023, size_band="micro", metric="gm_pct").sample_size, 1)
+
+            # Další výkazy rok jen označí (throttle), přepočet dožene refresh_dirty
+            with self.captureOnCommitCallbacks(execute=True):
+                users += [self._company(f"peer{i}", 2023, 1000, 1000 - 100 * i) for i in range(2, 5)]
+                self._company("big", 2023, 100_000, 10_000)
+            self.assertTrue(PeerBenchmark.objects.filter(year=2023, dirty=True).exists())
+            self.assertEqual(refresh_dirty(), [2023])
+            self.assertFalse(PeerBenchmark.objects.filter(dirty=True).exists())
+
+            gm = PeerBenchmark.objects.get(year=2023, size_band="micro", metric="gm_pct")
+            self.assertEqual(gm.sample_size, 4)
+            self.assertEqual((gm.quantiles[0], gm.quantiles[-1]), (10.0, 40.0))
+            self.assertEqual(PeerBenchmark.objects.get(year=2023, size_band="all", metric="gm_pct").sample_size, 5)
+
+            statements = user_metrics(users[-1])
+            with self.assertNumQueries(1):
+                benchmark = benchmarks_for(statements)
+            self.assertEqual(benchmark[2023]["gm_pct"]["percentile"], 100)
+            self.assertEqual(benchmark[2023]["gm_pct"]["band"], "micro")
+
+            # Pásmo "small" má jediný výkaz → srovnání se všemi firmami
+            big = benchmarks_for(user_metrics(User.objects.get(username="big")))
+            self.assertEqual(big[2023]["gm_pct"]["band"], "all")
+            self.assertEqual(big[2023]["gm_pct"]["percentile"], 100)
+
+
+class CashflowForecastTests(TemporaryMediaMixin, TestCase):
+    def _user(self, name, income, balance):
+        user = User.objects.create_user(username=name, password="x")
+        make_statement(user, 2023, income, balance)
+        return user
+
+    def test_deterministic_projection(self):
+        user = self._user(
+            "growing",
+            {"revenue": 1000, "cogs": 600, "overheads": 200, "income_tax_paid": 40},
+            {"cash": 300, "receivables": 100},
+        )
+        base = load_base(user)
+        self.assertAlmostEqual(base.dso, 36.5)
+        self.assertAlmostEqual(base.tax_rate, 0.2)
+        self.assertAlmostEqual(base.capex_ratio, 2.0)
+
+        drivers = {"revenue_growth": 10, "growth_volatility": 0, "dso": 0, "capex_ratio": 0}
+        result = simulate(with_drivers(base, drivers), horizon=2, scenarios=50)
+
+        self.assertEqual(result["years"], [2024, 2025])
+        # Rok 1: zisk 176 + uvolněné pohledávky 100; rok 2: zisk 193,6
+        self.assertEqual(result["bands"]["cash"]["p5"], [576.0, 769.6])
+        self.assertEqual(result["bands"]["cash"]["p95"], [576.0, 769.6])
+        self.assertIsNone(result["runway"]["p50"])
+        self.assertEqual(result["runway"]["beyond_horizon"], 1.0)
+
+        with self.assertRaises(ValueError):
+            with_drivers(base, {"dso": "999"})
+
+    def test_forecast_api_runway(self):
+        user = self._user("burning", {"revenue": 1000, "cogs": 900, "overheads": 300}, {"cash": 150})
+        self.client.force_login(user)
+        url = reverse("dashboard:api_cashflow_forecast")
+
+        data = self.client.get(
+            url, {"horizon": 2, "revenue_growth": 0, "growth_volatility": 0}, HTTP_X_REQUESTED_WITH="XMLHttpRequest"
+        ).json()
+
+        self.assertTrue(data["success"])
+        self.assertEqual(data["probability_negative_cash"], [1.0, 1.0])
+        # Ztráta 200 + capex 20 ročně → 150 vystačí na 150/220 roku
+        self.assertAlmostEqual(data["runway"]["p50"], 0.68)
+        self.assertEqual(data["defaults"]["revenue_growth"], 0.0)
+
+        response = self.client.get(url, {"horizon": 9}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+        self.assertEqual(response.status_code, 400)
+
+
+class DashboardContextCacheTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="cached", password="x")
+        make_statement(self.user, 2023, {"revenue": 1000, "cogs": 400})
+
+    def test_hit_is_cheaper_than_rebuild(self):
+        with CaptureQueriesContext(connection) as rebuild:
+            first = build_dashboard_context(self.user)
+        with CaptureQueriesContext(connection) as hit:
+            second = build_dashboard_context(self.user)
+
+        self.assertEqual(first["table_rows"], second["table_rows"])
+        self.assertLess(len(hit), len(rebuild))
+        stats = cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_ratio"]), (1, 1, 0.5))
+        self.assertIsNotNone(stats["avg_rebuild_ms"])
+
+    def test_writes_invalidate_context(self):
+        self.assertIsNone(build_dashboard_context(self.user)["profile"])
+
+        profile = CompanyProfile.objects.create(user=self.user, company_name="Cached")
+        self.assertEqual(build_dashboard_context(self.user)["profile"], profile)
+
+        coach = Coach.objects.create(user=User.objects.create_user(username="coach", password="x"))
+        notes = CoachClientNotes.objects.create(coach=coach, client=profile, notes="Hlídat marže")
+        self.assertEqual(build_dashboard_context(self.user)["coach_note"], "Hlídat marže")
+
+        notes.delete()
+        FinancialStatement.objects.filter(user=self.user).get().delete()
+        context = build_dashboard_context(self.user)
+        self.assertIsNone(context["coach_note"])
+        self.assertEqual(context["table_rows"], [])
+
+    def test_benchmark_refresh_invalidates_context(self):
+        with self.settings(BENCHMARK_MIN_PEERS=1):
+            refresh_dirty()
+            before = build_dashboard_context(self.user)["benchmark"]["gm_pct"]
+            self.assertEqual((before["peers"], before["percentile"]), (1, 100))
+
+            # Výkaz jiné firmy stejného roku posune percentil bez zápisu tohoto uživatele
+            other = User.objects.create_user(username="better", password="x")
+            make_statement(other, 2023, {"revenue": 1000, "cogs": 100})
+            refresh_dirty()
+            after = build_dashboard_context(self.user)["benchmark"]["gm_pct"]
+            self.assertEqual(after["peers"], 2)
+            self.assertLess(after["percentile"], before["percentile"])
+
+
+class ConditionalGetTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="polling", password="x")
+        self.client.force_login(self.user)
+        self._statement(2022)
+
+    def _statement(self, year):
+        return make_statement(self.user, year, {"revenue": 1000, "cogs": 400})
+
+    def _get(self, name, **headers):
+        return self.client.get(reverse(f"dashboard:{name}"), HTTP_X_REQUESTED_WITH="XMLHttpRequest", **headers)
+
+    def test_matching_etag_skips_computation(self):
+        response = self._get("api_profitability")
+        etag = response["ETag"]
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+
+        with mock.patch("dashboard.sections.user_metrics") as metrics:
+            response = self._get("api_profitability", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        metrics.assert_not_called()
+
+        # Jiný endpoint nad stejnými daty má vlastní ETag
+        self.assertNotEqual(self._get("api_metrics_series")["ETag"], etag)
+
+    def test_statement_changes_change_etag(self):
+        etag = self._get("api_cashflow_summary")["ETag"]
+
+        statement = self._statement(2023)
+        self.assertEqual(self._get("api_cashflow_summary", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self._get("api_cashflow_summary")["ETag"]
+        statement.income = {"revenue": 2000, "cogs": 400}
+        statement.save()
+        self.assertEqual(self._get("api_cashflow_summary", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self._get("api_cashflow_summary")["ETag"]
+        statement.delete()
+        self.assertEqual(self._get("api_cashflow_summary", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_anonymous_gets_no_etag(self):
+        self.client.logout()
+        response = self._get("api_metrics_series")
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(response.has_header("ETag"))
+
+
+class BundleTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="bundled", password="x")
+        self.client.force_login(self.user)
+        for year in (2022, 2023):
+            make_statement(self.user, year, {"revenue": 1000 * (year - 2020), "cogs": 400}, {"cash": 100})
+
+    def _get(self, name, params=None):
+        return self.client.get(reverse(f"dashboard:{name}"), params or {}, HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+
+    def test_bundle_matches_single_endpoints(self):
+        singles = {
+            "metrics": "api_metrics_series",
+            "profitability": "api_profitability",
+            "cashflow_summary": "api_cashflow_summary",
+        }
+        with CaptureQueriesContext(connection) as separate:
+            expected = {section: self._get(name, {"year": 2022}).json() for section, name in singles.items()}
+        with CaptureQueriesContext(connection) as bundled:
+            data = self._get("api_bundle", {"sections": ",".join(singles), "year": 2022}).json()
+
+        self.assertTrue(data["success"])
+        self.assertEqual(data["sections"], expected)
+        self.assertEqual(data["sections"]["cashflow_summary"]["current_year"], 2022)
+        self.assertLess(len(bundled), len(separate))
+
+    def test_unknown_section_rejected(self):
+        response = self._get("api_bundle", {"sections": "metrics,secret"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("profitability", response.json()["available"])
@@ -7,7 +7,6 @@ app_name = "dashboard"
 
 urlpatterns = [
     path("", views.index, name="index"),
-    path("save_chart/", views.save_chart, name="save_chart"),
     path("ask-coach/", views.ask_coach, name="ask_coach"),
     path("debug/", debug_views.debug_cashflow, name="debug_cashflow"),  # Debug view
 
@@ -24,4 +23,7 @@ urlpatterns += [
     path("api/metrics/series/", views.api_metrics_series, name="api_metrics_series"),
     path("api/profitability/", views.api_profitability, name="api_profitability"),
     path("api/cashflow/summary/", views.api_cashflow_summary, name="api_cashflow_summary"),
+    path("api/cashflow/series/", views.api_cashflow_series, name="api_cashflow_series"),
+    path("api/bundle/", views.api_bundle, name="api_bundle"),
+    path("api/cashflow/forecast/", views.api_cashflow_forecast, name="api_cashflow_forecast"),
 ]
@@ -1,7 +1,5 @@
-﻿import os
-import io
+﻿import io
 import json
-import base64
 import re
 
 from django.conf import settings
@@ -11,20 +9,33 @@ from django.http import JsonResponse, FileResponse, HttpResponse
 from django.template.loader import render_to_string
 from django.shortcuts import render
 from django.utils import timezone
-from django.views.decorators.csrf import csrf_exempt
-from openai import OpenAI
+from app.ai_clients import ai_call, get_client
+from app.conditional import conditional_json, statements_version
+from app.rate_limit import estimate_tokens
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet
 
 from accounts.models import CompanyProfile, CoachClientNotes
-from ingest.models import FinancialStatement
+from ingest.services.metrics_service import user_metrics
 from survey.models import SurveySubmission
 from suropen.models import OpenAnswer
 from coaching.models import UserCoachAssignment
-from finance.utils import compute_metrics, growth
-
-from .cashflow import calculate_cashflow
+from exports.charts import render_user_charts
+
+from .cashflow import calculate_cashflow, calculate_cashflow_series
+from .benchmarks import benchmarks_for
+from .context_cache import cached_context
+from .sections import (
+    DASHBOARD_SECTIONS,
+    UserData,
+    build_sections,
+    cashflow_summary_section,
+    metrics_section,
+    profitability_section,
+    requested_sections,
+)
+from .forecast import DEFAULT_SCENARIOS, load_base, simulate, with_drivers
 
 
 def _clean_text(text):
@@ -120,6 +131,7 @@ def _build_cashflow_table(cf):
     def entry(label, key, highlight=False):
         return {
             "label": label,
+            "key": key,
             "value": cf.get(key),
             "highlight": highlight,
         }
@@ -156,59 +168,73 @@ def _build_cashflow_table(cf):
     ]
 
 
+def _build_cashflow_series_table(series):
+    """Tabulka Profit vs Cash Flow přes všechny roky (řádek má hodnoty po jednotlivých letech)."""
+    if not series:
+        return []
+    sections = _build_cashflow_table(next(iter(series.values())))
+    for section in sections:
+        for row in section["rows"]:
+            row.pop("value")
+            row["values"] = {str(year): cf.get(row["key"]) for year, cf in series.items()}
+    return sections
+
+
 def _get_openai_client():
     api_key = getattr(settings, "OPENAI_API_KEY", None)
     if not api_key:
         return None
     try:
-        return OpenAI(api_key=api_key)
+        return get_client("openai", "chat")
     except Exception:
         return None
 
 
 def build_dashboard_context(target_user):
-    statements = FinancialStatement.objects.filter(user=target_user).order_by("year")
+    """Dashboard context of a user, cached until a relevant write (dashboard.context_cache)."""
+    return cached_context(target_user, _build_dashboard_context)
+
+
+def _build_dashboard_context(target_user):
+    statements = user_metrics(target_user)
+    benchmarks = benchmarks_for(statements)
 
     rows = []
-    for stmt in statements:
-        metrics = compute_metrics(stmt)
+    for m in statements:
         rows.append({
-            "year": stmt.year,
-            "revenue": metrics["revenue"],
-            "cogs": metrics["cogs"],
-            "cogs_materials": metrics["cogs_materials"],
-            "gross_margin": metrics["gross_margin"],
-            "overheads": metrics["overheads"],
-            "depreciation": metrics["depreciation"],
-            "ebit": metrics["ebit"],
-            "net_profit": metrics["net_profit"],
-            "profitability": metrics["profitability"],
-            "growth": {},  # filled later
+            "year": m.year,
+            "revenue": m.revenue,
+            "cogs": m.cogs,
+            "cogs_materials": m.cogs_materials,
+            "gross_margin": m.gross_margin,
+            "overheads": m.overheads,
+            "depreciation": m.depreciation,
+            "ebit": m.ebit,
+            "net_profit": m.net_profit,
+            "profitability": m.profitability,
+            # Year-over-year growth (materialized in StatementMetrics)
+            "growth": {
+                "revenue": m.revenue_yoy,
+                "cogs": m.cogs_yoy,
+                "overheads": m.overheads_yoy,
+            },
+            # Percentil marží mezi firmami stejné velikosti (PeerBenchmark)
+            "benchmark": benchmarks.get(m.year, {}),
         })
 
-    rows = sorted(rows, key=lambda r: r["year"])
     years = [r["year"] for r in rows]
 
-    # Year-over-year growth using shared helper
-    for i, r in enumerate(rows):
-        if i == 0:
-            r["growth"] = {"revenue": None, "cogs": None, "overheads": None}
-        else:
-            prev = rows[i - 1]
-            r["growth"] = {
-                "revenue": growth(r["revenue"], prev["revenue"]),
-                "cogs": growth(r["cogs"], prev["cogs"]),
-                "overheads": growth(r["overheads"], prev["overheads"]),
-            }
-
     # 📈 Insights from survey responses
     survey_history = []
     latest_submission = None
-    submissions_qs = SurveySubmission.objects.filter(user=target_user).order_by("created_at")
+    # Průměrné skóre všech dotazníků jedním dotazem
+    submissions_qs = (
+        SurveySubmission.objects.filter(user=target_user)
+        .annotate(avg_score=Avg("responses__score"))
+        .order_by("created_at")
+    )
     for submission in submissions_qs:
-        avg_score = None
-        if hasattr(submission, "responses"):
-            avg_score = submission.responses.aggregate(avg=Avg("score"))["avg"]
+        avg_score = submission.avg_score
         if avg_score is not None:
             survey_history.append({
                 "ts": submission.created_at,
@@ -275,13 +301,13 @@ def build_dashboard_context(target_user):
     document_upload_status = sorted(
         [
             {
-                "year": int(getattr(stmt, "year", 0)),
-                "has_rozvaha": bool(stmt.balance),
-                "has_vysledovka": bool(stmt.income),
-                "rozvaha_analyzed": bool(stmt.balance),
-                "vysledovka_analyzed": bool(stmt.income),
+                "year": int(m.year),
+                "has_rozvaha": m.has_balance,
+                "has_vysledovka": m.has_income,
+                "rozvaha_analyzed": m.has_balance,
+                "vysledovka_analyzed": m.has_income,
             }
-            for stmt in statements
+            for m in statements
         ],
         key=lambda entry: entry["year"],
         reverse=True,
@@ -313,6 +339,7 @@ def build_dashboard_context(target_user):
         "cashflow": cf,
         "cashflow_table": cashflow_table,
         "selected_year": selected_year,
+        "benchmark": rows[-1]["benchmark"] if rows else {},
         "company_score": company_score,
         "score_trend": score_trend,
         "score_history": json.dumps([
@@ -359,41 +386,6 @@ def api_cashflow(request, year):
     return HttpResponse(html)
 
 
-@csrf_exempt
-def save_chart(request):
-    """Uloží přijatý base64 PNG z frontendu do MEDIA_ROOT/charts/."""
-    if request.method == "POST":
-        data = json.loads(request.body)
-        image_data = data.get("image")
-        chart_id = data.get("chart_id")
-
-        if not image_data or not chart_id:
-            return JsonResponse({"status": "error", "message": "missing data"}, status=400)
-
-        if image_data.startswith("data:image/png;base64,"):
-            image_data = image_data.replace("data:image/png;base64,", "")
-
-        try:
-            image_binary = base64.b64decode(image_data)
-        except Exception as e:
-            return JsonResponse({"status": "error", "message": str(e)}, status=400)
-
-        # 🧱 Ujisti se, že složka charts existuje
-        charts_dir = os.path.join(settings.MEDIA_ROOT, "charts")
-        os.makedirs(charts_dir, exist_ok=True)
-
-        file_name = f"chart_{chart_id}.png"
-        file_path = os.path.join(charts_dir, file_name)
-
-        with open(file_path, "wb") as f:
-            f.write(image_binary)
-
-        print(f"✅ Graf uložen: {file_path}")  # volitelný log
-        return JsonResponse({"status": "ok", "file": file_path})
-
-    return JsonResponse({"status": "error", "message": "invalid method"}, status=405)
-
-
 @login_required
 def ask_coach(request):
     if request.method != "POST":
@@ -413,21 +405,22 @@ def ask_coach(request):
     if client:
         try:
             model_name = getattr(settings, "OPENAI_MODEL", "gpt-4o-mini")
-            completion = client.chat.completions.create(
-                model=model_name,
-                temperature=0.55,
-                max_tokens=380,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "Jsi kouč Scaleupboardu. Reaguj stručně, konkrétně a povzbudivě."
-                            " Zaměř se na další krok, potvrď pochopení a nabídni pomocné kroky."
-                        ),
-                    },
-                    {"role": "user", "content": message},
-                ],
-            )
+            with ai_call("openai", "interactive", tokens=estimate_tokens(message, max_tokens=380)):
+                completion = client.chat.completions.create(
+                    model=model_name,
+                    temperature=0.55,
+                    max_tokens=380,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": (
+                                "Jsi kouč Scaleupboardu. Reaguj stručně, konkrétně a povzbudivě."
+                                " Zaměř se na další krok, potvrď pochopení a nabídni pomocné kroky."
+                            ),
+                        },
+                        {"role": "user", "content": message},
+                    ],
+                )
             reply_text = completion.choices[0].message.content.strip()
         except Exception as exc:
             print(f"⚠️ OpenAI ask_coach error: {exc}")
@@ -446,9 +439,10 @@ def ask_coach(request):
     return JsonResponse({"success": True, "reply": reply_text})
 
 
+@login_required
 def export_full_pdf(request):
     """
-    Vytvoří PDF, do kterého vloží všechny PNG grafy z MEDIA_ROOT
+    Vytvoří PDF se všemi grafy dashboardu přihlášeného uživatele (renderované na serveru)
     """
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
@@ -458,12 +452,9 @@ def export_full_pdf(request):
     elements.append(Paragraph("📊 Financial Dashboard", styles["Title"]))
     elements.append(Spacer(1, 12))
 
-    # projdi všechny chart_*.png v MEDIA_ROOT
-    for fname in sorted(os.listdir(settings.MEDIA_ROOT)):
-        if fname.startswith("chart_") and fname.endswith(".png"):
-            chart_path = os.path.join(settings.MEDIA_ROOT, fname)
-            elements.append(Image(chart_path, width=400, height=250))
-            elements.append(Spacer(1, 24))
+    for chart_path in render_user_charts(request.user).values():
+        elements.append(Image(str(chart_path), width=400, height=225))
+        elements.append(Spacer(1, 24))
 
     doc.build(elements)
     buffer.seek(0)
@@ -473,6 +464,7 @@ def export_full_pdf(request):
 
 
 
+@conditional_json(statements_version)
 def api_metrics_series(request):
     """
     Vrací časové řady klíčových metrik a YoY růsty pro přihlášeného uživatele.
@@ -483,110 +475,80 @@ def api_metrics_series(request):
             "error": {"code": "UNAUTHORIZED", "message": "Přihlaste se."}
         }, status=401)
 
-    statements = FinancialStatement.objects.filter(user=request.user).order_by("year")
-    rows = []
-    margins = []
-    for stmt in statements:
-        metrics = compute_metrics(stmt)
-        rows.append({
-            "year": int(stmt.year),
-            "revenue": metrics["revenue"],
-            "cogs": metrics["cogs"],
-            "overheads": metrics["overheads"],
-            "ebit": metrics["ebit"],
-            "net_profit": metrics["net_profit"],
-        })
-        margins.append({
-            "year": int(stmt.year),
-            **metrics["profitability"],
-        })
-
-    rows = sorted(rows, key=lambda r: r["year"])
-    margins = sorted(margins, key=lambda r: r["year"])
-    years = [r["year"] for r in rows]
-
-    yoy = []
-    for i, r in enumerate(rows):
-        if i == 0:
-            yoy.append({
-                "year": r["year"],
-                "revenue_yoy": None,
-                "cogs_yoy": None,
-                "overheads_yoy": None,
-                "net_profit_yoy": None,
-                "ebit_yoy": None,
-            })
-        else:
-            p = rows[i - 1]
-            yoy.append({
-                "year": r["year"],
-                "revenue_yoy": growth(r["revenue"], p["revenue"]),
-                "cogs_yoy": growth(r["cogs"], p["cogs"]),
-                "overheads_yoy": growth(r["overheads"], p["overheads"]),
-                "net_profit_yoy": growth(r["net_profit"], p["net_profit"]),
-                "ebit_yoy": growth(r["ebit"], p["ebit"]),
-            })
-
-    return JsonResponse({
-        "success": True,
-        "years": years,
-        "series": rows,
-        "margins": margins,
-        "yoy": yoy,
-    })
+    return JsonResponse(metrics_section(UserData(request.user), request.GET))
 
 
 @login_required
+@conditional_json(statements_version)
 def api_profitability(request):
     """Vrací přehled ziskovosti (náhrada za templates/dashboard/profitability.html)."""
-    statements = FinancialStatement.objects.filter(user=request.user).order_by("year")
-    rows = []
-    for stmt in statements:
-        metrics = compute_metrics(stmt)
-        rows.append({
-            "year": stmt.year,
-            "revenue": metrics["revenue"],
-            "cogs": metrics["cogs"],
-            "gross_margin": metrics["gross_margin"],
-            "overheads": metrics["overheads"],
-            "ebit": metrics["ebit"],
-            "net_profit": metrics["net_profit"],
-            "gm_pct": metrics["profitability"]["gm_pct"],
-            "op_pct": metrics["profitability"]["op_pct"],
-            "np_pct": metrics["profitability"]["np_pct"],
-        })
-
-    return JsonResponse({"success": True, "rows": rows})
+    return JsonResponse(profitability_section(UserData(request.user), request.GET))
 
 
 @login_required
+@conditional_json(statements_version)
 def api_cashflow_summary(request):
     """
     Vrací souhrn pro stránku cashflow:
     - seznam dostupných roků
     - detailní výpočet pro vybraný rok (výchozí poslední dostupný nebo ?year=)
     """
-    years = list(
-        FinancialStatement.objects.filter(user=request.user)
-        .values_list("year", flat=True)
-        .order_by("year")
-    )
-    if not years:
-        return JsonResponse({"success": True, "years": [], "current_year": None, "cashflow": None})
+    return JsonResponse(cashflow_summary_section(UserData(request.user), request.GET))
+
+
+@login_required
+@conditional_json(statements_version)
+def api_bundle(request):
+    """
+    Více sekcí dashboardu jedním požadavkem (sdílená data se načtou jednou).
 
+    ?sections=metrics,profitability,cashflow_summary (výchozí všechny), ?year= pro cashflow_summary
+    """
     try:
-        selected_year = int(request.GET.get("year", years[-1]))
-    except (TypeError, ValueError):
-        selected_year = years[-1]
+        names = requested_sections(request.GET, DASHBOARD_SECTIONS)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e), "available": list(DASHBOARD_SECTIONS)}, status=400)
 
-    if selected_year not in years:
-        selected_year = years[-1]
+    sections = build_sections(UserData(request.user), names, DASHBOARD_SECTIONS, request.GET)
+    return JsonResponse({"success": True, "sections": sections})
 
-    cf = calculate_cashflow(request.user, selected_year) or {}
 
+@login_required
+@conditional_json(statements_version)
+def api_cashflow_series(request):
+    """
+    Vrací cash flow všech roků uživatele v jedné odpovědi:
+    - seznam roků
+    - výpočet pro každý rok (klíčem je rok)
+    - tabulka Profit vs Cash Flow s hodnotami všech roků
+    """
+    series = calculate_cashflow_series(request.user)
     return JsonResponse({
         "success": True,
-        "years": years,
-        "current_year": selected_year,
-        "cashflow": cf,
+        "years": list(series),
+        "cashflow": {str(year): cf for year, cf in series.items()},
+        "table": _build_cashflow_series_table(series),
     })
+
+
+@login_required
+def api_cashflow_forecast(request):
+    """
+    Monte Carlo projekce cash flow z posledního výkazu (dashboard.forecast).
+
+    GET parametry (vše volitelné, výchozí hodnoty z posledního roku):
+    ?horizon=1..5&scenarios=..&revenue_growth=&growth_volatility=
+     &dso=&dio=&dpo=&capex_ratio=&loan_repayment=
+    """
+    base = load_base(request.user)
+    if base is None:
+        return JsonResponse({"success": False, "error": "no_statements"}, status=404)
+
+    try:
+        horizon = int(request.GET.get("horizon") or 3)
+        scenarios = int(request.GET.get("scenarios") or DEFAULT_SCENARIOS)
+        result = simulate(with_drivers(base, request.GET), horizon=horizon, scenarios=scenarios)
+    except ValueError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=400)
+
+    return JsonResponse({"success": True, "defaults": base.drivers(), **result})
@@ -1,7 +1,6 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
-from ingest.models import FinancialStatement
-from dashboard.cashflow import calculate_cashflow
+from dashboard.cashflow import calculate_cashflow_series
 
 @login_required
 def cashflow_view(request):
@@ -9,8 +8,13 @@ def cashflow_view(request):
     Zobrazí tabulku Profit vs Cash Flow pro zvolený rok.
     """
     user = request.user
-    statements = FinancialStatement.objects.filter(user=user).order_by("year")
-    years = [s.year for s in statements]
+    error = None
+    try:
+        series = calculate_cashflow_series(user)
+    except Exception as e:
+        series = {}
+        error = str(e)
+    years = list(series)
 
     selected_year = request.GET.get("year")
     if selected_year:
@@ -18,13 +22,7 @@ def cashflow_view(request):
     elif years:
         selected_year = years[-1]  # poslední rok
 
-    cf = None
-    error = None
-    if selected_year:
-        try:
-            cf = calculate_cashflow(user, selected_year)
-        except Exception as e:
-            error = str(e)
+    cf = series.get(selected_year) if selected_year else None
 
     context = {
         "years": years,
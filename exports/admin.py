@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ExportJob
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "owner", "year", "sections", "status", "size", "created_at", "finished_at")
+    list_filter = ("status",)
+    search_fields = ("owner__username", "fingerprint")
+    readonly_fields = ("fingerprint", "file", "size", "error", "attempts", "created_at", "started_at", "finished_at")
@@ -0,0 +1,206 @@
+"""
+Bulk PDF export of a coach's whole portfolio as one streamed ZIP.
+
+Every client goes through the regular export job (exports.jobs), so clients
+whose data did not change since their last export reuse the stored PDF and
+cost one fingerprint lookup. Missing PDFs are built in a process pool
+(ReportLab layout is CPU bound and holds the GIL); each finished PDF is
+appended to the ZIP as soon as it is ready and copied in chunks, so neither
+the archive nor all PDFs are held in memory:
+
+    for chunk in stream_portfolio_zip(coach_user, year=None, sections=()):
+        ...
+
+Pool size is EXPORT_BULK_PROCESSES (default: number of CPU cores).
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import closing
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.text import slugify
+
+from accounts.models import CompanyProfile
+from accounts.permissions import get_coach_clients
+
+from .jobs import ExportJobService
+from .models import ExportJob
+from .utils import ZipStream
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Jak dlouho čekat na export klienta, který právě vytváří jiný worker (s)
+FOREIGN_JOB_TIMEOUT = 300
+
+_lock = threading.Lock()
+_pool = None
+_pool_size = None
+
+
+def bulk_processes() -> int:
+    default = os.cpu_count() or 1
+    return max(1, int(getattr(settings, "EXPORT_BULK_PROCESSES", default)))
+
+
+def _init_worker() -> None:
+    import django
+
+    django.setup()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Shared export pool; "spawn" because web/worker processes run threads."""
+    global _pool, _pool_size
+    size = bulk_processes()
+    with _lock:
+        if _pool is None or _pool_size != size:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(
+                max_workers=size, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker
+            )
+            _pool_size = size
+        return _pool
+
+
+def _build_worker(job_id: int) -> int:
+    """Build one claimed export job in a pool process."""
+    close_old_connections()
+    job = ExportJob.objects.select_related("owner").get(pk=job_id)
+    ExportJobService().process(job)
+    return job_id
+
+
+def _archive_names(clients) -> Dict[int, str]:
+    names = dict(CompanyProfile.objects.filter(user__in=clients).values_list("user_id", "company_name"))
+    return {
+        client.pk: f"{slugify(names.get(client.pk) or client.username) or 'klient'}_{client.pk}.pdf"
+        for client in clients
+    }
+
+
+def _finished_jobs(jobs: List[ExportJob]) -> Iterator[ExportJob]:
+    """
+    Yield the jobs as they finish: cached ones first, then the ones built here
+    (in the pool or in-process), then the ones another worker was building.
+
+    Jobs claimed here but not built yet when the download is aborted (the
+    generator is closed) are returned to the queue.
+    """
+    service = ExportJobService()
+    own: List[ExportJob] = []
+    foreign: List[ExportJob] = []
+    for job in jobs:
+        if job.is_finished:
+            yield job
+        elif job.status == "queued" and service.claim(job):
+            own.append(job)
+        else:
+            foreign.append(job)
+
+    unbuilt = {job.pk for job in own}
+    pending: Dict = {}
+    try:
+        if own:
+            built = False
+            if bulk_processes() > 1 and len(own) > 1:
+                try:
+                    pool = _get_pool()
+                    pending = {pool.submit(_build_worker, job.pk): job.pk for job in own}
+                    while pending:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            unbuilt.discard(pending.pop(future))
+                            yield ExportJob.objects.get(pk=future.result())
+                    built = True
+                except Exception as e:
+                    # Zbytek (i nedokončené joby) dostaví aktuální proces
+                    logger.warning(f"Export pool failed ({e}), building remaining exports in-process")
+                    own = list(
+                        ExportJob.objects.filter(pk__in=[job.pk for job in own]).exclude(status__in=("done", "failed"))
+                    )
+            if not built:
+                for job in own:
+                    unbuilt.discard(job.pk)
+                    yield service.process(job)
+    finally:
+        # Joby, které už pool zpracovává, dokončí pool; ostatní se vrátí do fronty
+        for future, pk in pending.items():
+            if not future.cancel():
+                unbuilt.discard(pk)
+        if unbuilt:
+            service.release(unbuilt)
+
+    deadline = time.monotonic() + FOREIGN_JOB_TIMEOUT
+    while foreign:
+        waiting = []
+        for job in foreign:
+            job.refresh_from_db()
+            if job.is_finished:
+                yield job
+            elif job.status == "queued" and service.claim(job):
+                yield service.process(job)
+            else:
+                waiting.append(job)
+        foreign = waiting
+        if foreign:
+            if time.monotonic() > deadline:
+                for job in foreign:
+                    job.status, job.error = "failed", "Export nebyl včas dokončen."
+                    yield job
+                return
+            time.sleep(0.5)
+
+
+def stream_portfolio_zip(coach_user, year: Optional[int] = None, sections: Iterable[str] = ()) -> Iterator[bytes]:
+    """
+    ZIP with the PDF export of every client of the coach, yielded in chunks.
+
+    Clients whose export fails are listed in chyby.txt inside the archive.
+    """
+    for data in _zip_chunks(coach_user, year, sections):
+        if data:
+            yield data
+
+
+def _zip_chunks(coach_user, year, sections) -> Iterator[bytes]:
+    clients = list(get_coach_clients(coach_user).order_by("id"))
+    names = _archive_names(clients)
+    sections = list(sections)
+    service = ExportJobService()
+    jobs = [service.request(client, year, sections) for client in clients]
+    logger.info(
+        f"Bulk export for {coach_user}: {len(jobs)} clients, "
+        f"{sum(1 for job in jobs if job.status == 'done')} cached"
+    )
+
+    sink = ZipStream()
+    errors = []
+    finished = closing(_finished_jobs(jobs))
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive, finished as finished_jobs:
+        for job in finished_jobs:
+            name = names.get(job.owner_id, f"klient_{job.owner_id}.pdf")
+            if job.status != "done":
+                errors.append(f"{name}: {job.error or 'export se nezdařil'}")
+                continue
+            try:
+                with job.file.open("rb") as source, archive.open(name, "w", force_zip64=True) as target:
+                    while chunk := source.read(CHUNK_SIZE):
+                        target.write(chunk)
+                        yield sink.drain()
+            except OSError as e:
+                logger.error(f"Bulk export: file of export job {job.pk} unreadable: {e}")
+                errors.append(f"{name}: soubor exportu není dostupný")
+            yield sink.drain()
+        if errors:
+            archive.writestr("chyby.txt", "\n".join(errors) + "\n")
+    yield sink.drain()
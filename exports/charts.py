@@ -0,0 +1,283 @@
+"""
+Server-side chart rendering for PDF exports.
+
+The dashboard charts of export_pdf (chart_specs) are rendered from the
+materialized metric series with Pillow, so an export no longer needs the
+browser to upload canvas PNGs first and never reads another user's charts.
+
+Rendered PNGs are cached on disk per user, named by chart id and a
+fingerprint of the plotted data:
+
+    <EXPORT_CHART_CACHE_DIR>/<user_id>/<chart_id>-<fingerprint>.png
+
+An unchanged chart is reused by every later export; when the data changes a
+new file is written and the old one of the same chart removed.
+
+    paths = render_user_charts(user)          # {chart_id: Path}
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import tempfile
+import textwrap
+from dataclasses import asdict, dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from PIL import Image, ImageDraw, ImageFont
+
+from ingest.services.metrics_service import user_metrics
+
+logger = logging.getLogger(__name__)
+
+# Zvýšit při změně vzhledu grafů (stará cache se přestane používat)
+RENDERER_VERSION = 1
+DEFAULT_CACHE_DIR = "exports/media/charts"
+
+WIDTH, HEIGHT = 1600, 900
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 190, 50, 50, 210
+BACKGROUND = "#ffffff"
+GRID = "#e2e8f0"
+AXIS = "#94a3b8"
+TEXT = "#334155"
+YEAR_PALETTE = ("#6366f1", "#0ea5e9", "#10b981", "#f59e0b", "#ef4444", "#8b5cf6", "#14b8a6", "#f97316")
+BLUE, RED, AMBER, GREEN, VIOLET, SLATE = "#3b82f6", "#ef4444", "#f59e0b", "#10b981", "#8b5cf6", "#64748b"
+
+FONT_PATH = os.path.join(settings.BASE_DIR, "static", "fonts", "DejaVuSans.ttf")
+
+
+@dataclass(frozen=True)
+class Series:
+    label: str
+    values: Tuple[Optional[float], ...]
+    color: str
+
+
+@dataclass(frozen=True)
+class ChartSpec:
+    """Bar (grouped) or line chart over categories; unit "Kč" or "%"."""
+    kind: str
+    categories: Tuple[str, ...]
+    series: Tuple[Series, ...]
+    unit: str = "Kč"
+
+    def fingerprint(self) -> str:
+        payload = json.dumps([RENDERER_VERSION, asdict(self)], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:20]
+
+
+# --- Definice grafů (stejné jako grafy na dashboardu) ---
+
+def _values(rows, getter) -> Tuple[Optional[float], ...]:
+    return tuple(None if getter(m) is None else round(float(getter(m)), 4) for m in rows)
+
+
+def chart_specs(rows: Sequence) -> Dict[str, ChartSpec]:
+    """Chart definitions from StatementMetrics rows ordered by year."""
+    if not rows:
+        return {}
+    years = tuple(str(m.year) for m in rows)
+
+    def by_year(categories, getters, unit="Kč"):
+        series = tuple(
+            Series(str(m.year), tuple(round(float(get(m) or 0.0), 4) for get in getters), YEAR_PALETTE[i % len(YEAR_PALETTE)])
+            for i, m in enumerate(rows)
+        )
+        return ChartSpec("bar", categories, series, unit)
+
+    return {
+        "profit_story": by_year(
+            ("Tržby", "Náklady na prodané zboží", "Hrubá marže", "Provozní náklady", "EBIT", "Čistý zisk"),
+            (lambda m: m.revenue, lambda m: m.cogs, lambda m: m.gross_margin,
+             lambda m: m.overheads, lambda m: m.ebit, lambda m: m.net_profit),
+        ),
+        "profitability_trends": by_year(
+            ("Hrubá marže %", "Provozní marže %", "Čistá marže %"),
+            (lambda m: m.gm_pct, lambda m: m.op_pct, lambda m: m.np_pct),
+            unit="%",
+        ),
+        "rev_cogs_growth": ChartSpec("bar", years, (
+            Series("Růst tržeb (%)", _values(rows, lambda m: m.revenue_yoy), BLUE),
+            Series("Růst nákladů na prodané zboží (%)", _values(rows, lambda m: m.cogs_yoy), RED),
+        ), unit="%"),
+        "rev_overheads_growth": ChartSpec("bar", years, (
+            Series("Růst tržeb (%)", _values(rows, lambda m: m.revenue_yoy), BLUE),
+            Series("Růst provozních nákladů (%)", _values(rows, lambda m: m.overheads_yoy), AMBER),
+        ), unit="%"),
+        "all_metrics": ChartSpec("line", years, (
+            Series("Tržby", _values(rows, lambda m: m.revenue), BLUE),
+            Series("COGS", _values(rows, lambda m: m.cogs), RED),
+            Series("Hrubá marže", _values(rows, lambda m: m.gross_margin), GREEN),
+            Series("Provozní náklady", _values(rows, lambda m: m.overheads), AMBER),
+            Series("EBIT", _values(rows, lambda m: m.ebit), VIOLET),
+            Series("Čistý zisk", _values(rows, lambda m: m.net_profit), SLATE),
+        )),
+        "metrics_trend": ChartSpec("line", years, (
+            Series("Tržby", _values(rows, lambda m: m.revenue), BLUE),
+            Series("Čistý zisk", _values(rows, lambda m: m.net_profit), GREEN),
+            Series("EBIT", _values(rows, lambda m: m.ebit), VIOLET),
+        )),
+    }
+
+
+# --- Vykreslení ---
+
+def _font(size: int):
+    try:
+        return ImageFont.truetype(FONT_PATH, size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def _nice_step(span: float, ticks: int = 5) -> float:
+    raw = span / ticks
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 2.5, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+def _format_value(value: float, unit: str) -> str:
+    if unit == "%":
+        return f"{value:.0f} %" if abs(value) >= 10 or value == 0 else f"{value:.1f} %"
+    # Stejně jako osa na dashboardu (K / M)
+    if abs(value) >= 1_000_000:
+        return f"{value / 1_000_000:.1f}M Kč"
+    if abs(value) >= 1000:
+        return f"{value / 1000:.0f}K Kč"
+    return f"{value:,.0f} Kč".replace(",", " ")
+
+
+def _y_range(spec: ChartSpec) -> Tuple[float, float, float]:
+    values = [v for s in spec.series for v in s.values if v is not None]
+    low, high = min(values + [0.0]), max(values + [0.0])
+    if high == low:
+        high = low + 1
+    step = _nice_step(high - low)
+    return math.floor(low / step) * step, math.ceil(high / step) * step, step
+
+
+def render_chart(spec: ChartSpec) -> bytes:
+    """Render one chart to PNG bytes."""
+    image = Image.new("RGB", (WIDTH, HEIGHT), BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    label_font, legend_font = _font(26), _font(28)
+
+    left, top = MARGIN_LEFT, MARGIN_TOP
+    right, bottom = WIDTH - MARGIN_RIGHT, HEIGHT - MARGIN_BOTTOM
+    low, high, step = _y_range(spec)
+
+    def y_of(value: float) -> float:
+        return bottom - (value - low) / (high - low) * (bottom - top)
+
+    # Mřížka a popisky osy Y
+    tick = low
+    while tick <= high + step / 2:
+        y = y_of(tick)
+        draw.line([(left, y), (right, y)], fill=AXIS if abs(tick) < step / 1000 else GRID, width=3 if abs(tick) < step / 1000 else 2)
+        text = _format_value(tick, spec.unit)
+        draw.text((left - 16, y), text, fill=TEXT, font=label_font, anchor="rm")
+        tick += step
+
+    slot = (right - left) / max(len(spec.categories), 1)
+    centers = [left + slot * (i + 0.5) for i in range(len(spec.categories))]
+    for center, category in zip(centers, spec.categories):
+        lines = textwrap.wrap(category, 16) or [""]
+        for n, line in enumerate(lines[:2]):
+            draw.text((center, bottom + 16 + n * 30), line, fill=TEXT, font=label_font, anchor="ma")
+
+    zero = y_of(0.0)
+    if spec.kind == "bar":
+        group = slot * 0.8
+        width = group / max(len(spec.series), 1)
+        for s_index, series in enumerate(spec.series):
+            for center, value in zip(centers, series.values):
+                if value is None:
+                    continue
+                x0 = center - group / 2 + s_index * width + width * 0.08
+                x1 = x0 + width * 0.84
+                y = y_of(value)
+                draw.rectangle([x0, min(y, zero), x1, max(y, zero)], fill=series.color)
+    else:
+        for series in spec.series:
+            points = [(c, y_of(v)) if v is not None else None for c, v in zip(centers, series.values)]
+            segment: List[Tuple[float, float]] = []
+            for point in points + [None]:
+                if point is None:
+                    if len(segment) > 1:
+                        draw.line(segment, fill=series.color, width=6, joint="curve")
+                    segment = []
+                    continue
+                segment.append(point)
+            for point in points:
+                if point is not None:
+                    x, y = point
+                    draw.ellipse([x - 9, y - 9, x + 9, y + 9], fill=series.color, outline=BACKGROUND, width=3)
+
+    # Legenda pod grafem
+    x, y = left, bottom + 100
+    for series in spec.series:
+        text_width = draw.textlength(series.label, font=legend_font)
+        if x + 40 + text_width > right:
+            x, y = left, y + 44
+        draw.rectangle([x, y + 4, x + 26, y + 30], fill=series.color)
+        draw.text((x + 38, y), series.label, fill=TEXT, font=legend_font)
+        x += 38 + text_width + 48
+
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+# --- Cache na disku ---
+
+def cache_root() -> Path:
+    root = Path(getattr(settings, "EXPORT_CHART_CACHE_DIR", DEFAULT_CACHE_DIR))
+    return root if root.is_absolute() else Path(settings.BASE_DIR) / root
+
+
+def cached_chart(user_id: int, chart_id: str, spec: ChartSpec) -> Path:
+    """Path of the rendered chart, rendering it only when the data changed."""
+    directory = cache_root() / str(user_id)
+    path = directory / f"{chart_id}-{spec.fingerprint()}.png"
+    if path.exists():
+        return path
+
+    directory.mkdir(parents=True, exist_ok=True)
+    content = render_chart(spec)
+    fd, tmp_name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(content)
+    os.replace(tmp_name, path)
+
+    for stale in directory.glob(f"{chart_id}-*.png"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    logger.debug(f"Rendered chart {chart_id} for user {user_id}")
+    return path
+
+
+def render_user_charts(user, chart_ids: Optional[Iterable[str]] = None, rows=None) -> Dict[str, Path]:
+    """
+    Rendered (or cached) charts of a user, {chart_id: Path}.
+
+    Charts that fail to render are left out (the export skips them).
+    """
+    specs = chart_specs(rows if rows is not None else user_metrics(user))
+    wanted = list(chart_ids) if chart_ids is not None else list(specs)
+    paths = {}
+    for chart_id in wanted:
+        spec = specs.get(chart_id)
+        if spec is None:
+            continue
+        try:
+            paths[chart_id] = cached_chart(user.pk, chart_id, spec)
+        except Exception as e:
+            logger.warning(f"Chart {chart_id} of user {user.pk} failed to render: {e}")
+    return paths
@@ -0,0 +1,180 @@
+"""
+Background PDF export jobs with cached artifacts.
+
+An export request is keyed by (user, year, sections, data fingerprint). The
+fingerprint hashes everything the PDF is built from: statements and their
+metrics, the latest survey and open-answer batch, company profile and coach.
+A finished job with the same key is returned immediately and its file is
+served again; an identical request while a job is pending joins that job.
+Only when the data changed is a new PDF built, outside the HTTP request:
+
+    job = ExportJobService().request(user, year, sections)
+    job.status   # "done" (cached artifact) or "queued"
+
+Jobs are processed like ingest jobs (app.job_queue): by an in-process daemon
+thread (EXPORT_JOBS_INLINE, default) or by the `run_export_worker` command.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Iterable, Optional
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from accounts.models import CompanyProfile
+from app.conditional import statements_version
+from app.job_queue import InlineWorker, JobQueue
+from coaching.models import UserCoachAssignment
+from suropen.models import OpenAnswer
+from survey.models import SurveySubmission
+
+from . import charts
+from .models import ExportJob
+from .pdf import build_export_pdf, normalize_sections
+
+logger = logging.getLogger(__name__)
+
+# Zvýšit při změně vzhledu nebo obsahu PDF (uložené exporty se přestanou používat)
+EXPORT_PDF_VERSION = 1
+
+COACH_FIELDS = ("specialization", "email", "phone", "city", "linkedin", "website")
+
+
+def _coach_payload(coach) -> Optional[list]:
+    if coach is None:
+        return None
+    return [coach.user.get_full_name(), coach.user.username, coach.user.email] + [
+        getattr(coach, name) for name in COACH_FIELDS
+    ]
+
+
+def export_fingerprint(user, year: Optional[int], sections: Iterable[str]) -> str:
+    """Hash of the export parameters and of all data the PDF shows."""
+    submission = SurveySubmission.objects.filter(user=user).order_by("-created_at").first()
+    responses = list(submission.responses.values_list("id", "question", "score")) if submission else []
+
+    open_answer = OpenAnswer.objects.filter(user=user).order_by("-created_at").first()
+    open_batch = (
+        list(OpenAnswer.objects.filter(user=user, batch_id=open_answer.batch_id)
+             .order_by("created_at").values_list("id", "question", "answer", "ai_response"))
+        if open_answer else []
+    )
+
+    company = CompanyProfile.objects.filter(user=user).select_related("assigned_coach__user").first()
+    coach = company.assigned_coach if company else None
+    if coach is None:
+        assignment = (
+            UserCoachAssignment.objects.filter(client=user)
+            .select_related("coach__user")
+            .order_by("-assigned_at")
+            .first()
+        )
+        coach = assignment.coach if assignment else None
+
+    payload = [
+        EXPORT_PDF_VERSION,
+        charts.RENDERER_VERSION,
+        year,
+        list(normalize_sections(sections)),
+        statements_version(user.pk),
+        [submission.pk, submission.ai_response, responses] if submission else None,
+        [open_answer.pk, open_answer.ai_response, open_batch] if open_answer else None,
+        [company.company_name, company.ico, company.contact_person, company.email] if company else None,
+        [user.get_full_name(), user.username, user.email],
+        _coach_payload(coach),
+    ]
+    return hashlib.sha256(json.dumps(payload, default=str).encode()).hexdigest()
+
+
+class ExportJobService(JobQueue):
+    """Request, claim and build PDF export jobs."""
+
+    model = ExportJob
+    label = "export job"
+    max_attempts_setting = "EXPORT_JOB_MAX_ATTEMPTS"
+    stale_minutes = 15
+    exhausted_error = "Export opakovaně selhal."
+
+    def request(self, user, year: Optional[int] = None, sections: Iterable[str] = ()) -> ExportJob:
+        """
+        Return the cached or pending export of this request, or queue a new one.
+
+        Args:
+            user: Owner of the exported data
+            year: Selected statement year (None = all years)
+            sections: Selected sections (empty = all)
+
+        Returns:
+            ExportJob
+        """
+        section_key = ",".join(normalize_sections(sections))
+        fingerprint = export_fingerprint(user, year, section_key.split(","))
+        job = (
+            ExportJob.objects.filter(
+                owner=user, year=year, sections=section_key, fingerprint=fingerprint,
+                status__in=("queued", "running", "done"),
+            )
+            .order_by("-created_at")
+            .first()
+        )
+        if job is not None and self.is_stale(job):
+            # Job po pádu procesu se nepřipojí – vrátí se do fronty, nebo po max. pokusech selže
+            self.requeue_stale()
+            job.refresh_from_db()
+            if job.status == "failed":
+                job = None
+        if job is not None and (job.status != "done" or job.file.storage.exists(job.file.name)):
+            logger.info(f"Export job {job.pk} reused for {user} ({job.status})")
+            return job
+
+        job = ExportJob.objects.create(owner=user, year=year, sections=section_key, fingerprint=fingerprint)
+        logger.info(f"Enqueued export job {job.pk} for {user} (year={year}, sections={section_key})")
+        return job
+
+    def process(self, job: ExportJob) -> ExportJob:
+        """Build the PDF of one job and store it as the job's artifact."""
+        try:
+            sections = job.sections.split(",")
+            # Data se mohla změnit od zařazení do fronty; artefakt nese otisk dat, ze kterých vznikl
+            job.fingerprint = export_fingerprint(job.owner, job.year, sections)
+            content = build_export_pdf(job.owner, job.year, sections)
+            job.file.save(f"export_{job.owner_id}_{job.pk}.pdf", ContentFile(content), save=False)
+            job.size = len(content)
+            job.status = "done"
+            job.error = ""
+        except Exception as e:
+            logger.error(f"Export job {job.pk} failed: {e}", exc_info=True)
+            job.status = "failed"
+            job.error = str(e)
+
+        job.finished_at = timezone.now()
+        job.save(update_fields=["fingerprint", "file", "size", "status", "error", "finished_at"])
+        if job.status == "done":
+            self._remove_superseded(job)
+        return job
+
+    def _remove_superseded(self, job: ExportJob) -> None:
+        """Older artifacts of the same request are out of date once a newer one exists."""
+        superseded = ExportJob.objects.filter(
+            owner_id=job.owner_id, year=job.year, sections=job.sections, status__in=("done", "failed"),
+            created_at__lte=job.created_at,
+        ).exclude(pk=job.pk)
+        for old in superseded:
+            if old.file:
+                old.file.delete(save=False)
+            old.delete()
+
+
+_inline = InlineWorker("export", "EXPORT_JOBS_INLINE", ExportJobService)
+
+
+def start_inline_worker() -> None:
+    """
+    Make sure a daemon thread builds queued exports.
+
+    Disabled by EXPORT_JOBS_INLINE = False when a dedicated
+    `run_export_worker` process is used instead.
+    """
+    _inline.start()
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from exports.tabular import FORMATS, statement_rows, stream_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Export statements, metrics and cashflow of all (or selected) users as CSV or XLSX. "
+        "Rows are read and written in chunks, so memory use does not grow with the data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+        parser.add_argument("--output", help="Target file (default: stdout).")
+        parser.add_argument("--user", type=int, action="append", dest="users", help="User id (repeatable).")
+        parser.add_argument("--year", type=int, help="Only this year.")
+        parser.add_argument("--chunk-size", type=int, help="Statements per query (default EXPORT_DATA_CHUNK_SIZE).")
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] is not None and options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        chunks = stream_table(
+            statement_rows(options["users"], options["year"], options["chunk_size"]), options["format"]
+        )
+        if not options["output"]:
+            for data in chunks:
+                sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+            return
+
+        size = 0
+        with open(options["output"], "wb") as target:
+            for data in chunks:
+                target.write(data)
+                size += len(data)
+        self.stderr.write(self.style.SUCCESS(f"Wrote {size} bytes to {options['output']}."))
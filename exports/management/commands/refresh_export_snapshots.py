@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from exports.snapshots import refresh_snapshot, stale_user_ids
+from ingest.models import FinancialStatement
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenerate export snapshots (chatbot context) of users whose statements changed "
+        "after their latest snapshot. Catches up refreshes lost with a restarted process; run from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Refresh every user with statements.")
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            user_ids = sorted(set(FinancialStatement.objects.values_list("user_id", flat=True)))
+        else:
+            user_ids = stale_user_ids()
+
+        for user_id in user_ids:
+            refresh_snapshot(user_id)
+        self.stdout.write(self.style.SUCCESS(f"Export snapshots refreshed for {len(user_ids)} users."))
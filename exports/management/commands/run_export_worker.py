@@ -0,0 +1,11 @@
+from app.job_queue import WorkerCommand
+from exports.jobs import ExportJobService
+
+
+class Command(WorkerCommand):
+    help = (
+        "Build queued PDF exports in the background. "
+        "Set EXPORT_JOBS_INLINE = False when running this worker instead of the in-process thread."
+    )
+    service_class = ExportJobService
+    name = "export"
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:55
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_created_at(apps, schema_editor):
+    Export = apps.get_model("exports", "Export")
+    Export.objects.update(refreshed_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exports', '0002_export_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='export',
+            options={'ordering': ['-refreshed_at', '-created_at']},
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='refreshed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='export',
+            index=models.Index(fields=['user', '-refreshed_at'], name='exports_exp_user_id_aa6998_idx'),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Export(models.Model):
@@ -19,11 +20,68 @@ class Export(models.Model):
     data = models.JSONField()
     source = models.CharField(max_length=30, choices=SOURCE_CHOICES, default=SOURCE_DASHBOARD)
     metadata = models.JSONField(blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # sha256 of data
     created_at = models.DateTimeField(auto_now_add=True)
+    refreshed_at = models.DateTimeField(default=timezone.now)  # last time the data were confirmed current
 
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-refreshed_at", "-created_at"]
+        indexes = [models.Index(fields=["user", "-refreshed_at"])]
 
     def __str__(self):
         year = self.statement_year or "n/a"
         return f"Export {year} for {self.user.username}"
+
+
+EXPORT_JOB_STATUS = [
+    ("queued", "Queued"),
+    ("running", "Running"),
+    ("done", "Done"),
+    ("failed", "Failed"),
+]
+
+
+class ExportJob(models.Model):
+    """
+    PDF export built in the background (see exports.jobs).
+
+    A finished job is the cached artifact of (user, year, sections, data
+    fingerprint); an identical request is answered with its file.
+    """
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="export_jobs")
+    year = models.IntegerField(blank=True, null=True)
+    sections = models.CharField(max_length=64)  # seřazené názvy sekcí oddělené čárkou
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=EXPORT_JOB_STATUS, default="queued", db_index=True)
+    file = models.FileField(upload_to="exports/pdf/", blank=True)
+    size = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["owner", "year", "sections", "fingerprint"])]
+
+    def __str__(self):
+        return f"ExportJob #{self.pk} ({self.status}) - {self.owner}"
+
+    @property
+    def is_finished(self):
+        return self.status in ("done", "failed")
+
+    def to_dict(self):
+        return {
+            "id": self.pk,
+            "status": self.status,
+            "finished": self.is_finished,
+            "year": self.year,
+            "sections": self.sections.split(",") if self.sections else [],
+            "size": self.size,
+            "error": self.error or None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from dataclasses import dataclass
 from typing import Any, Dict, Optional
 
+from django.conf import settings
 from django.db import transaction
+from django.utils import timezone
 
-from ingest.models import FinancialStatement
-from finance.utils import compute_metrics, growth
+from ingest.services.metrics_service import user_metrics
 
 from .models import Export
 
@@ -23,44 +26,28 @@ def build_latest_export_payload(user) -> Optional[ExportData]:
     Returns None if there are no statements.
     """
 
-    statements = list(
-        FinancialStatement.objects.filter(user=user).order_by("-year")
-    )
+    statements = user_metrics(user)
     if not statements:
         return None
 
-    latest = statements[0]
-    latest_metrics = compute_metrics(latest)
-
-    prev_metrics = compute_metrics(statements[1]) if len(statements) > 1 else None
-    prev_revenue = prev_metrics["revenue"] if prev_metrics else None
-
-    revenue_growth_yoy = growth(latest_metrics["revenue"], prev_revenue)
-
-    revenue_history = []
-    for stmt in sorted(statements, key=lambda s: s.year):
-        metrics = compute_metrics(stmt)
-        value = metrics["revenue"]
-        if value is not None:
-            revenue_history.append(
-                {
-                    "year": int(stmt.year),
-                    "Revenue": value,
-                }
-            )
+    latest = statements[-1]
+    revenue_history = [
+        {"year": int(m.year), "Revenue": m.revenue}
+        for m in statements
+    ]
 
     payload: Dict[str, Any] = {
         "year": int(latest.year),
-        "Revenue": latest_metrics["revenue"],
-        "COGS": latest_metrics["cogs"],
-        "GrossMargin": latest_metrics["gross_margin"],
-        "Overheads": latest_metrics["overheads"],
-        "Depreciation": latest_metrics["depreciation"],
-        "EBIT": latest_metrics["ebit"],
-        "NetProfit": latest_metrics["net_profit"],
-        "RevenueGrowthYoY": revenue_growth_yoy,
-        "EBITMargin": latest_metrics["profitability"]["op_pct"],
-        "NetProfitMargin": latest_metrics["profitability"]["np_pct"],
+        "Revenue": latest.revenue,
+        "COGS": latest.cogs,
+        "GrossMargin": latest.gross_margin,
+        "Overheads": latest.overheads,
+        "Depreciation": latest.depreciation,
+        "EBIT": latest.ebit,
+        "NetProfit": latest.net_profit,
+        "RevenueGrowthYoY": latest.revenue_yoy,
+        "EBITMargin": latest.op_pct,
+        "NetProfitMargin": latest.np_pct,
     }
 
     if revenue_history:
@@ -69,31 +56,69 @@ def build_latest_export_payload(user) -> Optional[ExportData]:
     return ExportData(payload=payload, statement_year=int(latest.year))
 
 
+def snapshot_hash(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
 @transaction.atomic
 def generate_export(user) -> Optional[Export]:
     """
-    Generates and persists a new export snapshot for the user.
-    Returns the created Export instance or None if source data are unavailable.
+    Stores the current export snapshot for the user.
+    An identical snapshot (same content hash) is reused instead of adding a row;
+    older snapshots beyond EXPORT_SNAPSHOT_KEEP are pruned.
+    Returns the current Export instance or None if source data are unavailable
+    (dashboard snapshots of a user without statements are removed).
     """
 
+    dashboard_exports = Export.objects.filter(user=user, source=Export.SOURCE_DASHBOARD)
     snapshot = build_latest_export_payload(user)
     if not snapshot:
+        dashboard_exports.delete()
         return None
 
-    return Export.objects.create(
-        user=user,
-        statement_year=snapshot.statement_year,
-        data=snapshot.payload,
-        source=Export.SOURCE_DASHBOARD,
-    )
+    content_hash = snapshot_hash(snapshot.payload)
+    now = timezone.now()
+    export = dashboard_exports.filter(content_hash=content_hash).first()
+    if export:
+        dashboard_exports.filter(pk=export.pk).update(refreshed_at=now)
+        export.refreshed_at = now
+    else:
+        export = Export.objects.create(
+            user=user,
+            statement_year=snapshot.statement_year,
+            data=snapshot.payload,
+            source=Export.SOURCE_DASHBOARD,
+            content_hash=content_hash,
+            refreshed_at=now,
+        )
+
+    prune_exports(user)
+    return export
+
+
+def prune_exports(user, keep: Optional[int] = None) -> int:
+    """
+    Deletes dashboard snapshots older than the newest `keep` ones.
+    Returns the number of deleted rows.
+    """
+
+    keep = keep if keep is not None else getattr(settings, "EXPORT_SNAPSHOT_KEEP", 5)
+    dashboard_exports = Export.objects.filter(user=user, source=Export.SOURCE_DASHBOARD)
+    stale_ids = list(dashboard_exports.order_by("-refreshed_at", "-created_at").values_list("pk", flat=True)[keep:])
+    if not stale_ids:
+        return 0
+    deleted, _ = Export.objects.filter(pk__in=stale_ids).delete()
+    return deleted
 
 
 def get_latest_export(user, ensure_exists: bool = True) -> Optional[Export]:
     """
-    Returns the most recent export record. Optionally generates one if missing.
+    Returns the most recent export record.
+    Snapshots are kept current by statement write hooks (exports.signals),
+    so this is a single read; one is generated only if the user has none yet.
     """
 
-    export = Export.objects.filter(user=user).order_by("-created_at").first()
+    export = Export.objects.filter(user=user).order_by("-refreshed_at", "-created_at").first()
     if export or not ensure_exists:
         return export
 
@@ -0,0 +1,28 @@
+"""
+Statement write hooks: debounced regeneration of the owner's export snapshot.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ingest.models import FinancialStatement
+from ingest.signals import METRIC_INPUTS
+
+from .snapshots import schedule_refresh
+
+
+def _schedule(user_id):
+    transaction.on_commit(lambda: schedule_refresh(user_id))
+
+
+@receiver(post_save, sender=FinancialStatement)
+def snapshot_on_statement_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not METRIC_INPUTS & set(update_fields)):
+        return
+    _schedule(instance.user_id)
+
+
+@receiver(post_delete, sender=FinancialStatement)
+def snapshot_on_statement_delete(sender, instance, **kwargs):
+    _schedule(instance.user_id)
@@ -0,0 +1,103 @@
+"""
+Debounced regeneration of export snapshots after statement writes.
+
+Statement saves and deletes (exports.signals) schedule a refresh of the
+owner's snapshot after commit. A burst of writes (a multi-file upload saves
+several statements in a row) is collapsed into one refresh that runs
+EXPORT_SNAPSHOT_DEBOUNCE seconds after the last write, but no later than
+EXPORT_SNAPSHOT_MAX_DELAY seconds after the first one:
+
+    schedule_refresh(user_id)      # from a write hook
+    refresh_snapshot(user_id)      # immediately (command, tests)
+
+Timers live in the process that saved the statements; a refresh lost with
+that process is caught up by `refresh_export_snapshots` (stale_user_ids).
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, connection
+from django.db.models import Max
+
+from ingest.models import FinancialStatement
+
+from .models import Export
+from .services import generate_export
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_timers: Dict[int, threading.Timer] = {}
+_first_scheduled: Dict[int, float] = {}
+
+
+def refresh_snapshot(user_id: int) -> Optional[Export]:
+    """Regenerate the snapshot of one user now; failures are logged, not raised."""
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return None
+    try:
+        return generate_export(user)
+    except Exception as e:
+        logger.warning(f"Failed to refresh export snapshot of user {user_id}: {e}")
+        return None
+
+
+def schedule_refresh(user_id: int) -> None:
+    """Refresh the snapshot of a user once the current burst of writes is over."""
+    delay = float(getattr(settings, "EXPORT_SNAPSHOT_DEBOUNCE", 10))
+    if delay <= 0:
+        refresh_snapshot(user_id)
+        return
+
+    max_delay = float(getattr(settings, "EXPORT_SNAPSHOT_MAX_DELAY", 60))
+    with _lock:
+        now = time.monotonic()
+        first = _first_scheduled.setdefault(user_id, now)
+        previous = _timers.pop(user_id, None)
+        if previous is not None:
+            previous.cancel()
+        timer = threading.Timer(max(0.0, min(delay, first + max_delay - now)), _run, args=(user_id,))
+        timer.daemon = True
+        _timers[user_id] = timer
+        timer.start()
+
+
+def _run(user_id: int) -> None:
+    with _lock:
+        # Mezitím přeplánováno jiným zápisem
+        if _timers.get(user_id) is not threading.current_thread():
+            return
+        del _timers[user_id]
+        _first_scheduled.pop(user_id, None)
+
+    close_old_connections()
+    try:
+        refresh_snapshot(user_id)
+    finally:
+        connection.close()
+
+
+def stale_user_ids() -> List[int]:
+    """Users whose statements changed after their latest dashboard snapshot (or who have none)."""
+    changed = {
+        row["user_id"]: max(filter(None, (row["created"], row["computed"])))
+        for row in FinancialStatement.objects.values("user_id").annotate(
+            created=Max("created_at"), computed=Max("metrics__computed_at")
+        )
+    }
+    refreshed = dict(
+        Export.objects.filter(source=Export.SOURCE_DASHBOARD)
+        .values("user_id")
+        .annotate(refreshed=Max("refreshed_at"))
+        .values_list("user_id", "refreshed")
+    )
+    stale = {user_id for user_id, at in changed.items() if user_id not in refreshed or refreshed[user_id] < at}
+    # Snapshoty uživatelů, kteří už žádné výkazy nemají
+    stale.update(set(refreshed) - set(changed))
+    return sorted(stale)
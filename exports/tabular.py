@@ -0,0 +1,253 @@
+"""
+Streaming tabular export of statements, metrics and cashflow (CSV / XLSX).
+
+One row per FinancialStatement: owner, canonical income and balance fields
+(finance.schema), the materialized StatementMetrics and the derived cashflow.
+Statements are read in keyset-paginated chunks ordered by (user_id, year) on
+the unique (user, year) index, and every chunk is written out before the next
+one is read, so memory stays flat for any number of rows:
+
+    for chunk in stream_table(statement_rows(user_ids=None), "csv"):
+        ...
+
+XLSX is written without extra dependencies: a minimal workbook whose sheet
+XML is deflated into the ZIP entry row by row (inline strings, no shared
+string table).
+"""
+
+import csv
+import re
+import zipfile
+from io import StringIO
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from dashboard.cashflow import _cashflow
+from finance.schema import BALANCE_FIELDS, INCOME_FIELDS, canonical_balance, canonical_income
+from ingest.models import FinancialStatement
+
+from .utils import ZipStream
+
+FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+METRIC_COLUMNS = (
+    "revenue", "cogs", "gross_margin", "overheads", "depreciation", "ebit", "net_profit",
+    "gm_pct", "op_pct", "np_pct",
+    "revenue_yoy", "cogs_yoy", "gross_margin_yoy", "overheads_yoy", "ebit_yoy", "net_profit_yoy",
+)
+CASHFLOW_COLUMNS = (
+    "cash_from_customers", "cash_to_suppliers", "gross_cash_profit", "working_capital_change",
+    "operating_cf", "capex", "asset_sales", "investing_cf", "loans_received", "loans_repaid",
+    "dividends_paid", "financing_cf", "net_cash_flow", "cash_begin", "cash_end",
+)
+
+HEADER = (
+    ["user_id", "username", "company", "year", "statement_id", "scale"]
+    + [f"income.{name}" for name in INCOME_FIELDS]
+    + [f"balance.{name}" for name in BALANCE_FIELDS]
+    + [f"metrics.{name}" for name in METRIC_COLUMNS]
+    + [f"cashflow.{name}" for name in CASHFLOW_COLUMNS]
+)
+
+
+def chunk_size() -> int:
+    return max(1, int(getattr(settings, "EXPORT_DATA_CHUNK_SIZE", 500)))
+
+
+def statement_rows(
+    user_ids: Optional[Iterable[int]] = None,
+    year: Optional[int] = None,
+    size: Optional[int] = None,
+) -> Iterator[List[List[Any]]]:
+    """
+    Export rows in chunks (lists of rows in HEADER order).
+
+    Args:
+        user_ids: Only statements of these users (None = all users)
+        year: Only this year; cashflow still uses the previous year's balance
+        size: Statements per query (default EXPORT_DATA_CHUNK_SIZE)
+    """
+    size = size or chunk_size()
+    queryset = (
+        FinancialStatement.objects
+        .select_related("metrics")
+        .annotate(username=F("user__username"), company=F("user__companyprofile__company_name"))
+        .only("id", "user_id", "year", "income", "balance", "scale", *(f"metrics__{name}" for name in METRIC_COLUMNS))
+        .order_by("user_id", "year")
+    )
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=list(user_ids))
+    if year is not None:
+        queryset = queryset.filter(year__in=(year - 1, year))
+
+    # Rozvaha předchozího řádku – Δ pro cash flow (řádky jsou seřazené podle uživatele a roku)
+    previous = (None, None, {})
+    last_key = None
+    while True:
+        page = queryset
+        if last_key is not None:
+            user_id, last_year = last_key
+            page = page.filter(Q(user_id__gt=user_id) | Q(user_id=user_id, year__gt=last_year))
+        statements = list(page[:size])
+        if not statements:
+            return
+
+        rows = []
+        for statement in statements:
+            income = canonical_income(statement.income)
+            balance = canonical_balance(statement.balance)
+            prev_user, prev_year, prev_balance = previous
+            balance_prev = prev_balance if (prev_user, prev_year) == (statement.user_id, statement.year - 1) else {}
+            previous = (statement.user_id, statement.year, balance)
+            if year is not None and statement.year != year:
+                continue
+
+            metrics = getattr(statement, "metrics", None)
+            cashflow = _cashflow(income, balance, balance_prev)
+            rows.append(
+                [statement.user_id, statement.username, statement.company, statement.year, statement.pk, statement.scale]
+                + [income.get(name) for name in INCOME_FIELDS]
+                + [balance.get(name) for name in BALANCE_FIELDS]
+                + [getattr(metrics, name, None) for name in METRIC_COLUMNS]
+                + [cashflow.get(name) for name in CASHFLOW_COLUMNS]
+            )
+        if rows:
+            yield rows
+        last_key = (statements[-1].user_id, statements[-1].year)
+
+
+# --- CSV ---
+
+# Text začínající těmito znaky by Excel/LibreOffice vyhodnotil jako vzorec
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(chunks: Iterable[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    # BOM, aby Excel otevřel UTF-8 s diakritikou správně
+    buffer.write("\ufeff")
+    writer.writerow(HEADER)
+    for rows in chunks:
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+# --- XLSX ---
+
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Statements" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+_COLUMNS = [_column_letter(i) for i in range(len(HEADER))]
+
+
+def _cell(ref: str, value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if value != value or value in (float("inf"), float("-inf")):
+            return ""
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    text = escape(_INVALID_XML.sub("", str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row(number: int, values: Sequence[Any]) -> str:
+    cells = "".join(_cell(f"{column}{number}", value) for column, value in zip(_COLUMNS, values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+def xlsx_chunks(chunks: Iterable[Sequence[Sequence[Any]]]) -> Iterator[bytes]:
+    sink = ZipStream()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _WORKBOOK)
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((_SHEET_START + _row(1, HEADER)).encode("utf-8"))
+            number = 1
+            for rows in chunks:
+                lines = []
+                for values in rows:
+                    number += 1
+                    lines.append(_row(number, values))
+                sheet.write("".join(lines).encode("utf-8"))
+                yield sink.drain()
+            sheet.write(_SHEET_END.encode("utf-8"))
+    yield sink.drain()
+
+
+def stream_table(chunks: Iterable[Sequence[Sequence[Any]]], fmt: str) -> Iterator[bytes]:
+    """Encode row chunks as CSV or XLSX bytes, yielded as they are produced."""
+    writer = csv_chunks if fmt == "csv" else xlsx_chunks
+    for data in writer(chunks):
+        if data:
+            yield data
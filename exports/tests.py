@@ -1,3 +1,442 @@
-from django.test import TestCase
+import csv
+import io
+import tempfile
+import threading
+import zipfile
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from accounts.models import CompanyProfile, OnboardingProgress, UserRole
+from coaching.models import Coach, UserCoachAssignment
+from ingest.models import FinancialStatement
+from ingest.services.metrics_service import user_metrics
+from ingest.tests.factories import TemporaryMediaMixin, make_statement
+
+from .charts import chart_specs, render_user_charts
+from .jobs import ExportJobService
+from .models import Export, ExportJob
+from .services import generate_export, get_latest_export
+from .snapshots import schedule_refresh, stale_user_ids
+from .tabular import HEADER, statement_rows, stream_table
+from .utils import generate_revenue_chart
+
+
+class ChartRenderingTests(TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        override = override_settings(
+            EXPORT_CHART_CACHE_DIR=self.cache_dir.name, MEDIA_ROOT=self.cache_dir.name, EXPORT_JOBS_INLINE=False
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(username="charts", password="x")
+        OnboardingProgress.objects.update_or_create(user=self.user, defaults={"current_step": "done", "is_completed": True})
+        self.other = User.objects.create_user(username="other", password="x")
+        for user in (self.user, self.other):
+            for year, revenue in ((2022, 1000), (2023, 1500)):
+                make_statement(user, year, {"revenue": revenue, "cogs": 400})
+
+    def test_all_export_charts_rendered_per_user(self):
+        paths = render_user_charts(self.user)
+        self.assertEqual(set(paths), {
+            "profit_story", "profitability_trends", "rev_cogs_growth",
+            "rev_overheads_growth", "all_metrics", "metrics_trend",
+        })
+        with Image.open(paths["profit_story"]) as image:
+            self.assertEqual(image.format, "PNG")
+
+        other = render_user_charts(self.other)
+        self.assertNotEqual(paths["profit_story"].parent, other["profit_story"].parent)
+        self.assertEqual(paths["profit_story"].parent.name, str(self.user.pk))
+
+    def test_cache_reused_until_data_changes(self):
+        first = render_user_charts(self.user, ["metrics_trend"])["metrics_trend"]
+        mtime = first.stat().st_mtime_ns
+        self.assertEqual(render_user_charts(self.user, ["metrics_trend"])["metrics_trend"].stat().st_mtime_ns, mtime)
+
+        statement = FinancialStatement.objects.get(user=self.user, year=2023)
+        statement.income = {"revenue": 2500, "cogs": 400}
+        statement.save()
+        second = render_user_charts(self.user, ["metrics_trend"])["metrics_trend"]
+
+        self.assertNotEqual(first, second)
+        self.assertFalse(first.exists())
+        self.assertEqual(list(second.parent.glob("metrics_trend-*.png")), [second])
+
+    def test_growth_chart_skips_first_year(self):
+        spec = chart_specs(user_metrics(self.user))["rev_cogs_growth"]
+        self.assertEqual(spec.categories, ("2022", "2023"))
+        self.assertEqual(spec.series[0].values, (None, 50.0))
+        self.assertEqual(generate_revenue_chart({"2022": 1, "2023": 2}).read(4), b"\x89PNG")
+
+    def test_export_pdf_embeds_rendered_charts(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("exports:export_pdf"), {"sections": ["charts"]}, HTTP_X_REQUESTED_WITH="XMLHttpRequest"
+        )
+        self.assertEqual(response.status_code, 202)
+        ExportJobService().drain()
+        download = self.client.get(reverse("exports:export_download", args=[response.json()["job_id"]]))
+        pdf = b"".join(download.streaming_content)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertGreaterEqual(pdf.count(b"/Subtype /Image"), 6)
+
+
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        override = override_settings(
+            MEDIA_ROOT=self.media_root.name, EXPORT_CHART_CACHE_DIR=self.media_root.name, EXPORT_JOBS_INLINE=False
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(username="exporter", password="x")
+        OnboardingProgress.objects.update_or_create(user=self.user, defaults={"current_step": "done", "is_completed": True})
+        self.service = ExportJobService()
+        for year, revenue in ((2022, 1000), (2023, 1500)):
+            make_statement(self.user, year, {"revenue": revenue, "cogs": 400})
+
+    def test_identical_request_reuses_artifact(self):
+        job = self.service.request(self.user, 2023, ["tables", "survey"])
+        self.assertEqual(job.status, "queued")
+        self.assertEqual(job.sections, "survey,tables")
+        # Dotaz během zpracování se připojí ke stejnému jobu
+        self.assertEqual(self.service.request(self.user, 2023, ["survey", "tables"]).pk, job.pk)
+
+        self.assertEqual(self.service.drain(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+        with job.file.open("rb") as fh:
+            self.assertEqual(fh.read(4), b"%PDF")
+
+        with self.assertNumQueries(6):
+            again = self.service.request(self.user, 2023, ["tables", "survey"])
+        self.assertEqual((again.pk, again.status), (job.pk, "done"))
+        self.assertEqual(ExportJob.objects.count(), 1)
+
+        self.assertNotEqual(self.service.request(self.user, 2022, ["tables", "survey"]).pk, job.pk)
+        self.assertNotEqual(self.service.request(self.user, 2023, ["tables"]).pk, job.pk)
+
+    def test_data_change_builds_new_artifact(self):
+        job = self.service.request(self.user, None, [])
+        self.service.drain()
+        job.refresh_from_db()
+        old_name = job.file.name
+
+        statement = FinancialStatement.objects.get(user=self.user, year=2023)
+        statement.income = {"revenue": 2500, "cogs": 400}
+        statement.save()
+
+        new_job = self.service.request(self.user, None, [])
+        self.assertNotEqual(new_job.pk, job.pk)
+        self.service.drain()
+
+        # Starší export stejného výběru je nahrazen
+        self.assertFalse(ExportJob.objects.filter(pk=job.pk).exists())
+        self.assertFalse(job.file.storage.exists(old_name))
+        self.assertEqual(ExportJob.objects.get().status, "done")
+
+    @override_settings(EXPORT_JOB_MAX_ATTEMPTS=2)
+    def test_stale_job_fails_after_max_attempts(self):
+        job = self.service.request(self.user, 2023, [])
+        past = timezone.now() - timedelta(hours=1)
+        for expected in ("queued", "failed"):
+            claimed = self.service.claim_next()
+            ExportJob.objects.filter(pk=claimed.pk).update(started_at=past)
+            self.service.requeue_stale()
+            job.refresh_from_db()
+            self.assertEqual(job.status, expected)
+        self.assertIsNone(self.service.claim_next())
+        # Nový požadavek chybný job nepoužije
+        self.assertNotEqual(self.service.request(self.user, 2023, []).pk, job.pk)
+
+    def test_stale_running_job_is_not_reused_as_running(self):
+        job = self.service.request(self.user, 2023, [])
+        self.service.claim_next()
+        # Proces, který job zpracovával, spadl
+        ExportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+
+        again = self.service.request(self.user, 2023, [])
+        self.assertEqual(again.pk, job.pk)
+        self.assertEqual(again.status, "queued")
+        self.service.drain()
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+
+    def test_views_queue_poll_and_download(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("exports:export_pdf"), {"year": "2023", "sections": ["tables"]},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+        self.assertEqual(response.status_code, 202)
+        payload = response.json()
+        self.assertIsNone(payload["download_url"])
+
+        status = self.client.get(payload["status_url"], HTTP_X_REQUESTED_WITH="XMLHttpRequest").json()
+        self.assertEqual(status["status"], "queued")
+        download_url = reverse("exports:export_download", args=[payload["job_id"]])
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+
+        self.assertContains(self.client.get(reverse("exports:export_job", args=[payload["job_id"]])), payload["status_url"])
+
+        self.service.drain()
+        status = self.client.get(payload["status_url"], HTTP_X_REQUESTED_WITH="XMLHttpRequest").json()
+        self.assertEqual(status["download_url"], download_url)
+        response = self.client.get(download_url)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+        # Stejný požadavek formulářem vede rovnou na stažení uloženého PDF
+        response = self.client.post(
+            reverse("exports:export_pdf"), {"year": "2023", "sections": ["tables"]},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["job_id"], payload["job_id"])
+
+        other = User.objects.create_user(username="intruder", password="x")
+        OnboardingProgress.objects.update_or_create(user=other, defaults={"current_step": "done", "is_completed": True})
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+        self.assertEqual(self.client.get(payload["status_url"]).status_code, 404)
+
+
+@override_settings(EXPORT_BULK_PROCESSES=1)  # testovací DB v paměti nevidí jiné procesy
+class CoachBulkExportTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        override = override_settings(
+            MEDIA_ROOT=self.media_root.name, EXPORT_CHART_CACHE_DIR=self.media_root.name, EXPORT_JOBS_INLINE=False
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.coach_user = User.objects.create_user(username="bulkcoach", password="x")
+        UserRole.objects.create(user=self.coach_user, role="coach")
+        coach = Coach.objects.create(user=self.coach_user)
+        self.clients = []
+        for i, name in enumerate(("Alfa s.r.o.", "Beta a.s.")):
+            client = User.objects.create_user(username=f"bulkclient{i}", password="x")
+            CompanyProfile.objects.create(user=client, company_name=name)
+            UserCoachAssignment.objects.create(coach=coach, client=client)
+            make_statement(client, 2023, {"revenue": 1000 + i, "cogs": 400})
+            self.clients.append(client)
+        self.outsider = User.objects.create_user(username="notmyclient", password="x")
+        self.client.force_login(self.coach_user)
+
+    def _zip(self, **params):
+        response = self.client.get(reverse("exports:coach_bulk_export"), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+    def test_zip_contains_pdf_of_every_client(self):
+        archive = self._zip(sections="tables")
+        names = sorted(archive.namelist())
+        self.assertEqual(names, [f"alfa-sro_{self.clients[0].pk}.pdf", f"beta-as_{self.clients[1].pk}.pdf"])
+        self.assertIsNone(archive.testzip())
+        for name in names:
+            self.assertTrue(archive.read(name).startswith(b"%PDF"))
+        self.assertFalse(ExportJob.objects.filter(owner=self.outsider).exists())
+
+    def test_unchanged_clients_reuse_cached_artifacts(self):
+        self._zip()
+        first = dict(ExportJob.objects.values_list("owner_id", "pk"))
+
+        statement = FinancialStatement.objects.get(user=self.clients[1])
+        statement.income = {"revenue": 5000, "cogs": 400}
+        statement.save()
+        self._zip()
+
+        second = dict(ExportJob.objects.values_list("owner_id", "pk"))
+        self.assertEqual(second[self.clients[0].pk], first[self.clients[0].pk])
+        self.assertNotEqual(second[self.clients[1].pk], first[self.clients[1].pk])
+
+    def test_failed_export_listed_in_archive(self):
+        with patch("exports.jobs.build_export_pdf", side_effect=[b"%PDF-1.4 ok", RuntimeError("boom")]):
+            archive = self._zip()
+        self.assertEqual(len([n for n in archive.namelist() if n.endswith(".pdf")]), 1)
+        self.assertIn("boom", archive.read("chyby.txt").decode())
+
+    def test_aborted_download_requeues_unbuilt_exports(self):
+        response = self.client.get(reverse("exports:coach_bulk_export"))
+        next(iter(response.streaming_content))
+        # Kouč stahování přerušil – druhý klient je zabraný, ale ještě nevytvořený
+        response.close()
+
+        jobs = {job.owner_id: job for job in ExportJob.objects.all()}
+        self.assertEqual(jobs[self.clients[0].pk].status, "done")
+        self.assertEqual((jobs[self.clients[1].pk].status, jobs[self.clients[1].pk].attempts), ("queued", 0))
+
+    def test_company_user_cannot_bulk_export(self):
+        self.client.force_login(self.clients[0])
+        response = self.client.get(reverse("exports:coach_bulk_export"))
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(EXPORT_SNAPSHOT_DEBOUNCE=0)
+class ExportSnapshotTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="snapshots", password="x")
+
+    def _statement(self, year, revenue):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_statement(self.user, year, {"revenue": revenue, "cogs": 400})
+
+    def _set_revenue(self, statement, revenue):
+        statement.income = {"revenue": revenue, "cogs": 400}
+        with self.captureOnCommitCallbacks(execute=True):
+            statement.save()
+
+    def test_statement_writes_refresh_snapshot(self):
+        statement = self._statement(2022, 1000)
+        self.assertEqual(Export.objects.get(user=self.user).data["Revenue"], 1000)
+
+        self._statement(2023, 1500)
+        with self.assertNumQueries(1):
+            latest = get_latest_export(self.user)
+        self.assertEqual((latest.statement_year, latest.data["Revenue"]), (2023, 1500))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FinancialStatement.objects.filter(user=self.user, year=2023).delete()
+        self.assertEqual(get_latest_export(self.user).statement_year, 2022)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            statement.delete()
+        self.assertFalse(Export.objects.filter(user=self.user).exists())
+
+    def test_identical_snapshot_reused_and_old_pruned(self):
+        statement = self._statement(2023, 1000)
+        first = Export.objects.get(user=self.user)
+        self.assertEqual(generate_export(self.user).pk, first.pk)
+
+        self._set_revenue(statement, 2000)
+        second = get_latest_export(self.user)
+        self.assertNotEqual(second.pk, first.pk)
+
+        # Návrat k původním datům znovu použije první snapshot
+        self._set_revenue(statement, 1000)
+        self.assertEqual(get_latest_export(self.user).pk, first.pk)
+        self.assertEqual(Export.objects.filter(user=self.user).count(), 2)
+
+        with self.settings(EXPORT_SNAPSHOT_KEEP=2):
+            self._set_revenue(statement, 3000)
+        self.assertEqual(
+            list(Export.objects.filter(user=self.user).values_list("data__Revenue", flat=True)), [3000, 1000]
+        )
+
+    def test_burst_of_writes_refreshes_once(self):
+        done = threading.Event()
+        with self.settings(EXPORT_SNAPSHOT_DEBOUNCE=0.2), \
+                patch("exports.snapshots.refresh_snapshot", side_effect=lambda user_id: done.set()) as refresh:
+            for _ in range(5):
+                schedule_refresh(self.user.pk)
+            self.assertTrue(done.wait(5))
+        refresh.assert_called_once_with(self.user.pk)
+
+    def test_command_catches_up_stale_snapshots(self):
+        with self.settings(EXPORT_SNAPSHOT_DEBOUNCE=3600):
+            make_statement(self.user, 2023, {"revenue": 900, "cogs": 400})
+        self.assertEqual(stale_user_ids(), [self.user.pk])
+
+        call_command("refresh_export_snapshots", stdout=io.StringIO())
+        self.assertEqual(stale_user_ids(), [])
+        self.assertEqual(Export.objects.get(user=self.user).data["Revenue"], 900)
+
+
+class TabularExportTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        self.coach_user = User.objects.create_user(username="datacoach", password="x")
+        UserRole.objects.create(user=self.coach_user, role="coach")
+        coach = Coach.objects.create(user=self.coach_user)
+        self.client_user = User.objects.create_user(username="dataclient", password="x")
+        CompanyProfile.objects.create(user=self.client_user, company_name="Žluťoučký kůň s.r.o.")
+        UserCoachAssignment.objects.create(coach=coach, client=self.client_user)
+        self.outsider = User.objects.create_user(username="dataoutsider", password="x")
+
+        for user, years in ((self.client_user, (2022, 2023, 2024)), (self.outsider, (2023,))):
+            for year in years:
+                make_statement(
+                    user, year,
+                    income={"revenue": 1000 + year % 10, "cogs": 400},
+                    balance={"receivables": 100 * (year - 2021), "cash": 50},
+                )
+
+    def _rows(self, **kwargs):
+        return [row for chunk in statement_rows(**kwargs) for row in chunk]
+
+    def test_keyset_chunks_cover_every_statement_once(self):
+        chunks = list(statement_rows(size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2])
+        keys = [(row[0], row[3]) for chunk in chunks for row in chunk]
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertEqual(len(keys), FinancialStatement.objects.count())
+
+    def test_cashflow_uses_previous_year_balance(self):
+        rows = self._rows(user_ids=[self.client_user.pk], year=2023)
+        self.assertEqual(len(rows), 1)
+        row = dict(zip(HEADER, rows[0]))
+        self.assertEqual(row["year"], 2023)
+        self.assertEqual(row["company"], "Žluťoučký kůň s.r.o.")
+        self.assertEqual(row["metrics.revenue"], 1003)
+        # Pohledávky vzrostly o 100 proti roku 2022
+        self.assertEqual(row["cashflow.cash_from_customers"], 1003 - 100)
+
+    def test_coach_gets_csv_of_own_clients(self):
+        self.client.force_login(self.coach_user)
+        response = self.client.get(reverse("exports:statements_data_export"), {"format": "csv"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/csv"))
+        content = b"".join(response.streaming_content).decode("utf-8-sig")
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], HEADER)
+        self.assertEqual([row[3] for row in rows[1:]], ["2022", "2023", "2024"])
+        self.assertEqual({row[0] for row in rows[1:]}, {str(self.client_user.pk)})
+
+    def test_csv_escapes_formula_text(self):
+        CompanyProfile.objects.filter(user=self.client_user).update(company_name='=HYPERLINK("http://x","y")')
+        content = b"".join(stream_table(statement_rows(user_ids=[self.client_user.pk], year=2023), "csv"))
+        row = list(csv.reader(io.StringIO(content.decode("utf-8-sig"))))[1]
+        self.assertEqual(row[2], '\'=HYPERLINK("http://x","y")')
+        self.assertEqual(row[3], "2023")
+
+    def test_xlsx_is_a_valid_workbook(self):
+        staff = User.objects.create_user(username="datastaff", password="x", is_staff=True)
+        OnboardingProgress.objects.update_or_create(user=staff, defaults={"current_step": "done", "is_completed": True})
+        self.client.force_login(staff)
+        response = self.client.get(reverse("exports:statements_data_export"), {"format": "xlsx", "year": 2023})
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        self.assertIn("[Content_Types].xml", archive.namelist())
+        sheet = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+        self.assertEqual(sheet.count("<row "), 3)
+        self.assertIn("Žluťoučký kůň s.r.o.", sheet)
+
+    def test_company_user_is_forbidden(self):
+        OnboardingProgress.objects.update_or_create(user=self.outsider, defaults={"current_step": "done", "is_completed": True})
+        self.client.force_login(self.outsider)
+        response = self.client.get(reverse("exports:statements_data_export"))
+        self.assertEqual(response.status_code, 403)
+
+    def test_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/data.csv"
+            call_command("export_statements_data", output=path, users=[self.outsider.pk], chunk_size=1, stderr=io.StringIO())
+            with open(path, encoding="utf-8-sig") as handle:
+                rows = list(csv.reader(handle))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][:4], [str(self.outsider.pk), "dataoutsider", "", "2023"])
@@ -6,6 +6,10 @@ app_name = "exports"
 urlpatterns = [
     path("", views.export_form, name="export_form"),
     path("pdf/", views.export_pdf, name="export_pdf"),
-    path("upload_chart/", views.upload_chart, name="upload_chart"),
+    path("jobs/<int:job_id>/", views.export_job, name="export_job"),
+    path("jobs/<int:job_id>/download/", views.export_download, name="export_download"),
+    path("coach/zip/", views.coach_bulk_export, name="coach_bulk_export"),
+    path("data/", views.statements_data_export, name="statements_data_export"),
+    path("api/jobs/<int:job_id>/", views.export_job_status, name="export_job_status"),
     path("api/config/", views.export_config_api, name="export_config_api"),
 ]
@@ -1,14 +1,33 @@
-import matplotlib.pyplot as plt
 from io import BytesIO
+from typing import List
+
+from .charts import BLUE, ChartSpec, Series, render_chart
+
 
 def generate_revenue_chart(data):
     """data = {'2021': 1000, '2022': 1200, '2023': 900}"""
-    fig, ax = plt.subplots()
-    ax.plot(list(data.keys()), list(data.values()), marker="o")
-    ax.set_title("Revenue")
-    ax.set_ylabel("CZK")
-
-    buffer = BytesIO()
-    plt.savefig(buffer, format="png")
-    buffer.seek(0)
-    return buffer
+    spec = ChartSpec(
+        "line",
+        tuple(str(year) for year in data),
+        (Series("Tržby", tuple(float(value) for value in data.values()), BLUE),),
+    )
+    return BytesIO(render_chart(spec))
+
+
+class ZipStream:
+    """Write-only sink for a streamed ZipFile; the written bytes are taken out with drain()."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
@@ -0,0 +1,184 @@
+"""Canonical schema of ``FinancialStatement.income`` / ``balance``.
+
+Parsers emit different spellings of the same field ("Revenue", "revenue",
+"TotalAssets", "assets_total") and legacy rows contain formatted strings
+("1 234,5 Kč"). Statements are normalized once when they are written
+(ingest.signals): canonical snake_case keys, float values, missing (None)
+values dropped and a nested "current period" dataset flattened. The schema
+version is stored in the dict under ``SCHEMA_KEY`` so readers can tell a
+normalized dict with a single lookup and use plain ``data.get("revenue")``.
+
+Bump ``SCHEMA_VERSION`` when the field map changes and run
+``manage.py normalize_statements`` to rewrite stored rows.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+SCHEMA_VERSION = 1
+SCHEMA_KEY = "_schema"
+
+CURRENT_PERIOD_KEYS = ("current_period", "current", "bezne_obdobi")
+
+
+def _camel(name: str) -> str:
+    return "".join(part.capitalize() for part in name.split("_"))
+
+
+def _fields(spec: Dict[str, Tuple[str, ...]]) -> Dict[str, Tuple[str, ...]]:
+    """Canonical key → aliases in lookup order (canonical, CamelCase, extras)."""
+    fields = {}
+    for canonical, extra in spec.items():
+        aliases = [canonical, _camel(canonical), *extra]
+        fields[canonical] = tuple(dict.fromkeys(aliases))
+    return fields
+
+
+INCOME_FIELDS = _fields({
+    "revenue": (),
+    "revenue_products_services": (),
+    "revenue_goods": (),
+    "cogs": ("COGS",),
+    "cogs_goods": (),
+    "cogs_materials": (),
+    "cogs_services": (),
+    "services": (),
+    "personnel_costs": (),
+    "personnel_wages": ("personnel_costs_wages",),
+    "personnel_insurance": ("personnel_costs_social",),
+    "taxes_fees": (),
+    "depreciation": (),
+    "other_operating_costs": ("other_operating_expenses",),
+    "other_operating_revenue": (),
+    "financial_revenue": (),
+    "financial_costs": (),
+    "income_tax": (),
+    "gross_margin": (),
+    "overheads": (),
+    "ebit": ("EBIT",),
+    "net_profit": ("net_income",),
+    "interest_paid": ("Interest",),
+    "income_tax_paid": ("Tax",),
+    "dividends_paid": ("Dividends",),
+    "extraordinary_items": (),
+    "cash_begin": (),
+})
+
+BALANCE_FIELDS = _fields({
+    "total_assets": ("assets_total",),
+    "cash": (),
+    "receivables": (),
+    "inventory": (),
+    "tangible_assets": ("fixed_assets_tangible",),
+    "equity": (),
+    "total_liabilities": (),
+    "trade_payables": (),
+    "short_term_liabilities": ("liabilities_short",),
+    "short_term_loans": (),
+    "long_term_loans": (),
+    "loans_received": (),
+    "loans_repaid": (),
+    "asset_sales": (),
+    "capex": ("CapEx", "FixedAssets"),
+    "cash_begin": (),
+})
+
+
+def to_number(value: Any) -> Optional[float]:
+    """Normalize numeric values that may be strings with currency/spacing."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        try:
+            return float(value)
+        except Exception:
+            return None
+    if isinstance(value, str):
+        cleaned = (
+            value.replace("\u00a0", "")
+            .replace(" ", "")
+            .replace("CZK", "")
+            .replace("Kc", "")
+            .replace("K\u010d", "")
+            .replace("eur", "")
+            .replace("EUR", "")
+            .rstrip("%")
+            .strip()
+        )
+        if not cleaned:
+            return None
+
+        has_comma = "," in cleaned
+        has_dot = "." in cleaned
+        if has_comma and has_dot:
+            if cleaned.rfind(",") > cleaned.rfind("."):
+                cleaned = cleaned.replace(".", "").replace(",", ".")
+            else:
+                cleaned = cleaned.replace(",", "")
+        elif has_comma:
+            cleaned = cleaned.replace(",", ".")
+
+        try:
+            return float(cleaned)
+        except Exception:
+            return None
+    return None
+
+
+def is_canonical(data: Any) -> bool:
+    return isinstance(data, dict) and data.get(SCHEMA_KEY) == SCHEMA_VERSION
+
+
+def normalize(data: Any, fields: Dict[str, Tuple[str, ...]]) -> Dict[str, Any]:
+    """
+    Rewrite one statement dict to canonical keys and float values.
+
+    For every canonical field the first alias with a parseable value wins;
+    unknown keys are kept (numeric strings converted). Other nested periods
+    (e.g. "previous") are kept untouched.
+    """
+    if not isinstance(data, dict):
+        return {}
+    if is_canonical(data):
+        return data
+
+    source = data
+    period_key = next((key for key in CURRENT_PERIOD_KEYS if isinstance(data.get(key), dict)), None)
+    if period_key:
+        source = data[period_key]
+
+    result: Dict[str, Any] = {}
+    known = set()
+    for canonical, aliases in fields.items():
+        known.update(aliases)
+        for alias in aliases:
+            value = to_number(source.get(alias))
+            if value is not None:
+                result[canonical] = value
+                break
+
+    extras = {key: value for key, value in data.items() if key != period_key}
+    if period_key:
+        extras.update(source)
+    for key, value in extras.items():
+        if key in known or key == SCHEMA_KEY or value is None:
+            continue
+        if isinstance(value, str) and to_number(value) is not None:
+            value = to_number(value)
+        result[key] = value
+
+    result[SCHEMA_KEY] = SCHEMA_VERSION
+    return result
+
+
+def canonical_income(data: Any) -> Dict[str, Any]:
+    """Canonical income statement dict (no-op for already normalized data)."""
+    return data if is_canonical(data) else normalize(data, INCOME_FIELDS)
+
+
+def canonical_balance(data: Any) -> Dict[str, Any]:
+    """Canonical balance sheet dict (no-op for already normalized data)."""
+    return data if is_canonical(data) else normalize(data, BALANCE_FIELDS)
+
+
+def without_schema_key(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Statement dict without the ``SCHEMA_KEY`` version marker (for display and AI prompts)."""
+    return {key: value for key, value in data.items() if key != SCHEMA_KEY}
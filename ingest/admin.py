@@ -1,7 +1,18 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import Document, FinancialStatement
+from .models import (
+    AIRateBucket,
+    AIRateStat,
+    AIRateWaiter,
+    Document,
+    ExtractionCacheEntry,
+    FinancialStatement,
+    IngestJob,
+    IngestTask,
+    StatementMetrics,
+    VisionTierStat,
+)
 
 
 @admin.register(Document)
@@ -197,3 +208,107 @@ class FinancialStatementAdmin(admin.ModelAdmin):
         return obj.document.uploaded_at if obj.document else None
     uploaded_at.admin_order_field = "document__uploaded_at"
     uploaded_at.short_description = "Uploaded at"
+
+
+@admin.register(StatementMetrics)
+class StatementMetricsAdmin(admin.ModelAdmin):
+    list_display = ("user", "year", "revenue", "ebit", "net_profit", "revenue_yoy", "computed_at")
+    list_filter = ("year",)
+    search_fields = ("user__username",)
+    readonly_fields = [field.name for field in StatementMetrics._meta.fields]
+
+
+@admin.register(ExtractionCacheEntry)
+class ExtractionCacheEntryAdmin(admin.ModelAdmin):
+    list_display = ("short_hash", "page", "dpi", "model", "prompt_version", "hit_count", "last_used_at", "created_at")
+    list_filter = ("model", "dpi", "prompt_version")
+    search_fields = ("pdf_sha256", "key")
+    readonly_fields = ("key", "pdf_sha256", "hit_count", "created_at", "last_used_at")
+    ordering = ("-last_used_at",)
+
+    def short_hash(self, obj):
+        return obj.pdf_sha256[:12]
+    short_hash.short_description = "PDF SHA-256"
+
+
+@admin.register(VisionTierStat)
+class VisionTierStatAdmin(admin.ModelAdmin):
+    list_display = (
+        "dpi", "attempts", "accepted", "hit_rate_display", "low_confidence",
+        "inconsistent", "failed", "avg_confidence_display", "updated_at",
+    )
+    readonly_fields = (
+        "dpi", "attempts", "accepted", "low_confidence", "inconsistent",
+        "failed", "confidence_sum", "payload_bytes", "updated_at",
+    )
+
+    def hit_rate_display(self, obj):
+        return f"{obj.hit_rate:.0%}"
+    hit_rate_display.short_description = "Hit rate"
+
+    def avg_confidence_display(self, obj):
+        return f"{obj.avg_confidence:.2f}"
+    avg_confidence_display.short_description = "Avg confidence"
+
+
+class IngestTaskInline(admin.TabularInline):
+    model = IngestTask
+    extra = 0
+    fields = ("filename", "status", "attempts", "error", "started_at", "finished_at")
+    readonly_fields = fields
+
+
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "owner", "source", "status_badge", "task_count", "created_at", "finished_at")
+    list_filter = ("status", "source")
+    search_fields = ("owner__username",)
+    inlines = [IngestTaskInline]
+
+    def status_badge(self, obj):
+        colors = {
+            "queued": "gray",
+            "running": "blue",
+            "completed": "green",
+            "failed": "red",
+        }
+        return format_html(
+            '<span style="background-color: {}; color: white; padding: 3px 10px; '
+            'border-radius: 3px; font-size: 11px;">{}</span>',
+            colors.get(obj.status, "gray"),
+            obj.status.upper()
+        )
+    status_badge.short_description = "Status"
+
+    def task_count(self, obj):
+        return obj.tasks.count()
+    task_count.short_description = "Files"
+
+
+@admin.register(AIRateBucket)
+class AIRateBucketAdmin(admin.ModelAdmin):
+    list_display = ("provider", "tokens", "requests", "updated_at")
+    readonly_fields = ("provider", "tokens", "requests", "updated_at")
+
+
+@admin.register(AIRateWaiter)
+class AIRateWaiterAdmin(admin.ModelAdmin):
+    list_display = ("id", "provider", "priority", "tokens", "enqueued_at", "heartbeat_at")
+    list_filter = ("provider", "priority")
+
+
+@admin.register(AIRateStat)
+class AIRateStatAdmin(admin.ModelAdmin):
+    list_display = (
+        "provider", "priority", "calls", "waited", "timed_out",
+        "avg_wait_display", "max_wait_seconds", "tokens", "updated_at",
+    )
+    list_filter = ("provider", "priority")
+    readonly_fields = (
+        "provider", "priority", "calls", "waited", "timed_out", "tokens",
+        "wait_seconds", "max_wait_seconds", "updated_at",
+    )
+
+    def avg_wait_display(self, obj):
+        return f"{obj.avg_wait_seconds:.2f}s"
+    avg_wait_display.short_description = "Avg wait"
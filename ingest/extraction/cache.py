@@ -0,0 +1,212 @@
+"""
+Persistent cache for AI extraction results.
+
+Entries are keyed by PDF content hash + page + render DPI + model + prompt
+version, so re-uploads, confirmations and reprocessing of identical bytes
+skip the rendering and the AI round trip entirely.
+"""
+import hashlib
+import logging
+import threading
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def sha256_bytes(data: bytes) -> str:
+    """Hex SHA-256 of a byte string."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def sha256_chunks(chunks: Iterable[bytes]) -> str:
+    """Hex SHA-256 of an iterable of byte chunks (e.g. UploadedFile.chunks())."""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def prompt_fingerprint(prompt: str) -> str:
+    """Short stable version tag of a prompt text."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class ExtractionCache:
+    """DB-backed extraction cache with TTL + LRU eviction and hit/miss counters."""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_days: Optional[int] = None):
+        self._max_entries = max_entries
+        self._ttl_days = ttl_days
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Settings are read lazily so override_settings() works in tests
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, "INGEST_EXTRACTION_CACHE_ENABLED", True)
+
+    @property
+    def max_entries(self) -> int:
+        if self._max_entries is not None:
+            return self._max_entries
+        return getattr(settings, "INGEST_EXTRACTION_CACHE_MAX_ENTRIES", 5000)
+
+    @property
+    def ttl_days(self) -> int:
+        if self._ttl_days is not None:
+            return self._ttl_days
+        return getattr(settings, "INGEST_EXTRACTION_CACHE_TTL_DAYS", 90)
+
+    @staticmethod
+    def build_key(pdf_sha256: str, page: Any, dpi: int, model: str, prompt_version: str, variant: str = "") -> str:
+        """variant = image preparation settings (see ImagePreparer.signature)"""
+        raw = "|".join([pdf_sha256, str(page), str(dpi), model or "", prompt_version or "", variant or ""])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, pdf_sha256: str, page: Any, dpi: int, model: str, prompt_version: str, variant: str = ""):
+        """
+        Look up a cached extraction.
+
+        Returns:
+            ExtractionCacheEntry or None. Cache failures never break extraction.
+        """
+        if not self.enabled:
+            return None
+
+        from ingest.models import ExtractionCacheEntry
+
+        key = self.build_key(pdf_sha256, page, dpi, model, prompt_version, variant)
+        try:
+            entry = ExtractionCacheEntry.objects.filter(key=key).first()
+            if entry is not None and self._expired(entry):
+                entry.delete()
+                entry = None
+
+            if entry is None:
+                self._count(hit=False)
+                return None
+
+            now = timezone.now()
+            ExtractionCacheEntry.objects.filter(pk=entry.pk).update(
+                hit_count=F("hit_count") + 1,
+                last_used_at=now,
+            )
+            entry.hit_count += 1
+            entry.last_used_at = now
+            self._count(hit=True)
+            logger.info(f"Extraction cache hit: {pdf_sha256[:12]} page={page} dpi={dpi}")
+            return entry
+        except Exception as e:
+            logger.warning(f"Extraction cache lookup failed: {e}")
+            self._count(hit=False)
+            return None
+
+    def set(
+        self,
+        pdf_sha256: str,
+        page: Any,
+        dpi: int,
+        model: str,
+        prompt_version: str,
+        result: Dict[str, Any],
+        image_path: str = "",
+        variant: str = "",
+    ):
+        """Store (or replace) an extraction result and enforce the size limit."""
+        if not self.enabled:
+            return None
+
+        from ingest.models import ExtractionCacheEntry
+
+        key = self.build_key(pdf_sha256, page, dpi, model, prompt_version, variant)
+        try:
+            entry, _ = ExtractionCacheEntry.objects.update_or_create(
+                key=key,
+                defaults={
+                    "pdf_sha256": pdf_sha256,
+                    "page": str(page),
+                    "dpi": dpi,
+                    "model": model or "",
+                    "prompt_version": prompt_version or "",
+                    "result": result,
+                    "image_path": image_path or "",
+                    "last_used_at": timezone.now(),
+                },
+            )
+            self.evict()
+            return entry
+        except Exception as e:
+            logger.warning(f"Extraction cache store failed: {e}")
+            return None
+
+    def update_image_path(self, entry, image_path: str) -> None:
+        """Point an existing entry at a freshly rendered image."""
+        entry.image_path = image_path
+        type(entry).objects.filter(pk=entry.pk).update(image_path=image_path)
+
+    def evict(self) -> int:
+        """
+        Drop expired entries, then the least recently used ones above max_entries.
+
+        Returns:
+            Number of deleted entries
+        """
+        from ingest.models import ExtractionCacheEntry
+
+        deleted = 0
+        if self.ttl_days:
+            cutoff = timezone.now() - timedelta(days=self.ttl_days)
+            deleted += ExtractionCacheEntry.objects.filter(last_used_at__lt=cutoff).delete()[0]
+
+        overflow = ExtractionCacheEntry.objects.count() - self.max_entries
+        if overflow > 0:
+            stale_ids = list(
+                ExtractionCacheEntry.objects.order_by("last_used_at", "id")
+                .values_list("id", flat=True)[:overflow]
+            )
+            deleted += ExtractionCacheEntry.objects.filter(id__in=stale_ids).delete()[0]
+
+        if deleted:
+            logger.info(f"Extraction cache evicted {deleted} entries")
+        return deleted
+
+    def clear(self) -> int:
+        from ingest.models import ExtractionCacheEntry
+
+        return ExtractionCacheEntry.objects.all().delete()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Process-local hit/miss counters plus persistent totals."""
+        from ingest.models import ExtractionCacheEntry
+
+        total = self.hits + self.misses
+        return {
+            "entries": ExtractionCacheEntry.objects.count(),
+            "stored_hits": ExtractionCacheEntry.objects.aggregate(s=Sum("hit_count"))["s"] or 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "max_entries": self.max_entries,
+            "ttl_days": self.ttl_days,
+        }
+
+    def _expired(self, entry) -> bool:
+        if not self.ttl_days:
+            return False
+        return entry.last_used_at < timezone.now() - timedelta(days=self.ttl_days)
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+extraction_cache = ExtractionCache()
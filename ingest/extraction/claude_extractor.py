@@ -6,7 +6,12 @@ import base64
 import json
 import logging
 from typing import Dict, Any, Optional
-import anthropic
+
+from app.ai_clients import ai_call, get_client
+from app.rate_limit import estimate_tokens
+from .cache import prompt_fingerprint
+from .image_prep import image_media_type
+from .postprocess import compute_aggregates, convert_to_thousands, post_process_extraction
 
 logger = logging.getLogger(__name__)
 
@@ -22,22 +27,25 @@ class FinancialExtractor:
             api_key: Anthropic API key (if None, uses ANTHROPIC_API_KEY env var)
             model: Claude model to use (default: claude-3-5-sonnet-20241022)
         """
-        # Initialize Anthropic client with explicit parameters only
-        if api_key:
-            self.client = anthropic.Anthropic(api_key=api_key)
-        else:
-            # Let Anthropic read from ANTHROPIC_API_KEY env var
-            self.client = anthropic.Anthropic()
+        # Shared pooled Anthropic client with the vision deadline
+        # (without api_key: settings / ANTHROPIC_API_KEY env var)
+        self.client = get_client("anthropic", "vision", api_key=api_key)
 
         self.model = model or "claude-sonnet-4-20250514"
         self.max_tokens = 2048
 
-    def extract_from_png(self, png_bytes: bytes) -> Dict[str, Any]:
+    @property
+    def prompt_version(self) -> str:
+        """Fingerprint of the extraction prompt (part of the extraction cache key)"""
+        return prompt_fingerprint(self._build_extraction_prompt())
+
+    def extract_from_png(self, png_bytes: bytes, media_type: Optional[str] = None) -> Dict[str, Any]:
         """
         Extract financial data from PNG image
 
         Args:
-            png_bytes: PNG image as bytes
+            png_bytes: Image as bytes (PNG, or WEBP/JPEG from ImagePreparer)
+            media_type: MIME type of the image (detected from bytes if None)
 
         Returns:
             Dictionary with extracted data:
@@ -61,29 +69,32 @@ class FinancialExtractor:
             prompt = self._build_extraction_prompt()
 
             # Call Claude API with vision
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/png",
-                                    "data": png_base64,
+            with ai_call(
+                "anthropic", "ingest", tokens=estimate_tokens(prompt, max_tokens=self.max_tokens, images=1)
+            ):
+                message = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=self.max_tokens,
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {
+                                    "type": "image",
+                                    "source": {
+                                        "type": "base64",
+                                        "media_type": media_type or image_media_type(png_bytes),
+                                        "data": png_base64,
+                                    },
                                 },
-                            },
-                            {
-                                "type": "text",
-                                "text": prompt
-                            }
-                        ],
-                    }
-                ],
-            )
+                                {
+                                    "type": "text",
+                                    "text": prompt
+                                }
+                            ],
+                        }
+                    ],
+                )
 
             # Extract response text
             response_text = message.content[0].text
@@ -123,67 +134,14 @@ class FinancialExtractor:
             }
 
     def _post_process_extraction(self, result: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Post-process extracted data:
-        1. Compute aggregated fields (revenue, cogs, etc.)
-        2. Convert scale to thousands if needed
-        """
-        if not result.get("success"):
-            return result
-
-        data = result.get("extracted_data", {})
-        scale = result.get("scale", "thousands")
-
-        # 1. Compute aggregated fields
-        data = self._compute_aggregates(data)
-
-        # 2. Convert to thousands if in units
-        if scale == "units":
-            data = self._convert_to_thousands(data)
-            result["scale"] = "thousands"
-
-        result["extracted_data"] = data
-        return result
+        """Compute aggregates and normalize scale (shared with the text-layer parser)"""
+        return post_process_extraction(result)
 
     def _compute_aggregates(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Compute aggregated fields from components:
-        - revenue = revenue_products_services + revenue_goods
-        - cogs = cogs_goods + cogs_materials
-        """
-        def safe_add(*values):
-            """Add values, treating None as 0, return None if all None"""
-            non_none = [v for v in values if v is not None]
-            return sum(non_none) if non_none else None
-
-        # Compute revenue (products + goods)
-        revenue_products = data.get("revenue_products_services")
-        revenue_goods = data.get("revenue_goods")
-        if revenue_products is not None or revenue_goods is not None:
-            data["revenue"] = safe_add(revenue_products, revenue_goods)
-
-        # Compute COGS (goods + materials)
-        cogs_goods = data.get("cogs_goods")
-        cogs_materials = data.get("cogs_materials")
-        if cogs_goods is not None or cogs_materials is not None:
-            data["cogs"] = safe_add(cogs_goods, cogs_materials)
-
-        return data
+        return compute_aggregates(data)
 
     def _convert_to_thousands(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Convert all numeric values from units to thousands
-        Dashboard expects all values in thousands
-        """
-        converted = {}
-        for key, value in data.items():
-            if value is not None and isinstance(value, (int, float)):
-                converted[key] = value / 1000.0
-            else:
-                converted[key] = value
-
-        logger.info("Converted units to thousands")
-        return converted
+        return convert_to_thousands(data)
 
     def _build_extraction_prompt(self) -> str:
         """Build prompt for Claude vision API"""
@@ -0,0 +1,144 @@
+"""
+Page fan-out for PDFs with several statements (annual reports).
+
+Statement pages are located in the text layer (text_layer.find_statement_pages),
+pages that need vision are rendered in a process pool (PyMuPDF rendering is
+CPU bound and holds the GIL) and extracted concurrently. Page results are
+merged per (doc_type, year), so one upload fills every statement it contains.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from .image_prep import ImagePreparer, PreparedImage
+from .pdf_processor import FitzDocument, PDFSource, open_pdf, read_pdf_bytes
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_pool = None
+_pool_size = None
+
+
+def render_processes() -> int:
+    default = min(4, os.cpu_count() or 1)
+    return max(1, int(getattr(settings, "INGEST_RENDER_PROCESSES", default)))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Shared render pool; "spawn" because web/worker processes run threads."""
+    global _pool, _pool_size
+    size = render_processes()
+    with _lock:
+        if _pool is None or _pool_size != size:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=size, mp_context=multiprocessing.get_context("spawn"))
+            _pool_size = size
+        return _pool
+
+
+def _render_worker(pdf_path: PDFSource, page_num: int, dpi: int, preparer: ImagePreparer) -> PreparedImage:
+    with open_pdf(pdf_path) as doc:
+        return preparer.render_page(doc.load_page(page_num), dpi=dpi, measure_baseline=False)
+
+
+def render_pages(
+    pdf_path: PDFSource,
+    page_nums: Iterable[int],
+    dpi: int,
+    preparer: Optional[ImagePreparer] = None,
+) -> Dict[int, PreparedImage]:
+    """
+    Render several pages of one PDF as vision payloads in parallel.
+
+    Falls back to rendering in the calling thread for a single page, with
+    INGEST_RENDER_PROCESSES=1, for an open fitz.Document (not picklable) or
+    when the pool is unavailable. Streams and memoryviews are sent to the
+    workers as bytes.
+
+    Returns:
+        {page_num: PreparedImage}
+    """
+    preparer = preparer or ImagePreparer()
+    page_nums = sorted(set(page_nums))
+
+    if len(page_nums) > 1 and render_processes() > 1 and not isinstance(pdf_path, FitzDocument):
+        try:
+            payload = pdf_path if isinstance(pdf_path, (str, os.PathLike, bytes)) else bytes(read_pdf_bytes(pdf_path))
+            pool = _get_pool()
+            futures = {num: pool.submit(_render_worker, payload, num, dpi, preparer) for num in page_nums}
+            return {num: future.result() for num, future in futures.items()}
+        except Exception as e:
+            logger.warning(f"Render pool failed ({e}), rendering {len(page_nums)} pages in-process")
+
+    with open_pdf(pdf_path) as doc:
+        return {
+            num: preparer.render_page(doc.load_page(num), dpi=dpi, measure_baseline=False)
+            for num in page_nums
+        }
+
+
+def run_concurrently(func: Callable, items: List[Any], max_workers: int) -> List[Any]:
+    """
+    func(item) for every item in a thread pool, results in input order.
+
+    Each worker thread closes its DB connection when done (same as IngestJobService).
+    """
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    from django.db import connection
+
+    def call(item):
+        try:
+            return func(item)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix="fanout") as pool:
+        return list(pool.map(call, items))
+
+
+def merge_page_results(page_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge successful per-page extractions into one statement per (doc_type, year).
+
+    Pages are merged in page order; the first non-null value of a field wins
+    (a balance sheet split into "Aktiva" and "Pasiva" pages becomes one statement).
+    Confidence of a statement is its weakest page.
+    """
+    statements: Dict[tuple, Dict[str, Any]] = {}
+    for result in sorted(page_results, key=lambda r: r.get("page_num", 0)):
+        doc_type, year = result.get("doc_type"), result.get("year")
+        if not result.get("success") or not doc_type or not isinstance(year, int):
+            continue
+
+        statement = statements.setdefault((doc_type, year), {
+            "success": True,
+            "doc_type": doc_type,
+            "year": year,
+            "scale": result.get("scale") or "thousands",
+            "extracted_data": {},
+            "confidence": result.get("confidence", 0.0),
+            "pages": [],
+            "sources": [],
+            "local_image_path": "",
+        })
+        data = statement["extracted_data"]
+        for field, value in (result.get("extracted_data") or {}).items():
+            if data.get(field) is None:
+                data[field] = value
+
+        statement["confidence"] = min(statement["confidence"], result.get("confidence", 0.0))
+        statement["pages"].append(result.get("page_num", 0))
+        if result.get("source") not in statement["sources"]:
+            statement["sources"].append(result.get("source"))
+        statement["local_image_path"] = statement["local_image_path"] or result.get("local_image_path") or ""
+
+    return list(statements.values())
@@ -0,0 +1,241 @@
+"""
+Vision payload preparation between PDFProcessor and the AI providers.
+
+Full 300 DPI A4 renders are several MB and get downscaled by the model
+anyway. Instead we crop to the table region (PyMuPDF text blocks + drawings),
+render in grayscale directly at the model's effective resolution and
+re-encode compactly. Byte and token savings are reported per image.
+"""
+import io
+import logging
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import fitz  # PyMuPDF
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Claude downsizes anything with a long edge above 1568 px or ~1.15 MP
+DEFAULT_MAX_LONG_EDGE = 1568
+DEFAULT_MAX_PIXELS = 1_150_000
+PIXELS_PER_TOKEN = 750
+
+
+def image_media_type(data: bytes) -> str:
+    """MIME type from magic bytes (PNG / JPEG / WEBP / GIF)."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "image/png"
+
+
+def estimate_tokens(width: int, height: int, max_long_edge: int = DEFAULT_MAX_LONG_EDGE,
+                    max_pixels: int = DEFAULT_MAX_PIXELS) -> int:
+    """Image tokens after the model's own downscaling (≈ w*h/750)."""
+    scale = min(1.0, max_long_edge / max(width, height, 1), math.sqrt(max_pixels / max(width * height, 1)))
+    return math.ceil((width * scale) * (height * scale) / PIXELS_PER_TOKEN)
+
+
+@dataclass
+class PreparedImage:
+    """Encoded image plus payload statistics against the unoptimized render."""
+    data: bytes
+    media_type: str
+    width: int
+    height: int
+    original_bytes: Optional[int]  # None when the legacy render was not measured
+    original_width: int
+    original_height: int
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.width, self.height)
+
+    @property
+    def original_tokens(self) -> int:
+        return estimate_tokens(self.original_width, self.original_height)
+
+    @property
+    def bytes_saved(self) -> Optional[int]:
+        if self.original_bytes is None:
+            return None
+        return self.original_bytes - len(self.data)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.tokens
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "bytes": len(self.data),
+            "original_bytes": self.original_bytes,
+            "bytes_saved": self.bytes_saved,
+            "tokens": self.tokens,
+            "original_tokens": self.original_tokens,
+            "tokens_saved": self.tokens_saved,
+            "size": f"{self.width}x{self.height}",
+        }
+
+
+class ImagePreparer:
+    """Crops, converts and downscales statement pages for vision models"""
+
+    def __init__(
+        self,
+        max_long_edge: Optional[int] = None,
+        max_pixels: Optional[int] = None,
+        grayscale: bool = True,
+        crop: bool = True,
+        padding: float = 12.0,
+        image_format: Optional[str] = None,
+    ):
+        self.max_long_edge = max_long_edge or getattr(settings, "INGEST_VISION_MAX_LONG_EDGE", DEFAULT_MAX_LONG_EDGE)
+        self.max_pixels = max_pixels or getattr(settings, "INGEST_VISION_MAX_PIXELS", DEFAULT_MAX_PIXELS)
+        self.grayscale = grayscale
+        self.crop = crop
+        self.padding = padding
+        self.image_format = (image_format or getattr(settings, "INGEST_VISION_IMAGE_FORMAT", "png")).lower()
+
+    @property
+    def signature(self) -> str:
+        """Stable description of the settings (part of the extraction cache key)."""
+        return "-".join([
+            "crop" if self.crop else "full",
+            "gray" if self.grayscale else "rgb",
+            str(self.max_long_edge),
+            str(self.max_pixels),
+            self.image_format,
+        ])
+
+    def table_rect(self, page) -> fitz.Rect:
+        """Bounding box of text blocks and vector drawings (the statement table)."""
+        rect = fitz.Rect()
+        for block in page.get_text("blocks"):
+            if block[4].strip():
+                rect |= fitz.Rect(block[:4])
+        for drawing in page.get_drawings():
+            r = drawing.get("rect")
+            # Ignore page frames / background fills
+            if r is not None and r.width < page.rect.width * 0.98 and r.height < page.rect.height * 0.98:
+                rect |= r
+
+        if rect.is_empty or rect.get_area() < page.rect.get_area() * 0.05:
+            return fitz.Rect(page.rect)
+
+        rect = fitz.Rect(rect.x0 - self.padding, rect.y0 - self.padding, rect.x1 + self.padding, rect.y1 + self.padding)
+        return rect & page.rect
+
+    def render_page(self, page, dpi: int = 300, measure_baseline: Optional[bool] = None) -> PreparedImage:
+        """
+        Render one page for a vision model.
+
+        Args:
+            page: fitz.Page
+            dpi: DPI of the unoptimized render (upper bound, used as baseline for stats)
+            measure_baseline: Also render the legacy full-page PNG to report bytes saved
+                (default INGEST_VISION_MEASURE_BASELINE, costs one extra render)
+
+        Returns:
+            PreparedImage
+        """
+        clip = self.table_rect(page) if self.crop else fitz.Rect(page.rect)
+
+        base_zoom = dpi / 72
+        zoom = min(
+            base_zoom,
+            self.max_long_edge / max(clip.width, clip.height),
+            math.sqrt(self.max_pixels / (clip.width * clip.height)),
+        )
+        # The pixmap is rounded out to whole pixels – keep it inside the limits
+        while zoom > 0.1:
+            width, height = math.ceil(clip.width * zoom) + 1, math.ceil(clip.height * zoom) + 1
+            if max(width, height) <= self.max_long_edge and width * height <= self.max_pixels:
+                break
+            zoom *= 0.995
+        colorspace = fitz.csGRAY if self.grayscale else fitz.csRGB
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip, colorspace=colorspace, alpha=False)
+
+        data = self._encode(pix)
+
+        if measure_baseline is None:
+            measure_baseline = getattr(settings, "INGEST_VISION_MEASURE_BASELINE", False)
+        original_bytes = None
+        if measure_baseline:
+            original_bytes = len(page.get_pixmap(matrix=fitz.Matrix(base_zoom, base_zoom)).tobytes("png"))
+
+        prepared = PreparedImage(
+            data=data,
+            media_type=image_media_type(data),
+            width=pix.width,
+            height=pix.height,
+            original_bytes=original_bytes,
+            original_width=int(page.rect.width * base_zoom),
+            original_height=int(page.rect.height * base_zoom),
+        )
+        self._log(prepared)
+        return prepared
+
+    def prepare_png(self, png_bytes: bytes) -> PreparedImage:
+        """Optimize an already rendered image (crop to content, grayscale, downscale)."""
+        from PIL import Image, ImageOps
+
+        img = Image.open(io.BytesIO(png_bytes))
+        original_width, original_height = img.size
+        img = img.convert("L") if self.grayscale else img.convert("RGB")
+
+        if self.crop:
+            gray = img if img.mode == "L" else img.convert("L")
+            bbox = ImageOps.invert(gray).point(lambda v: 255 if v > 24 else 0).getbbox()
+            if bbox:
+                pad = int(self.padding * 2)
+                bbox = (max(bbox[0] - pad, 0), max(bbox[1] - pad, 0),
+                        min(bbox[2] + pad, img.width), min(bbox[3] + pad, img.height))
+                img = img.crop(bbox)
+
+        scale = min(1.0, self.max_long_edge / max(img.size), math.sqrt(self.max_pixels / (img.width * img.height)))
+        if scale < 1.0:
+            img = img.resize((max(1, int(img.width * scale)), max(1, int(img.height * scale))), Image.LANCZOS)
+
+        data = self._encode_pil(img)
+        prepared = PreparedImage(
+            data=data,
+            media_type=image_media_type(data),
+            width=img.width,
+            height=img.height,
+            original_bytes=len(png_bytes),
+            original_width=original_width,
+            original_height=original_height,
+        )
+        self._log(prepared)
+        return prepared
+
+    def _encode(self, pix) -> bytes:
+        from PIL import Image
+
+        # Pillow's PNG optimizer beats PyMuPDF's default zlib level on grayscale tables
+        mode = "L" if pix.n == 1 else "RGB"
+        return self._encode_pil(Image.frombytes(mode, (pix.width, pix.height), pix.samples))
+
+    def _encode_pil(self, img) -> bytes:
+        buf = io.BytesIO()
+        if self.image_format == "webp":
+            img.save(buf, format="WEBP", lossless=True, method=6)
+        else:
+            img.save(buf, format="PNG", optimize=True)
+        return buf.getvalue()
+
+    @staticmethod
+    def _log(prepared: PreparedImage) -> None:
+        stats = prepared.stats()
+        saved = f" (saved {stats['bytes_saved']} B)" if stats["bytes_saved"] is not None else ""
+        logger.info(
+            f"Vision payload {stats['size']}: {stats['bytes']} B{saved}, "
+            f"~{stats['tokens']} tokens (saved {stats['tokens_saved']})"
+        )
@@ -0,0 +1,242 @@
+"""
+Content-addressed store for extracted table images.
+
+Images are named by the SHA-256 of their bytes and fanned out into two
+directory levels (ab/cd/abcd….png), so identical renders (re-uploads,
+check_only passes followed by the confirmed upload, reprocessing) are
+written once. Files no longer referenced by FinancialStatement.local_image_path
+are removed by `manage.py gc_extracted_images` once they are older than
+INGEST_IMAGE_RETENTION_DAYS.
+"""
+import logging
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Union
+
+from django.conf import settings
+
+from ingest.utils.constants import EXTRACTED_TABLES_DIR
+from .cache import sha256_bytes
+from .image_prep import image_media_type
+
+logger = logging.getLogger(__name__)
+
+HASHED_NAME_RE = re.compile(r"^[0-9a-f]{64}\.(png|webp|jpg|gif)$")
+
+EXTENSIONS = {
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/jpeg": "jpg",
+    "image/gif": "gif",
+}
+
+
+def retention_days() -> int:
+    return int(getattr(settings, "INGEST_IMAGE_RETENTION_DAYS", 7))
+
+
+@dataclass
+class DiskUsage:
+    files: int = 0
+    bytes: int = 0
+
+    @property
+    def megabytes(self) -> float:
+        return self.bytes / 1024 / 1024
+
+
+@dataclass
+class GCReport:
+    """Result of ImageStore.collect_garbage."""
+    before: DiskUsage = field(default_factory=DiskUsage)
+    after: DiskUsage = field(default_factory=DiskUsage)
+    removed: List[str] = field(default_factory=list)
+    removed_bytes: int = 0
+    kept_referenced: int = 0
+    kept_recent: int = 0
+    adopted: int = 0
+
+
+class ImageStore:
+    """Hash-named, deduplicating image store below BASE_DIR."""
+
+    def __init__(self, root: Optional[Union[str, Path]] = None):
+        if root is None:
+            root = getattr(settings, "INGEST_IMAGE_STORE_DIR", EXTRACTED_TABLES_DIR)
+        root = Path(root)
+        self.root = root if root.is_absolute() else Path(settings.BASE_DIR) / root
+
+    # ------------------------------------------------------------------
+    # Paths
+    # ------------------------------------------------------------------
+    def path_for(self, digest: str, ext: str = "png") -> Path:
+        return self.root / digest[:2] / digest[2:4] / f"{digest}.{ext}"
+
+    def relative(self, path: Path) -> str:
+        """Path as stored in the DB (relative to BASE_DIR when possible)."""
+        try:
+            return str(path.relative_to(Path(settings.BASE_DIR)))
+        except ValueError:
+            return str(path)
+
+    def resolve(self, stored_path: str) -> Path:
+        path = Path(stored_path)
+        return path if path.is_absolute() else Path(settings.BASE_DIR) / path
+
+    @staticmethod
+    def is_hashed(path: Path) -> bool:
+        return bool(HASHED_NAME_RE.match(path.name))
+
+    # ------------------------------------------------------------------
+    # Write
+    # ------------------------------------------------------------------
+    def save(self, data: bytes) -> str:
+        """
+        Store image bytes once.
+
+        Returns:
+            Path of the image (relative to BASE_DIR). An existing file is only
+            touched, so the retention period counts from its last use.
+        """
+        digest = sha256_bytes(data)
+        path = self.path_for(digest, EXTENSIONS.get(image_media_type(data), "png"))
+
+        if path.exists():
+            os.utime(path)
+            logger.debug(f"Image {digest[:12]} already stored")
+            return self.relative(path)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write + rename, concurrent writers of the same image never see a partial file
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            raise
+
+        relative_path = self.relative(path)
+        logger.info(f"Saved image to {relative_path}")
+        return relative_path
+
+    # ------------------------------------------------------------------
+    # Inspection / GC
+    # ------------------------------------------------------------------
+    def iter_files(self) -> Iterator[Path]:
+        if not self.root.exists():
+            return
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                yield Path(dirpath) / name
+
+    def disk_usage(self) -> DiskUsage:
+        usage = DiskUsage()
+        for path in self.iter_files():
+            try:
+                usage.bytes += path.stat().st_size
+                usage.files += 1
+            except OSError:
+                pass
+        return usage
+
+    def referenced_paths(self) -> Set[Path]:
+        """Images linked to a FinancialStatement."""
+        from ingest.models import FinancialStatement
+
+        stored = (
+            FinancialStatement.objects.exclude(local_image_path__isnull=True)
+            .exclude(local_image_path="")
+            .values_list("local_image_path", flat=True)
+            .distinct()
+        )
+        return {self.resolve(p).resolve() for p in stored}
+
+    def adopt_legacy(self, dry_run: bool = False) -> int:
+        """
+        Move referenced uuid-named images into the hashed layout.
+
+        FinancialStatement and cache rows are repointed; duplicates collapse
+        into one file. The old files become unreferenced and are collected.
+        """
+        from ingest.models import ExtractionCacheEntry, FinancialStatement
+
+        adopted = 0
+        for old in sorted(self.referenced_paths()):
+            if self.is_hashed(old) or not old.is_file() or self.root.resolve() not in old.parents:
+                continue
+            adopted += 1
+            if dry_run:
+                continue
+            new_path = self.save(old.read_bytes())
+            for stored in {self.relative(old), str(old)}:
+                FinancialStatement.objects.filter(local_image_path=stored).update(local_image_path=new_path)
+                ExtractionCacheEntry.objects.filter(image_path=stored).update(image_path=new_path)
+        return adopted
+
+    def collect_garbage(
+        self,
+        retention: Optional[int] = None,
+        dry_run: bool = False,
+        adopt: bool = False,
+    ) -> GCReport:
+        """
+        Remove images not referenced by any FinancialStatement.
+
+        Args:
+            retention: Keep unreferenced images younger than this many days
+                (default INGEST_IMAGE_RETENTION_DAYS; covers uploads waiting for confirmation)
+            dry_run: Only report what would be removed
+            adopt: Move referenced legacy (uuid) images into the hashed layout first
+        """
+        retention = retention_days() if retention is None else retention
+        report = GCReport(before=self.disk_usage())
+        if adopt:
+            report.adopted = self.adopt_legacy(dry_run=dry_run)
+
+        referenced = self.referenced_paths()
+        cutoff = time.time() - retention * 86400
+
+        for path in self.iter_files():
+            if path.resolve() in referenced:
+                report.kept_referenced += 1
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if stat.st_mtime > cutoff:
+                report.kept_recent += 1
+                continue
+            report.removed.append(self.relative(path))
+            report.removed_bytes += stat.st_size
+            if not dry_run:
+                try:
+                    path.unlink()
+                except OSError as e:
+                    logger.warning(f"Failed to remove {path}: {e}")
+
+        if not dry_run:
+            self._remove_empty_dirs()
+        report.after = self.disk_usage()
+        logger.info(
+            f"Image GC: removed {len(report.removed)} files ({report.removed_bytes} B), "
+            f"{report.before.bytes} B → {report.after.bytes} B"
+        )
+        return report
+
+    def _remove_empty_dirs(self) -> None:
+        if not self.root.exists():
+            return
+        for dirpath, _, _ in os.walk(self.root, topdown=False):
+            if Path(dirpath) != self.root and not os.listdir(dirpath):
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass
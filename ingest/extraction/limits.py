@@ -0,0 +1,44 @@
+"""
+Process-wide concurrency limit for vision (Claude) calls.
+
+Background ingest workers and synchronous uploads share the same slots, so a
+burst of uploads never fires more than INGEST_VISION_CONCURRENCY requests at once.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_semaphore = None
+_semaphore_size = None
+
+
+def vision_concurrency() -> int:
+    return max(1, int(getattr(settings, "INGEST_VISION_CONCURRENCY", 3)))
+
+
+def _get_semaphore() -> threading.BoundedSemaphore:
+    global _semaphore, _semaphore_size
+    size = vision_concurrency()
+    with _lock:
+        if _semaphore is None or _semaphore_size != size:
+            _semaphore = threading.BoundedSemaphore(size)
+            _semaphore_size = size
+        return _semaphore
+
+
+@contextmanager
+def vision_slot():
+    """Block until a vision call slot is free."""
+    semaphore = _get_semaphore()
+    if not semaphore.acquire(blocking=False):
+        logger.debug("Waiting for a free vision slot")
+        semaphore.acquire()
+    try:
+        yield
+    finally:
+        semaphore.release()
@@ -1,16 +1,107 @@
 """
 PDF to PNG conversion using PyMuPDF (fitz)
 Converts PDF pages to PNG images for Claude vision API
+
+All methods accept a path, bytes / bytearray / memoryview, a Django
+UploadedFile (or any binary stream) or an already open fitz.Document,
+so uploads are processed from memory without temp files.
 """
 import os
-import uuid
 import fitz  # PyMuPDF
-from pathlib import Path
-from typing import Optional
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Union
 import logging
 
+from django.conf import settings
+
+from ingest.utils.constants import MAX_PDF_SIZE
+from .image_store import ImageStore
+
 logger = logging.getLogger(__name__)
 
+FitzDocument = fitz.Document
+PDFSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO, FitzDocument]
+
+
+class PDFTooLargeError(ValueError):
+    """PDF exceeds INGEST_MAX_PDF_SIZE (default MAX_PDF_SIZE)."""
+
+
+def max_pdf_size() -> int:
+    return getattr(settings, "INGEST_MAX_PDF_SIZE", MAX_PDF_SIZE)
+
+
+def pdf_size(source: PDFSource) -> Optional[int]:
+    """Size in bytes without reading the content (None if unknown)."""
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    if isinstance(source, memoryview):
+        return source.nbytes
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    size = getattr(source, "size", None)  # UploadedFile / File
+    return size if isinstance(size, int) else None
+
+
+def check_pdf_size(source: PDFSource) -> None:
+    """
+    Raises:
+        PDFTooLargeError: if the PDF is larger than max_pdf_size()
+    """
+    size = pdf_size(source)
+    limit = max_pdf_size()
+    if size is not None and limit and size > limit:
+        raise PDFTooLargeError(f"PDF has {size / 1024 / 1024:.1f} MB, limit is {limit / 1024 / 1024:.0f} MB")
+
+
+def read_pdf_bytes(source: PDFSource) -> Union[bytes, bytearray, memoryview]:
+    """
+    PDF content for fitz.open(stream=...) and hashing (size is checked first).
+
+    Bytes-like sources are returned as they are, streams are read from the start.
+    """
+    if isinstance(source, FitzDocument):
+        return source.tobytes()
+    check_pdf_size(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fh:
+            return fh.read()
+
+    if hasattr(source, "seek"):
+        try:
+            source.seek(0)
+        except (OSError, ValueError):
+            pass
+    if hasattr(source, "chunks"):
+        return b"".join(source.chunks())
+    data = source.read()
+    if len(data) > max_pdf_size():
+        raise PDFTooLargeError(f"PDF has {len(data) / 1024 / 1024:.1f} MB")
+    return data
+
+
+@contextmanager
+def open_pdf(source: PDFSource) -> Iterator[FitzDocument]:
+    """
+    Open any PDFSource as a fitz.Document.
+
+    An already open document is yielded as is and left open for the caller.
+    """
+    if isinstance(source, FitzDocument):
+        yield source
+        return
+
+    if isinstance(source, (str, os.PathLike)):
+        doc = fitz.open(source)
+    else:
+        doc = fitz.open(stream=read_pdf_bytes(source), filetype="pdf")
+    try:
+        yield doc
+    finally:
+        doc.close()
+
 
 class PDFProcessor:
     """Handles PDF to PNG conversion"""
@@ -24,12 +115,12 @@ class PDFProcessor:
         """
         self.dpi = dpi
 
-    def pdf_to_png(self, pdf_path: str, page_num: int = 0) -> bytes:
+    def pdf_to_png(self, pdf_path: PDFSource, page_num: int = 0) -> bytes:
         """
         Convert PDF page to PNG bytes
 
         Args:
-            pdf_path: Path to PDF file
+            pdf_path: Path to PDF file, PDF bytes / stream or open fitz.Document
             page_num: Page number to convert (0-indexed)
 
         Returns:
@@ -39,24 +130,21 @@ class PDFProcessor:
             Exception: If PDF conversion fails
         """
         try:
-            doc = fitz.open(pdf_path)
-
-            if page_num >= doc.page_count:
-                logger.warning(f"Page {page_num} not found, using page 0")
-                page_num = 0
-
-            page = doc.load_page(page_num)
+            with open_pdf(pdf_path) as doc:
+                if page_num >= doc.page_count:
+                    logger.warning(f"Page {page_num} not found, using page 0")
+                    page_num = 0
 
-            # Convert to pixmap with specified DPI
-            # zoom factor = dpi / 72 (72 is default DPI)
-            zoom = self.dpi / 72
-            mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat)
+                page = doc.load_page(page_num)
 
-            # Convert to PNG bytes
-            png_bytes = pix.tobytes("png")
+                # Convert to pixmap with specified DPI
+                # zoom factor = dpi / 72 (72 is default DPI)
+                zoom = self.dpi / 72
+                mat = fitz.Matrix(zoom, zoom)
+                pix = page.get_pixmap(matrix=mat)
 
-            doc.close()
+                # Convert to PNG bytes
+                png_bytes = pix.tobytes("png")
 
             logger.info(f"Converted PDF page {page_num} to PNG ({len(png_bytes)} bytes)")
             return png_bytes
@@ -65,74 +153,76 @@ class PDFProcessor:
             logger.error(f"Failed to convert PDF to PNG: {e}")
             raise
 
+    def pdf_to_vision_image(self, pdf_path: PDFSource, page_num: int = 0, preparer=None):
+        """
+        Render PDF page as an optimized vision payload (cropped, grayscale, downscaled)
+
+        Args:
+            pdf_path: Path to PDF file, PDF bytes / stream or open fitz.Document
+            page_num: Page number to convert (0-indexed)
+            preparer: ImagePreparer instance (default settings if None)
+
+        Returns:
+            PreparedImage (see ingest/extraction/image_prep.py)
+        """
+        from .image_prep import ImagePreparer
+
+        preparer = preparer or ImagePreparer()
+        try:
+            with open_pdf(pdf_path) as doc:
+                if page_num >= doc.page_count:
+                    logger.warning(f"Page {page_num} not found, using page 0")
+                    page_num = 0
+                return preparer.render_page(doc.load_page(page_num), dpi=self.dpi)
+        except Exception as e:
+            logger.error(f"Failed to render vision image: {e}")
+            raise
+
     def save_png_local(
         self,
         png_bytes: bytes,
         output_dir: Optional[str] = None
     ) -> str:
         """
-        Save PNG bytes to local file system
+        Save PNG bytes to the content-addressed image store
+
+        Identical images are written once (see image_store.ImageStore).
 
         Args:
             png_bytes: PNG image as bytes
-            output_dir: Directory to save PNG (default: ingest/media/extracted_tables/)
+            output_dir: Store root (default: INGEST_IMAGE_STORE_DIR, ingest/media/extracted_tables/)
 
         Returns:
             Path to saved PNG file (relative to project root)
         """
-        if output_dir is None:
-            # Default to ingest/media/extracted_tables/
-            from django.conf import settings
-            base_dir = Path(settings.BASE_DIR)
-            output_dir = base_dir / "ingest" / "media" / "extracted_tables"
-        else:
-            output_dir = Path(output_dir)
-
-        # Ensure directory exists
-        output_dir.mkdir(parents=True, exist_ok=True)
-
-        # Generate unique filename
-        filename = f"{uuid.uuid4()}.png"
-        file_path = output_dir / filename
-
-        # Write PNG bytes
-        with open(file_path, 'wb') as f:
-            f.write(png_bytes)
+        return ImageStore(output_dir).save(png_bytes)
 
-        # Return relative path
-        relative_path = str(file_path.relative_to(Path(settings.BASE_DIR)))
-        logger.info(f"Saved PNG to {relative_path}")
-
-        return relative_path
-
-    def get_pdf_info(self, pdf_path: str) -> dict:
+    def get_pdf_info(self, pdf_path: PDFSource) -> dict:
         """
         Get basic PDF information
 
         Args:
-            pdf_path: Path to PDF file
+            pdf_path: Path to PDF file, PDF bytes / stream or open fitz.Document
 
         Returns:
             Dictionary with PDF metadata
         """
         try:
-            doc = fitz.open(pdf_path)
-            info = {
-                "page_count": doc.page_count,
-                "metadata": doc.metadata,
-            }
-            doc.close()
-            return info
+            with open_pdf(pdf_path) as doc:
+                return {
+                    "page_count": doc.page_count,
+                    "metadata": doc.metadata,
+                }
         except Exception as e:
             logger.error(f"Failed to get PDF info: {e}")
             return {"page_count": 0, "metadata": {}}
 
-    def extract_text(self, pdf_path: str) -> str:
+    def extract_text(self, pdf_path: PDFSource) -> str:
         """
         Extract all text from PDF.
 
         Args:
-            pdf_path: Path to PDF file
+            pdf_path: Path to PDF file, PDF bytes / stream or open fitz.Document
 
         Returns:
             Extracted text from all pages
@@ -141,16 +231,14 @@ class PDFProcessor:
             Exception: If text extraction fails
         """
         try:
-            doc = fitz.open(pdf_path)
-            text = ""
-            page_count = doc.page_count
-
-            for page_num in range(page_count):
-                page = doc.load_page(page_num)
-                text += page.get_text()
-                text += "\n\n"  # Page separator
-
-            doc.close()
+            with open_pdf(pdf_path) as doc:
+                text = ""
+                page_count = doc.page_count
+
+                for page_num in range(page_count):
+                    page = doc.load_page(page_num)
+                    text += page.get_text()
+                    text += "\n\n"  # Page separator
 
             logger.info(f"Extracted {len(text)} characters from {page_count} pages")
             return text.strip()
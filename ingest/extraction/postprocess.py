@@ -0,0 +1,103 @@
+"""
+Shared post-processing of extraction results.
+
+Both the Claude vision extractor and the text-layer parser return the same
+schema; aggregates and scale normalization are applied here.
+"""
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+def compute_aggregates(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compute aggregated fields from components:
+    - revenue = revenue_products_services + revenue_goods
+    - cogs = cogs_goods + cogs_materials
+    """
+    def safe_add(*values):
+        """Add values, treating None as 0, return None if all None"""
+        non_none = [v for v in values if v is not None]
+        return sum(non_none) if non_none else None
+
+    # Compute revenue (products + goods)
+    revenue_products = data.get("revenue_products_services")
+    revenue_goods = data.get("revenue_goods")
+    if revenue_products is not None or revenue_goods is not None:
+        data["revenue"] = safe_add(revenue_products, revenue_goods)
+
+    # Compute COGS (goods + materials)
+    cogs_goods = data.get("cogs_goods")
+    cogs_materials = data.get("cogs_materials")
+    if cogs_goods is not None or cogs_materials is not None:
+        data["cogs"] = safe_add(cogs_goods, cogs_materials)
+
+    return data
+
+
+def aggregate_mismatches(data: Dict[str, Any], tolerance: float = 0.005) -> List[str]:
+    """
+    Accounting identities the extracted values violate (checked before
+    compute_aggregates overwrites the totals):
+    - revenue = revenue_products_services + revenue_goods
+    - cogs = cogs_goods + cogs_materials
+    - total_assets ≈ equity + total_liabilities (accruals allowed, 5 %)
+    """
+    def differs(total, parts, tol):
+        if total is None or any(p is None for p in parts):
+            return False
+        return abs(total - sum(parts)) > max(1, abs(total) * tol)
+
+    issues = []
+    if differs(data.get("revenue"), [data.get("revenue_products_services"), data.get("revenue_goods")], tolerance):
+        issues.append("revenue")
+    if differs(data.get("cogs"), [data.get("cogs_goods"), data.get("cogs_materials")], tolerance):
+        issues.append("cogs")
+    if differs(data.get("total_assets"), [data.get("equity"), data.get("total_liabilities")], 0.05):
+        issues.append("total_assets")
+    return issues
+
+
+def convert_to_thousands(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert all numeric values from units to thousands
+    Dashboard expects all values in thousands
+    """
+    converted = {}
+    for key, value in data.items():
+        if value is not None and isinstance(value, (int, float)):
+            converted[key] = value / 1000.0
+        else:
+            converted[key] = value
+
+    logger.info("Converted units to thousands")
+    return converted
+
+
+def post_process_extraction(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Post-process extracted data:
+    1. Record violated accounting identities ("consistency_issues")
+    2. Compute aggregated fields (revenue, cogs, etc.)
+    3. Convert scale to thousands if needed
+    """
+    if not result.get("success"):
+        return result
+
+    data = result.get("extracted_data", {})
+    scale = result.get("scale", "thousands")
+
+    # 1. Identities as returned by the extractor
+    result["consistency_issues"] = aggregate_mismatches(data)
+
+    # 2. Compute aggregated fields
+    data = compute_aggregates(data)
+
+    # 3. Convert to thousands if in units
+    if scale == "units":
+        data = convert_to_thousands(data)
+        result["scale"] = "thousands"
+
+    result["extracted_data"] = data
+    return result
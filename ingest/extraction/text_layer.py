@@ -0,0 +1,225 @@
+"""
+Text-layer pre-pass for Czech financial statements.
+
+Most PDFs exported from accounting software carry a PyMuPDF text layer.
+Before any rendering or AI call we scan it with regexes to find the page
+with the statement and detect document type, year and scale.
+"""
+import logging
+import re
+import unicodedata
+from dataclasses import asdict, dataclass
+from datetime import date
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from .pdf_processor import PDFSource, open_pdf
+
+logger = logging.getLogger(__name__)
+
+# Markers are matched on lowercase text without diacritics: (pattern, weight)
+INCOME_MARKERS = [
+    (r"vykaz\s+zisku\s+a\s+ztraty", 5),
+    (r"vysledovka", 4),
+    (r"trzby\s+z\s+prodeje\s+vyrobku", 2),
+    (r"trzby\s+za\s+prodej\s+zbozi", 2),
+    (r"vykonova\s+spotreba", 2),
+    (r"naklady\s+vynalozene\s+na\s+prodane\s+zbozi", 1),
+    (r"osobni\s+naklady", 1),
+    (r"provozni\s+vysledek\s+hospodareni", 1),
+    (r"vysledek\s+hospodareni\s+za\s+ucetni\s+obdobi", 1),
+]
+
+BALANCE_MARKERS = [
+    (r"\brozvaha\b", 5),
+    (r"aktiva\s+celkem", 2),
+    (r"pasiva\s+celkem", 2),
+    (r"stala\s+aktiva", 2),
+    (r"obezna\s+aktiva", 2),
+    (r"vlastni\s+kapital", 1),
+    (r"cizi\s+zdroje", 1),
+    (r"dlouhodoby\s+hmotny\s+majetek", 1),
+]
+
+# Period end ("k 31.12.2023", "ke dni 31. 12. 2023", "do 31.12.2023")
+PERIOD_END_RE = re.compile(r"31\s*\.\s*12\s*\.\s*((?:19|20)\d{2})")
+# Fallback ("za rok 2023", "ucetni obdobi 2023", "obdobi: 2023")
+PERIOD_YEAR_RE = re.compile(r"(?:rok|obdobi)\s*:?\s*((?:19|20)\d{2})\b")
+
+THOUSANDS_RE = re.compile(r"v\s+(?:celych\s+)?tisic\w*|\btis\.?\s*kc\b|\(\s*tis\.?\s*\)")
+UNITS_RE = re.compile(r"v\s+(?:celych\s+)?(?:korunach|kc)\b")
+
+
+@dataclass
+class TextLayerHint:
+    """Result of the text-layer pre-pass."""
+    has_text: bool = False
+    page_num: int = 0
+    page_count: int = 0
+    doc_type: Optional[str] = None
+    year: Optional[int] = None
+    scale: Optional[str] = None
+    confidence: float = 0.0
+
+    @property
+    def is_confident(self) -> bool:
+        """Good enough to skip the AI classification."""
+        min_confidence = getattr(settings, "INGEST_TEXT_PREPASS_MIN_CONFIDENCE", 0.8)
+        return bool(self.doc_type and self.year and self.confidence >= min_confidence)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip diacritics and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", text.lower())
+
+
+def _score(text: str, markers) -> int:
+    return sum(weight for pattern, weight in markers if re.search(pattern, text))
+
+
+def detect_year(text: str) -> Optional[int]:
+    """Most frequent plausible period-end year on the page (current period wins ties)."""
+    max_year = date.today().year + 1
+    for regex in (PERIOD_END_RE, PERIOD_YEAR_RE):
+        years = [int(y) for y in regex.findall(text) if 1990 <= int(y) <= max_year]
+        if years:
+            return max(set(years), key=lambda y: (years.count(y), y))
+    return None
+
+
+def detect_scale(text: str) -> Optional[str]:
+    if THOUSANDS_RE.search(text):
+        return "thousands"
+    if UNITS_RE.search(text):
+        return "units"
+    return None
+
+
+def analyze_page_text(text: str) -> Dict:
+    """Score one page of text. Returns doc_type/year/scale candidates and scores."""
+    norm = normalize_text(text)
+    income = _score(norm, INCOME_MARKERS)
+    balance = _score(norm, BALANCE_MARKERS)
+
+    doc_type = None
+    if income > balance:
+        doc_type = "income_statement"
+    elif balance > income:
+        doc_type = "balance_sheet"
+
+    return {
+        "doc_type": doc_type,
+        "score": max(income, balance),
+        "margin": abs(income - balance),
+        "year": detect_year(norm),
+        "scale": detect_scale(norm),
+        "chars": len(norm.strip()),
+    }
+
+
+def page_texts(doc, max_pages: Optional[int] = None) -> List[str]:
+    """Text of the first max_pages pages of an open fitz document."""
+    count = doc.page_count if max_pages is None else min(doc.page_count, max_pages)
+    return [doc.load_page(i).get_text() for i in range(count)]
+
+
+def analyze_texts(texts: List[str]) -> TextLayerHint:
+    """Pick the statement page and build a hint from per-page texts."""
+    hint = TextLayerHint(page_count=len(texts))
+    pages = [analyze_page_text(t) for t in texts]
+    hint.has_text = any(p["chars"] > 50 for p in pages)
+    if not hint.has_text:
+        return hint
+
+    best_num, best = max(enumerate(pages), key=lambda item: (item[1]["score"], -item[0]))
+    if not best["doc_type"]:
+        return hint
+
+    hint.page_num = best_num
+    hint.doc_type = best["doc_type"]
+    # Year/scale are often printed only in the header page of a multi-page statement
+    hint.year = best["year"] or next((p["year"] for p in pages if p["year"]), None)
+    hint.scale = best["scale"] or next((p["scale"] for p in pages if p["scale"]), None)
+
+    hint.confidence = _confidence(best, hint.year, hint.scale)
+    return hint
+
+
+def find_statement_pages(texts: List[str]) -> List[TextLayerHint]:
+    """
+    Every statement page of a PDF (annual reports carry several statements / years).
+
+    A page with a statement heading starts a statement; a directly following page
+    of the same type without its own heading (e.g. "Pasiva") continues it and
+    inherits year and scale. Notes pages that merely mention the markers are skipped.
+    """
+    pages = [analyze_page_text(t) for t in texts]
+    hints: List[TextLayerHint] = []
+    for num, page in enumerate(pages):
+        if not page["doc_type"] or page["margin"] < 2:
+            continue
+        prev = hints[-1] if hints and hints[-1].page_num == num - 1 else None
+        continues = prev is not None and prev.doc_type == page["doc_type"] and page["score"] >= 3
+        if page["score"] < 5 and not continues:
+            continue
+
+        year = page["year"] or (prev.year if continues else None)
+        scale = page["scale"] or (prev.scale if continues else None)
+        hints.append(TextLayerHint(
+            has_text=True,
+            page_num=num,
+            page_count=len(texts),
+            doc_type=page["doc_type"],
+            year=year,
+            scale=scale,
+            confidence=_confidence(page, year, scale),
+        ))
+    return hints
+
+
+def _confidence(page: Dict, year: Optional[int], scale: Optional[str]) -> float:
+    confidence = 0.5
+    if page["score"] >= 5 and page["margin"] >= 3:
+        confidence += 0.3
+    elif page["margin"] >= 2:
+        confidence += 0.15
+    if year:
+        confidence += 0.15
+    if scale:
+        confidence += 0.05
+    return round(min(confidence, 0.95), 2)
+
+
+def detect_statement(pdf_path: PDFSource, max_pages: Optional[int] = None) -> TextLayerHint:
+    """
+    Run the text-layer pre-pass on a PDF file.
+
+    Args:
+        pdf_path: Path to PDF file, PDF bytes / stream or open fitz.Document
+        max_pages: Number of pages to scan (default INGEST_TEXT_PREPASS_MAX_PAGES)
+
+    Returns:
+        TextLayerHint (empty hint if the PDF has no usable text layer)
+    """
+    if not getattr(settings, "INGEST_TEXT_PREPASS_ENABLED", True):
+        return TextLayerHint()
+
+    max_pages = max_pages or getattr(settings, "INGEST_TEXT_PREPASS_MAX_PAGES", 10)
+    try:
+        with open_pdf(pdf_path) as doc:
+            hint = analyze_texts(page_texts(doc, max_pages))
+    except Exception as e:
+        logger.warning(f"Text-layer pre-pass failed: {e}")
+        return TextLayerHint()
+
+    logger.info(
+        f"Text-layer pre-pass: doc_type={hint.doc_type}, year={hint.year}, scale={hint.scale}, "
+        f"page={hint.page_num}, confidence={hint.confidence}"
+    )
+    return hint
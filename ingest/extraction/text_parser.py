@@ -0,0 +1,293 @@
+"""
+Deterministic parser for Czech financial statements with a text layer.
+
+Uses PyMuPDF span coordinates (page.get_text("dict")): rows are grouped by
+baseline, labels are mapped with the row mappings from utils/constants.py
+and values are taken from the "Běžné období" / "Netto" column. Produces the
+same result schema as FinancialExtractor, so Claude vision is only needed
+as a fallback when the parser's confidence is low.
+"""
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from ingest.utils.constants import (
+    BALANCE_SHEET_FIELDS,
+    BALANCE_SHEET_ROW_MAPPING,
+    INCOME_STATEMENT_FIELDS,
+    INCOME_STATEMENT_ROW_MAPPING,
+)
+from .pdf_processor import PDFSource, open_pdf
+from .postprocess import post_process_extraction
+from .text_layer import TextLayerHint, analyze_texts, normalize_text, page_texts
+
+logger = logging.getLogger(__name__)
+
+NUMBER_RE = re.compile(r"^[(\-−–]?\s*\d{1,3}(?:[  .]\d{3})*(?:,\d+)?\s*\)?$|^[(\-−–]?\d+(?:,\d+)?\)?$")
+CODE_RE = re.compile(r"^(?:[A-Z]{1,2}(?:\.[A-Z]{1,3})?\.?(?:\d{1,2}\.?)*|[IVX]+\.?(?:\d{1,2}\.?)*|\d{1,2}\.(?:\d{1,2}\.?)*|\*{1,3}|[A-Z]\.\+[A-Z]\.)$")
+
+# Fields that indicate the parser really understood the statement
+CORE_FIELDS = {
+    "income_statement": ["revenue_products_services", "cogs_materials", "cogs_services", "personnel_wages"],
+    "balance_sheet": ["total_assets", "equity", "receivables", "cash"],
+}
+
+
+def _normalize_mapping(mapping: Dict[str, str]) -> List[Tuple[str, str, int]]:
+    """[(normalized label, field, priority)] – earlier keys win for the same field."""
+    order: Dict[str, int] = {}
+    items = []
+    for label, field in mapping.items():
+        order[field] = order.get(field, -1) + 1
+        items.append((normalize_text(label).strip(), field, order[field]))
+    return items
+
+
+ROW_MAPPINGS = {
+    "income_statement": _normalize_mapping(INCOME_STATEMENT_ROW_MAPPING),
+    "balance_sheet": _normalize_mapping(BALANCE_SHEET_ROW_MAPPING),
+}
+
+
+def parse_number(text: str) -> Optional[float]:
+    """'12 500' → 12500, '(1 200)' / '-1 200' → -1200, '1 234,5' → 1234.5"""
+    raw = (text or "").strip()
+    if not raw or not NUMBER_RE.match(raw):
+        return None
+    negative = raw.startswith(("(", "-", "−", "–"))
+    digits = re.sub(r"[()\-−–  .\s]", "", raw).replace(",", ".")
+    try:
+        value = float(digits)
+    except ValueError:
+        return None
+    if value.is_integer():
+        value = int(value)
+    return -value if negative else value
+
+
+class TextStatementParser:
+    """Parses statement tables from the PDF text layer"""
+
+    def __init__(self, row_tolerance: float = 3.0):
+        self.row_tolerance = row_tolerance
+
+    @property
+    def min_confidence(self) -> float:
+        return getattr(settings, "INGEST_TEXT_PARSER_MIN_CONFIDENCE", 0.85)
+
+    def is_confident(self, result: Dict[str, Any]) -> bool:
+        return bool(result.get("success")) and result.get("confidence", 0.0) >= self.min_confidence
+
+    def parse(self, pdf_path: PDFSource, hint: Optional[TextLayerHint] = None) -> Dict[str, Any]:
+        """
+        Parse the statement page of a PDF.
+
+        Args:
+            pdf_path: Path to PDF file, PDF bytes / stream or open fitz.Document
+            hint: Result of the text-layer pre-pass (computed if None)
+
+        Returns:
+            Same schema as FinancialExtractor.extract_from_png plus "source": "text_parser"
+        """
+        try:
+            with open_pdf(pdf_path) as doc:
+                if hint is None:
+                    hint = analyze_texts(page_texts(doc, getattr(settings, "INGEST_TEXT_PREPASS_MAX_PAGES", 10)))
+                if not hint.has_text or not hint.doc_type:
+                    return {"success": False, "error": "No usable text layer", "confidence": 0.0}
+                return self.parse_page(doc.load_page(hint.page_num), hint)
+        except Exception as e:
+            logger.warning(f"Text-layer parsing failed: {e}")
+            return {"success": False, "error": str(e), "confidence": 0.0}
+
+    def parse_page(self, page, hint: TextLayerHint, clip=None) -> Dict[str, Any]:
+        """Parse one page; clip restricts parsing to a region (fitz.Rect)."""
+        doc_type = hint.doc_type
+        rows = self._group_rows(self._spans(page, clip))
+        columns = self._find_columns(rows, hint.year)
+        current_x = columns.get("current")
+
+        fields = INCOME_STATEMENT_FIELDS if doc_type == "income_statement" else BALANCE_SHEET_FIELDS
+        data: Dict[str, Any] = {field: None for field in fields}
+        chosen: Dict[str, Tuple[int, int]] = {}
+        checks: Dict[str, Any] = {}
+
+        for row in rows:
+            label, numbers = self._split_row(row, columns)
+            if not label or not numbers:
+                continue
+
+            value = self._current_value(numbers, columns) if current_x is not None else self._fallback_value(numbers)
+            if value is None:
+                continue
+
+            if label.startswith("pasiva celkem"):
+                checks["total_liabilities_equity"] = value
+
+            match = self._match_field(label, doc_type)
+            if match is None:
+                continue
+            field, rank = match
+            if field not in chosen or rank < chosen[field]:
+                chosen[field] = rank
+                data[field] = value
+
+        found = [f for f in fields if data.get(f) is not None]
+        core = CORE_FIELDS.get(doc_type, [])
+        coverage = sum(1 for f in core if data.get(f) is not None) / len(core) if core else 0.0
+
+        confidence = (0.45 + 0.5 * coverage) if current_x is not None else (0.35 + 0.4 * coverage)
+        if len(found) < 3:
+            confidence = min(confidence, 0.5)
+        if not hint.year:
+            confidence -= 0.2
+        # No unit marker: a missed "v tis. Kč" would be off by 1000×, let vision confirm
+        if not hint.scale:
+            confidence -= 0.2
+        total_assets = data.get("total_assets")
+        if total_assets is not None and "total_liabilities_equity" in checks:
+            if abs(total_assets - checks["total_liabilities_equity"]) > 1:
+                confidence -= 0.2
+
+        result = {
+            "success": bool(found),
+            "doc_type": doc_type,
+            "year": hint.year,
+            "scale": hint.scale or "thousands",
+            "extracted_data": data,
+            "confidence": round(max(confidence, 0.0), 2),
+            "source": "text_parser",
+        }
+        if not found:
+            result["error"] = "Text-layer parser found no known rows"
+            return result
+
+        logger.info(
+            f"Text-layer parser: {doc_type} {hint.year}, {len(found)} fields, "
+            f"confidence={result['confidence']}, column={'header' if current_x is not None else 'fallback'}"
+        )
+        return post_process_extraction(result)
+
+    # ------------------------------------------------------------------
+    # Layout helpers
+    # ------------------------------------------------------------------
+    def _spans(self, page, clip=None) -> List[Dict[str, Any]]:
+        spans = []
+        for block in page.get_text("dict", clip=clip).get("blocks", []):
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    text = span.get("text", "").strip()
+                    if not text:
+                        continue
+                    x0, y0, x1, y1 = span["bbox"]
+                    spans.append({"text": text, "x0": x0, "x1": x1, "y": (y0 + y1) / 2, "xc": (x0 + x1) / 2})
+        return spans
+
+    def _group_rows(self, spans: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        rows: List[List[Dict[str, Any]]] = []
+        for span in sorted(spans, key=lambda s: (s["y"], s["x0"])):
+            if rows and abs(rows[-1][0]["y"] - span["y"]) <= self.row_tolerance:
+                rows[-1].append(span)
+            else:
+                rows.append([span])
+        return [self._merge_numbers(sorted(row, key=lambda s: s["x0"])) for row in rows]
+
+    @staticmethod
+    def _merge_numbers(row: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Join thousand groups split into separate spans ("12" "500")."""
+        merged: List[Dict[str, Any]] = []
+        for span in row:
+            prev = merged[-1] if merged else None
+            if (
+                prev is not None
+                and span["x0"] - prev["x1"] < 4
+                and re.fullmatch(r"\d{3}\)?", span["text"])
+                and parse_number(prev["text"]) is not None
+            ):
+                text = f"{prev['text']} {span['text']}"
+                merged[-1] = {**prev, "text": text, "x1": span["x1"], "xc": (prev["x0"] + span["x1"]) / 2}
+            else:
+                merged.append(dict(span))
+        return merged
+
+    def _find_columns(self, rows, year: Optional[int]) -> Dict[str, float]:
+        """x-centres of value columns from the table header."""
+        columns: Dict[str, float] = {}
+        for row in rows[:40]:
+            for span in row:
+                text = normalize_text(span["text"]).strip()
+                if "minul" in text:
+                    columns.setdefault("previous", span["xc"])
+                elif text.startswith("netto") or text == "netto":
+                    columns.setdefault("netto", span["xc"])
+                elif "bezn" in text:
+                    columns.setdefault("bezne", span["xc"])
+                elif text.startswith("brutto"):
+                    columns.setdefault("brutto", span["xc"])
+                elif text.startswith("korekce"):
+                    columns.setdefault("korekce", span["xc"])
+                elif "radk" in text or text in ("c. r.", "c.r.", "radek"):
+                    columns.setdefault("row_no", span["xc"])
+                elif year and text == str(year):
+                    columns.setdefault("year_current", span["xc"])
+                elif year and text == str(year - 1):
+                    columns.setdefault("year_previous", span["xc"])
+
+        # Balance sheet: Brutto | Korekce | Netto (běžné) | Netto (minulé)
+        current = columns.get("netto") or columns.get("bezne") or columns.get("year_current")
+        if current is not None:
+            columns["current"] = current
+        if "previous" not in columns and "year_previous" in columns:
+            columns["previous"] = columns["year_previous"]
+        return columns
+
+    def _split_row(self, row, columns) -> Tuple[str, List[Dict[str, Any]]]:
+        label_parts, numbers = [], []
+        first_value_x = min(
+            (columns[k] for k in ("current", "previous", "brutto", "row_no") if k in columns),
+            default=None,
+        )
+        for span in row:
+            value = parse_number(span["text"])
+            left_of_values = first_value_x is not None and span["x1"] < first_value_x - 20
+            if value is not None and not left_of_values:
+                numbers.append({**span, "value": value})
+            elif not CODE_RE.match(span["text"]):
+                label_parts.append(span["text"])
+        label = normalize_text(" ".join(label_parts)).strip(" .:")
+        return label, numbers
+
+    @staticmethod
+    def _current_value(numbers, columns) -> Optional[float]:
+        targets = {k: columns[k] for k in ("current", "previous", "brutto", "korekce", "row_no") if k in columns}
+        for num in numbers:
+            nearest = min(targets, key=lambda k: abs(targets[k] - num["xc"]))
+            if nearest == "current":
+                return num["value"]
+        return None
+
+    @staticmethod
+    def _fallback_value(numbers) -> Optional[float]:
+        """No header: first value column is the current period (skip a row number)."""
+        values = [n for n in numbers]
+        if len(values) >= 3 and isinstance(values[0]["value"], int) and 0 < values[0]["value"] < 1000 \
+                and " " not in values[0]["text"]:
+            values = values[1:]
+        return values[0]["value"] if values else None
+
+    @staticmethod
+    def _match_field(label: str, doc_type: str) -> Optional[Tuple[str, Tuple[int, int]]]:
+        """Exact label match beats prefix match; earlier mapping keys beat later ones."""
+        best = None
+        for key, field, order in ROW_MAPPINGS.get(doc_type, []):
+            if label == key:
+                rank = (0, order)
+            elif label.startswith(key + " ") or label.startswith(key + ","):
+                rank = (1, order)
+            else:
+                continue
+            if best is None or rank < best[1]:
+                best = (field, rank)
+        return best
@@ -0,0 +1,137 @@
+"""
+Adaptive DPI escalation for vision extraction.
+
+Pages are rendered at the lowest DPI tier first; a higher tier is only
+rendered and sent to the model when the result's confidence is below
+INGEST_VISION_TIER_MIN_CONFIDENCE or its accounting identities don't add up
+(see postprocess.aggregate_mismatches). Outcomes are counted per tier in
+VisionTierStat so the thresholds can be tuned on real traffic.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db.models import F
+
+from .image_prep import ImagePreparer, PreparedImage
+from .limits import vision_slot
+from .pdf_processor import PDFSource, open_pdf
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DPI_TIERS = (120, 200, 300)
+
+
+def dpi_tiers() -> List[int]:
+    """INGEST_VISION_DPI_TIERS as a sorted list (accepts "120,200,300" or a sequence)."""
+    raw = getattr(settings, "INGEST_VISION_DPI_TIERS", DEFAULT_DPI_TIERS)
+    if isinstance(raw, str):
+        raw = [part for part in raw.split(",") if part.strip()]
+    tiers = sorted({int(dpi) for dpi in raw})
+    return tiers or list(DEFAULT_DPI_TIERS)
+
+
+def record_tier_outcome(dpi: int, outcome: str, confidence: float = 0.0, payload_bytes: int = 0) -> None:
+    """
+    Count one extraction attempt of a tier.
+
+    outcome: "accepted" | "low_confidence" | "inconsistent" | "failed"
+    """
+    from ingest.models import VisionTierStat
+
+    try:
+        VisionTierStat.objects.get_or_create(dpi=dpi)
+        VisionTierStat.objects.filter(dpi=dpi).update(**{
+            "attempts": F("attempts") + 1,
+            outcome: F(outcome) + 1,
+            "confidence_sum": F("confidence_sum") + confidence,
+            "payload_bytes": F("payload_bytes") + payload_bytes,
+        })
+    except Exception as e:
+        logger.warning(f"Recording vision tier stats failed: {e}")
+
+
+class TieredVisionExtractor:
+    """Runs FinancialExtractor on increasing render DPIs until the result is trustworthy"""
+
+    def __init__(
+        self,
+        extractor,
+        preparer: Optional[ImagePreparer] = None,
+        tiers: Optional[Sequence[int]] = None,
+        min_confidence: Optional[float] = None,
+    ):
+        self.extractor = extractor
+        self.preparer = preparer or ImagePreparer()
+        self.tiers = sorted(tiers) if tiers else dpi_tiers()
+        self.min_confidence = (
+            min_confidence if min_confidence is not None
+            else getattr(settings, "INGEST_VISION_TIER_MIN_CONFIDENCE", 0.85)
+        )
+
+    @property
+    def signature(self) -> str:
+        """Image settings + tier ladder (part of the extraction cache key)."""
+        return f"{self.preparer.signature}-tiers{'/'.join(str(dpi) for dpi in self.tiers)}"
+
+    def evaluate(self, result: Dict[str, Any]) -> str:
+        """Classify an extraction result: accepted / low_confidence / inconsistent / failed."""
+        if not result.get("success"):
+            return "failed"
+        if (result.get("confidence") or 0.0) < self.min_confidence:
+            return "low_confidence"
+        if result.get("consistency_issues"):
+            return "inconsistent"
+        return "accepted"
+
+    def extract(
+        self,
+        pdf_path: PDFSource,
+        page_num: int = 0,
+        first_image: Optional[PreparedImage] = None,
+    ) -> Tuple[Dict[str, Any], Optional[PreparedImage]]:
+        """
+        Extract one page, escalating the DPI only when needed.
+
+        first_image: page already rendered at the lowest tier (see fanout.render_pages)
+
+        Returns:
+            (extraction_result, prepared image of the returned tier) – the result carries
+            "render_dpi" and "tiers_tried"; if no tier is accepted the best one is returned
+        """
+        best: Optional[Tuple[Tuple[int, float], Dict[str, Any], PreparedImage]] = None
+
+        with open_pdf(pdf_path) as doc:
+            if page_num >= doc.page_count:
+                logger.warning(f"Page {page_num} not found, using page 0")
+                page_num = 0
+            page = doc.load_page(page_num)
+
+            for tried, dpi in enumerate(self.tiers, start=1):
+                if tried == 1 and first_image is not None:
+                    prepared = first_image
+                else:
+                    prepared = self.preparer.render_page(page, dpi=dpi)
+                with vision_slot():
+                    result = self.extractor.extract_from_png(prepared.data, media_type=prepared.media_type)
+
+                outcome = self.evaluate(result)
+                confidence = result.get("confidence") or 0.0
+                record_tier_outcome(dpi, outcome, confidence, len(prepared.data))
+                result.update({"render_dpi": dpi, "tiers_tried": tried})
+
+                rank = ({"accepted": 3, "inconsistent": 2, "low_confidence": 1}.get(outcome, 0), confidence)
+                if best is None or rank > best[0]:
+                    best = (rank, result, prepared)
+
+                if outcome == "accepted":
+                    logger.info(f"Vision tier {dpi} dpi accepted (confidence={confidence})")
+                    break
+                if outcome == "failed":
+                    # API / parsing errors are not a resolution problem
+                    break
+                logger.info(f"Vision tier {dpi} dpi {outcome} (confidence={confidence}), escalating")
+
+        if best is None:
+            return {"success": False, "error": "No DPI tiers configured"}, None
+        return best[1], best[2]
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.rate_limit import PRIORITIES, provider_limits, rate_limit_enabled, rate_limiter
+from ingest.models import AIRateBucket, AIRateStat
+
+
+class Command(BaseCommand):
+    help = (
+        "Budgets, queue depth and wait times of the cluster-wide AI rate limiter. "
+        "--reset refills all buckets and clears the queue and counters."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Refill buckets, drop queue and statistics.")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            rate_limiter.reset()
+            self.stdout.write(self.style.SUCCESS("Rate limiter reset."))
+            return
+
+        if not rate_limit_enabled():
+            self.stdout.write(self.style.WARNING("AI_RATE_LIMIT_ENABLED is off, calls are not limited."))
+
+        now = timezone.now()
+        depth = rate_limiter.queue_depth()
+        self.stdout.write(f"{'provider':<10} {'tokens':>17} {'requests':>13} {'queued':>26}")
+        for bucket in AIRateBucket.objects.order_by("provider"):
+            limits = provider_limits(bucket.provider)
+            tpm, rpm = limits["tokens_per_minute"], limits["requests_per_minute"]
+            elapsed = max(0.0, (now - bucket.updated_at).total_seconds())
+            tokens = min(tpm, bucket.tokens + elapsed * tpm / 60)
+            requests = min(rpm, bucket.requests + elapsed * rpm / 60)
+            queued = " ".join(f"{p[:5]}={depth.get(bucket.provider, {}).get(p, 0)}" for p in PRIORITIES)
+            self.stdout.write(
+                f"{bucket.provider:<10} {tokens:>8.0f}/{tpm:<8.0f} {requests:>6.0f}/{rpm:<6.0f} {queued:>26}"
+            )
+
+        stats = list(AIRateStat.objects.all())
+        if not stats:
+            self.stdout.write("No calls recorded yet.")
+            return
+
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'provider':<10} {'priority':<12} {'calls':>7} {'waited':>7} {'timeout':>8} "
+            f"{'avg wait':>9} {'max wait':>9} {'tokens':>10}"
+        )
+        for stat in stats:
+            self.stdout.write(
+                f"{stat.provider:<10} {stat.priority:<12} {stat.calls:>7} {stat.waited:>7} {stat.timed_out:>8} "
+                f"{stat.avg_wait_seconds:>8.2f}s {stat.max_wait_seconds:>8.2f}s {stat.tokens:>10}"
+            )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from ingest.models import FinancialStatement
+from ingest.services.metrics_service import refresh_user_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the materialized StatementMetrics of financial statements. "
+        "By default only statements without metrics are processed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Recompute metrics of every statement.")
+        parser.add_argument("--user", type=int, default=None, help="Only statements of this user id.")
+        parser.add_argument("--batch-size", type=int, default=500, help="Statements per transaction.")
+
+    def handle(self, *args, **options):
+        statements = FinancialStatement.objects.order_by("user_id", "year")
+        if options["user"] is not None:
+            statements = statements.filter(user_id=options["user"])
+        if not options["all"]:
+            statements = statements.filter(metrics__isnull=True)
+
+        ids = list(statements.values_list("pk", flat=True))
+        batch_size = max(1, options["batch_size"])
+        done = 0
+        for start in range(0, len(ids), batch_size):
+            done += refresh_user_metrics(
+                FinancialStatement.objects.filter(pk__in=ids[start:start + batch_size])
+            )
+            self.stdout.write(f"{done}/{len(ids)} statements")
+
+        self.stdout.write(self.style.SUCCESS(f"Metrics refreshed for {done} statements."))
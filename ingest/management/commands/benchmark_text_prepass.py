@@ -0,0 +1,89 @@
+import statistics
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ingest.extraction.claude_extractor import FinancialExtractor
+from ingest.extraction.pdf_processor import PDFProcessor
+from ingest.extraction.text_layer import detect_statement
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the text-layer pre-pass against the render + vision path used by the upload "
+        "duplicate check. Accepts PDF files or directories."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="PDF files or directories with PDFs.")
+        parser.add_argument("--runs", type=int, default=3, help="Repetitions per file (median is reported).")
+        parser.add_argument("--dpi", type=int, default=300, help="Render DPI of the vision path.")
+        parser.add_argument(
+            "--with-vision",
+            action="store_true",
+            help="Also call the Claude vision API once per file (costs tokens).",
+        )
+        parser.add_argument(
+            "--vision-seconds",
+            type=float,
+            default=8.0,
+            help="Assumed vision call latency when --with-vision is not used.",
+        )
+
+    def handle(self, *args, **options):
+        files = []
+        for raw in options["paths"]:
+            path = Path(raw)
+            if path.is_dir():
+                files.extend(sorted(path.glob("**/*.pdf")))
+            elif path.exists():
+                files.append(path)
+        if not files:
+            raise CommandError("No PDF files found.")
+
+        processor = PDFProcessor(dpi=options["dpi"])
+        extractor = FinancialExtractor() if options["with_vision"] else None
+        runs = max(1, options["runs"])
+
+        saved_total = 0.0
+        confident = 0
+        self.stdout.write(f"{'file':40} {'prepass':>9} {'render':>9} {'vision':>9} {'saved':>9}  hint")
+
+        for pdf in files:
+            prepass_ms = statistics.median(self._timed(lambda: detect_statement(str(pdf)))[0] for _ in range(runs))
+            hint = detect_statement(str(pdf))
+            render_ms = statistics.median(
+                self._timed(lambda: processor.pdf_to_vision_image(str(pdf), page_num=hint.page_num))[0] for _ in range(runs)
+            )
+
+            if extractor is not None:
+                image = processor.pdf_to_vision_image(str(pdf), page_num=hint.page_num)
+                vision_ms, _ = self._timed(lambda: extractor.extract_from_png(image.data, media_type=image.media_type))
+            else:
+                vision_ms = options["vision_seconds"] * 1000
+
+            # Confident pre-pass replaces render + vision call in the duplicate check
+            if hint.is_confident:
+                confident += 1
+                saved_ms = render_ms + vision_ms - prepass_ms
+            else:
+                saved_ms = -prepass_ms
+            saved_total += saved_ms
+
+            self.stdout.write(
+                f"{pdf.name[:40]:40} {prepass_ms:8.1f}ms {render_ms:8.1f}ms {vision_ms:8.0f}ms {saved_ms:8.0f}ms  "
+                f"{hint.doc_type or '-'} {hint.year or '-'} {hint.scale or '-'} p{hint.page_num} ({hint.confidence})"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{confident}/{len(files)} files resolved from the text layer, "
+            f"average saved per upload: {saved_total / len(files):.0f} ms"
+            + ("" if extractor else f" (vision latency assumed {options['vision_seconds']}s)")
+        ))
+
+    @staticmethod
+    def _timed(func):
+        start = time.perf_counter()
+        value = func()
+        return (time.perf_counter() - start) * 1000, value
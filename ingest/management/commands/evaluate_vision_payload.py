@@ -0,0 +1,124 @@
+import json
+from pathlib import Path
+
+import fitz
+from django.core.management.base import BaseCommand, CommandError
+
+from ingest.extraction.claude_extractor import FinancialExtractor
+from ingest.extraction.image_prep import ImagePreparer
+from ingest.extraction.pdf_processor import PDFProcessor
+from ingest.extraction.text_layer import analyze_texts, page_texts
+from ingest.extraction.text_parser import TextStatementParser
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that the optimized vision payload (crop + grayscale + downscale) does not regress "
+        "extraction accuracy on a fixture corpus. Expected values are read from <name>.json next to "
+        "each PDF ({doc_type, year, extracted_data}) or taken from a confident text-layer parse."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("corpus", help="Directory with fixture PDFs.")
+        parser.add_argument("--dpi", type=int, default=300, help="DPI of the legacy full-page render.")
+        parser.add_argument("--tolerance", type=float, default=0.005, help="Relative tolerance per value.")
+        parser.add_argument(
+            "--max-regression",
+            type=float,
+            default=0.0,
+            help="Allowed accuracy drop of the optimized payload (0.01 = 1 percentage point).",
+        )
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="No API calls: verify with the text-layer parser that the crop keeps every table row.",
+        )
+
+    def handle(self, *args, **options):
+        corpus = Path(options["corpus"])
+        pdfs = sorted(corpus.glob("**/*.pdf"))
+        if not pdfs:
+            raise CommandError(f"No PDFs in {corpus}")
+
+        processor = PDFProcessor(dpi=options["dpi"])
+        preparer = ImagePreparer()
+        text_parser = TextStatementParser()
+        extractor = None if options["offline"] else FinancialExtractor()
+
+        totals = {"baseline": [0, 0], "optimized": [0, 0], "bytes": [0, 0], "tokens": [0, 0]}
+        self.stdout.write(f"{'file':36} {'baseline':>9} {'optimized':>9} {'bytes':>19} {'tokens':>11}")
+
+        for pdf in pdfs:
+            expected = self._expected(pdf, text_parser)
+            if expected is None:
+                self.stdout.write(self.style.WARNING(f"{pdf.name}: no expected values, skipped"))
+                continue
+
+            with fitz.open(str(pdf)) as doc:
+                hint = analyze_texts(page_texts(doc, 10))
+                page = doc.load_page(hint.page_num)
+                prepared = preparer.render_page(page, dpi=options["dpi"], measure_baseline=True)
+
+                if extractor is None:
+                    baseline = text_parser.parse_page(page, hint)
+                    optimized = text_parser.parse_page(page, hint, clip=preparer.table_rect(page))
+                else:
+                    full_png = processor.pdf_to_png(str(pdf), page_num=hint.page_num)
+                    baseline = extractor.extract_from_png(full_png)
+                    optimized = extractor.extract_from_png(prepared.data, media_type=prepared.media_type)
+
+            base_ok, base_total = self._score(baseline, expected, options["tolerance"])
+            opt_ok, opt_total = self._score(optimized, expected, options["tolerance"])
+            totals["baseline"][0] += base_ok
+            totals["baseline"][1] += base_total
+            totals["optimized"][0] += opt_ok
+            totals["optimized"][1] += opt_total
+            totals["bytes"][0] += prepared.original_bytes
+            totals["bytes"][1] += len(prepared.data)
+            totals["tokens"][0] += prepared.original_tokens
+            totals["tokens"][1] += prepared.tokens
+
+            self.stdout.write(
+                f"{pdf.name[:36]:36} {base_ok:>4}/{base_total:<4} {opt_ok:>4}/{opt_total:<4} "
+                f"{prepared.original_bytes:>9}→{len(prepared.data):<9} "
+                f"{prepared.original_tokens:>5}→{prepared.tokens:<5}"
+            )
+
+        base_acc = self._ratio(*totals["baseline"])
+        opt_acc = self._ratio(*totals["optimized"])
+        original_bytes, optimized_bytes = totals["bytes"]
+        original_tokens, optimized_tokens = totals["tokens"]
+
+        self.stdout.write(
+            f"Accuracy: baseline {base_acc:.1%}, optimized {opt_acc:.1%}. "
+            f"Payload: {original_bytes} → {optimized_bytes} B "
+            f"({1 - optimized_bytes / max(original_bytes, 1):.0%} smaller), "
+            f"tokens {original_tokens} → {optimized_tokens}."
+        )
+
+        if opt_acc < base_acc - options["max_regression"]:
+            raise CommandError("Optimized payload regresses extraction accuracy.")
+        self.stdout.write(self.style.SUCCESS("No accuracy regression."))
+
+    def _expected(self, pdf: Path, text_parser: TextStatementParser):
+        expected_file = pdf.with_suffix(".json")
+        if expected_file.exists():
+            return json.loads(expected_file.read_text(encoding="utf-8"))
+        parsed = text_parser.parse(str(pdf))
+        return parsed if text_parser.is_confident(parsed) else None
+
+    @staticmethod
+    def _score(result, expected, tolerance):
+        """(correct, total) over doc_type, year and every non-null expected value."""
+        got = (result or {}).get("extracted_data") or {}
+        checks = [result.get("doc_type") == expected.get("doc_type"), result.get("year") == expected.get("year")]
+        for key, value in (expected.get("extracted_data") or {}).items():
+            if value is None:
+                continue
+            actual = got.get(key)
+            checks.append(actual is not None and abs(actual - value) <= abs(value) * tolerance + 1e-9)
+        return sum(checks), len(checks)
+
+    @staticmethod
+    def _ratio(ok, total):
+        return ok / total if total else 0.0
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from ingest.extraction.cache import extraction_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Inspect and maintain the AI extraction cache. "
+        "Without options prints statistics; --evict applies TTL/LRU limits, --clear drops everything."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--evict", action="store_true", help="Drop expired and least recently used entries.")
+        parser.add_argument("--clear", action="store_true", help="Drop all cache entries.")
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            deleted = extraction_cache.clear()
+            self.stdout.write(self.style.SUCCESS(f"Cleared {deleted} cache entries."))
+        elif options["evict"]:
+            deleted = extraction_cache.evict()
+            self.stdout.write(self.style.SUCCESS(f"Evicted {deleted} cache entries."))
+
+        stats = extraction_cache.stats()
+        self.stdout.write(
+            f"Entries: {stats['entries']}/{stats['max_entries']} (TTL {stats['ttl_days']} days), "
+            f"stored hits: {stats['stored_hits']}"
+        )
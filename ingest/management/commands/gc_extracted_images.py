@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from ingest.extraction.image_store import ImageStore, retention_days
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove extracted table images no longer referenced by any FinancialStatement. "
+        "Unreferenced images younger than the retention period are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-days",
+            type=int,
+            default=None,
+            help="Keep unreferenced images younger than N days (default INGEST_IMAGE_RETENTION_DAYS).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed.")
+        parser.add_argument(
+            "--adopt-legacy",
+            action="store_true",
+            help="Move referenced uuid-named images into the hashed layout (duplicates collapse).",
+        )
+
+    def handle(self, *args, **options):
+        store = ImageStore()
+        retention = options["retention_days"]
+        retention = retention_days() if retention is None else retention
+
+        report = store.collect_garbage(
+            retention=retention,
+            dry_run=options["dry_run"],
+            adopt=options["adopt_legacy"],
+        )
+
+        prefix = "[dry run] " if options["dry_run"] else ""
+        self.stdout.write(f"Store: {store.root} (retention {retention} days)")
+        self.stdout.write(f"Before: {report.before.files} files, {report.before.megabytes:.2f} MB")
+        if options["adopt_legacy"]:
+            self.stdout.write(f"{prefix}Adopted {report.adopted} legacy images")
+        self.stdout.write(
+            f"Kept: {report.kept_referenced} referenced, {report.kept_recent} within retention"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Removed {len(report.removed)} files ({report.removed_bytes / 1024 / 1024:.2f} MB)"
+        ))
+        self.stdout.write(f"After: {report.after.files} files, {report.after.megabytes:.2f} MB")
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from finance.schema import SCHEMA_VERSION, canonical_balance, canonical_income
+from ingest.models import FinancialStatement
+from ingest.services.metrics_service import refresh_user_metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite FinancialStatement.income/balance to the canonical schema "
+        f"(version {SCHEMA_VERSION}) in batches. Already normalized rows are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Statements per transaction.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count statements that would change.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        dry_run = options["dry_run"]
+        last_pk = 0
+        scanned = changed = 0
+
+        while True:
+            batch = list(
+                FinancialStatement.objects.filter(pk__gt=last_pk).order_by("pk")[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            dirty = []
+            for fs in batch:
+                income = canonical_income(fs.income) if fs.income else fs.income
+                balance = canonical_balance(fs.balance) if fs.balance else fs.balance
+                if income != fs.income or balance != fs.balance:
+                    fs.income, fs.balance = income, balance
+                    dirty.append(fs)
+            changed += len(dirty)
+
+            if dirty and not dry_run:
+                with transaction.atomic():
+                    FinancialStatement.objects.bulk_update(dirty, ["income", "balance"])
+                    # bulk_update skips signals, keep the materialized metrics in sync
+                    refresh_user_metrics(dirty)
+            self.stdout.write(f"{scanned} scanned, {changed} {'to normalize' if dry_run else 'normalized'}")
+
+        prefix = "[dry run] " if dry_run else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{changed} of {scanned} statements rewritten to schema version {SCHEMA_VERSION}."
+        ))
@@ -0,0 +1,18 @@
+from app.job_queue import WorkerCommand
+from ingest.services.job_service import IngestJobService
+
+
+class Command(WorkerCommand):
+    help = (
+        "Process queued ingest jobs (uploaded PDFs) in the background. "
+        "Set INGEST_JOBS_INLINE = False when running this worker instead of the in-process thread."
+    )
+    service_class = IngestJobService
+    name = "ingest"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--concurrency", type=int, default=None, help="Worker threads (default INGEST_VISION_CONCURRENCY).")
+
+    def drain(self, service, options):
+        return service.drain(options["concurrency"])
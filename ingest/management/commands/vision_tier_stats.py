@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from ingest.extraction.tiers import dpi_tiers
+from ingest.models import VisionTierStat
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-DPI-tier hit rates of the adaptive vision extraction. "
+        "A tier with a low hit rate mostly costs an extra render + AI call; --reset starts a new sample."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Delete all collected tier statistics.")
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            deleted = VisionTierStat.objects.all().delete()[0]
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} tier rows."))
+            return
+
+        stats = list(VisionTierStat.objects.all())
+        if not stats:
+            self.stdout.write(f"No tier statistics yet (configured tiers: {dpi_tiers()}).")
+            return
+
+        documents = stats[0].attempts
+        self.stdout.write(
+            f"{'dpi':>5} {'attempts':>9} {'accepted':>9} {'hit rate':>9} {'low conf':>9} "
+            f"{'inconsist':>9} {'failed':>7} {'avg conf':>9} {'avg KB':>7}"
+        )
+        for stat in stats:
+            avg_kb = stat.payload_bytes / stat.attempts / 1024 if stat.attempts else 0
+            self.stdout.write(
+                f"{stat.dpi:>5} {stat.attempts:>9} {stat.accepted:>9} {stat.hit_rate:>9.0%} "
+                f"{stat.low_confidence:>9} {stat.inconsistent:>9} {stat.failed:>7} "
+                f"{stat.avg_confidence:>9.2f} {avg_kb:>7.0f}"
+            )
+
+        calls = sum(stat.attempts for stat in stats)
+        self.stdout.write(self.style.SUCCESS(
+            f"Configured tiers: {dpi_tiers()}. "
+            f"{calls} vision calls for ~{documents} pages ({calls / max(documents, 1):.2f} calls per page)."
+        ))
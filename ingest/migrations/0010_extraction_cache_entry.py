@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingest', '0009_document_rag_error_message_document_rag_processed_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractionCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('pdf_sha256', models.CharField(db_index=True, max_length=64)),
+                ('page', models.CharField(max_length=32)),
+                ('dpi', models.IntegerField()),
+                ('model', models.CharField(max_length=100)),
+                ('prompt_version', models.CharField(max_length=32)),
+                ('result', models.JSONField()),
+                ('image_path', models.CharField(blank=True, max_length=500)),
+                ('hit_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
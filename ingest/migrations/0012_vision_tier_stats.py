@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingest', '0011_ingest_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VisionTierStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dpi', models.IntegerField(unique=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('accepted', models.IntegerField(default=0)),
+                ('low_confidence', models.IntegerField(default=0)),
+                ('inconsistent', models.IntegerField(default=0)),
+                ('failed', models.IntegerField(default=0)),
+                ('confidence_sum', models.FloatField(default=0.0)),
+                ('payload_bytes', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['dpi'],
+            },
+        ),
+    ]
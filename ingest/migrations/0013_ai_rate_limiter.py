@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:13
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingest', '0012_vision_tier_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AIRateBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=32, unique=True)),
+                ('tokens', models.FloatField(default=0.0)),
+                ('requests', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AIRateStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=32)),
+                ('priority', models.CharField(choices=[('interactive', 'Interactive'), ('ingest', 'Ingest'), ('batch', 'Batch')], max_length=16)),
+                ('calls', models.IntegerField(default=0)),
+                ('waited', models.IntegerField(default=0)),
+                ('timed_out', models.IntegerField(default=0)),
+                ('tokens', models.BigIntegerField(default=0)),
+                ('wait_seconds', models.FloatField(default=0.0)),
+                ('max_wait_seconds', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['provider', 'priority'],
+                'unique_together': {('provider', 'priority')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AIRateWaiter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(max_length=32)),
+                ('priority', models.CharField(choices=[('interactive', 'Interactive'), ('ingest', 'Ingest'), ('batch', 'Batch')], max_length=16)),
+                ('rank', models.SmallIntegerField()),
+                ('tokens', models.IntegerField(default=0)),
+                ('enqueued_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('heartbeat_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['provider', 'rank', 'id'], name='ingest_aira_provide_82d093_idx')],
+            },
+        ),
+    ]
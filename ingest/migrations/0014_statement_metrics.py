@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingest', '0013_ai_rate_limiter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatementMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('revenue', models.FloatField(default=0.0)),
+                ('raw_revenue', models.FloatField(default=0.0)),
+                ('cogs', models.FloatField(default=0.0)),
+                ('cogs_materials', models.FloatField(default=0.0)),
+                ('gross_margin', models.FloatField(default=0.0)),
+                ('overheads', models.FloatField(default=0.0)),
+                ('depreciation', models.FloatField(default=0.0)),
+                ('ebit', models.FloatField(default=0.0)),
+                ('net_profit', models.FloatField(default=0.0)),
+                ('gm_pct', models.FloatField(default=0.0)),
+                ('op_pct', models.FloatField(default=0.0)),
+                ('np_pct', models.FloatField(default=0.0)),
+                ('revenue_yoy', models.FloatField(blank=True, null=True)),
+                ('cogs_yoy', models.FloatField(blank=True, null=True)),
+                ('gross_margin_yoy', models.FloatField(blank=True, null=True)),
+                ('overheads_yoy', models.FloatField(blank=True, null=True)),
+                ('ebit_yoy', models.FloatField(blank=True, null=True)),
+                ('net_profit_yoy', models.FloatField(blank=True, null=True)),
+                ('has_income', models.BooleanField(default=False)),
+                ('has_balance', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('statement', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='ingest.financialstatement')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'statement metrics',
+                'indexes': [models.Index(fields=['user', 'year'], name='ingest_stat_user_id_a5af7f_idx')],
+            },
+        ),
+    ]
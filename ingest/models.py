@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 DOC_TYPES = [
     ("income_statement", "Income Statement"),
@@ -21,6 +22,20 @@ RAG_PROCESSING_STATUS = [
     ("skipped", "Skipped"),
 ]
 
+INGEST_JOB_STATUS = [
+    ("queued", "Queued"),
+    ("running", "Running"),
+    ("completed", "Completed"),
+    ("failed", "Failed"),
+]
+
+INGEST_TASK_STATUS = [
+    ("queued", "Queued"),
+    ("running", "Running"),
+    ("done", "Done"),
+    ("failed", "Failed"),
+]
+
 RAG_PROCESSING_MODE = [
     ("immediate", "Immediate"),
     ("batch", "Batch (nightly)"),
@@ -42,6 +57,7 @@ class Document(models.Model):
     )
     analyzed = models.BooleanField(default=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     # RAG processing fields
     rag_status = models.CharField(
@@ -93,3 +109,247 @@ class FinancialStatement(models.Model):
 
     def __str__(self):
         return f"FS {self.year} - {self.user}"
+
+
+class StatementMetrics(models.Model):
+    """
+    Derived metrics of one FinancialStatement (finance.utils.compute_metrics).
+
+    Maintained on write by ingest.signals, read paths load these typed columns
+    instead of parsing the income/balance JSON on every request. YoY growth is
+    relative to the previous available year of the same user.
+    """
+    statement = models.OneToOneField(FinancialStatement, on_delete=models.CASCADE, related_name="metrics")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    year = models.IntegerField()
+
+    revenue = models.FloatField(default=0.0)
+    raw_revenue = models.FloatField(default=0.0)
+    cogs = models.FloatField(default=0.0)
+    cogs_materials = models.FloatField(default=0.0)
+    gross_margin = models.FloatField(default=0.0)
+    overheads = models.FloatField(default=0.0)
+    depreciation = models.FloatField(default=0.0)
+    ebit = models.FloatField(default=0.0)
+    net_profit = models.FloatField(default=0.0)
+
+    gm_pct = models.FloatField(default=0.0)
+    op_pct = models.FloatField(default=0.0)
+    np_pct = models.FloatField(default=0.0)
+
+    revenue_yoy = models.FloatField(null=True, blank=True)
+    cogs_yoy = models.FloatField(null=True, blank=True)
+    gross_margin_yoy = models.FloatField(null=True, blank=True)
+    overheads_yoy = models.FloatField(null=True, blank=True)
+    ebit_yoy = models.FloatField(null=True, blank=True)
+    net_profit_yoy = models.FloatField(null=True, blank=True)
+
+    has_income = models.BooleanField(default=False)
+    has_balance = models.BooleanField(default=False)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "year"])]
+        verbose_name_plural = "statement metrics"
+
+    def __str__(self):
+        return f"Metrics {self.year} - {self.user}"
+
+    @property
+    def profitability(self):
+        return {"gm_pct": self.gm_pct, "op_pct": self.op_pct, "np_pct": self.np_pct}
+
+    @property
+    def growth(self):
+        return {
+            "revenue": self.revenue_yoy,
+            "cogs": self.cogs_yoy,
+            "gross_margin": self.gross_margin_yoy,
+            "overheads": self.overheads_yoy,
+            "ebit": self.ebit_yoy,
+            "net_profit": self.net_profit_yoy,
+        }
+
+
+class ExtractionCacheEntry(models.Model):
+    """
+    Cached AI extraction result for a PDF page (or page range).
+
+    The key covers everything that influences the model output: PDF content
+    hash, page, render DPI, model and prompt version. Identical bytes never
+    pay for a second AI call.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    pdf_sha256 = models.CharField(max_length=64, db_index=True)
+    page = models.CharField(max_length=32)
+    dpi = models.IntegerField()
+    model = models.CharField(max_length=100)
+    prompt_version = models.CharField(max_length=32)
+    result = models.JSONField()
+    image_path = models.CharField(max_length=500, blank=True)
+    hit_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.pdf_sha256[:12]} p{self.page} @{self.dpi}dpi ({self.model})"
+
+
+class VisionTierStat(models.Model):
+    """
+    Counters of the adaptive DPI extraction (see TieredVisionExtractor), one row
+    per render DPI. accepted / attempts is the tier's hit rate.
+    """
+    dpi = models.IntegerField(unique=True)
+    attempts = models.IntegerField(default=0)
+    accepted = models.IntegerField(default=0)
+    low_confidence = models.IntegerField(default=0)
+    inconsistent = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    confidence_sum = models.FloatField(default=0.0)
+    payload_bytes = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["dpi"]
+
+    def __str__(self):
+        return f"{self.dpi} dpi: {self.accepted}/{self.attempts}"
+
+    @property
+    def hit_rate(self):
+        return self.accepted / self.attempts if self.attempts else 0.0
+
+    @property
+    def avg_confidence(self):
+        scored = self.attempts - self.failed
+        return self.confidence_sum / scored if scored else 0.0
+
+
+class IngestJob(models.Model):
+    """Batch of uploaded PDFs processed in the background (see IngestJobService)."""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="ingest_jobs")
+    status = models.CharField(max_length=20, choices=INGEST_JOB_STATUS, default="queued", db_index=True)
+    source = models.CharField(max_length=32, blank=True)  # upload_many / documents_api / upload_vision_api
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"IngestJob #{self.pk} ({self.status}) - {self.owner}"
+
+    @property
+    def is_finished(self):
+        return self.status in ("completed", "failed")
+
+    def to_dict(self):
+        tasks = list(self.tasks.order_by("id"))
+        done = sum(1 for t in tasks if t.status in ("done", "failed"))
+        return {
+            "id": self.pk,
+            "status": self.status,
+            "finished": self.is_finished,
+            "total": len(tasks),
+            "processed": done,
+            "succeeded": sum(1 for t in tasks if t.status == "done"),
+            "failed": sum(1 for t in tasks if t.status == "failed"),
+            "progress": int(done * 100 / len(tasks)) if tasks else 100,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "tasks": [t.to_dict() for t in tasks],
+        }
+
+
+class IngestTask(models.Model):
+    """Single PDF within an IngestJob."""
+    job = models.ForeignKey(IngestJob, on_delete=models.CASCADE, related_name="tasks")
+    file = models.FileField(upload_to="ingest_jobs/", blank=True)  # staged upload, removed after processing
+    filename = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=INGEST_TASK_STATUS, default="queued", db_index=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"IngestTask #{self.pk} {self.filename} ({self.status})"
+
+    def to_dict(self):
+        result = self.result or {}
+        return {
+            "id": self.pk,
+            "file": self.filename,
+            "status": self.status,
+            "year": result.get("year"),
+            "doc_type": result.get("doc_type"),
+            "confidence": result.get("confidence"),
+            "error": self.error or None,
+        }
+
+
+AI_PRIORITIES = [
+    ("interactive", "Interactive"),
+    ("ingest", "Ingest"),
+    ("batch", "Batch"),
+]
+
+
+class AIRateBucket(models.Model):
+    """
+    Token bucket of one AI provider shared by all processes (see app/rate_limit.py).
+
+    tokens / requests are the budgets left at updated_at; they refill
+    continuously up to the per-minute limits from settings.AI_RATE_LIMITS.
+    """
+    provider = models.CharField(max_length=32, unique=True)
+    tokens = models.FloatField(default=0.0)
+    requests = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.provider}: {self.tokens:.0f} tokens, {self.requests:.1f} requests"
+
+
+class AIRateWaiter(models.Model):
+    """A call queued for its provider budget (rows live only while waiting)."""
+    provider = models.CharField(max_length=32)
+    priority = models.CharField(max_length=16, choices=AI_PRIORITIES)
+    rank = models.SmallIntegerField()  # 0 = interactive, lower goes first
+    tokens = models.IntegerField(default=0)
+    enqueued_at = models.DateTimeField(default=timezone.now)
+    heartbeat_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["provider", "rank", "id"])]
+
+    def __str__(self):
+        return f"{self.provider}/{self.priority} #{self.pk}"
+
+
+class AIRateStat(models.Model):
+    """Wait-time counters per provider and priority class."""
+    provider = models.CharField(max_length=32)
+    priority = models.CharField(max_length=16, choices=AI_PRIORITIES)
+    calls = models.IntegerField(default=0)
+    waited = models.IntegerField(default=0)
+    timed_out = models.IntegerField(default=0)
+    tokens = models.BigIntegerField(default=0)
+    wait_seconds = models.FloatField(default=0.0)
+    max_wait_seconds = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("provider", "priority")
+        ordering = ["provider", "priority"]
+
+    def __str__(self):
+        return f"{self.provider}/{self.priority}: {self.calls} calls"
+
+    @property
+    def avg_wait_seconds(self):
+        return self.wait_seconds / self.calls if self.calls else 0.0
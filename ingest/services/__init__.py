@@ -1,4 +1,5 @@
 from .parser_service import PDFParserService
 from .document_service import DocumentProcessingService
+from .job_service import IngestJobService, start_inline_worker
 
-__all__ = ["PDFParserService", "DocumentProcessingService"]
+__all__ = ["PDFParserService", "DocumentProcessingService", "IngestJobService", "start_inline_worker"]
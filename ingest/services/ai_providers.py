@@ -11,6 +11,10 @@ from typing import Any, Dict, List, Optional
 
 from django.conf import settings
 
+from app.ai_clients import ai_call, get_client
+from app.rate_limit import estimate_tokens
+from ingest.extraction.image_prep import image_media_type
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,11 +31,9 @@ class OpenAIProvider(AIProvider):
     """OpenAI provider for document parsing."""
 
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
-        from openai import OpenAI
-
         self.api_key = api_key or settings.OPENAI_API_KEY
         self.model = model or getattr(settings, "OPENAI_MODEL", "gpt-4o-mini")
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = get_client("openai", "vision", api_key=self.api_key)
 
     def parse_document(self, images: List[bytes], prompt: str) -> Dict[str, Any]:
         """Parse document using OpenAI Vision API."""
@@ -42,17 +44,18 @@ class OpenAIProvider(AIProvider):
             b64 = base64.b64encode(img).decode("utf-8")
             content.append({
                 "type": "input_image",
-                "image_url": f"data:image/png;base64,{b64}"
+                "image_url": f"data:{image_media_type(img)};base64,{b64}"
             })
 
         try:
             logger.info(f"Calling OpenAI API with model: {self.model}")
-            resp = self.client.responses.create(
-                model=self.model,
-                input=[{"role": "user", "content": content}],
-                max_output_tokens=2000,
-                temperature=0
-            )
+            with ai_call("openai", "ingest", tokens=estimate_tokens(prompt, max_tokens=2000, images=len(images))):
+                resp = self.client.responses.create(
+                    model=self.model,
+                    input=[{"role": "user", "content": content}],
+                    max_output_tokens=2000,
+                    temperature=0
+                )
 
             raw_text = self._extract_text(resp)
             cleaned_text = self._clean_json(raw_text)
@@ -112,14 +115,12 @@ class ClaudeProvider(AIProvider):
     """Anthropic Claude provider for document parsing."""
 
     def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
-        import anthropic
-
         self.api_key = api_key or getattr(settings, "ANTHROPIC_API_KEY", None)
         if not self.api_key:
             raise ValueError("ANTHROPIC_API_KEY is not configured in settings")
 
         self.model = model or getattr(settings, "ANTHROPIC_MODEL", "claude-sonnet-4-20250514")
-        self.client = anthropic.Anthropic(api_key=self.api_key)
+        self.client = get_client("anthropic", "vision", api_key=self.api_key)
 
     def parse_document(self, images: List[bytes], prompt: str) -> Dict[str, Any]:
         """Parse document using Claude Vision API."""
@@ -132,19 +133,22 @@ class ClaudeProvider(AIProvider):
                 "type": "image",
                 "source": {
                     "type": "base64",
-                    "media_type": "image/png",
+                    "media_type": image_media_type(img),
                     "data": b64
                 }
             })
 
         try:
             logger.info(f"Calling Claude API with model: {self.model}")
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=4000,
-                temperature=0,
-                messages=[{"role": "user", "content": content}]
-            )
+            with ai_call(
+                "anthropic", "ingest", tokens=estimate_tokens(prompt, max_tokens=4000, images=len(images))
+            ):
+                response = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=4000,
+                    temperature=0,
+                    messages=[{"role": "user", "content": content}]
+                )
 
             raw_text = response.content[0].text
             cleaned_text = self._clean_json(raw_text)
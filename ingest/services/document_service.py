@@ -5,7 +5,6 @@ Coordinates between file handling, AI parsing, and data persistence.
 
 import logging
 import os
-import tempfile
 from typing import Any, Dict, Optional
 
 from django.contrib.auth.models import User
@@ -63,15 +62,10 @@ class DocumentProcessingService:
             "parsed_data": None
         }
 
-        tmp_path = None
-
         try:
-            # Step 1: Save file temporarily
+            # Step 1+2: Parse PDF with AI, straight from the upload (no temp file)
             logger.info(f"Processing file: {uploaded_file.name}")
-            tmp_path = self._save_temp_file(uploaded_file)
-
-            # Step 2: Parse PDF with AI
-            parsed = self.parser.parse_pdf(tmp_path)
+            parsed = self.parser.parse_pdf(uploaded_file)
 
             if not parsed.get("success"):
                 result["error"] = parsed.get("error") or "Parsing failed"
@@ -123,18 +117,14 @@ class DocumentProcessingService:
             result["error"] = error_msg
             return result
 
-        finally:
-            # Cleanup temporary file
-            if tmp_path:
-                self._cleanup_temp_file(tmp_path)
-
-    def reprocess_document(self, document_id: int, user: User) -> Dict[str, Any]:
+    def reprocess_document(self, document_id: int, user: User, force: bool = False) -> Dict[str, Any]:
         """
         Re-parse an existing document.
 
         Args:
             document_id: ID of the document to reprocess
             user: User who owns the document
+            force: Bypass the extraction cache and call the AI provider again
 
         Returns:
             Dict with processing result
@@ -149,7 +139,7 @@ class DocumentProcessingService:
                 }
 
             # Parse the file
-            parsed = self.parser.parse_pdf(doc.file.path)
+            parsed = self.parser.parse_pdf(doc.file.path, use_cache=not force)
 
             if not parsed.get("success"):
                 return {
@@ -214,21 +204,6 @@ class DocumentProcessingService:
                 "error": str(e)
             }
 
-    def _save_temp_file(self, uploaded_file) -> str:
-        """Save uploaded file to temporary location."""
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            for chunk in uploaded_file.chunks():
-                tmp.write(chunk)
-            return tmp.name
-
-    def _cleanup_temp_file(self, path: str):
-        """Remove temporary file."""
-        try:
-            if os.path.exists(path):
-                os.remove(path)
-        except OSError as e:
-            logger.warning(f"Failed to remove temp file {path}: {e}")
-
     @transaction.atomic
     def _save_to_database(
         self,
@@ -0,0 +1,129 @@
+"""
+Ingest Job Service - background processing of uploaded PDFs.
+
+Uploads are staged as IngestTask rows and processed by workers outside the
+HTTP request. Works without Celery/Redis: either an in-process daemon thread
+(INGEST_JOBS_INLINE, default) or the `run_ingest_worker` management command;
+claiming and crash recovery are shared with export jobs (app.job_queue).
+"""
+
+import logging
+from typing import Iterable, Optional
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from app.job_queue import InlineWorker, JobQueue
+from ingest.extraction.limits import vision_concurrency
+from ingest.extraction.pdf_processor import PDFTooLargeError, check_pdf_size, max_pdf_size
+from ingest.models import IngestJob, IngestTask
+
+logger = logging.getLogger(__name__)
+
+
+class IngestJobService(JobQueue):
+    """Enqueue, claim and process ingest tasks."""
+
+    model = IngestTask
+    label = "ingest task"
+    max_attempts_setting = "INGEST_JOB_MAX_ATTEMPTS"
+    exhausted_error = "Zpracování souboru opakovaně selhalo."
+
+    def enqueue(self, user: User, files: Iterable, source: str = "") -> IngestJob:
+        """
+        Stage uploaded files and create a queued job.
+
+        Args:
+            user: Owner of the uploaded documents
+            files: Django UploadedFile objects
+            source: Name of the endpoint that created the job
+
+        Returns:
+            IngestJob
+        """
+        with transaction.atomic():
+            job = IngestJob.objects.create(owner=user, source=source)
+            for f in files:
+                task = IngestTask(job=job, filename=getattr(f, "name", "") or "upload.pdf")
+                try:
+                    check_pdf_size(f)
+                except PDFTooLargeError as e:
+                    # Rejected before staging, nothing is written to disk
+                    logger.warning(f"Ingest job {job.pk}: {task.filename} rejected: {e}")
+                    task.status = "failed"
+                    task.error = f"Soubor je příliš velký (max. {max_pdf_size() // (1024 * 1024)} MB)."
+                    task.finished_at = timezone.now()
+                    task.save()
+                    continue
+                task.file.save(task.filename, f, save=False)
+                task.save()
+            self._refresh_job(job.pk)
+
+        logger.info(f"Enqueued ingest job {job.pk} with {job.tasks.count()} files for {user}")
+        return job
+
+    def on_claimed(self, task: IngestTask) -> None:
+        IngestJob.objects.filter(pk=task.job_id, status="queued").update(
+            status="running", started_at=task.started_at
+        )
+
+    def process(self, task: IngestTask) -> IngestTask:
+        """Run the vision extraction for one staged file."""
+        from ingest.views import _process_uploaded_file_vision
+
+        try:
+            with task.file.open("rb") as fh:
+                result = _process_uploaded_file_vision(task.job.owner, File(fh, name=task.filename))
+            task.result = result
+            task.status = "done" if result.get("success") else "failed"
+            task.error = "" if result.get("success") else (result.get("error") or "Soubor se nepodařilo analyzovat.")
+        except Exception as e:
+            logger.error(f"Ingest task {task.pk} crashed: {e}", exc_info=True)
+            task.status = "failed"
+            task.error = str(e)
+
+        task.finished_at = timezone.now()
+        task.save(update_fields=["result", "status", "error", "finished_at"])
+
+        # Document keeps its own copy of the PDF, the staged upload is no longer needed
+        if task.file:
+            task.file.delete(save=True)
+
+        self._refresh_job(task.job_id)
+        return task
+
+    def drain(self, concurrency: Optional[int] = None) -> int:
+        """Process queued tasks with INGEST_VISION_CONCURRENCY threads (or `concurrency`)."""
+        return super().drain(concurrency or vision_concurrency())
+
+    def on_exhausted(self, task: IngestTask) -> None:
+        if task.file:
+            task.file.delete(save=False)
+            IngestTask.objects.filter(pk=task.pk).update(file="")
+        self._refresh_job(task.job_id)
+
+    def _refresh_job(self, job_id: int) -> None:
+        pending = IngestTask.objects.filter(job_id=job_id, status__in=("queued", "running")).exists()
+        if pending:
+            return
+
+        succeeded = IngestTask.objects.filter(job_id=job_id, status="done").exists()
+        IngestJob.objects.filter(pk=job_id).exclude(status__in=("completed", "failed")).update(
+            status="completed" if succeeded else "failed",
+            finished_at=timezone.now(),
+        )
+
+
+_inline = InlineWorker("ingest", "INGEST_JOBS_INLINE", IngestJobService)
+
+
+def start_inline_worker() -> None:
+    """
+    Make sure a daemon thread drains the queue.
+
+    Disabled by INGEST_JOBS_INLINE = False when a dedicated
+    `run_ingest_worker` process is used instead.
+    """
+    _inline.start()
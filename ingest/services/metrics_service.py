@@ -0,0 +1,141 @@
+"""
+Statement Metrics Service - materialized per-statement metrics.
+
+compute_metrics() parses the income/balance JSON of a statement. Instead of
+running it on every dashboard, export and chatbot request, the result is stored
+in StatementMetrics whenever a FinancialStatement is saved (ingest.signals) and
+read paths load the typed columns with a single indexed query:
+
+    for m in user_metrics(user):
+        m.year, m.revenue, m.ebit, m.profitability, m.growth
+"""
+
+import logging
+from typing import Iterable, List, Optional
+
+from django.db import transaction
+
+from finance.utils import compute_metrics, growth
+from ingest.models import FinancialStatement, StatementMetrics
+
+logger = logging.getLogger(__name__)
+
+METRIC_FIELDS = (
+    "revenue", "raw_revenue", "cogs", "cogs_materials", "gross_margin",
+    "overheads", "depreciation", "ebit", "net_profit",
+)
+# Columns with a YoY counterpart <name>_yoy
+GROWTH_FIELDS = ("revenue", "cogs", "gross_margin", "overheads", "ebit", "net_profit")
+
+
+def _metric_values(statement: FinancialStatement) -> dict:
+    metrics = compute_metrics(statement)
+    values = {name: float(metrics[name] or 0.0) for name in METRIC_FIELDS}
+    values.update({key: float(val or 0.0) for key, val in metrics["profitability"].items()})
+    values["has_income"] = bool(statement.income)
+    values["has_balance"] = bool(statement.balance)
+    return values
+
+
+def relink_growth(user_id: int) -> int:
+    """
+    Recompute YoY columns of all metrics rows of a user from the stored values.
+
+    Returns:
+        Number of rows whose growth changed
+    """
+    rows = list(StatementMetrics.objects.filter(user_id=user_id).order_by("year"))
+    changed = []
+    previous: Optional[StatementMetrics] = None
+    for row in rows:
+        dirty = False
+        for name in GROWTH_FIELDS:
+            value = growth(getattr(row, name), getattr(previous, name)) if previous else None
+            if getattr(row, f"{name}_yoy") != value:
+                setattr(row, f"{name}_yoy", value)
+                dirty = True
+        if dirty:
+            changed.append(row)
+        previous = row
+    if changed:
+        StatementMetrics.objects.bulk_update(changed, [f"{name}_yoy" for name in GROWTH_FIELDS])
+    return len(changed)
+
+
+def refresh_statement_metrics(statement: FinancialStatement) -> StatementMetrics:
+    """
+    Recompute metrics of one statement and the growth of its user's years.
+
+    Only the saved statement is parsed; YoY of the other years is derived from
+    their stored columns.
+    """
+    values = _metric_values(statement)
+    with transaction.atomic():
+        metrics, _ = StatementMetrics.objects.update_or_create(
+            statement=statement,
+            defaults={"user_id": statement.user_id, "year": statement.year, **values},
+        )
+        relink_growth(statement.user_id)
+    metrics.refresh_from_db()
+    return metrics
+
+
+def refresh_user_metrics(statements: Iterable[FinancialStatement]) -> int:
+    """Recompute metrics of the given statements (growth linked once per user)."""
+    count = 0
+    users = set()
+    with transaction.atomic():
+        for statement in statements:
+            StatementMetrics.objects.update_or_create(
+                statement=statement,
+                defaults={"user_id": statement.user_id, "year": statement.year, **_metric_values(statement)},
+            )
+            users.add(statement.user_id)
+            count += 1
+        for user_id in users:
+            relink_growth(user_id)
+    return count
+
+
+def materialize_missing(user_ids: Optional[Iterable[int]] = None, year: Optional[int] = None) -> int:
+    """
+    Materialize metrics of statements that have no StatementMetrics row yet.
+
+    The same step as in user_metrics(), for read paths over many companies
+    (coach portfolio, peer benchmarks) that join the metrics table directly.
+    Costs one query when nothing is missing.
+
+    Returns:
+        Number of materialized statements
+    """
+    statements = FinancialStatement.objects.filter(metrics__isnull=True)
+    if user_ids is not None:
+        statements = statements.filter(user_id__in=list(user_ids))
+    if year is not None:
+        statements = statements.filter(year=year)
+    missing = list(statements.values_list("pk", flat=True))
+    if not missing:
+        return 0
+    logger.info(f"Materializing metrics of {len(missing)} statements")
+    return refresh_user_metrics(FinancialStatement.objects.filter(pk__in=missing))
+
+
+def user_metrics(user) -> List[StatementMetrics]:
+    """
+    Metrics rows of a user ordered by year.
+
+    Statements saved before the metrics table existed (or whose refresh failed)
+    are materialized on first read.
+    """
+    statements = list(
+        FinancialStatement.objects.filter(user=user)
+        .select_related("metrics")
+        .defer("income", "balance")
+        .order_by("year")
+    )
+    missing = [stmt.pk for stmt in statements if not hasattr(stmt, "metrics")]
+    if missing:
+        logger.info(f"Materializing metrics of {len(missing)} statements for user {user.pk}")
+        refresh_user_metrics(FinancialStatement.objects.filter(pk__in=missing))
+        return list(StatementMetrics.objects.filter(user=user).order_by("year"))
+    return [stmt.metrics for stmt in statements]
@@ -4,10 +4,17 @@ Uses AI providers (OpenAI or Claude) to extract structured financial data.
 """
 
 import logging
-import tempfile
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+from ingest.extraction.cache import extraction_cache, prompt_fingerprint, sha256_bytes
+from ingest.extraction.fanout import render_pages
+from ingest.extraction.image_prep import ImagePreparer
+from ingest.extraction.pdf_processor import PDFSource, open_pdf, read_pdf_bytes
+from ingest.extraction.postprocess import aggregate_mismatches
+from ingest.extraction.text_layer import analyze_texts, page_texts
+from ingest.extraction.text_parser import TextStatementParser
+from ingest.extraction.tiers import dpi_tiers
 from .ai_providers import get_ai_provider
 
 logger = logging.getLogger(__name__)
@@ -76,7 +83,7 @@ RULES:
         self,
         provider: str = "openai",
         max_pages: int = 3,
-        render_dpi: int = 220,
+        render_dpi: Optional[int] = None,
         prompt: Optional[str] = None
     ):
         """
@@ -85,22 +92,30 @@ RULES:
         Args:
             provider: AI provider to use ("openai" or "claude")
             max_pages: Maximum number of PDF pages to process
-            render_dpi: DPI for PDF rendering
+            render_dpi: DPI for PDF rendering (None = INGEST_VISION_DPI_TIERS, escalating
+                only when the response is incomplete or inconsistent)
             prompt: Custom parsing prompt (uses default if None)
         """
         self.provider_name = provider
         self.max_pages = max_pages
         self.render_dpi = render_dpi
+        self.dpi_tiers = [render_dpi] if render_dpi else dpi_tiers()
         self.prompt = prompt or self.DEFAULT_PROMPT
 
         logger.info(f"Initialized PDFParserService with provider: {provider}")
 
-    def parse_pdf(self, pdf_path: str) -> Dict[str, Any]:
+    @property
+    def prompt_version(self) -> str:
+        """Fingerprint of the parsing prompt (part of the extraction cache key)."""
+        return prompt_fingerprint(self.prompt)
+
+    def parse_pdf(self, pdf_path: PDFSource, use_cache: bool = True) -> Dict[str, Any]:
         """
         Parse a financial PDF document.
 
         Args:
-            pdf_path: Path to the PDF file
+            pdf_path: Path to the PDF file, PDF bytes or an uploaded file (read in memory)
+            use_cache: Reuse a cached result for identical PDF bytes
 
         Returns:
             Dict with structure:
@@ -123,25 +138,61 @@ RULES:
         }
 
         try:
-            # Step 1: Render PDF to images
-            logger.info(f"Starting PDF parsing: {pdf_path}")
-            images = self._render_pdf(pdf_path)
-
-            if not images:
-                error_msg = "No images produced from PDF"
-                logger.error(error_msg)
-                default_result["error"] = error_msg
-                return default_result
-
-            # Step 2: Get AI provider and parse
             provider = get_ai_provider(self.provider_name)
-            parsed_data = provider.parse_document(images, self.prompt)
-
-            # Step 3: Validate and normalize
-            result = self._validate_response(parsed_data)
-            result["success"] = True
 
-            logger.info(f"Successfully parsed PDF: {pdf_path} - Year: {result['year']}, Type: {result['doc_type']}")
+            # Step 0: Identical bytes → cached result, no rendering or AI call
+            pdf_bytes = read_pdf_bytes(pdf_path)
+            pdf_sha256 = sha256_bytes(pdf_bytes)
+            cache_key = {
+                "pdf_sha256": pdf_sha256,
+                "page": f"0-{self.max_pages - 1}",
+                "dpi": self.dpi_tiers[-1],
+                "model": f"{self.provider_name}:{getattr(provider, 'model', '')}",
+                "prompt_version": self.prompt_version,
+                "variant": f"{ImagePreparer().signature}-tiers{'/'.join(map(str, self.dpi_tiers))}",
+            }
+            if use_cache:
+                cached = extraction_cache.get(**cache_key)
+                if cached is not None:
+                    return dict(cached.result)
+
+            # Step 1: Deterministic text-layer parser, AI provider only as fallback
+            text_parser = TextStatementParser()
+            parsed_text = text_parser.parse(pdf_bytes)
+            if text_parser.is_confident(parsed_text):
+                logger.info(f"Parsed PDF from text layer: {pdf_sha256[:12]}")
+                return self._validate_response({
+                    "doc_type": parsed_text["doc_type"],
+                    "year": parsed_text["year"],
+                    "scale": parsed_text["scale"],
+                    "data": parsed_text["extracted_data"],
+                })
+
+            # Step 2+3: Render PDF and parse with AI provider, lowest DPI first
+            logger.info(f"Starting PDF parsing: {pdf_sha256[:12]}")
+            result = None
+            for dpi in self.dpi_tiers:
+                images = self._render_pdf(pdf_bytes, dpi)
+
+                if not images:
+                    error_msg = "No images produced from PDF"
+                    logger.error(error_msg)
+                    default_result["error"] = error_msg
+                    return default_result
+
+                parsed_data = provider.parse_document(images, self.prompt)
+
+                # Step 4: Validate and normalize
+                result = self._validate_response(parsed_data)
+                result["render_dpi"] = dpi
+                issues = aggregate_mismatches(result["data"])
+                if result["doc_type"] and result["year"] and not issues:
+                    break
+                logger.info(f"Incomplete or inconsistent response at {dpi} dpi ({issues}), escalating")
+
+            extraction_cache.set(**cache_key, result=result)
+
+            logger.info(f"Successfully parsed PDF: {pdf_sha256[:12]} - Year: {result['year']}, Type: {result['doc_type']}")
             return result
 
         except Exception as e:
@@ -150,26 +201,19 @@ RULES:
             default_result["error"] = error_msg
             return default_result
 
-    def _render_pdf(self, pdf_path: str) -> list:
-        """Render PDF pages to PNG images."""
-        try:
-            import fitz
-        except ImportError:
-            raise ImportError("PyMuPDF (fitz) is required. Install with: pip install pymupdf")
-
+    def _render_pdf(self, pdf_path: PDFSource, dpi: Optional[int] = None) -> list:
+        """Render PDF pages to PNG images (pages in parallel, see fanout.render_pages)."""
         images = []
         try:
-            doc = fitz.open(pdf_path)
-            page_count = min(doc.page_count, self.max_pages)
-
-            logger.debug(f"Rendering {page_count} pages from PDF")
+            with open_pdf(pdf_path) as doc:
+                # Skip cover pages: start at the statement page found in the text layer
+                start = analyze_texts(page_texts(doc, self.max_pages + 2)).page_num if doc.page_count > self.max_pages else 0
+                page_count = min(doc.page_count - start, self.max_pages)
 
-            for i in range(page_count):
-                page = doc.load_page(i)
-                pix = page.get_pixmap(dpi=self.render_dpi)
-                images.append(pix.tobytes("png"))
+            logger.debug(f"Rendering {page_count} pages from PDF (starting at page {start})")
 
-            doc.close()
+            rendered = render_pages(pdf_path, range(start, start + page_count), dpi or self.dpi_tiers[-1])
+            images = [rendered[num].data for num in sorted(rendered)]
 
         except Exception as e:
             logger.error(f"Failed to render PDF: {e}", exc_info=True)
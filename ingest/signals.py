@@ -0,0 +1,49 @@
+"""
+FinancialStatement write hooks: canonical schema normalization and
+StatementMetrics maintenance.
+"""
+
+import logging
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from finance.schema import canonical_balance, canonical_income
+from ingest.models import FinancialStatement, StatementMetrics
+from ingest.services.metrics_service import refresh_statement_metrics, relink_growth
+
+logger = logging.getLogger(__name__)
+
+# Saves touching only these fields do not change the metrics
+METRIC_INPUTS = {"income", "balance", "year", "user", "user_id"}
+
+
+@receiver(pre_save, sender=FinancialStatement)
+def normalize_statement_schema(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Store income/balance in the canonical schema (finance.schema)."""
+    if raw or (update_fields is not None and not {"income", "balance"} & set(update_fields)):
+        return
+    if instance.income:
+        instance.income = canonical_income(instance.income)
+    if instance.balance:
+        instance.balance = canonical_balance(instance.balance)
+
+
+@receiver(post_save, sender=FinancialStatement)
+def refresh_metrics_on_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not METRIC_INPUTS & set(update_fields)):
+        return
+    try:
+        refresh_statement_metrics(instance)
+    except Exception as e:
+        # Read paths materialize missing rows, a failed refresh must not break the upload
+        logger.warning(f"Failed to refresh metrics of statement {instance.pk}: {e}")
+        StatementMetrics.objects.filter(statement_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=FinancialStatement)
+def relink_metrics_on_delete(sender, instance, **kwargs):
+    try:
+        relink_growth(instance.user_id)
+    except Exception as e:
+        logger.warning(f"Failed to relink growth for user {instance.user_id}: {e}")
@@ -0,0 +1,50 @@
+"""
+Test factories for financial statements, shared by the app test suites.
+
+    class MyTests(TemporaryMediaMixin, TestCase):
+        def test_x(self):
+            make_statement(user, 2023, {"revenue": 1000, "cogs": 400}, {"cash": 50})
+
+Statements need a Document with an uploaded file; TemporaryMediaMixin keeps
+those files in a temporary MEDIA_ROOT removed after the test class.
+"""
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from ingest.models import Document, FinancialStatement
+
+
+class TemporaryMediaMixin:
+    """Store uploaded files of the test class in a temporary MEDIA_ROOT."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        media_override.enable()
+        cls.addClassCleanup(media_override.disable)
+        super().setUpClass()
+
+
+def make_statement(user, year, income=None, balance=None, filename=None, **fields):
+    """
+    Create a FinancialStatement of one year with its source Document.
+
+    Args:
+        user: Owner of the statement
+        year: Statement year
+        income: Income statement data (default empty)
+        balance: Balance sheet data (default empty)
+        filename: Name of the uploaded PDF (default "<year>.pdf")
+        **fields: Other FinancialStatement fields (e.g. scale)
+    """
+    document = Document.objects.create(
+        owner=user, file=SimpleUploadedFile(filename or f"{year}.pdf", b"%PDF"), year=year
+    )
+    return FinancialStatement.objects.create(
+        user=user, document=document, year=year, income=income or {}, balance=balance or {}, **fields
+    )
@@ -0,0 +1,124 @@
+"""
+Synthetic Czech statement PDFs with a real text layer (PyMuPDF + DejaVuSans)
+"""
+from pathlib import Path
+
+import fitz
+from django.conf import settings
+
+FONT_FILE = Path(settings.BASE_DIR) / "static" / "fonts" / "DejaVuSans.ttf"
+
+INCOME_ROWS = [
+    ("I.", "Tržby z prodeje výrobků a služeb", 12500, 11800),
+    ("II.", "Tržby za prodej zboží", 3400, 3100),
+    ("A.", "Výkonová spotřeba", 9100, 8600),
+    ("A.1.", "Náklady vynaložené na prodané zboží", 2500, 2300),
+    ("A.2.", "Spotřeba materiálu a energie", 4100, 3900),
+    ("A.3.", "Služby", 2500, 2400),
+    ("D.", "Osobní náklady", 3900, 3700),
+    ("D.1.", "Mzdové náklady", 2900, 2750),
+    ("D.2.", "Náklady na sociální zabezpečení, zdravotní pojištění a ostatní náklady", 1000, 950),
+    ("E.", "Úpravy hodnot v provozní oblasti", 600, 580),
+    ("*", "Provozní výsledek hospodaření", 2300, 2020),
+    ("**", "Výsledek hospodaření za účetní období (+/-)", 1700, 1500),
+]
+
+BALANCE_ROWS = [
+    ("", "AKTIVA CELKEM", 20400, 19100),
+    ("B.", "Stálá aktiva", 8200, 8500),
+    ("B.II.", "Dlouhodobý hmotný majetek", 7900, 8200),
+    ("C.", "Oběžná aktiva", 12000, 10400),
+    ("C.I.", "Zásoby", 2100, 1900),
+    ("C.II.", "Pohledávky", 4300, 3900),
+    ("C.IV.", "Peněžní prostředky", 5600, 4600),
+    ("", "PASIVA CELKEM", 20400, 19100),
+    ("A.", "Vlastní kapitál", 11800, 10100),
+    ("B.+C.", "Cizí zdroje", 8600, 9000),
+]
+
+
+def make_statement_pdf(
+    doc_type="income_statement",
+    year=2023,
+    scale="thousands",
+    rows=None,
+    cover_page=False,
+    with_text=True,
+):
+    """
+    Build a statement PDF as bytes.
+
+    Columns: Označení | Text | Běžné období | Minulé období
+    """
+    if rows is None:
+        rows = INCOME_ROWS if doc_type == "income_statement" else BALANCE_ROWS
+
+    doc = fitz.open()
+
+    if cover_page:
+        page = doc.new_page()
+        page.insert_font(fontname="dv", fontfile=str(FONT_FILE))
+        page.insert_text((72, 100), "Průvodní dopis k účetní závěrce", fontname="dv", fontsize=12)
+        page.insert_text((72, 130), "Vážení, v příloze zasíláme účetní závěrku společnosti.", fontname="dv", fontsize=10)
+
+    if with_text:
+        _add_statement_page(doc, doc_type, year, scale, rows)
+    else:
+        # "Scanned" page: only vector shapes, no text layer
+        page = doc.new_page()
+        page.draw_rect(fitz.Rect(72, 60, 520, 400))
+
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_annual_report_pdf(statements, scale="thousands", cover_page=True):
+    """
+    Annual report with several statements, e.g. [("balance_sheet", 2023), ("income_statement", 2023)].
+
+    Values of each statement are multiplied by its position (1, 2, ...) so years can be told apart.
+    """
+    doc = fitz.open()
+    if cover_page:
+        page = doc.new_page()
+        page.insert_font(fontname="dv", fontfile=str(FONT_FILE))
+        page.insert_text((72, 100), "Výroční zpráva", fontname="dv", fontsize=16)
+
+    for factor, (doc_type, year) in enumerate(statements, start=1):
+        base_rows = INCOME_ROWS if doc_type == "income_statement" else BALANCE_ROWS
+        rows = [(code, label, current * factor, previous * factor) for code, label, current, previous in base_rows]
+        _add_statement_page(doc, doc_type, year, scale, rows)
+
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _add_statement_page(doc, doc_type, year, scale, rows):
+    title = "VÝKAZ ZISKU A ZTRÁTY" if doc_type == "income_statement" else "ROZVAHA"
+    units = {"thousands": " (v celých tisících Kč)", "units": " (v celých Kč)", None: ""}
+
+    page = doc.new_page()
+    page.insert_font(fontname="dv", fontfile=str(FONT_FILE))
+    page.insert_text((72, 60), f"{title} v plném rozsahu", fontname="dv", fontsize=14)
+    page.insert_text((72, 80), f"k 31.12.{year}{units[scale]}", fontname="dv", fontsize=10)
+    page.insert_text((72, 110), "Označení", fontname="dv", fontsize=8)
+    page.insert_text((130, 110), "Text", fontname="dv", fontsize=8)
+    page.insert_text((400, 110), "Běžné období", fontname="dv", fontsize=8)
+    page.insert_text((490, 110), "Minulé období", fontname="dv", fontsize=8)
+
+    y = 130
+    for code, label, current, previous in rows:
+        page.insert_text((72, y), code, fontname="dv", fontsize=8)
+        page.insert_text((130, y), label[:60], fontname="dv", fontsize=8)
+        page.insert_text((400, y), _fmt(current), fontname="dv", fontsize=8)
+        page.insert_text((490, y), _fmt(previous), fontname="dv", fontsize=8)
+        y += 16
+    return page
+
+
+def _fmt(value):
+    if value is None:
+        return ""
+    return f"{value:,}".replace(",", " ")
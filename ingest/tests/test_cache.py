@@ -0,0 +1,99 @@
+"""
+Tests for the AI extraction cache
+"""
+import shutil
+import tempfile
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from ingest.extraction.cache import ExtractionCache
+from ingest.models import ExtractionCacheEntry
+from ingest.tests.pdf_factory import make_statement_pdf
+
+
+RESULT = {
+    "success": True,
+    "doc_type": "income_statement",
+    "year": 2023,
+    "scale": "thousands",
+    "extracted_data": {"revenue": 1000},
+    "confidence": 0.9,
+}
+
+
+class ExtractionCacheTestCase(TestCase):
+    """Tests for ExtractionCache"""
+
+    def setUp(self):
+        self.cache = ExtractionCache(max_entries=3, ttl_days=30)
+        self.key = {"pdf_sha256": "a" * 64, "page": 0, "dpi": 300, "model": "m", "prompt_version": "p1"}
+
+    def test_miss_then_hit(self):
+        """Stored result is returned and counters are updated"""
+        self.assertIsNone(self.cache.get(**self.key))
+        self.cache.set(**self.key, result=RESULT, image_path="x.png")
+
+        entry = self.cache.get(**self.key)
+        self.assertEqual(entry.result, RESULT)
+        self.assertEqual(entry.image_path, "x.png")
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+        self.assertEqual(ExtractionCacheEntry.objects.get().hit_count, 1)
+
+    def test_key_covers_dpi_and_prompt(self):
+        """Changing DPI or prompt version invalidates the entry"""
+        self.cache.set(**self.key, result=RESULT)
+        self.assertIsNone(self.cache.get(**{**self.key, "dpi": 200}))
+        self.assertIsNone(self.cache.get(**{**self.key, "prompt_version": "p2"}))
+
+    def test_lru_eviction(self):
+        """Least recently used entries are dropped above max_entries"""
+        for i in range(3):
+            self.cache.set(**{**self.key, "page": i}, result=RESULT)
+        self.cache.get(**{**self.key, "page": 0})
+        self.cache.set(**{**self.key, "page": 3}, result=RESULT)
+
+        self.assertEqual(ExtractionCacheEntry.objects.count(), 3)
+        self.assertIsNotNone(self.cache.get(**{**self.key, "page": 0}))
+        self.assertIsNone(self.cache.get(**{**self.key, "page": 1}))
+
+
+class VisionUploadCacheTestCase(TestCase):
+    """check_only + full processing of the same upload calls Claude once"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    @patch('ingest.views._image_exists', return_value=True)
+    @patch('ingest.views.PDFProcessor')
+    @patch('ingest.views.FinancialExtractor')
+    def test_second_pass_uses_cache(self, mock_extractor_cls, mock_processor_cls, _mock_exists):
+        from ingest.views import _process_uploaded_file_vision
+
+        extractor = mock_extractor_cls.return_value
+        extractor.model = "claude-test"
+        extractor.prompt_version = "v1"
+        extractor.extract_from_png.side_effect = lambda *args, **kwargs: dict(RESULT)
+
+        processor = mock_processor_cls.return_value
+        processor.save_png_local.return_value = "ingest/media/extracted_tables/test.png"
+
+        user = User.objects.create_user(username="cache", password="x")
+        scan = make_statement_pdf(with_text=False)  # no text layer → vision path
+
+        def upload():
+            return SimpleUploadedFile("vzz.pdf", scan, content_type="application/pdf")
+
+        first = _process_uploaded_file_vision(user, upload(), check_only=True)
+        second = _process_uploaded_file_vision(user, upload())
+
+        self.assertTrue(first["success"])
+        self.assertTrue(second["success"])
+        self.assertEqual(extractor.extract_from_png.call_count, 1)
+        self.assertEqual(processor.save_png_local.call_count, 1)
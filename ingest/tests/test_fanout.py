@@ -0,0 +1,158 @@
+"""
+Tests for multi-page / multi-statement fan-out
+"""
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import fitz
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from ingest.extraction.fanout import merge_page_results, render_pages
+from ingest.extraction.text_layer import find_statement_pages
+from ingest.models import FinancialStatement
+from ingest.tests.pdf_factory import make_annual_report_pdf
+
+STATEMENTS = [
+    ("balance_sheet", 2023),
+    ("income_statement", 2023),
+    ("balance_sheet", 2022),
+    ("income_statement", 2022),
+]
+
+
+def _texts(pdf_bytes):
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return [page.get_text() for page in doc]
+
+
+class FindStatementPagesTestCase(TestCase):
+    """Tests for find_statement_pages"""
+
+    def test_annual_report(self):
+        pages = find_statement_pages(_texts(make_annual_report_pdf(STATEMENTS)))
+
+        self.assertEqual([(p.page_num, p.doc_type, p.year) for p in pages], [
+            (1, "balance_sheet", 2023),
+            (2, "income_statement", 2023),
+            (3, "balance_sheet", 2022),
+            (4, "income_statement", 2022),
+        ])
+        self.assertTrue(all(p.is_confident for p in pages))
+
+    def test_continuation_page_inherits_year(self):
+        texts = [
+            "ROZVAHA v plném rozsahu k 31.12.2023 (v celých tisících Kč) AKTIVA CELKEM Stálá aktiva Oběžná aktiva",
+            "PASIVA CELKEM Vlastní kapitál Cizí zdroje",
+            "Výroční zpráva – obsah",
+        ]
+        pages = find_statement_pages(texts)
+
+        self.assertEqual([(p.page_num, p.year, p.scale) for p in pages], [(0, 2023, "thousands"), (1, 2023, "thousands")])
+
+
+class MergePageResultsTestCase(TestCase):
+    """Tests for merge_page_results"""
+
+    def test_merge_per_type_and_year(self):
+        merged = merge_page_results([
+            {"success": True, "doc_type": "balance_sheet", "year": 2023, "page_num": 2, "confidence": 0.8,
+             "extracted_data": {"total_assets": 999, "equity": 600}, "source": "vision"},
+            {"success": True, "doc_type": "balance_sheet", "year": 2023, "page_num": 1, "confidence": 0.95,
+             "extracted_data": {"total_assets": 1000, "equity": None}, "source": "text_parser"},
+            {"success": True, "doc_type": "income_statement", "year": 2023, "page_num": 3, "confidence": 0.9,
+             "extracted_data": {"revenue": 10}},
+            {"success": False, "error": "cover page", "page_num": 0},
+        ])
+
+        self.assertEqual(len(merged), 2)
+        balance = merged[0]
+        self.assertEqual(balance["extracted_data"], {"total_assets": 1000, "equity": 600})
+        self.assertEqual(balance["pages"], [1, 2])
+        self.assertEqual(balance["confidence"], 0.8)
+        self.assertEqual(balance["sources"], ["text_parser", "vision"])
+
+
+class RenderPagesTestCase(TestCase):
+    """Tests for parallel page rendering"""
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+            tmp.write(make_annual_report_pdf(STATEMENTS[:2]))
+        self.pdf_path = tmp.name
+        self.addCleanup(os.remove, self.pdf_path)
+
+    def test_process_pool_matches_inline(self):
+        with override_settings(INGEST_RENDER_PROCESSES=1):
+            inline = render_pages(self.pdf_path, [1, 2], dpi=120)
+        with override_settings(INGEST_RENDER_PROCESSES=2):
+            pooled = render_pages(self.pdf_path, [2, 1, 2], dpi=120)
+
+        self.assertEqual(sorted(pooled), [1, 2])
+        self.assertEqual({n: img.data for n, img in pooled.items()}, {n: img.data for n, img in inline.items()})
+
+
+class FanoutUploadTestCase(TestCase):
+    """One upload fills every statement it contains"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.user = User.objects.create_user(username="fanout", password="x")
+
+    def _upload(self, pdf_bytes, **kwargs):
+        from ingest.views import _process_uploaded_file_vision
+
+        upload = SimpleUploadedFile("vyrocni_zprava.pdf", pdf_bytes, content_type="application/pdf")
+        return _process_uploaded_file_vision(self.user, upload, **kwargs)
+
+    @patch('ingest.views.FinancialExtractor')
+    def test_annual_report_fills_all_years(self, mock_extractor_cls):
+        result = self._upload(make_annual_report_pdf(STATEMENTS))
+
+        self.assertTrue(result["success"])
+        self.assertEqual(len(result["statements"]), 4)
+        mock_extractor_cls.return_value.extract_from_png.assert_not_called()
+
+        fs_2023 = FinancialStatement.objects.get(user=self.user, year=2023)
+        fs_2022 = FinancialStatement.objects.get(user=self.user, year=2022)
+        self.assertEqual(fs_2023.balance["total_assets"], 20400)
+        self.assertEqual(fs_2023.income["revenue_products_services"], 12500 * 2)
+        self.assertEqual(fs_2022.balance["total_assets"], 20400 * 3)
+        self.assertEqual(fs_2022.income["revenue_products_services"], 12500 * 4)
+
+    @override_settings(INGEST_VISION_CONCURRENCY=1, INGEST_RENDER_PROCESSES=1)
+    @patch('ingest.views.PDFProcessor')
+    @patch('ingest.views.FinancialExtractor')
+    def test_scan_pages_go_to_vision(self, mock_extractor_cls, mock_processor_cls):
+        """Without a text layer every page is classified by vision"""
+        doc = fitz.open()
+        for _ in range(2):
+            doc.new_page().draw_rect(fitz.Rect(72, 60, 520, 400))
+        scan = doc.tobytes()
+        doc.close()
+
+        extractor = mock_extractor_cls.return_value
+        extractor.model = "claude-test"
+        extractor.prompt_version = "v1"
+        extractor.extract_from_png.side_effect = [
+            {"success": True, "doc_type": "balance_sheet", "year": 2023, "scale": "thousands",
+             "extracted_data": {"total_assets": 500}, "confidence": 0.9},
+            {"success": True, "doc_type": "income_statement", "year": 2023, "scale": "thousands",
+             "extracted_data": {"revenue": 700}, "confidence": 0.9},
+        ]
+        mock_processor_cls.return_value.save_png_local.return_value = "ingest/media/extracted_tables/scan.png"
+
+        result = self._upload(scan)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(extractor.extract_from_png.call_count, 2)
+        fs = FinancialStatement.objects.get(user=self.user, year=2023)
+        self.assertEqual(fs.balance["total_assets"], 500)
+        self.assertEqual(fs.income["revenue"], 700)
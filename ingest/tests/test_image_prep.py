@@ -0,0 +1,110 @@
+"""
+Tests for the vision payload optimizer
+"""
+import io
+
+import fitz
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from ingest.extraction.image_prep import ImagePreparer, estimate_tokens, image_media_type
+from ingest.extraction.text_layer import analyze_texts, page_texts
+from ingest.extraction.text_parser import TextStatementParser
+from ingest.tests.pdf_factory import make_statement_pdf
+
+# Fixture corpus: (doc_type, scale, cover_page)
+CORPUS = [
+    ("income_statement", "thousands", False),
+    ("income_statement", "units", True),
+    ("balance_sheet", "thousands", False),
+    ("balance_sheet", "units", True),
+]
+
+
+class ImagePreparerTestCase(TestCase):
+    """Tests for ImagePreparer"""
+
+    def setUp(self):
+        self.preparer = ImagePreparer(max_long_edge=1568, max_pixels=1_150_000)
+
+    def _open(self, **kwargs):
+        doc = fitz.open(stream=make_statement_pdf(**kwargs), filetype="pdf")
+        self.addCleanup(doc.close)
+        hint = analyze_texts(page_texts(doc, 10))
+        return doc.load_page(hint.page_num), hint
+
+    def test_table_rect_contains_all_text(self):
+        """The crop never cuts off a text span"""
+        page, _ = self._open()
+        rect = self.preparer.table_rect(page)
+
+        self.assertLess(rect.get_area(), page.rect.get_area())
+        for block in page.get_text("blocks"):
+            self.assertTrue(rect.contains(fitz.Rect(block[:4])), block[4])
+
+    def test_cropped_region_keeps_extraction_accuracy(self):
+        """Parsing only the cropped region yields the same result on the fixture corpus"""
+        parser = TextStatementParser()
+        for doc_type, scale, cover_page in CORPUS:
+            with self.subTest(doc_type=doc_type, scale=scale, cover_page=cover_page):
+                page, hint = self._open(doc_type=doc_type, scale=scale, cover_page=cover_page)
+                full = parser.parse_page(page, hint)
+                cropped = parser.parse_page(page, hint, clip=self.preparer.table_rect(page))
+
+                self.assertTrue(parser.is_confident(cropped))
+                self.assertEqual(cropped["extracted_data"], full["extracted_data"])
+                self.assertEqual(cropped["confidence"], full["confidence"])
+
+    def test_render_page_grayscale_within_limits(self):
+        """Output is a grayscale PNG within the model's resolution limits and smaller than the legacy render"""
+        page, _ = self._open()
+        prepared = self.preparer.render_page(page, dpi=300, measure_baseline=True)
+
+        img = Image.open(io.BytesIO(prepared.data))
+        self.assertEqual(img.mode, "L")
+        self.assertEqual(prepared.media_type, "image/png")
+        self.assertLessEqual(max(img.size), 1568)
+        self.assertLessEqual(img.width * img.height, 1_150_000)
+        self.assertLess(len(prepared.data), prepared.original_bytes)
+        self.assertGreater(prepared.bytes_saved, 0)
+        self.assertLessEqual(prepared.tokens, prepared.original_tokens)
+
+    @override_settings(INGEST_VISION_MEASURE_BASELINE=False)
+    def test_baseline_not_measured_by_default(self):
+        page, _ = self._open()
+        prepared = self.preparer.render_page(page)
+
+        self.assertIsNone(prepared.original_bytes)
+        self.assertIsNone(prepared.stats()["bytes_saved"])
+
+    def test_prepare_png_crops_and_downscales(self):
+        """Already rendered full-page PNGs are optimized too"""
+        page, _ = self._open()
+        png = page.get_pixmap(matrix=fitz.Matrix(300 / 72, 300 / 72)).tobytes("png")
+        prepared = self.preparer.prepare_png(png)
+
+        img = Image.open(io.BytesIO(prepared.data))
+        self.assertEqual(img.mode, "L")
+        self.assertLessEqual(max(img.size), 1568)
+        self.assertLess(len(prepared.data), len(png))
+
+    def test_webp_format(self):
+        page, _ = self._open()
+        prepared = ImagePreparer(image_format="webp").render_page(page)
+
+        self.assertEqual(prepared.media_type, "image/webp")
+
+    def test_signature_changes_with_settings(self):
+        self.assertNotEqual(ImagePreparer(grayscale=False).signature, ImagePreparer().signature)
+        self.assertNotEqual(ImagePreparer(max_long_edge=1000).signature, ImagePreparer().signature)
+
+    def test_image_media_type(self):
+        self.assertEqual(image_media_type(b"\x89PNG\r\n\x1a\n...."), "image/png")
+        self.assertEqual(image_media_type(b"\xff\xd8\xff\xe0...."), "image/jpeg")
+        self.assertEqual(image_media_type(b"RIFF\x00\x00\x00\x00WEBPVP8L"), "image/webp")
+
+    def test_estimate_tokens(self):
+        """Tokens ≈ w*h/750 after the model's own downscale"""
+        self.assertEqual(estimate_tokens(750, 100), 100)
+        # A4 at 300 DPI is capped at ~1.15 MP by the model
+        self.assertEqual(estimate_tokens(2480, 3508), 1534)
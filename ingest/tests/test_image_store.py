@@ -0,0 +1,120 @@
+"""
+Tests for the content-addressed image store and its garbage collection
+"""
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ingest.extraction.image_store import ImageStore
+from ingest.models import ExtractionCacheEntry, FinancialStatement
+from ingest.tests.factories import make_statement
+
+PNG = b"\x89PNG\r\n\x1a\n"
+
+
+def _age(path, days):
+    old = time.time() - days * 86400
+    os.utime(path, (old, old))
+
+
+class ImageStoreTestCase(TestCase):
+    """Tests for ImageStore"""
+
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir, ignore_errors=True)
+        self.settings_override = override_settings(
+            BASE_DIR=Path(self.base_dir),
+            MEDIA_ROOT=os.path.join(self.base_dir, "media"),
+            INGEST_IMAGE_STORE_DIR="ingest/media/extracted_tables",
+            INGEST_IMAGE_RETENTION_DAYS=7,
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.store = ImageStore()
+        self.user = User.objects.create_user(username="images", password="x")
+
+    def _statement(self, year, image_path):
+        return make_statement(self.user, year, local_image_path=image_path)
+
+    def test_identical_images_written_once(self):
+        first = self.store.save(PNG + b"table")
+        second = self.store.save(PNG + b"table")
+        other = self.store.save(PNG + b"other")
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertEqual(self.store.disk_usage().files, 2)
+        parts = Path(first).parts
+        self.assertEqual(parts[:3], ("ingest", "media", "extracted_tables"))
+        self.assertEqual(parts[3] + parts[4], parts[5][:4])
+
+    def test_webp_extension(self):
+        self.assertTrue(self.store.save(b"RIFF\x00\x00\x00\x00WEBPVP8 ").endswith(".webp"))
+
+    def test_gc_removes_unreferenced_after_retention(self):
+        linked = self.store.save(PNG + b"linked")
+        stale = self.store.save(PNG + b"stale")
+        recent = self.store.save(PNG + b"check_only")
+        self._statement(2023, linked)
+        for path in (linked, stale):
+            _age(self.store.resolve(path), 30)
+
+        report = self.store.collect_garbage()
+
+        self.assertEqual(report.removed, [stale])
+        self.assertEqual((report.kept_referenced, report.kept_recent), (1, 1))
+        self.assertEqual((report.before.files, report.after.files), (3, 2))
+        self.assertLess(report.after.bytes, report.before.bytes)
+        self.assertFalse(self.store.resolve(stale).exists())
+        self.assertFalse(self.store.resolve(stale).parent.exists())
+        self.assertTrue(self.store.resolve(recent).exists())
+
+    def test_dry_run_keeps_files(self):
+        stale = self.store.save(PNG + b"stale")
+        _age(self.store.resolve(stale), 30)
+
+        report = self.store.collect_garbage(dry_run=True)
+
+        self.assertEqual(report.removed, [stale])
+        self.assertTrue(self.store.resolve(stale).exists())
+
+    def test_adopt_legacy_deduplicates(self):
+        legacy_dir = self.store.root
+        legacy_dir.mkdir(parents=True)
+        for name in ("a.png", "b.png"):
+            (legacy_dir / name).write_bytes(PNG + b"same table")
+            _age(legacy_dir / name, 30)
+        self._statement(2022, "ingest/media/extracted_tables/a.png")
+        self._statement(2023, "ingest/media/extracted_tables/b.png")
+        ExtractionCacheEntry.objects.create(
+            key="k", pdf_sha256="x", page="0", dpi=120, model="m", prompt_version="p", result={},
+            image_path="ingest/media/extracted_tables/a.png",
+        )
+
+        report = self.store.collect_garbage(adopt=True)
+
+        paths = set(FinancialStatement.objects.values_list("local_image_path", flat=True))
+        self.assertEqual(len(paths), 1)
+        self.assertTrue(self.store.is_hashed(Path(paths.pop())))
+        self.assertEqual(report.adopted, 2)
+        self.assertEqual(report.after.files, 1)
+        self.assertEqual(ExtractionCacheEntry.objects.get().image_path, FinancialStatement.objects.first().local_image_path)
+
+    def test_command_reports_disk_usage(self):
+        _age(self.store.resolve(self.store.save(PNG + b"stale")), 30)
+        out = StringIO()
+
+        call_command("gc_extracted_images", "--retention-days", "1", stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("Before: 1 files", output)
+        self.assertIn("Removed 1 files", output)
+        self.assertIn("After: 0 files", output)
@@ -0,0 +1,156 @@
+"""
+Tests for background ingest jobs
+"""
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import OnboardingProgress
+from ingest.models import IngestJob, IngestTask
+from ingest.services import job_service
+from ingest.services.job_service import IngestJobService
+
+
+def _pdf(name):
+    return SimpleUploadedFile(name, b"%PDF-1.4 test", content_type="application/pdf")
+
+
+def _fake_vision(user, uploaded_file, check_only=False):
+    if "broken" in uploaded_file.name:
+        return {"file": uploaded_file.name, "success": False, "error": "PDF nebyl rozpoznán"}
+    return {
+        "file": uploaded_file.name,
+        "success": True,
+        "error": None,
+        "year": 2023,
+        "doc_type": "income_statement",
+        "confidence": 0.9,
+    }
+
+
+class IngestJobTestCase(TestCase):
+    """Tests for IngestJobService and the job endpoints"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, INGEST_JOBS_INLINE=False)
+        self.settings_override.enable()
+        self.user = User.objects.create_user(username="jobs", password="x")
+        OnboardingProgress.objects.update_or_create(user=self.user, defaults={"current_step": "done", "is_completed": True})
+        self.service = IngestJobService()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+
+    def test_enqueue_stages_files(self):
+        """Each uploaded file becomes a queued task"""
+        job = self.service.enqueue(self.user, [_pdf("a.pdf"), _pdf("b.pdf")], source="test")
+
+        self.assertEqual(job.status, "queued")
+        self.assertEqual(list(job.tasks.values_list("filename", flat=True)), ["a.pdf", "b.pdf"])
+        self.assertTrue(all(t.file for t in job.tasks.all()))
+
+    @patch('ingest.views._process_uploaded_file_vision', side_effect=_fake_vision)
+    def test_drain_processes_all_tasks(self, mock_vision):
+        """Worker processes every task, records results and finishes the job"""
+        job = self.service.enqueue(self.user, [_pdf("a.pdf"), _pdf("broken.pdf")])
+
+        processed = self.service.drain(concurrency=1)
+
+        self.assertEqual(processed, 2)
+        self.assertEqual(mock_vision.call_count, 2)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "completed")
+        summary = job.to_dict()
+        self.assertEqual((summary["succeeded"], summary["failed"], summary["progress"]), (1, 1, 100))
+        self.assertEqual(summary["tasks"][0]["year"], 2023)
+        self.assertFalse(IngestTask.objects.filter(job=job).exclude(file="").exists())
+
+    def test_claim_is_exclusive(self):
+        """A claimed task is not handed out again"""
+        self.service.enqueue(self.user, [_pdf("a.pdf")])
+
+        self.assertIsNotNone(self.service.claim_next())
+        self.assertIsNone(self.service.claim_next())
+
+    @override_settings(INGEST_JOB_MAX_ATTEMPTS=2)
+    def test_stale_task_fails_after_max_attempts(self):
+        """A file that keeps killing the worker is not requeued forever"""
+        job = self.service.enqueue(self.user, [_pdf("killer.pdf")])
+        past = timezone.now() - timedelta(hours=1)
+
+        task = self.service.claim_next()
+        IngestTask.objects.filter(pk=task.pk).update(started_at=past)
+        self.assertEqual(self.service.requeue_stale(), 1)
+
+        task = self.service.claim_next()
+        self.assertEqual(task.attempts, 2)
+        IngestTask.objects.filter(pk=task.pk).update(started_at=past)
+        self.assertEqual(self.service.requeue_stale(), 0)
+
+        task.refresh_from_db()
+        job.refresh_from_db()
+        self.assertEqual(task.status, "failed")
+        self.assertFalse(task.file)
+        self.assertEqual(job.status, "failed")
+        self.assertIsNone(self.service.claim_next())
+
+    @override_settings(INGEST_VISION_CONCURRENCY=1)  # worker threads would not see the test transaction
+    @patch('ingest.views._process_uploaded_file_vision', side_effect=_fake_vision)
+    def test_inline_worker_recovers_stale_task(self, mock_vision):
+        """The inline worker requeues a task left running by a crashed web process"""
+        job = self.service.enqueue(self.user, [_pdf("a.pdf")])
+        task = self.service.claim_next()
+        IngestTask.objects.filter(pk=task.pk).update(started_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(job_service._inline.drain(), 1)
+
+        task.refresh_from_db()
+        job.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), ("done", 2))
+        self.assertEqual(job.status, "completed")
+
+    @patch('ingest.views.start_inline_worker')
+    def test_status_poll_wakes_inline_worker(self, mock_start):
+        """Polling a pending job starts the inline worker, a finished one does not"""
+        job = self.service.enqueue(self.user, [_pdf("a.pdf")])
+        self.client.force_login(self.user)
+
+        self.client.get(reverse("ingest:job_status_api", args=[job.id]))
+        self.assertEqual(mock_start.call_count, 1)
+
+        IngestJob.objects.filter(pk=job.pk).update(status="completed")
+        self.client.get(reverse("ingest:job_status_api", args=[job.id]))
+        self.assertEqual(mock_start.call_count, 1)
+
+    def test_upload_many_returns_job(self):
+        """AJAX upload returns 202 with a pollable job"""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("ingest:upload_many"),
+            {"pdf_files": [_pdf("a.pdf"), _pdf("b.pdf")]},
+            HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+        )
+
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["job_id"]
+        status = self.client.get(reverse("ingest:job_status_api", args=[job_id])).json()
+        self.assertEqual(status["total"], 2)
+        self.assertFalse(status["finished"])
+
+    def test_job_status_is_owner_only(self):
+        """Other users cannot see the job"""
+        job = IngestJob.objects.create(owner=self.user)
+        other = User.objects.create_user(username="other", password="x")
+        OnboardingProgress.objects.update_or_create(user=other, defaults={"current_step": "done", "is_completed": True})
+        self.client.force_login(other)
+
+        response = self.client.get(reverse("ingest:job_status_api", args=[job.id]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,99 @@
+"""
+Tests for in-memory PDF handling and the upload size limit
+"""
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import fitz
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from ingest.extraction.pdf_processor import (
+    PDFProcessor,
+    PDFTooLargeError,
+    check_pdf_size,
+    open_pdf,
+    read_pdf_bytes,
+)
+from ingest.services.job_service import IngestJobService
+from ingest.tests.pdf_factory import make_statement_pdf
+
+
+class OpenPdfTestCase(TestCase):
+    """Tests for open_pdf / read_pdf_bytes"""
+
+    def setUp(self):
+        self.pdf_bytes = make_statement_pdf()
+
+    def test_sources(self):
+        sources = [
+            self.pdf_bytes,
+            memoryview(self.pdf_bytes),
+            SimpleUploadedFile("vykaz.pdf", self.pdf_bytes, content_type="application/pdf"),
+        ]
+        for source in sources:
+            with open_pdf(source) as doc:
+                self.assertEqual(doc.page_count, 1)
+
+    def test_open_document_stays_open(self):
+        doc = fitz.open(stream=self.pdf_bytes, filetype="pdf")
+        with open_pdf(doc) as opened:
+            self.assertIs(opened, doc)
+        self.assertFalse(doc.is_closed)
+        doc.close()
+
+    def test_stream_is_read_from_start(self):
+        upload = SimpleUploadedFile("vykaz.pdf", self.pdf_bytes)
+        upload.read(100)
+        self.assertEqual(bytes(read_pdf_bytes(upload)), self.pdf_bytes)
+
+    def test_processor_from_bytes(self):
+        processor = PDFProcessor(dpi=72)
+
+        self.assertEqual(processor.get_pdf_info(self.pdf_bytes)["page_count"], 1)
+        self.assertIn("VÝKAZ ZISKU A ZTRÁTY", processor.extract_text(self.pdf_bytes))
+        self.assertTrue(processor.pdf_to_png(self.pdf_bytes).startswith(b"\x89PNG"))
+
+
+@override_settings(INGEST_MAX_PDF_SIZE=1024)
+class PdfSizeLimitTestCase(TestCase):
+    """Oversize PDFs are rejected before anything is written to disk"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="limit", password="x")
+        self.big = SimpleUploadedFile("velky.pdf", b"%PDF-1.4" + b"0" * 2048, content_type="application/pdf")
+
+    def test_check_pdf_size(self):
+        check_pdf_size(b"x" * 1024)
+        with self.assertRaises(PDFTooLargeError):
+            check_pdf_size(self.big)
+        with self.assertRaises(PDFTooLargeError):
+            read_pdf_bytes(b"x" * 1025)
+
+    @patch('ingest.views.FinancialExtractor')
+    def test_upload_rejected(self, mock_extractor_cls):
+        from ingest.views import _process_uploaded_file_vision
+
+        with patch('tempfile.NamedTemporaryFile') as mock_tmp:
+            result = _process_uploaded_file_vision(self.user, self.big)
+
+        self.assertFalse(result["success"])
+        self.assertIn("příliš velký", result["error"])
+        mock_tmp.assert_not_called()
+        mock_extractor_cls.return_value.extract_from_png.assert_not_called()
+
+    def test_job_task_failed_without_staging(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+
+        with override_settings(MEDIA_ROOT=media_root, INGEST_JOBS_INLINE=False):
+            job = IngestJobService().enqueue(self.user, [self.big], source="test")
+
+        task = job.tasks.get()
+        self.assertEqual(task.status, "failed")
+        self.assertIn("příliš velký", task.error)
+        self.assertFalse(task.file)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
@@ -0,0 +1,101 @@
+"""
+Tests for the materialized StatementMetrics table
+"""
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models.signals import post_save
+from django.test import TestCase
+
+from dashboard.views import build_dashboard_context
+from finance.utils import compute_metrics
+from ingest.models import FinancialStatement, StatementMetrics
+from ingest.services.metrics_service import user_metrics
+from ingest.signals import refresh_metrics_on_save
+from ingest.tests.factories import TemporaryMediaMixin, make_statement
+
+
+def _income(revenue, cogs, overheads):
+    return {"revenue": revenue, "cogs": cogs, "overheads": overheads}
+
+
+class StatementMetricsTestCase(TemporaryMediaMixin, TestCase):
+    """Tests for metrics maintained on FinancialStatement writes"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="metrics", password="x")
+
+    def test_metrics_match_compute_metrics(self):
+        fs = make_statement(self.user, 2023, {"revenue_products_services": "1 000", "cogs_goods": 300, "personnel_costs": 200})
+
+        metrics = fs.metrics
+        expected = compute_metrics(fs)
+        for name in ("revenue", "cogs", "gross_margin", "overheads", "ebit", "net_profit"):
+            self.assertAlmostEqual(getattr(metrics, name), expected[name])
+        self.assertEqual(metrics.profitability, expected["profitability"])
+        self.assertTrue(metrics.has_income)
+        self.assertFalse(metrics.has_balance)
+
+    def test_growth_updated_when_years_change(self):
+        make_statement(self.user, 2022, _income(1000, 500, 200))
+        fs_2024 = make_statement(self.user, 2024, _income(1500, 600, 300))
+        make_statement(self.user, 2023, _income(1200, 550, 250))
+
+        rows = user_metrics(self.user)
+        self.assertEqual([m.year for m in rows], [2022, 2023, 2024])
+        self.assertIsNone(rows[0].revenue_yoy)
+        self.assertAlmostEqual(rows[1].revenue_yoy, 20.0)
+        self.assertAlmostEqual(rows[2].revenue_yoy, 25.0)
+
+        fs_2024.income = _income(1800, 600, 300)
+        fs_2024.save()
+        self.assertAlmostEqual(StatementMetrics.objects.get(year=2024).revenue_yoy, 50.0)
+
+        FinancialStatement.objects.get(year=2023).delete()
+        self.assertAlmostEqual(StatementMetrics.objects.get(year=2024).revenue_yoy, 80.0)
+
+    def test_unrelated_save_skips_refresh(self):
+        fs = make_statement(self.user, 2023, _income(1000, 500, 200))
+        computed_at = fs.metrics.computed_at
+
+        fs.local_image_path = "ingest/media/extracted_tables/x.png"
+        fs.save(update_fields=["local_image_path"])
+
+        self.assertEqual(StatementMetrics.objects.get(statement=fs).computed_at, computed_at)
+
+    def test_missing_rows_materialized_on_read(self):
+        post_save.disconnect(refresh_metrics_on_save, sender=FinancialStatement)
+        try:
+            make_statement(self.user, 2022, _income(1000, 500, 200))
+            make_statement(self.user, 2023, _income(1100, 500, 200))
+        finally:
+            post_save.connect(refresh_metrics_on_save, sender=FinancialStatement)
+        self.assertFalse(StatementMetrics.objects.exists())
+
+        rows = user_metrics(self.user)
+
+        self.assertEqual(len(rows), 2)
+        self.assertAlmostEqual(rows[1].revenue_yoy, 10.0)
+
+    def test_dashboard_reads_one_query(self):
+        make_statement(self.user, 2022, _income(1000, 500, 200))
+        make_statement(self.user, 2023, _income(1100, 500, 200))
+
+        with self.assertNumQueries(1):
+            rows = user_metrics(self.user)
+        context = build_dashboard_context(self.user)
+
+        self.assertEqual([r["year"] for r in context["table_rows"]], [2022, 2023])
+        self.assertAlmostEqual(context["table_rows"][1]["growth"]["revenue"], 10.0)
+        self.assertEqual(rows[1].revenue, context["table_rows"][1]["revenue"])
+
+    def test_backfill_command(self):
+        make_statement(self.user, 2023, _income(1000, 500, 200))
+        StatementMetrics.objects.all().delete()
+        out = StringIO()
+
+        call_command("backfill_statement_metrics", stdout=out)
+
+        self.assertEqual(StatementMetrics.objects.count(), 1)
+        self.assertIn("Metrics refreshed for 1 statements", out.getvalue())
@@ -0,0 +1,50 @@
+"""
+Tests for canonical schema normalization of stored statements
+"""
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from finance.schema import SCHEMA_KEY, is_canonical
+from ingest.models import FinancialStatement, StatementMetrics
+from ingest.tests.factories import TemporaryMediaMixin, make_statement
+
+
+class StatementSchemaTestCase(TemporaryMediaMixin, TestCase):
+    """Tests for normalization on write and the normalize_statements command"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="schema", password="x")
+
+    def test_normalized_on_save(self):
+        fs = make_statement(self.user, 2023, income={"Revenue": "2 000", "EBIT": 300}, balance={})
+        fs.refresh_from_db()
+
+        self.assertEqual(fs.income, {"revenue": 2000.0, "ebit": 300.0, SCHEMA_KEY: 1})
+        self.assertEqual(fs.balance, {})
+        self.assertEqual(fs.metrics.revenue, 2000.0)
+
+    def test_command_rewrites_legacy_rows(self):
+        fs_a = make_statement(self.user, 2022)
+        fs_b = make_statement(self.user, 2023)
+        FinancialStatement.objects.filter(pk=fs_a.pk).update(income={"Revenue": "1 000 Kč", "COGS": "400"})
+        FinancialStatement.objects.filter(pk=fs_b.pk).update(balance={"Cash": 10, "TotalAssets": 100})
+        out = StringIO()
+
+        call_command("normalize_statements", "--batch-size", "1", "--dry-run", stdout=out)
+        self.assertFalse(is_canonical(FinancialStatement.objects.get(pk=fs_a.pk).income))
+
+        call_command("normalize_statements", "--batch-size", "1", stdout=out)
+
+        fs_a.refresh_from_db()
+        fs_b.refresh_from_db()
+        self.assertEqual(fs_a.income["revenue"], 1000.0)
+        self.assertEqual(fs_b.balance["total_assets"], 100.0)
+        self.assertEqual(StatementMetrics.objects.get(statement=fs_a).cogs, 400.0)
+        self.assertIn("2 of 2 statements rewritten", out.getvalue())
+
+        out = StringIO()
+        call_command("normalize_statements", stdout=out)
+        self.assertIn("0 of 2 statements rewritten", out.getvalue())
@@ -0,0 +1,72 @@
+"""
+Tests for the text-layer pre-pass
+"""
+import os
+import tempfile
+from unittest.mock import patch
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from ingest.extraction.text_layer import analyze_page_text, detect_statement
+from ingest.tests.pdf_factory import make_statement_pdf
+
+
+class TextLayerTestCase(TestCase):
+    """Tests for detect_statement"""
+
+    def _detect(self, pdf_bytes):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+            tmp.write(pdf_bytes)
+        try:
+            return detect_statement(tmp.name)
+        finally:
+            os.remove(tmp.name)
+
+    def test_income_statement(self):
+        """Detects type, year and scale of an income statement"""
+        hint = self._detect(make_statement_pdf("income_statement", year=2023))
+
+        self.assertEqual(hint.doc_type, "income_statement")
+        self.assertEqual(hint.year, 2023)
+        self.assertEqual(hint.scale, "thousands")
+        self.assertTrue(hint.is_confident)
+
+    def test_balance_sheet_after_cover_page(self):
+        """Finds the statement page in a multi-page PDF"""
+        hint = self._detect(make_statement_pdf("balance_sheet", year=2022, scale="units", cover_page=True))
+
+        self.assertEqual(hint.doc_type, "balance_sheet")
+        self.assertEqual(hint.year, 2022)
+        self.assertEqual(hint.scale, "units")
+        self.assertEqual(hint.page_num, 1)
+
+    def test_scanned_pdf_is_not_confident(self):
+        """PDF without text layer falls back to vision"""
+        hint = self._detect(make_statement_pdf(with_text=False))
+
+        self.assertFalse(hint.has_text)
+        self.assertFalse(hint.is_confident)
+
+    def test_current_period_year_wins(self):
+        """Previous period date does not override the current one"""
+        page = analyze_page_text("ROZVAHA k 31.12.2023 Běžné období 31.12.2023 Minulé období 31.12.2022")
+        self.assertEqual(page["year"], 2023)
+
+
+class CheckOnlyPrepassTestCase(TestCase):
+    """upload_pdf duplicate check runs without AI for text PDFs"""
+
+    @patch('ingest.views.FinancialExtractor')
+    def test_check_only_skips_vision(self, mock_extractor_cls):
+        from ingest.views import _process_uploaded_file_vision
+
+        user = User.objects.create_user(username="prepass", password="x")
+        upload = SimpleUploadedFile("vzz.pdf", make_statement_pdf(year=2024), content_type="application/pdf")
+
+        result = _process_uploaded_file_vision(user, upload, check_only=True)
+
+        self.assertTrue(result["success"])
+        self.assertEqual((result["doc_type"], result["year"]), ("income_statement", 2024))
+        self.assertEqual(result["source"], "text_layer")
+        mock_extractor_cls.assert_not_called()
@@ -0,0 +1,97 @@
+"""
+Tests for the deterministic text-layer statement parser
+"""
+import os
+import tempfile
+from unittest.mock import patch
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from ingest.extraction.text_parser import TextStatementParser, parse_number
+from ingest.models import FinancialStatement
+from ingest.tests.pdf_factory import make_statement_pdf
+
+
+class TextStatementParserTestCase(TestCase):
+    """Tests for TextStatementParser"""
+
+    def setUp(self):
+        self.parser = TextStatementParser()
+
+    def _parse(self, pdf_bytes):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+            tmp.write(pdf_bytes)
+        try:
+            return self.parser.parse(tmp.name)
+        finally:
+            os.remove(tmp.name)
+
+    def test_parse_number(self):
+        """Czech number formats"""
+        self.assertEqual(parse_number("12 500"), 12500)
+        self.assertEqual(parse_number("(1 200)"), -1200)
+        self.assertEqual(parse_number("-350"), -350)
+        self.assertEqual(parse_number("1 234,5"), 1234.5)
+        self.assertIsNone(parse_number("A.1."))
+
+    def test_income_statement_current_period(self):
+        """Values come from "Běžné období", detail rows win over aggregates"""
+        result = self._parse(make_statement_pdf("income_statement", year=2023))
+        data = result["extracted_data"]
+
+        self.assertTrue(self.parser.is_confident(result))
+        self.assertEqual(result["source"], "text_parser")
+        self.assertEqual(data["revenue_products_services"], 12500)
+        self.assertEqual(data["revenue_goods"], 3400)
+        self.assertEqual(data["cogs_goods"], 2500)
+        self.assertEqual(data["cogs_services"], 2500)
+        self.assertEqual(data["personnel_wages"], 2900)  # D.1., not D. Osobní náklady
+        self.assertEqual(data["revenue"], 15900)
+        self.assertEqual(data["cogs"], 6600)
+        self.assertIsNone(data["income_tax"])
+
+    def test_balance_sheet_in_units(self):
+        """Units are converted to thousands like the vision path"""
+        result = self._parse(make_statement_pdf("balance_sheet", year=2022, scale="units", cover_page=True))
+        data = result["extracted_data"]
+
+        self.assertEqual(result["scale"], "thousands")
+        self.assertEqual(data["total_assets"], 20.4)
+        self.assertEqual(data["equity"], 11.8)
+        self.assertEqual(data["total_liabilities"], 8.6)
+
+    def test_missing_scale_defaults_to_thousands(self):
+        """No unit marker → values stay in thousands and vision double-checks"""
+        result = self._parse(make_statement_pdf("income_statement", year=2023, scale=None))
+
+        self.assertEqual(result["scale"], "thousands")
+        self.assertEqual(result["extracted_data"]["revenue_products_services"], 12500)
+        self.assertFalse(self.parser.is_confident(result))
+
+    def test_unknown_layout_is_not_confident(self):
+        """Few recognised rows → vision fallback"""
+        rows = [("I.", "Tržby z prodeje výrobků a služeb", 100, 90)]
+        result = self._parse(make_statement_pdf("income_statement", rows=rows))
+
+        self.assertFalse(self.parser.is_confident(result))
+
+
+class TextParserUploadTestCase(TestCase):
+    """Digital PDFs are saved without calling Claude"""
+
+    @patch('ingest.views.FinancialExtractor')
+    def test_upload_without_vision(self, mock_extractor_cls):
+        from ingest.views import _process_uploaded_file_vision
+
+        user = User.objects.create_user(username="parser", password="x")
+        upload = SimpleUploadedFile("vzz.pdf", make_statement_pdf(year=2023), content_type="application/pdf")
+
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            result = _process_uploaded_file_vision(user, upload)
+
+        self.assertTrue(result["success"])
+        mock_extractor_cls.assert_not_called()
+        fs = FinancialStatement.objects.get(user=user, year=2023)
+        self.assertEqual(fs.income["revenue_products_services"], 12500)
+        self.assertEqual(fs.scale, "thousands")
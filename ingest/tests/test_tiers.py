@@ -0,0 +1,123 @@
+"""
+Tests for adaptive DPI escalation of vision extraction
+"""
+import os
+import tempfile
+from unittest.mock import MagicMock
+
+from django.test import TestCase, override_settings
+
+from ingest.extraction.postprocess import aggregate_mismatches, post_process_extraction
+from ingest.extraction.tiers import TieredVisionExtractor, dpi_tiers
+from ingest.models import VisionTierStat
+from ingest.tests.pdf_factory import make_statement_pdf
+
+
+def _result(confidence=0.95, **extra):
+    return {
+        "success": True,
+        "doc_type": "income_statement",
+        "year": 2023,
+        "scale": "thousands",
+        "extracted_data": {"revenue": 1000},
+        "confidence": confidence,
+        "consistency_issues": [],
+        **extra,
+    }
+
+
+class AggregateMismatchesTestCase(TestCase):
+    """Tests for the accounting identity checks"""
+
+    def test_consistent_data(self):
+        data = {"revenue": 1500, "revenue_products_services": 1000, "revenue_goods": 500,
+                "total_assets": 1000, "equity": 600, "total_liabilities": 390}
+        self.assertEqual(aggregate_mismatches(data), [])
+
+    def test_mismatches(self):
+        data = {"revenue": 1800, "revenue_products_services": 1000, "revenue_goods": 500,
+                "cogs": 300, "cogs_goods": 100, "cogs_materials": 100,
+                "total_assets": 1000, "equity": 600, "total_liabilities": 100}
+        self.assertEqual(aggregate_mismatches(data), ["revenue", "cogs", "total_assets"])
+
+    def test_missing_parts_are_not_checked(self):
+        self.assertEqual(aggregate_mismatches({"revenue": 1800, "revenue_goods": 500}), [])
+
+    def test_recorded_before_aggregates_are_overwritten(self):
+        result = post_process_extraction({
+            "success": True,
+            "scale": "thousands",
+            "extracted_data": {"revenue": 1800, "revenue_products_services": 1000, "revenue_goods": 500},
+        })
+        self.assertEqual(result["consistency_issues"], ["revenue"])
+        self.assertEqual(result["extracted_data"]["revenue"], 1500)
+
+
+class TieredVisionExtractorTestCase(TestCase):
+    """Tests for TieredVisionExtractor"""
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
+            tmp.write(make_statement_pdf(with_text=False))
+        self.pdf_path = tmp.name
+        self.addCleanup(os.remove, self.pdf_path)
+        self.extractor = MagicMock()
+
+    def _tiered(self, *results):
+        self.extractor.extract_from_png.side_effect = list(results)
+        return TieredVisionExtractor(self.extractor, tiers=[120, 200, 300], min_confidence=0.85)
+
+    def test_confident_low_tier_stops(self):
+        """One render + one AI call when the lowest tier is trustworthy"""
+        result, prepared = self._tiered(_result()).extract(self.pdf_path)
+
+        self.assertEqual(self.extractor.extract_from_png.call_count, 1)
+        self.assertEqual(result["render_dpi"], 120)
+        self.assertEqual(result["tiers_tried"], 1)
+        self.assertIsNotNone(prepared)
+        stat = VisionTierStat.objects.get(dpi=120)
+        self.assertEqual((stat.attempts, stat.accepted), (1, 1))
+        self.assertFalse(VisionTierStat.objects.filter(dpi=200).exists())
+
+    def test_low_confidence_escalates(self):
+        result, _ = self._tiered(_result(0.5), _result(0.9)).extract(self.pdf_path)
+
+        self.assertEqual(result["render_dpi"], 200)
+        self.assertEqual(VisionTierStat.objects.get(dpi=120).low_confidence, 1)
+        self.assertEqual(VisionTierStat.objects.get(dpi=200).accepted, 1)
+
+    def test_inconsistent_totals_escalate(self):
+        result, _ = self._tiered(
+            _result(consistency_issues=["revenue"]),
+            _result(consistency_issues=["revenue"]),
+            _result(),
+        ).extract(self.pdf_path)
+
+        self.assertEqual(result["render_dpi"], 300)
+        self.assertEqual(result["tiers_tried"], 3)
+        self.assertEqual(VisionTierStat.objects.get(dpi=200).inconsistent, 1)
+
+    def test_best_result_when_no_tier_accepted(self):
+        result, _ = self._tiered(_result(0.6), _result(0.8), _result(0.7)).extract(self.pdf_path)
+
+        self.assertEqual(result["confidence"], 0.8)
+        self.assertEqual(result["render_dpi"], 200)
+
+    def test_failure_does_not_escalate(self):
+        """API errors are not a resolution problem"""
+        result, _ = self._tiered({"success": False, "error": "API down"}).extract(self.pdf_path)
+
+        self.assertFalse(result["success"])
+        self.assertEqual(self.extractor.extract_from_png.call_count, 1)
+        self.assertEqual(VisionTierStat.objects.get(dpi=120).failed, 1)
+
+    def test_higher_tier_renders_more_pixels(self):
+        self._tiered(_result(0.5), _result(0.5), _result(0.5)).extract(self.pdf_path)
+
+        sizes = [VisionTierStat.objects.get(dpi=dpi).payload_bytes for dpi in (120, 200, 300)]
+        self.assertLess(sizes[0], sizes[1])
+
+    @override_settings(INGEST_VISION_DPI_TIERS="300, 150")
+    def test_tiers_from_settings(self):
+        self.assertEqual(dpi_tiers(), [150, 300])
+        self.assertIn("tiers150/300", TieredVisionExtractor(self.extractor).signature)
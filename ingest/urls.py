@@ -7,7 +7,9 @@ urlpatterns = [
     path("documents/", views.documents_list, name="documents"),
     path("upload/", views.upload_pdf, name="upload_pdf"),
     path("upload-many/", views.upload_many, name="upload_many"),
+    path("jobs/<int:job_id>/", views.job_detail, name="job_detail"),
     path("api/documents/", views.documents_api, name="documents_api"),
     path("api/documents/<int:document_id>/", views.document_api, name="document_api"),
     path("api/upload-vision/", views.upload_vision_api, name="upload_vision_api"),
+    path("api/jobs/<int:job_id>/", views.job_status_api, name="job_status_api"),
 ]
@@ -36,7 +36,7 @@ INCOME_STATEMENT_FIELDS = [
     'revenue_goods',              # Tržby za prodej zboží
     'cogs_goods',                 # Náklady vynaložené na prodané zboží
     'cogs_materials',             # Spotřeba materiálu a energie
-    'services',                   # Služby
+    'cogs_services',              # Služby
     'personnel_wages',            # Mzdové náklady / Osobní náklady
     'personnel_insurance',        # Náklady na sociální zabezpečení
     'taxes_fees',                 # Daně a poplatky
@@ -91,7 +91,7 @@ SCALE_CHOICES = [
 ]
 
 # ================================================================
-# Czech Accounting Row Mappings (for reference)
+# Czech Accounting Row Mappings (used by extraction/text_parser.py)
 # ================================================================
 
 # Income Statement row mappings (Czech → English field names)
@@ -99,19 +99,22 @@ INCOME_STATEMENT_ROW_MAPPING = {
     # Revenue
     "tržby za prodej zboží": "revenue_goods",
     "tržby za prodej vlastních výrobků a služeb": "revenue_products_services",
+    "tržby z prodeje výrobků a služeb": "revenue_products_services",
 
     # COGS
     "náklady vynaložené na prodané zboží": "cogs_goods",
     "spotřeba materiálu a energie": "cogs_materials",
 
     # Operating costs
-    "služby": "services",
+    "služby": "cogs_services",
     "mzdové náklady": "personnel_wages",
     "osobní náklady": "personnel_wages",
     "náklady na sociální zabezpečení": "personnel_insurance",
     "zákonné sociální pojištění": "personnel_insurance",
     "daně a poplatky": "taxes_fees",
     "odpisy dlouhodobého majetku": "depreciation",
+    "odpisy dlouhodobého nehmotného a hmotného majetku": "depreciation",
+    "úpravy hodnot v provozní oblasti": "depreciation",
     "ostatní provozní náklady": "other_operating_costs",
     "ostatní provozní výnosy": "other_operating_revenue",
 
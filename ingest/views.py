@@ -1,20 +1,37 @@
 import logging
 import os
-import tempfile
 import uuid
 from datetime import datetime
 from typing import Any, Dict
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
 from django.db.models import Max
 from django.http import HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 
-from ingest.models import Document, FinancialStatement
-from ingest.extraction.pdf_processor import PDFProcessor
+from ingest.models import Document, FinancialStatement, IngestJob
+from ingest.extraction.pdf_processor import (
+    PDFProcessor,
+    PDFTooLargeError,
+    max_pdf_size,
+    open_pdf,
+    read_pdf_bytes,
+)
 from ingest.extraction.claude_extractor import FinancialExtractor
+from ingest.extraction.cache import extraction_cache, sha256_bytes
+from ingest.extraction.fanout import merge_page_results, render_pages, run_concurrently
+from ingest.extraction.limits import vision_concurrency
+from ingest.extraction.text_layer import TextLayerHint, detect_statement, find_statement_pages, page_texts
+from ingest.extraction.text_parser import TextStatementParser
+from ingest.extraction.tiers import TieredVisionExtractor, dpi_tiers
+from ingest.services.job_service import IngestJobService, start_inline_worker
 
 logger = logging.getLogger(__name__)
 
@@ -22,12 +39,157 @@ logger = logging.getLogger(__name__)
 # ================================================================
 #   VISION-BASED EXTRACTION (NEW)
 # ================================================================
+def _image_exists(image_path):
+    """Cached PNG paths are relative to BASE_DIR (see PDFProcessor.save_png_local)."""
+    if not image_path:
+        return False
+    return os.path.exists(os.path.join(settings.BASE_DIR, image_path))
+
+
+def _extract_with_vision(pdf_source, pdf_sha256, page_num, check_only, file_name, first_image=None):
+    """
+    Claude vision extrakce jedné stránky (s cache podle obsahu PDF).
+    Stránka se renderuje nejdřív v nejnižším DPI, vyšší DPI jen při nízké
+    confidence nebo nesedících součtech (TieredVisionExtractor).
+    first_image = stránka už vyrenderovaná v nejnižším DPI (fan-out).
+
+    Returns:
+        (extraction_result, local_image_path)
+    """
+    extractor = FinancialExtractor()
+    tiered = TieredVisionExtractor(extractor)
+    cache_key = {
+        "pdf_sha256": pdf_sha256,
+        "page": page_num,
+        "dpi": tiered.tiers[-1],
+        "model": extractor.model,
+        "prompt_version": extractor.prompt_version,
+        "variant": tiered.signature,
+    }
+
+    # Cache – stejné bajty = žádné další volání AI
+    cached = extraction_cache.get(**cache_key)
+    if cached is not None:
+        local_image_path = cached.image_path
+        if not check_only and not _image_exists(local_image_path):
+            processor = PDFProcessor(dpi=cached.result.get("render_dpi") or tiered.tiers[-1])
+            prepared = processor.pdf_to_vision_image(pdf_source, page_num=page_num, preparer=tiered.preparer)
+            local_image_path = processor.save_png_local(prepared.data)
+            extraction_cache.update_image_path(cached, local_image_path)
+        return cached.result, local_image_path
+
+    # PDF → optimalizovaný obrázek → Claude vision, DPI podle potřeby
+    logger.info(f"Extracting page {page_num} with Claude vision (DPI tiers {tiered.tiers}): {file_name}")
+    extraction_result, prepared = tiered.extract(pdf_source, page_num=page_num, first_image=first_image)
+
+    # Save image locally
+    local_image_path = PDFProcessor().save_png_local(prepared.data)
+    logger.info(f"PNG saved to: {local_image_path}")
+
+    if extraction_result.get("success"):
+        extraction_cache.set(**cache_key, result=extraction_result, image_path=local_image_path)
+
+    return extraction_result, local_image_path
+
+
+def _apply_text_hint(extraction_result, hint):
+    """Text layer is literal – keep check_only and full pass consistent."""
+    doc_type, year = extraction_result.get("doc_type"), extraction_result.get("year")
+    if hint.is_confident and (doc_type, year) != (hint.doc_type, hint.year):
+        logger.warning(
+            f"Vision ({doc_type}, {year}) disagrees with text layer "
+            f"({hint.doc_type}, {hint.year}), using text layer"
+        )
+        extraction_result["doc_type"], extraction_result["year"] = hint.doc_type, hint.year
+    return extraction_result
+
+
+def _extract_page_text(pdf_source, hint):
+    """Deterministický parser textové vrstvy; None když si není jistý."""
+    if not (hint.has_text and hint.doc_type):
+        return None
+    text_parser = TextStatementParser()
+    parsed = text_parser.parse(pdf_source, hint)
+    if not text_parser.is_confident(parsed):
+        logger.info(f"Text-layer parser not confident ({parsed.get('confidence')}) on page {hint.page_num}")
+        return None
+    return {**parsed, "page_num": hint.page_num, "local_image_path": ""}
+
+
+def _extract_page_vision(pdf_source, pdf_sha256, hint, check_only, file_name, first_image=None):
+    extraction_result, local_image_path = _extract_with_vision(
+        pdf_source, pdf_sha256, hint.page_num, check_only, file_name, first_image=first_image
+    )
+    extraction_result = _apply_text_hint(dict(extraction_result), hint)
+    extraction_result.update({"page_num": hint.page_num, "local_image_path": local_image_path or ""})
+    return extraction_result
+
+
+def _extract_page(pdf_source, pdf_sha256, hint, check_only, file_name):
+    """Jedna stránka: textová vrstva, vision jen jako fallback."""
+    return (
+        _extract_page_text(pdf_source, hint)
+        or _extract_page_vision(pdf_source, pdf_sha256, hint, check_only, file_name)
+    )
+
+
+def _extract_statements(pdf, pdf_bytes, pdf_sha256, file_name):
+    """
+    Fan-out přes všechny stránky s výkazy (výroční zprávy: rozvaha + VZZ, více let).
+    Stránky pro vision se renderují v process poolu a extrahují souběžně,
+    výsledky se sloučí podle (typ, rok).
+
+    Args:
+        pdf: otevřený fitz.Document (textová vrstva, jen toto vlákno)
+        pdf_bytes: obsah PDF pro process pool a vision vlákna (fitz handle není thread-safe)
+
+    Returns:
+        list sloučených výkazů (viz merge_page_results)
+    """
+    page_count = pdf.page_count
+    texts = page_texts(pdf, getattr(settings, "INGEST_FANOUT_MAX_PAGES", 40))
+
+    pages = find_statement_pages(texts)
+    if not pages:
+        # Sken / neznámé rozložení – typ a rok určí vision pro každou stránku
+        scan_pages = min(page_count, getattr(settings, "INGEST_FANOUT_SCAN_PAGES", 3))
+        pages = [TextLayerHint(page_num=num, page_count=page_count) for num in range(scan_pages)]
+    logger.info(f"Fan-out {file_name}: pages {[p.page_num for p in pages]}")
+
+    # Textová vrstva je levná – parsovat hned, zbytek jde na vision
+    page_results, vision_pages = [], []
+    for hint in pages:
+        parsed = _extract_page_text(pdf, hint)
+        if parsed is not None:
+            page_results.append(parsed)
+        else:
+            vision_pages.append(hint)
+
+    if vision_pages:
+        images = {}
+        if len(vision_pages) > 1:
+            images = render_pages(pdf_bytes, [p.page_num for p in vision_pages], dpi_tiers()[0])
+
+        def extract(hint):
+            return _extract_page_vision(
+                pdf_bytes, pdf_sha256, hint, False, file_name, first_image=images.get(hint.page_num)
+            )
+
+        page_results.extend(run_concurrently(extract, vision_pages, vision_concurrency()))
+
+    failed = [r for r in page_results if not r.get("success")]
+    if failed:
+        logger.info(f"Fan-out {file_name}: {len(failed)} pages without a statement")
+    return merge_page_results(page_results)
+
+
 def _process_uploaded_file_vision(user, uploaded_file, check_only=False):
     """
     Nová vision-based extrakce:
-    1. PDF → PNG
-    2. Claude vidí PNG graficky
-    3. Extrahuje data z "Běžné období"
+    1. Text-layer pre-pass najde stránku, typ a rok (check_only bez AI)
+    2. Deterministický parser textové vrstvy (sloupec "Běžné období")
+    3. Fallback: PDF → PNG → Claude vision
+    4. Plné zpracování projde všechny stránky s výkazy a uloží každý rok
 
     Args:
         user: Django User instance
@@ -40,122 +202,152 @@ def _process_uploaded_file_vision(user, uploaded_file, check_only=False):
         "error": None,
     }
 
-    tmp_path = None
-
     try:
         # -------------------------
-        # 1) Uložit dočasný PDF
+        # 1) Načíst PDF do paměti – velikost se kontroluje před čtením, žádný dočasný soubor
         # -------------------------
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            for chunk in uploaded_file.chunks():
-                tmp.write(chunk)
-            tmp_path = tmp.name
+        pdf_bytes = read_pdf_bytes(uploaded_file)
+        pdf_sha256 = sha256_bytes(pdf_bytes)
 
-        # -------------------------
-        # 2) PDF → PNG conversion
-        # -------------------------
-        logger.info(f"Converting PDF to PNG: {uploaded_file.name}")
-        processor = PDFProcessor(dpi=300)
-        png_bytes = processor.pdf_to_png(tmp_path, page_num=0)
+        with open_pdf(pdf_bytes) as pdf:
+            return _process_pdf(user, uploaded_file, pdf, pdf_bytes, pdf_sha256, check_only, result)
+
+    except PDFTooLargeError as exc:
+        logger.warning(f"Upload {uploaded_file} rejected: {exc}")
+        result["error"] = f"Soubor je příliš velký (max. {max_pdf_size() // (1024 * 1024)} MB)."
+        return result
 
-        # Save PNG locally
-        local_image_path = processor.save_png_local(png_bytes)
-        logger.info(f"PNG saved to: {local_image_path}")
+    except Exception as exc:
+        logger.error(f"Chyba při zpracování (vision): {uploaded_file}: {exc}", exc_info=True)
+        result["error"] = str(exc)
+        return result
 
-        # -------------------------
-        # 3) Claude vision extraction
-        # -------------------------
-        logger.info("Extracting data with Claude vision API")
-        extractor = FinancialExtractor()
-        extraction_result = extractor.extract_from_png(png_bytes)
 
+def _process_pdf(user, uploaded_file, pdf, pdf_bytes, pdf_sha256, check_only, result):
+    """Kroky 2–6 nad jedním otevřeným dokumentem (sdílený handle pro pre-pass, parser i render)."""
+    # -------------------------
+    # 2) Text-layer pre-pass – typ, rok a stránka bez AI
+    # -------------------------
+    hint = detect_statement(pdf)
+    if check_only and hint.is_confident:
+        result.update({
+            "success": True,
+            "year": hint.year,
+            "doc_type": hint.doc_type,
+            "confidence": hint.confidence,
+            "check_only": True,
+            "source": "text_layer",
+        })
+        return result
+
+    # -------------------------
+    # 3) Extrakce – textová vrstva, vision jen jako fallback.
+    #    Plné zpracování projde všechny stránky s výkazy (fan-out).
+    # -------------------------
+    if check_only or not getattr(settings, "INGEST_FANOUT_ENABLED", True):
+        extraction_result = _extract_page(pdf, pdf_sha256, hint, check_only, uploaded_file.name)
         if not extraction_result.get("success"):
             error_msg = extraction_result.get("error", "Extraction failed")
             logger.error(f"Extraction failed: {error_msg}")
             result["error"] = error_msg
             return result
+        statements = merge_page_results([extraction_result])
+    else:
+        statements = _extract_statements(pdf, pdf_bytes, pdf_sha256, uploaded_file.name)
 
-        doc_type = extraction_result.get("doc_type")
-        year = extraction_result.get("year")
-        data = extraction_result.get("extracted_data") or {}
-        scale = extraction_result.get("scale") or "units"
-        confidence = extraction_result.get("confidence", 0.0)
+    if not statements:
+        msg = "PDF nebyl rozpoznán (typ nebo rok chybí)."
+        logger.warning(f"{msg} Soubor: {uploaded_file.name}")
+        result["error"] = msg
+        return result
 
-        if not doc_type or not isinstance(year, int):
-            msg = "PDF nebyl rozpoznán (typ nebo rok chybí)."
-            logger.warning(f"{msg} Výstup: {extraction_result}")
-            result["error"] = msg
-            return result
+    # Hlavní výkaz = ten na stránce z pre-passu (kontrola duplicit pracuje s ním)
+    primary = next((st for st in statements if hint.page_num in st["pages"]), statements[0])
 
-        # If check_only mode, return metadata without saving
-        if check_only:
-            result.update({
-                "success": True,
-                "year": year,
-                "doc_type": doc_type,
-                "confidence": confidence,
-                "check_only": True,
-            })
-            return result
+    # If check_only mode, return metadata without saving
+    if check_only:
+        result.update({
+            "success": True,
+            "year": primary["year"],
+            "doc_type": primary["doc_type"],
+            "confidence": primary["confidence"],
+            "check_only": True,
+        })
+        return result
 
-        # -------------------------
-        # 4) Uložit Document model
-        # -------------------------
-        doc = Document.objects.create(
-            owner=user,
-            file=uploaded_file,
-            year=year,
-            doc_type=doc_type,
-            analyzed=True,
-        )
+    # -------------------------
+    # 4) Uložit Document model
+    # -------------------------
+    doc = Document.objects.create(
+        owner=user,
+        file=uploaded_file,
+        year=primary["year"],
+        doc_type=primary["doc_type"],
+        analyzed=True,
+    )
+
+    # -------------------------
+    # 5) Uložit FinancialStatement – každý nalezený výkaz do svého roku.
+    #    FinancialStatement.document je 1:1, další roky dostanou vlastní
+    #    Document nad stejným souborem (RAG jen jednou, u hlavního).
+    # -------------------------
+    year_documents = {primary["year"]: doc}
+    for statement in statements:
+        year_doc = year_documents.get(statement["year"])
+        if year_doc is None:
+            year_doc = year_documents[statement["year"]] = Document.objects.create(
+                owner=user,
+                file=doc.file.name,
+                filename=doc.filename,
+                year=statement["year"],
+                doc_type=statement["doc_type"],
+                analyzed=True,
+                rag_processing_mode="manual",
+                rag_status="skipped",
+            )
 
-        # -------------------------
-        # 5) Uložit FinancialStatement
-        # -------------------------
         fs, _ = FinancialStatement.objects.get_or_create(
             user=user,
-            year=year,
-            defaults={"document": doc},
+            year=statement["year"],
+            defaults={"document": year_doc},
         )
 
         # Aktualizovat data
-        fs.document = doc
-        fs.scale = scale
-        fs.local_image_path = local_image_path
-        fs.confidence = confidence
+        fs.document = year_doc
+        fs.scale = statement["scale"]
+        fs.local_image_path = statement["local_image_path"]
+        fs.confidence = statement["confidence"]
 
         # Uložit správná data
-        if doc_type == "income_statement":
-            fs.income = data
-        elif doc_type == "balance_sheet":
-            fs.balance = data
+        if statement["doc_type"] == "income_statement":
+            fs.income = statement["extracted_data"]
+        elif statement["doc_type"] == "balance_sheet":
+            fs.balance = statement["extracted_data"]
 
         fs.save()
 
-        # -------------------------
-        # 6) Výsledek pro uživatele
-        # -------------------------
-        result.update({
-            "success": True,
-            "year": year,
-            "doc_type": doc_type,
-            "status": "Analyzováno (Vision API)",
-            "confidence": confidence,
-            "local_image_path": local_image_path,
-        })
-        return result
-
-    except Exception as exc:
-        logger.error(f"Chyba při zpracování (vision): {uploaded_file}: {exc}", exc_info=True)
-        result["error"] = str(exc)
-        return result
-
-    finally:
-        if tmp_path:
-            try:
-                os.remove(tmp_path)
-            except OSError:
-                pass
+    # -------------------------
+    # 6) Výsledek pro uživatele
+    # -------------------------
+    source = "textová vrstva PDF" if primary["sources"] == ["text_parser"] else "Vision API"
+    result.update({
+        "success": True,
+        "year": primary["year"],
+        "doc_type": primary["doc_type"],
+        "status": f"Analyzováno ({source})",
+        "confidence": primary["confidence"],
+        "local_image_path": primary["local_image_path"],
+        "statements": [
+            {
+                "year": st["year"],
+                "doc_type": st["doc_type"],
+                "pages": st["pages"],
+                "confidence": st["confidence"],
+            }
+            for st in statements
+        ],
+    })
+    return result
 
 
 # ================================================================
@@ -170,20 +362,15 @@ def upload_pdf(request):
         # Check if this is a confirmation of pending upload
         if confirm_overwrite and 'pending_upload' in request.session:
             pending = request.session['pending_upload']
-            temp_path = pending.get('temp_path')
+            pending_name = pending.get('pending_name')
 
-            if temp_path and os.path.exists(temp_path):
-                # Create a file-like object from temp file
-                from django.core.files import File
-                with open(temp_path, 'rb') as temp_file:
-                    django_file = File(temp_file, name=pending['file_name'])
+            if pending_name and default_storage.exists(pending_name):
+                # Zpracovat přímo ze storage (stream), žádná další kopie
+                with default_storage.open(pending_name, 'rb') as pending_file:
+                    django_file = File(pending_file, name=pending['file_name'])
                     result = _process_uploaded_file_vision(request.user, django_file, check_only=False)
 
-                # Clean up temp file
-                try:
-                    os.remove(temp_path)
-                except OSError:
-                    pass
+                default_storage.delete(pending_name)
 
                 del request.session['pending_upload']
 
@@ -237,18 +424,12 @@ def upload_pdf(request):
                     doc_type_name = "Rozvaha"
 
                 if has_data:
-                    # Save file temporarily and store path in session
-                    temp_filename = f"temp_upload_{uuid.uuid4().hex}.pdf"
-                    temp_dir = tempfile.gettempdir()
-                    temp_path = os.path.join(temp_dir, temp_filename)
-
-                    with open(temp_path, 'wb') as temp_file:
-                        for chunk in file.chunks():
-                            temp_file.write(chunk)
+                    # Jediný zápis souboru – čeká na potvrzení přepsání
+                    pending_name = default_storage.save(f"pending_uploads/{uuid.uuid4().hex}.pdf", file)
 
                     request.session['pending_upload'] = {
                         'file_name': file.name,
-                        'temp_path': temp_path,
+                        'pending_name': pending_name,
                         'year': year,
                         'doc_type': doc_type,
                         'confidence': confidence,
@@ -293,20 +474,57 @@ def upload_pdf(request):
 def upload_many(request):
     if request.method == "POST":
         files = request.FILES.getlist("pdf_files") or request.FILES.getlist("files")
-        results = []
+        if not files:
+            messages.error(request, "Žádné soubory.")
+            return redirect("ingest:upload_many")
 
-        for f in files:
-            # Use vision-based extraction
-            res = _process_uploaded_file_vision(request.user, f)
-            if not res["success"]:
-                logger.error(f"Chyba uploadu {f.name}: {res.get('error')}")
-            results.append(res)
+        job = _enqueue_ingest_job(request.user, files, source="upload_many")
 
-        return render(request, "ingest/upload_many_result.html", {"results": results})
+        if request.headers.get("x-requested-with") == "XMLHttpRequest":
+            return _job_accepted_response(job)
+        return redirect("ingest:job_detail", job_id=job.id)
 
     return render(request, "ingest/upload_many.html")
 
 
+# ================================================================
+#   2B) Background ingest jobs – stav zpracování
+# ================================================================
+def _enqueue_ingest_job(user, files, source):
+    job = IngestJobService().enqueue(user, files, source=source)
+    transaction.on_commit(start_inline_worker)
+    return job
+
+
+def _job_accepted_response(job):
+    payload = job.to_dict()
+    payload["job_id"] = job.id
+    payload["status_url"] = reverse("ingest:job_status_api", args=[job.id])
+    return JsonResponse(payload, status=202)
+
+
+@login_required
+def job_detail(request, job_id):
+    job = get_object_or_404(IngestJob, id=job_id, owner=request.user)
+    summary = job.to_dict()
+    return render(request, "ingest/upload_many_result.html", {
+        "job": job,
+        "summary": summary,
+        "results": summary["tasks"],
+        "status_url": reverse("ingest:job_status_api", args=[job.id]),
+    })
+
+
+@login_required
+@require_http_methods(["GET"])
+def job_status_api(request, job_id):
+    job = get_object_or_404(IngestJob, id=job_id, owner=request.user)
+    if job.status in ("queued", "running"):
+        # Dotazování probudí worker, který vrátí úlohy po pádu procesu zpět do fronty
+        start_inline_worker()
+    return JsonResponse(job.to_dict())
+
+
 # ================================================================
 #   3) Seznam dokumentů (HTML)
 # ================================================================
@@ -372,13 +590,9 @@ def documents_api(request):
     if not files:
         return HttpResponseBadRequest("Žádné soubory.")
 
-    # Use vision-based extraction
-    results = [
-        _process_uploaded_file_vision(request.user, f)
-        for f in files
-    ]
-
-    return JsonResponse({"results": results})
+    # Vision extraction runs in the background, poll status_url for results
+    job = _enqueue_ingest_job(request.user, files, source="documents_api")
+    return _job_accepted_response(job)
 
 
 # ================================================================
@@ -389,7 +603,8 @@ def documents_api(request):
 def upload_vision_api(request):
     """
     New API endpoint specifically for vision-based extraction
-    Returns detailed extraction results including confidence and PNG path
+    Queues the files and returns 202 with a job id; per-file results
+    (confidence, year, doc_type, errors) are available at status_url
     """
     files = request.FILES.getlist("files") or [request.FILES.get("file")]
     files = [f for f in files if f]  # Filter out None values
@@ -397,16 +612,8 @@ def upload_vision_api(request):
     if not files:
         return HttpResponseBadRequest("Žádné soubory.")
 
-    results = []
-    for f in files:
-        result = _process_uploaded_file_vision(request.user, f)
-        results.append(result)
-
-    # Return detailed results
-    if len(results) == 1:
-        return JsonResponse(results[0])
-    else:
-        return JsonResponse({"results": results})
+    job = _enqueue_ingest_job(request.user, files, source="upload_vision_api")
+    return _job_accepted_response(job)
 
 
 # ================================================================
@@ -419,7 +626,8 @@ def document_api(request, document_id):
         doc = get_object_or_404(Document, id=document_id, owner=request.user)
         FinancialStatement.objects.filter(document=doc).delete()
 
-        if doc.file:
+        # Soubor může sdílet více dokumentů (výroční zpráva s více roky)
+        if doc.file and not Document.objects.filter(file=doc.file.name).exclude(pk=doc.pk).exists():
             doc.file.delete(save=False)
 
         doc.delete()
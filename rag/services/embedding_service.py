@@ -11,7 +11,9 @@ from typing import List, Optional, Dict, Any
 from dataclasses import dataclass
 
 from django.conf import settings
-from openai import OpenAI
+
+from app.ai_clients import CircuitOpenError, ai_call, get_client
+from app.rate_limit import estimate_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +42,7 @@ class EmbeddingService:
         batch_size: int = 100,  # OpenAI supports up to 2048 inputs per request
         max_retries: int = 3,
         retry_delay: float = 1.0,
+        priority: str = "batch",
     ):
         """
         Initialize embedding service.
@@ -49,18 +52,22 @@ class EmbeddingService:
             batch_size: Number of texts to embed in a single API call
             max_retries: Maximum number of retries on failure
             retry_delay: Delay between retries in seconds
+            priority: Rate-limit class ("interactive" for search queries,
+                "ingest" for uploads, "batch" for bulk runs)
         """
         self.model = model
         self.batch_size = batch_size
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.priority = priority
 
         # Initialize OpenAI client
         api_key = settings.OPENAI_API_KEY
         if not api_key:
             raise ValueError("OPENAI_API_KEY not configured in settings")
 
-        self.client = OpenAI(api_key=api_key)
+        # Shared pooled client with the embeddings deadline
+        self.client = get_client("openai", "embeddings", api_key=api_key)
         logger.info(f"Initialized EmbeddingService with model: {model}")
 
     def embed_text(self, text: str) -> Optional[EmbeddingResult]:
@@ -126,10 +133,11 @@ class EmbeddingService:
         """
         for attempt in range(self.max_retries):
             try:
-                response = self.client.embeddings.create(
-                    input=texts,
-                    model=self.model
-                )
+                with ai_call("openai", self.priority, tokens=estimate_tokens(texts)):
+                    response = self.client.embeddings.create(
+                        input=texts,
+                        model=self.model
+                    )
 
                 # Parse response
                 results = []
@@ -147,6 +155,11 @@ class EmbeddingService:
 
                 return results
 
+            except CircuitOpenError as e:
+                # Provider degraded - retrying would only wait for the breaker
+                logger.warning(f"Embedding generation skipped: {e}")
+                return [None] * len(texts)
+
             except Exception as e:
                 logger.warning(
                     f"Embedding generation failed (attempt {attempt + 1}/{self.max_retries}): {e}"
@@ -41,7 +41,7 @@ class SemanticSearchService:
         Args:
             embedding_service: Service for generating query embeddings
         """
-        self.embedding_service = embedding_service or EmbeddingService()
+        self.embedding_service = embedding_service or EmbeddingService(priority="interactive")
         logger.info("Initialized SemanticSearchService")
 
     def search(
@@ -144,7 +144,7 @@ def _process_synchronously(document: Document):
 
         # Initialize services
         chunking_service = ChunkingService()
-        embedding_service = EmbeddingService()
+        embedding_service = EmbeddingService(priority="ingest")
 
         # Extract text
         processor = PDFProcessor()
@@ -12,12 +12,11 @@ from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 
-from openai import OpenAI
+from app.ai_clients import ai_call, get_client
+from app.rate_limit import estimate_tokens
 
 from .models import OpenAnswer
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
 QUESTIONS = [
     {
         "section": "VÍCE ČASU",
@@ -81,12 +80,13 @@ def _build_ai_prompt(user_inputs):
 def _ask_openai(messages, model=None):
     model = model or getattr(settings, "OPENAI_MODEL", "gpt-4o-mini")
     try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=0.2,
-            max_tokens=900,
-        )
+        with ai_call("openai", "ingest", tokens=estimate_tokens(messages, max_tokens=900)):
+            resp = get_client("openai", "chat").chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=0.2,
+                max_tokens=900,
+            )
         return resp.choices[0].message.content.strip()
     except Exception as exc:  # pragma: no cover - OpenAI fallback
         return (
@@ -1,10 +1,8 @@
 # survey/utils.py
-from openai import OpenAI
-from django.conf import settings
+from app.ai_clients import ai_call, get_client
+from app.rate_limit import estimate_tokens
 from .models import OpenAnswer
 
-client = OpenAI(api_key=getattr(settings, "OPENAI_API_KEY", None))
-
 
 def generate_ai_summary(batch_id, user):
     """
@@ -26,15 +24,16 @@ Piš česky, srozumitelně a přehledně.
 """
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Jsi asistent, který shrnuje odpovědi z dotazníků."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.7,
-            max_tokens=400,
-        )
+        with ai_call("openai", "ingest", tokens=estimate_tokens(prompt, max_tokens=400)):
+            response = get_client("openai", "chat").chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "Jsi asistent, který shrnuje odpovědi z dotazníků."},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0.7,
+                max_tokens=400,
+            )
         summary = response.choices[0].message.content.strip()
 
         # Uložení shrnutí ke všem odpovědím v batchi
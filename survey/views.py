@@ -5,12 +5,11 @@ from django.db.models import Avg
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.views.decorators.http import require_http_methods
 from .models import Response, SurveySubmission
-from openai import OpenAI
-from django.conf import settings
 import json
 
-# ✅ OpenAI klient
-client = OpenAI(api_key=getattr(settings, "OPENAI_API_KEY", None))
+# ✅ OpenAI klient – sdílený (pool spojení, timeout, circuit breaker)
+from app.ai_clients import ai_call, get_client
+from app.rate_limit import estimate_tokens
 
 
 
@@ -235,15 +234,16 @@ Níže jsou otázky a odpovědi v textové formě podle významu skóre:
 """
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Jsi firemní analytik, který interpretuje odpovědi z interních dotazníků."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.6,
-            max_tokens=800,
-        )
+        with ai_call("openai", "ingest", tokens=estimate_tokens(prompt, max_tokens=800)):
+            response = get_client("openai", "chat").chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": "Jsi firemní analytik, který interpretuje odpovědi z interních dotazníků."},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0.6,
+                max_tokens=800,
+            )
         summary = response.choices[0].message.content.strip()
         submission.ai_response = summary
         submission.save(update_fields=["ai_response"])